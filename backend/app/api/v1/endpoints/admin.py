@@ -3,6 +3,8 @@ Admin Endpoints
 User management, audit logs, and system settings
 """
 
+import asyncio
+import logging
 import uuid
 import json # Added import
 from datetime import datetime
@@ -20,9 +22,11 @@ from backend.app.infrastructure.database.models import AuditLog, Report, User, U
 from backend.app.schemas.user import UserCreate, UserResponse, UserUpdate
 from backend.app.core.parquet_cache import cache
 from backend.app.core.sync_service import sync_service
+from backend.app.services.insights_cache import schedule_insights_refresh_for_all_scopes
 from backend.app.core.supabase_user_service import supabase_user_service
 from backend.app.core.playground_sql_access import build_sql_access_context, evaluate_sql_access, parse_sql_access_context
 
+logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/admin", tags=["Admin"])
 PLAYGROUND_SQL_ACCESS_KEY = "playground_sql_full_access"
 PLAYGROUND_CANARY_ACCESS_KEY = "playground_canary_access"
@@ -175,6 +179,15 @@ def _log_playground_access_change(
     )
 
 
+async def _sync_parquet_and_refresh_insights():
+    """Runs the parquet sync off the event loop, then schedules insight regeneration if data changed."""
+    result = await asyncio.to_thread(sync_service.run_sync)
+    if not isinstance(result, dict) or result.get("status") != "success":
+        logger.warning(f"[WARNING] Sync sem novos dados ({result}); insights não serão regenerados")
+        return
+    await schedule_insights_refresh_for_all_scopes()
+
+
 @router.post("/sync-parquet")
 async def sync_parquet_data(
     background_tasks: BackgroundTasks,
@@ -184,8 +197,9 @@ async def sync_parquet_data(
     Trigger SQL Server -> Parquet synchronization
     
     Runs in background. Requires admin role.
+    After a successful sync, proactive insights are regenerated for every known segment scope.
     """
-    background_tasks.add_task(sync_service.run_sync)
+    background_tasks.add_task(_sync_parquet_and_refresh_insights)
     return {"message": "Sincronização iniciada em segundo plano. Verifique os logs para progresso.", "status": "processing"}
 
 
@@ -5,16 +5,19 @@ Autor: Backend Specialist Agent
 Data: 2026-02-07
 """
 
+from functools import lru_cache
+
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 
+from backend.app.config.settings import settings
 from backend.application.services.catalog_builder_service import CatalogBuilderService
 from backend.application.services.product_search_service import ProductSearchService
 from backend.infrastructure.adapters.repository.duckdb_catalog_repository import DuckDBCatalogRepository
 from backend.infrastructure.adapters.source.product_source_parquet_adapter import ProductSourceParquetAdapter
 from backend.application.services.pt_br_normalizer import PTBRNormalizer
-from backend.infrastructure.adapters.search.whoosh_bm25_index_adapter import WhooshBM25IndexAdapter
+from backend.infrastructure.adapters.search.product_retrieval_index_adapter import ProductRetrievalIndexAdapter
 from backend.infrastructure.adapters.search.vector_index_adapter import VectorIndexAdapter
 from backend.infrastructure.adapters.search.hybrid_ranking_adapter import HybridRankingAdapter
 
@@ -28,22 +31,35 @@ class SearchRequest(BaseModel):
 
 class RebuildRequest(BaseModel):
     description: str = "Manual Rebuild via API"
+    full: bool = False  # reprocessa todos os produtos (ex.: após mudar a normalização)
 
 # --- Dependency Injection (Simplified for MVP) ---
 
+@lru_cache(maxsize=1)
 def get_services():
+    """Serviços montados uma vez por processo (índices quentes compartilhados entre requests)."""
     db_path = "backend/data/product_catalog.duckdb"
-    index_dir = "backend/data/whoosh_index"
     parquet_path = "backend/data/parquet/admmat.parquet"
 
     repo = DuckDBCatalogRepository(db_path)
     source = ProductSourceParquetAdapter(parquet_path)
     normalizer = PTBRNormalizer()
-    bm25 = WhooshBM25IndexAdapter(index_dir)
-    vec = VectorIndexAdapter(db_path)
+    bm25 = ProductRetrievalIndexAdapter(repository=repo)
+    vec = VectorIndexAdapter(
+        db_path,
+        hnsw_m=settings.ANN_HNSW_M,
+        ef_construction=settings.ANN_EF_CONSTRUCTION,
+        ef_search=settings.ANN_EF_SEARCH,
+        onnx_model_dir=settings.EMBEDDING_ONNX_MODEL_DIR,
+        onnx_model_file=settings.EMBEDDING_ONNX_MODEL_FILE,
+        onnx_threads=settings.EMBEDDING_ONNX_THREADS,
+        query_batch_window_ms=settings.EMBEDDING_QUERY_BATCH_WINDOW_MS,
+        query_max_batch=settings.EMBEDDING_QUERY_MAX_BATCH,
+        query_cache_size=settings.EMBEDDING_QUERY_CACHE_SIZE,
+    )
     ranker = HybridRankingAdapter(repo)
 
-    builder = CatalogBuilderService(source, repo, repo, normalizer)
+    builder = CatalogBuilderService(source, repo, repo, normalizer, vector_index=vec)
     search = ProductSearchService(bm25, vec, ranker, repo)
     
     return builder, search, repo
@@ -64,9 +80,9 @@ async def rebuild_catalog(req: RebuildRequest, background_tasks: BackgroundTasks
     builder, _, _ = deps
     
     # Executar em background pois pode levar 2 minutos
-    background_tasks.add_task(builder.rebuild_catalog, req.description)
+    background_tasks.add_task(builder.rebuild_catalog, req.description, req.full)
     
-    return {"message": "Catalog rebuild started in background.", "description": req.description}
+    return {"message": "Catalog rebuild started in background.", "description": req.description, "full": req.full}
 
 @router.post("/search")
 async def search_catalog(req: SearchRequest, deps=Depends(get_services)):
@@ -31,6 +31,7 @@ from backend.app.core.learning.pattern_matcher import PatternMatcher
 # Sistema agora usa ChatServiceV3 (Metrics-First)
 from backend.app.core.llm_factory import LLMFactory, SmartLLM
 from backend.app.core.utils.error_handler import APIError
+from backend.app.core.cancellation import CancellationToken, cancellation_scope, record_reclaimed
 from backend.app.core.utils.session_manager import SessionManager
 from backend.app.core.utils.semantic_cache import cache_get, cache_set, cache_stats
 from backend.app.core.utils.response_validator import validate_response, validator_stats
@@ -274,8 +275,13 @@ async def stream_chat(
     last_event_id = request.headers.get("Last-Event-ID")
     logger.info(f"==> SSE STREAM REQUEST: {q} (Session: {session_id}) (Last-Event-ID: {last_event_id}) <==")
 
+    # Interrompe agente, ferramentas e DuckDB quando o cliente some (ver core/cancellation.py)
+    cancel_token = CancellationToken()
+
     async def event_generator():
         final_sent = False
+        streamed_text = ""
+        agent_task = None
         try:
             event_counter = int(last_event_id) if last_event_id else 0
 
@@ -363,6 +369,10 @@ async def stream_chat(
                 return # SAÍDA ANTECIPADA - Evita carregar o agente pesado
             
             # --- FAST PATH: perguntas determinísticas de KPI (sem LLM) ---
+            # KPIs com template (UNE, produto, top N, rupturas) são respondidos pelo
+            # agente via deterministic fast path; aqui só tratamos pedidos genéricos.
+            from backend.app.core.utils.deterministic_fast_path import plan_fast_path
+
             kpi_intents = [
                 "kpi",
                 "kpis",
@@ -371,7 +381,11 @@ async def stream_chat(
                 "métricas",
                 "resumo executivo",
             ]
-            if any(term in query_clean for term in kpi_intents) and len(query_clean) <= 60:
+            if (
+                any(term in query_clean for term in kpi_intents)
+                and len(query_clean) <= 60
+                and (not settings.DETERMINISTIC_FAST_PATH_ENABLED or plan_fast_path(q) is None)
+            ):
                 deterministic_msg = (
                     "Para KPIs instantâneos, use o Dashboard/endpoint de métricas. "
                     "Posso detalhar um KPI específico se você informar qual (ex.: venda_30dd, margem, estoque)."
@@ -443,18 +457,20 @@ async def stream_chat(
                     await event_queue.put(event)
 
                 # [OK] FIX: Timeout reduzido de 300s para 60s (resposta mais rápida)
-                agent_task = asyncio.create_task(
-                    asyncio.wait_for(
-                        chat_service_v3.process_message(
-                            query=q, 
-                            session_id=session_id, 
-                            user_id=current_user.id,
-                            user_role=current_user.role,
-                            on_progress=progress_callback
-                        ),
-                        timeout=90.0  # [OK] FIX: Aumentado para 90s para queries complexas com gráficos
+                # A task herda o token (contextvar) e o repassa às threads das ferramentas
+                with cancellation_scope(cancel_token):
+                    agent_task = asyncio.create_task(
+                        asyncio.wait_for(
+                            chat_service_v3.process_message(
+                                query=q,
+                                session_id=session_id,
+                                user_id=current_user.id,
+                                user_role=current_user.role,
+                                on_progress=progress_callback
+                            ),
+                            timeout=90.0  # [OK] FIX: Aumentado para 90s para queries complexas com gráficos
+                        )
                     )
-                )
 
                 # Stream progress events as they arrive
                 agent_response = None
@@ -464,6 +480,11 @@ async def stream_chat(
                 while True:
                     try:
                         event = await asyncio.wait_for(event_queue.get(), timeout=0.1)
+                        # Tokens da síntese final (LLM streaming) já chegam como eventos "text"
+                        if isinstance(event, dict) and event.get("type") == "text":
+                            streamed_text += str(event.get("text", ""))
+                        elif isinstance(event, dict) and event.get("type") == "text_replace":
+                            streamed_text = str(event.get("text", ""))
                         event_counter += 1
                         keepalive_counter = 0  # Reset keepalive on real event
                         yield f"id: {event_counter}\n"
@@ -471,6 +492,12 @@ async def stream_chat(
                     except asyncio.TimeoutError:
                         keepalive_counter += 1
 
+                        # Cliente fechou a aba: parar o agente em vez de esperar a resposta
+                        if keepalive_counter % 10 == 0 and await request.is_disconnected():
+                            logger.info(f"SSE desconectado durante o processamento: {q[:50]}...")
+                            final_sent = True
+                            return
+
                         # Send keepalive event every 5 seconds to prevent frontend timeout
                         if keepalive_counter >= keepalive_interval:
                             event_counter += 1
@@ -484,6 +511,8 @@ async def stream_chat(
                                 agent_response = agent_task.result()
                             except asyncio.TimeoutError:
                                 logger.error(f"Agent timeout após 90s para query: {q}")
+                                # wait_for cancelou a coroutine; o token para threads e queries
+                                cancel_token.cancel("timeout")
                                 agent_response = {
                                     "type": "text",
                                     "result": {
@@ -526,6 +555,7 @@ async def stream_chat(
             response_type = agent_response.get("type", "text")
             response_content = agent_response.get("result")
             response_text = ""
+            chart_sent = False
 
             if response_type == "text" or response_type == "tool_result":
                 # CRITICAL FIX: Check if tool_result contains chart_data from chart generation tools
@@ -555,6 +585,7 @@ async def stream_chat(
                         event_counter += 1
                         yield f"id: {event_counter}\n"
                         yield f"data: {safe_json_dumps({'type': 'chart', 'chart_spec': chart_data, 'done': False})}\n\n"
+                        chart_sent = True
                         
                         # Set response text from result's mensagem if available
                         if isinstance(result_data, dict):
@@ -589,6 +620,7 @@ async def stream_chat(
                     event_counter += 1
                     yield f"id: {event_counter}\n"
                     yield f"data: {safe_json_dumps({'type': 'chart', 'chart_spec': chart_spec, 'done': False})}\n\n"
+                    chart_sent = True
             
             # Reforço de qualidade interno: não expor detalhes técnicos ao usuário final.
             if response_text and response_text.strip() and not validation.is_valid:
@@ -603,6 +635,21 @@ async def stream_chat(
                     logger.info("[QUALITY] Sanitizacao de saida aplicada para remover termos tecnicos.")
                 response_text = sanitized
 
+            # Texto já enviado token a token pelo LLM: apenas reconciliar com a versão final.
+            # Gráficos reiniciam o texto no frontend, então nesse caso o texto é reenviado.
+            if streamed_text and not chart_sent and response_text and response_text.strip():
+                if response_text.startswith(streamed_text):
+                    remainder = response_text[len(streamed_text):]
+                    if remainder:
+                        event_counter += 1
+                        yield f"id: {event_counter}\n"
+                        yield f"data: {safe_json_dumps({'type': 'text', 'text': remainder, 'done': False})}\n\n"
+                else:
+                    event_counter += 1
+                    yield f"id: {event_counter}\n"
+                    yield f"data: {safe_json_dumps({'type': 'text_replace', 'text': response_text, 'done': False})}\n\n"
+                response_text = ""
+
             # Só fazer streaming de texto se houver texto para enviar
             if response_text and response_text.strip():
                 words = response_text.split(" ")
@@ -643,6 +690,12 @@ async def stream_chat(
 
             yield f"data: {safe_json_dumps(error_response)}\n\n"
         finally:
+            if agent_task is not None and not agent_task.done():
+                # Gerador encerrado (desconexão/erro) com o agente ainda rodando
+                cancel_token.cancel("client_disconnected")
+                agent_task.cancel()
+                record_reclaimed("request", cancel_token)
+
             # 🛑 SAFETY NET: Always send DONE signal to prevent frontend infinite spinner
             if not final_sent:
                 yield f"data: {safe_json_dumps({'type': 'final', 'text': '', 'done': True})}\n\n"
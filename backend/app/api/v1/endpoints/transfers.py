@@ -1,5 +1,6 @@
 from typing import Annotated, List, Dict, Any, Optional
 from datetime import datetime
+import asyncio
 import json
 import os
 from pathlib import Path
@@ -17,6 +18,7 @@ from backend.app.core.tools.une_tools import (
 from backend.app.core.utils.error_handler import APIError
 from backend.app.core.duckdb_config import get_safe_connection
 from backend.app.core.data_scope_service import data_scope_service
+from backend.app.core.rag.product_retrieval import get_product_retrieval_service
 
 router = APIRouter(prefix="/transfers", tags=["Transfers"])
 
@@ -46,6 +48,23 @@ class ProductSearchRequest(BaseModel):
     limit: int = Field(default=50, le=500)
 
 
+def _attribute_predicate(column: str, fragment: str) -> Optional[str]:
+    """
+    Filtro "contém" (ILIKE '%x%') resolvido contra os valores distintos da
+    coluna no índice de produtos compartilhado: o SQL compara por igualdade
+    (IN) em vez de aplicar ILIKE em cada linha. None = nenhum valor casa.
+    """
+    try:
+        values = get_product_retrieval_service().match_attribute(column, fragment)
+    except Exception:
+        safe = fragment.replace("'", "''")
+        return f"{column} ILIKE '%{safe}%'"
+    if not values:
+        return None
+    quoted = ", ".join("'" + v.replace("'", "''") + "'" for v in values)
+    return f"{column} IN ({quoted})"
+
+
 class BulkTransferRequestPayload(BaseModel):
     """Payload para transferências múltiplas (1→N ou N→N)"""
     items: List[TransferRequestPayload]
@@ -330,21 +349,18 @@ async def search_products(
         grupo_col = "NOMEGRUPO" if "NOMEGRUPO" in cols else None
         fabricante_col = "NOMEFABRICANTE" if "NOMEFABRICANTE" in cols else None
 
-        # Construir filtros Chaining
-        # FIX: Explicit f-string interpolation for LIKE/ILIKE patterns 
-        # to avoid "incompatible function arguments" error in current DuckDB python binding
-        if request.segmento and segmento_col:
-             # Sanitize input to prevent injection
-             safe_seg = request.segmento.replace("'", "''")
-             rel = rel.filter(f"{segmento_col} ILIKE '%{safe_seg}%'")
-
-        if request.grupo and grupo_col:
-             safe_grp = request.grupo.replace("'", "''")
-             rel = rel.filter(f"{grupo_col} ILIKE '%{safe_grp}%'")
-
-        if request.fabricante and fabricante_col:
-             safe_fab = request.fabricante.replace("'", "''")
-             rel = rel.filter(f"{fabricante_col} ILIKE '%{safe_fab}%'")
+        # Construir filtros Chaining (valores resolvidos no índice de produtos compartilhado)
+        for fragment, col in (
+            (request.segmento, segmento_col),
+            (request.grupo, grupo_col),
+            (request.fabricante, fabricante_col),
+        ):
+            if fragment and col:
+                # Partida a frio lê o parquet e monta o índice: fora do event loop
+                predicate = await asyncio.to_thread(_attribute_predicate, col, fragment)
+                if predicate is None:
+                    return []
+                rel = rel.filter(predicate)
 
         if request.estoque_min is not None:
              rel = rel.filter(f"COALESCE(TRY_CAST(ESTOQUE_UNE AS DOUBLE), 0) >= {request.estoque_min}")
@@ -406,6 +422,45 @@ async def search_products(
         )
 
 
+@router.get("/products/autocomplete")
+async def autocomplete_products(
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(default=10, ge=1, le=50),
+) -> List[Dict[str, Any]]:
+    """
+    Typeahead de produtos por nome (tolerante a erros de digitação) ou código,
+    ordenado por relevância e vendas dos últimos 30 dias.
+    Respeita os segmentos permitidos ao usuário.
+    """
+    unrestricted = (
+        current_user.role == "admin"
+        or current_user.username == "admin"
+        or "*" in current_user.segments_list
+        or not current_user.segments_list
+    )
+    segments = None if unrestricted else list(current_user.segments_list)
+    try:
+        hits = await asyncio.to_thread(
+            get_product_retrieval_service().autocomplete, q, limit, segments
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error autocompleting products: {str(e)}",
+        )
+    return [
+        {
+            "produto_id": h.product_id,
+            "nome": h.name[:60],
+            "segmento": h.segment,
+            "vendas_30dd": int(h.sales),
+            "match": h.match,
+        }
+        for h in hits
+    ]
+
+
 @router.post("/bulk")
 async def create_bulk_transfer_request(
     payload: BulkTransferRequestPayload,
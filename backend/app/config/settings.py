@@ -81,6 +81,22 @@ class Settings(BaseSettings):
     # RAG (Retrieval Augmented Generation)
     RAG_EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
     RAG_FAISS_INDEX_PATH: str = "data/rag/faiss_index.bin"
+    RAG_EMBEDDING_STORE_DTYPE: str = "float32"  # float16 = metade do disco/RSS (perda de precisão desprezível p/ cosseno)
+    EMBEDDING_BATCH_SIZE: int = 64  # textos por chamada (limitado pelo backend)
+    EMBEDDING_MAX_CONCURRENCY: int = 4  # lotes simultâneos (backend local usa 1)
+    EMBEDDING_MAX_RETRIES: int = 3
+    EMBEDDING_ONNX_MODEL_DIR: str = "backend/data/models/all-MiniLM-L6-v2"  # tokenizer.json + onnx/ (sem ele: sentence-transformers)
+    EMBEDDING_ONNX_MODEL_FILE: str = "onnx/model_qint8_avx2.onnx"  # modelo quantizado int8 (relativo ao diretório)
+    EMBEDDING_ONNX_THREADS: int = 0  # threads intra-op do onnxruntime (0 = padrão do runtime)
+    EMBEDDING_QUERY_BATCH_WINDOW_MS: float = 5.0  # janela para agrupar queries concorrentes num forward pass
+    EMBEDDING_QUERY_MAX_BATCH: int = 32
+    EMBEDDING_QUERY_CACHE_SIZE: int = 4096  # LRU query -> embedding
+    ANN_HNSW_M: int = 32  # vizinhos por nó do HNSW (maior = mais recall, mais memória)
+    ANN_EF_CONSTRUCTION: int = 200  # largura da busca ao inserir (maior = grafo melhor, build mais lento)
+    ANN_EF_SEARCH: int = 64  # largura da busca por query (trade-off recall/latência)
+    PRODUCT_SEARCH_CACHE_SIZE: int = 1024  # LRU query -> resultados (por versão do catálogo)
+    PRODUCT_SEARCH_LATENCY_BUDGET_MS: int = 800  # perna densa acima disso é descartada (só BM25)
+    PRODUCT_SEARCH_VERSION_CHECK_SECONDS: int = 30  # intervalo para checar se o parquet mudou
 
     # Learning System
     LEARNING_FEEDBACK_PATH: str = "data/feedback/"
@@ -132,6 +148,85 @@ class Settings(BaseSettings):
     DEV_FAST_MODE: bool = False
     LLM_MAX_OUTPUT_TOKENS: int = 2048
     LLM_HISTORY_MAX_MESSAGES: int = 15
+    LLM_STREAMING_ENABLED: bool = True  # Tokens da resposta final enviados direto ao SSE
+
+    # Async LLM adapters (cliente HTTP compartilhado com keep-alive/HTTP2)
+    LLM_ASYNC_ADAPTERS_ENABLED: bool = True
+    LLM_HTTP2_ENABLED: bool = True
+    LLM_HTTP_MAX_CONNECTIONS: int = 100
+    LLM_HTTP_MAX_KEEPALIVE: int = 20
+    LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    LLM_HTTP_TIMEOUT_SECONDS: float = 60.0
+    LLM_PROVIDER_MAX_CONCURRENCY: int = 16  # chamadas simultâneas por provedor
+
+    # LLM Hedging (dispara o provedor secundário se o primário passar do p95)
+    LLM_HEDGING_ENABLED: bool = False  # hedge gasta chamadas extras no secundário
+    LLM_HEDGING_DEFAULT_DEADLINE_SECONDS: float = 4.0  # prazo antes de ter amostras suficientes
+    LLM_HEDGING_MIN_DEADLINE_SECONDS: float = 0.5
+    LLM_HEDGING_DEADLINE_MULTIPLIER: float = 1.0  # prazo = p95 do primário x multiplicador
+    LLM_HEDGING_MIN_SAMPLES: int = 20
+    LLM_HEDGING_MAX_RATIO: float = 0.1  # no máximo ~10% das requisições com hedge
+    LLM_HEDGING_MAX_INFLIGHT: int = 4
+
+    # Admissão adaptativa por provedor (limite AIMD + breaker por SLO + cota)
+    LLM_ADAPTIVE_LIMIT_ENABLED: bool = True
+    LLM_ADAPTIVE_LIMIT_INITIAL: int = 8  # teto: LLM_PROVIDER_MAX_CONCURRENCY
+    LLM_ADAPTIVE_LIMIT_MIN: int = 1
+    LLM_LATENCY_SLO_SECONDS: float = 10.0  # completion inteira
+    LLM_FIRST_TOKEN_SLO_SECONDS: float = 4.0  # streaming
+    LLM_BREAKER_WINDOW: int = 20
+    LLM_BREAKER_MIN_CALLS: int = 5
+    LLM_BREAKER_ERROR_RATIO: float = 0.5
+    LLM_BREAKER_SLOW_RATIO: float = 0.5
+    LLM_BREAKER_OPEN_SECONDS: float = 30.0
+    LLM_BREAKER_MAX_OPEN_SECONDS: float = 300.0
+    LLM_RATE_LIMIT_DEFAULT_BACKOFF_SECONDS: float = 5.0  # 429 sem dica de retry
+
+    # LLM Completion Cache (content-addressed, apenas configurações determinísticas)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 512
+    LLM_CACHE_TTL_SECONDS: int = 3600
+    LLM_CACHE_MAX_TEMPERATURE: float = 0.1
+
+    # Provider Prompt Cache (system prompt + tools em cache no provedor, referenciado por handle)
+    LLM_PROMPT_CACHE_ENABLED: bool = True
+    LLM_PROMPT_CACHE_TTL_SECONDS: int = 3600
+    LLM_PROMPT_CACHE_REFRESH_MARGIN_SECONDS: int = 60
+    LLM_PROMPT_CACHE_RETRY_SECONDS: int = 600
+
+    # Context Budget (compacta resultados de ferramenta e histórico antes de cada rodada LLM)
+    LLM_CONTEXT_BUDGET_ENABLED: bool = True
+    LLM_CONTEXT_BUDGET_TOKENS: int = 24000
+    LLM_TOOL_RESULT_MAX_TOKENS: int = 2500
+    LLM_TOOL_RESULT_TOP_K: int = 10
+
+    # Deterministic Fast Path (KPIs respondidos por template, sem loop LLM)
+    DETERMINISTIC_FAST_PATH_ENABLED: bool = True
+    DETERMINISTIC_FAST_PATH_MIN_CONFIDENCE: float = 0.80
+
+    # Speculative Tool Prefetch (ferramenta prevista executa durante a 1a rodada LLM)
+    SPECULATIVE_PREFETCH_ENABLED: bool = True
+    SPECULATIVE_PREFETCH_MIN_CONFIDENCE: float = 0.80
+    SPECULATIVE_PREFETCH_MAX_INFLIGHT: int = 4
+
+    # Tool Memo (resultados de ferramenta reaproveitados entre turnos da mesma sessão)
+    TOOL_MEMO_ENABLED: bool = True
+    TOOL_MEMO_MAX_ENTRIES: int = 64  # por sessão
+    TOOL_MEMO_TTL_SECONDS: int = 900
+    TOOL_MEMO_MAX_SESSIONS: int = 1000
+
+    # Multi-Intent Planner (perguntas compostas -> DAG de ferramentas + 1 rodada de síntese)
+    MULTI_INTENT_PLANNER_ENABLED: bool = True
+    MULTI_INTENT_LLM_PLANNER_ENABLED: bool = False  # chamada LLM de planejamento quando as regras não cobrem
+    MULTI_INTENT_MAX_NODES: int = 8
+    MULTI_INTENT_MAX_CONCURRENCY: int = 4
+
+    # Tool Executor (pools separados cpu/io, limite por ferramenta em tool_registry.TOOL_EXECUTION_PROFILES)
+    TOOL_EXECUTOR_ENABLED: bool = True
+    TOOL_EXECUTOR_CPU_WORKERS: int = 0  # 0 = min(4, núcleos)
+    TOOL_EXECUTOR_IO_WORKERS: int = 16
+    TOOL_EXECUTOR_PROCESS_POOL_ENABLED: bool = False  # ferramentas pandas com process=True em processos (spawn)
+    TOOL_EXECUTOR_PROCESS_WORKERS: int = 0  # 0 = mesmo número do pool cpu
 
     # Modelos de Tarefa
     INTENT_CLASSIFICATION_MODEL: str = "gemini-2.5-pro"
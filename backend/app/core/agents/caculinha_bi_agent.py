@@ -49,6 +49,7 @@ from backend.app.core.tools.metadata_tools import consultar_dicionario_dados, an
 # )
 
 from backend.app.core.data_source_manager import get_data_manager # Para injeção dinâmica
+from backend.app.core.llm_base import aiter_in_thread
 
 # Import NEW universal chart tool - Context7 2025 Best Practice
 from backend.app.core.tools.universal_chart_generator import gerar_grafico_universal_v2
@@ -71,21 +72,18 @@ from backend.app.core.tools.chart_tools import (
 # MOVED TO __INIT__ FOR SAFETY
 # from app.core.tools.semantic_search_tool import buscar_produtos_inteligente
 
-# NEW 2026-02-07: Deep Catalog Search (Hybrid BM25 + Vector)
-try:
-    from backend.app.core.tools.catalog_search_tool import create_catalog_search_tool
-    from backend.application.services.product_search_service import ProductSearchService
-    from backend.infrastructure.adapters.search.whoosh_bm25_index_adapter import WhooshBM25IndexAdapter
-    from backend.infrastructure.adapters.search.vector_index_adapter import VectorIndexAdapter
-    from backend.infrastructure.adapters.search.hybrid_ranking_adapter import HybridRankingAdapter
-    from backend.infrastructure.adapters.repository.duckdb_catalog_repository import DuckDBCatalogRepository
-    CATALOG_SEARCH_AVAILABLE = True
-except ImportError as e:
-    logger.warning(f"Catalog Search dependencies missing: {e}")
-    CATALOG_SEARCH_AVAILABLE = False
+# NEW 2026-02-07: Deep Catalog Search (Hybrid BM25 + Vector) - montada no tool registry
+from backend.app.core.cancellation import (
+    RequestCancelled,
+    current_cancellation_token,
+    raise_if_cancelled,
+    record_reclaimed,
+)
+from backend.app.core.tool_executor import get_tool_executor
+from backend.app.core.tools.tool_registry import clean_tool_schema, convert_tools_to_declarations, get_tool_registry
 
 # Import RAG Hybrid Retriever - Query Example Retrieval 2025
-from backend.app.core.rag.hybrid_retriever import HybridRetriever
+from backend.app.core.rag.hybrid_retriever import get_hybrid_retriever
 
 # Optional: Import CodeGenAgent just for type hinting if needed,
 # but we won't use it for logic anymore.
@@ -107,6 +105,79 @@ safe_json_serialize = safe_json_dumps
 # Este agente está deprecated. Use ChatServiceV3 para novas implementações.
 from backend.app.core.prompts.master_prompt import MASTER_PROMPT as SYSTEM_PROMPT
 
+_system_prompt_cache: Optional[str] = None
+
+
+def _get_system_prompt() -> str:
+    """
+    System prompt com o schema real injetado (DYNAMIC PROMPTING).
+    Montado uma vez por processo e compartilhado pelos agentes de todos os
+    roles; falhas na leitura do schema não ficam em cache.
+    """
+    global _system_prompt_cache
+
+    if _system_prompt_cache is not None:
+        return _system_prompt_cache
+
+    try:
+        manager = get_data_manager()
+        # Tentar obter colunas (cache hit provável)
+        cols = manager.get_columns()
+
+        # Filtrar colunas importantes (evitar poluir com as 100)
+        # Mas garantir que as críticas estejam lá
+        important_keywords = ['PRODUTO', 'NOME', 'UNE', 'SEGMENTO', 'CATEGORIA', 'VENDA', 'ESTOQUE', 'PRECO', 'CUSTO', 'LIQUIDO', 'MARGEM', 'FABRICANTE']
+        priority_cols = [c for c in cols if any(k in c.upper() for k in important_keywords)]
+        other_cols = [c for c in cols if c not in priority_cols]
+
+        # Montar string de schema com instruções claras para o LLM
+        schema_str = f"""Você tem acesso a um banco de dados Parquet com **{len(cols)} colunas**.
+
+**[DATA] COLUNAS PRIORITÁRIAS ({len(priority_cols)} colunas):**
+Use estas colunas preferencialmente para análises. Elas cobrem os principais casos de uso:
+{", ".join([f"`{c}`" for c in priority_cols])}
+
+**📁 OUTRAS COLUNAS DISPONÍVEIS ({len(other_cols)} colunas):**
+{", ".join([f"`{c}`" for c in other_cols[:30]])}
+{f"... (+{len(other_cols)-30} colunas adicionais)" if len(other_cols) > 30 else ""}
+
+**[WARNING] IMPORTANTE:**
+- Se precisar de TODAS as colunas ou descrições detalhadas, use a ferramenta `consultar_dicionario_dados()`.
+- NUNCA invente nomes de colunas. Use APENAS as listadas acima.
+- Para histórico de vendas, use: `MES_01` a `MES_12` (vendas mensais) ou `VENDA_30DD` (últimos 30 dias).
+- Para preços: `LIQUIDO_38` (preço de venda) e `ULTIMA_ENTRADA_CUSTO_CD` (custo).
+"""
+
+        # Substituir no template usando o novo placeholder
+        if "[SCHEMA_INJECTION_POINT]" in SYSTEM_PROMPT:
+            prompt = SYSTEM_PROMPT.replace(
+                "[SCHEMA_INJECTION_POINT]",
+                schema_str
+            )
+            logger.info(f"[OK] Dynamic Schema Injection: Sucesso ({len(cols)} colunas injetadas)")
+        else:
+            # Fallback: se o placeholder não existir, anexar ao final
+            logger.warning("[WARNING] Placeholder [SCHEMA_INJECTION_POINT] não encontrado. Anexando schema ao final do prompt.")
+            prompt = SYSTEM_PROMPT + "\n\n## 🗄️ DADOS DISPONÍVEIS\n" + schema_str
+
+        schema_injected = True
+    except Exception as e:
+        logger.warning(f"[ERROR] Dynamic Schema Injection Failed: {e}. Using static prompt.")
+        prompt = SYSTEM_PROMPT
+        schema_injected = False
+
+    if settings.DEV_FAST_MODE:
+        prompt += (
+            "\n\n## MODO DEV FAST\n"
+            "- Responda objetivamente em no máximo 8 linhas.\n"
+            "- Evite chamadas de ferramenta caras, a menos que sejam estritamente necessárias.\n"
+        )
+
+    if schema_injected:
+        _system_prompt_cache = prompt
+    return prompt
+
+
 class CaculinhaBIAgent:
     """
     Agent responsible for Business Intelligence queries using Gemini Native Function Calling.
@@ -139,8 +210,8 @@ class CaculinhaBIAgent:
         # Initialize RAG Retriever (lazy - background warming, não bloqueia)
         if self.enable_rag:
             try:
-                self.retriever = HybridRetriever()
-                logger.info("RAG Hybrid Retriever criado (warming será iniciado em background)")
+                self.retriever = get_hybrid_retriever()  # compartilhado entre agentes de todos os roles
+                logger.info("RAG Hybrid Retriever obtido (warming será iniciado em background)")
                 # NOTE: Warming será iniciado no primeiro run_async() via _start_rag_warming()
             except Exception as e:
                 logger.warning(f"Falha ao criar RAG retriever: {e}. Continuando sem RAG.")
@@ -150,204 +221,26 @@ class CaculinhaBIAgent:
             self.retriever = None
             logger.info("RAG desabilitado (enable_rag=False)")
 
-        # Define CORE tools (always available)
-        # FIX DEFINITIVO: Gemini tem limite RÍGIDO de complexidade
-        # Mantendo apenas 4 ferramentas CRÍTICAS
-        core_tools = [
-            consultar_dados_flexivel,  # Consulta genérica
-            gerar_grafico_universal_v2,  # Visualização
-            pesquisar_precos_concorrentes,  # Pesquisa concorrencial externa
-            calcular_abastecimento_une,  # Abastecimento
-            encontrar_rupturas_criticas,  # Rupturas
-            consultar_dicionario_dados,  # FIX 2026-02-04: Restaurado para schema discovery
-            analisar_produto_todas_lojas,  # FIX 2026-02-04: Restaurado para análise multi-loja
-        ]
-        
-        # [OK] NEW 2026-02-07: Integration of Deep Catalog Search
-        if CATALOG_SEARCH_AVAILABLE:
-            try:
-                # Initialize Search Infrastructure
-                db_path = "backend/data/product_catalog.duckdb"
-                index_dir = "backend/data/whoosh_index"
-                
-                repo = DuckDBCatalogRepository(db_path)
-                bm25 = WhooshBM25IndexAdapter(index_dir)
-                vec = VectorIndexAdapter(db_path)
-                ranker = HybridRankingAdapter(repo)
-                
-                search_service = ProductSearchService(bm25, vec, ranker, repo)
-                catalog_search_tool = create_catalog_search_tool(search_service)
-                core_tools.append(catalog_search_tool)
-                logger.info("[OK] Deep Catalog Search tool registered successfully")
-            except Exception as e:
-                logger.error(f"Failed to initialize Catalog Search tool: {e}")
-        
-        # FIX 2026-02-04: Ferramentas restauradas para melhorar capacidade do agente
-        
-        # Remove None tools (failed imports)
-        core_tools = [t for t in core_tools if t is not None]
-
-        # Dynamically add OPTIONAL tools (ML/Deep Learning dependencies)
-        optional_tools = []
-        if settings.DEV_FAST_MODE:
-            logger.info("[DEV_FAST_MODE] Optional expensive tools disabled by default.")
-        else:
-        
-        # 1. Anomaly Detection (SciPy/Stats dependency)
-            try:
-                from backend.app.core.tools.anomaly_detection import analisar_anomalias
-                optional_tools.append(analisar_anomalias)
-            except ImportError:
-                logger.warning("[WARNING] Anomaly Detection tools missing (dependency issue).")
-
-        # 2. Purchasing Tools (StatsModels/Torch dependency)
-            try:
-                from backend.app.core.tools.purchasing_tools import (
-                    calcular_eoq,
-                    prever_demanda,
-                    alocar_estoque_lojas
-                )
-                optional_tools.extend([calcular_eoq, prever_demanda, alocar_estoque_lojas])
-            except ImportError:
-                logger.warning("[WARNING] Purchasing tools missing (likely StatsModels/Torch issue).")
-
-        # 3. Advanced Analytics Tools (SciPy/Sklearn dependency) - NOVO 2026-01-24
-        # Ferramentas STEM para Gemini 2.5 Pro: regressão, anomalias, correlação
-            try:
-                from backend.app.core.tools.advanced_analytics_tool import (
-                    analise_regressao_vendas,
-                    detectar_anomalias_vendas,
-                    analise_correlacao_produtos
-                )
-                optional_tools.extend([
-                    analise_regressao_vendas,
-                    detectar_anomalias_vendas,
-                    analise_correlacao_produtos
-                ])
-                logger.info("[OK] Advanced Analytics tools loaded (Gemini 2.5 Pro STEM features)")
-            except ImportError as e:
-                logger.warning(f"[WARNING] Advanced Analytics tools missing (SciPy/Sklearn issue): {e}")
-
-        # 4. RAG Tools (LangChain/FAISS/Torch dependency)
-        # Already handled via self.buscar_produtos_inteligente logic in _register_retriever_tools
-        # But for 'all_bi_tools' list used for scoping, we add it if enabled
-        if self.enable_rag and self.buscar_produtos_inteligente and not settings.DEV_FAST_MODE:
-             optional_tools.append(self.buscar_produtos_inteligente)
-
-        all_bi_tools = core_tools + optional_tools
-
-        # Apply role-based tool scoping (Security 2025)
-        self.bi_tools = ToolPermissionManager.get_tools_for_role(
-            all_tools=all_bi_tools,
-            user_role=self.user_role
-        )
+        # Ferramentas: registro do processo (montado uma vez) + visão do role.
+        # Agentes de novos roles não reimportam nem reconvertem ferramentas.
+        registry = get_tool_registry()
+        tool_view = registry.view(self.user_role)
+        self.bi_tools = list(tool_view.tools)
 
         logger.info(
-            f"Agent initialized with {len(self.bi_tools)}/{len(all_bi_tools)} tools "
+            f"Agent initialized with {len(self.bi_tools)}/{len(registry)} tools "
             f"for role '{self.user_role}'"
         )
 
-        # Convert LangChain tools to Gemini Function Declarations
-        self.gemini_tools = self._convert_tools_to_gemini_format(self.bi_tools)
-        
-        # System instruction - Conversacional + BI Expert (Context7 Enhanced v2025)
-        # DYNAMIC PROMPTING: Injetar schema real na inicialização
-        try:
-            manager = get_data_manager()
-            # Tentar obter colunas (cache hit provável)
-            cols = manager.get_columns()
-            
-            # Filtrar colunas importantes (evitar poluir com as 100)
-            # Mas garantir que as críticas estejam lá
-            important_keywords = ['PRODUTO', 'NOME', 'UNE', 'SEGMENTO', 'CATEGORIA', 'VENDA', 'ESTOQUE', 'PRECO', 'CUSTO', 'LIQUIDO', 'MARGEM', 'FABRICANTE']
-            priority_cols = [c for c in cols if any(k in c.upper() for k in important_keywords)]
-            other_cols = [c for c in cols if c not in priority_cols]
-            
-            # Montar string de schema com instruções claras para o LLM
-            schema_str = f"""Você tem acesso a um banco de dados Parquet com **{len(cols)} colunas**.
-
-**[DATA] COLUNAS PRIORITÁRIAS ({len(priority_cols)} colunas):**
-Use estas colunas preferencialmente para análises. Elas cobrem os principais casos de uso:
-{", ".join([f"`{c}`" for c in priority_cols])}
-
-**📁 OUTRAS COLUNAS DISPONÍVEIS ({len(other_cols)} colunas):**
-{", ".join([f"`{c}`" for c in other_cols[:30]])}
-{f"... (+{len(other_cols)-30} colunas adicionais)" if len(other_cols) > 30 else ""}
-
-**[WARNING] IMPORTANTE:**
-- Se precisar de TODAS as colunas ou descrições detalhadas, use a ferramenta `consultar_dicionario_dados()`.
-- NUNCA invente nomes de colunas. Use APENAS as listadas acima.
-- Para histórico de vendas, use: `MES_01` a `MES_12` (vendas mensais) ou `VENDA_30DD` (últimos 30 dias).
-- Para preços: `LIQUIDO_38` (preço de venda) e `ULTIMA_ENTRADA_CUSTO_CD` (custo).
-"""
-                
-            # Substituir no template usando o novo placeholder
-            if "[SCHEMA_INJECTION_POINT]" in SYSTEM_PROMPT:
-                self.system_prompt = SYSTEM_PROMPT.replace(
-                    "[SCHEMA_INJECTION_POINT]", 
-                    schema_str
-                )
-                logger.info(f"[OK] Dynamic Schema Injection: Sucesso ({len(cols)} colunas injetadas)")
-            else:
-                # Fallback: se o placeholder não existir, anexar ao final
-                logger.warning("[WARNING] Placeholder [SCHEMA_INJECTION_POINT] não encontrado. Anexando schema ao final do prompt.")
-                self.system_prompt = SYSTEM_PROMPT + "\n\n## 🗄️ DADOS DISPONÍVEIS\n" + schema_str
-            
-        except Exception as e:
-            logger.warning(f"[ERROR] Dynamic Schema Injection Failed: {e}. Using static prompt.")
-            self.system_prompt = SYSTEM_PROMPT
-
-        if settings.DEV_FAST_MODE:
-            self.system_prompt += (
-                "\n\n## MODO DEV FAST\n"
-                "- Responda objetivamente em no máximo 8 linhas.\n"
-                "- Evite chamadas de ferramenta caras, a menos que sejam estritamente necessárias.\n"
-            )
+        # Function declarations pré-calculadas no registro
+        self.gemini_tools = tool_view.declarations
 
+        # System instruction - Conversacional + BI Expert (Context7 Enhanced v2025)
+        # DYNAMIC PROMPTING: schema real injetado (montado uma vez por processo)
+        self.system_prompt = _get_system_prompt()
 
     def _convert_tools_to_gemini_format(self, tools: List[BaseTool]) -> Dict[str, List[Dict[str, Any]]]:
-        declarations = []
-        for tool in tools:
-            # Normalize tool metadata for both LangChain tools and plain callables.
-            tool_name = getattr(tool, "name", None) or getattr(tool, "__name__", None)
-            tool_description = getattr(tool, "description", None) or getattr(tool, "__doc__", "") or ""
-            if not tool_name:
-                logger.warning(f"Skipping tool without resolvable name: {type(tool)}")
-                continue
-
-            # Generate schema using LangChain's standardized method when available.
-            # For plain callables, fallback to empty object schema.
-            schema = {}
-            if hasattr(tool, "get_input_schema"):
-                try:
-                    schema = tool.get_input_schema().model_json_schema()
-                except AttributeError:
-                    if hasattr(tool, "args_schema") and tool.args_schema:
-                        if hasattr(tool.args_schema, "schema"):
-                            schema = tool.args_schema.schema()
-                        else:
-                            schema = {}
-            elif hasattr(tool, "args_schema") and tool.args_schema:
-                if hasattr(tool.args_schema, "schema"):
-                    schema = tool.args_schema.schema()
-            
-            # Clean schema to be compatible with Gemini (remove anyOf, titles)
-            cleaned_schema = self._clean_schema(schema)
-            
-            # Ensure 'properties' and 'required' are present if parameters exist
-            parameters = {
-                "type": "object",
-                "properties": cleaned_schema.get("properties", {}),
-                "required": cleaned_schema.get("required", [])
-            }
-
-            declarations.append({
-                "name": str(tool_name),
-                "description": str(tool_description).strip(),
-                "parameters": parameters
-            })
-        
-        return {"function_declarations": declarations}
+        return convert_tools_to_declarations(tools)
 
     def _clean_context7_violations(self, content: str, context_type: str = "generic") -> str:
         """
@@ -483,50 +376,7 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
         """
         Recursively cleans Pydantic JSON Schema for Gemini compatibility.
         """
-        if not isinstance(schema, dict):
-            return schema
-            
-        new_schema = schema.copy()
-        
-        # Remove incompatible keys
-        if "title" in new_schema:
-            del new_schema["title"]
-        if "default" in new_schema:
-            del new_schema["default"]
-        if "additionalProperties" in new_schema:
-            del new_schema["additionalProperties"]
-
-        # Handle anyOf
-        if "anyOf" in new_schema:
-            options = new_schema.pop("anyOf")
-            non_null_options = [opt for opt in options if opt.get("type") != "null"]
-
-            # Se houver múltiplos tipos primitivos (ex: boolean|string), usamos string
-            # para evitar validação estrita entre providers (Groq/Gemini).
-            primitive_types = {
-                opt.get("type")
-                for opt in non_null_options
-                if isinstance(opt, dict) and opt.get("type") in {"string", "boolean", "integer", "number"}
-            }
-            if len(primitive_types) > 1:
-                new_schema["type"] = "string"
-            else:
-                valid_option = non_null_options[0] if non_null_options else None
-                if valid_option:
-                    cleaned_child = self._clean_schema(valid_option)
-                    new_schema.update(cleaned_child)
-                else:
-                    new_schema["type"] = "string"
-
-        # Recurse
-        if "properties" in new_schema:
-            for prop, prop_schema in new_schema["properties"].items():
-                new_schema["properties"][prop] = self._clean_schema(prop_schema)
-        
-        if "items" in new_schema:
-            new_schema["items"] = self._clean_schema(new_schema["items"])
-
-        return new_schema
+        return clean_tool_schema(schema)
 
     def _normalize_tool_arguments(self, func_name: str, func_args: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -597,17 +447,22 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
         Executa ferramenta com normalização e uma tentativa de recuperação.
         """
         normalized_args = self._normalize_tool_arguments(func_name, func_args)
+        token = current_cancellation_token()
+        if token is not None and token.cancelled:
+            # Requisição abandonada enquanto a ferramenta esperava na fila
+            record_reclaimed("tool", token)
+            token.raise_if_cancelled()
 
         def _invoke(tool_obj: Any, args: Dict[str, Any]) -> Any:
-            if hasattr(tool_obj, "invoke"):
-                return tool_obj.invoke(args)
-            if callable(tool_obj):
-                return tool_obj(**args)
-            raise TypeError(f"Ferramenta '{func_name}' não é invocável")
+            return get_tool_executor().invoke(tool_obj, func_name, args)
 
         try:
             return _invoke(tool_to_run, normalized_args)
+        except RequestCancelled:
+            raise
         except Exception as first_error:
+            raise_if_cancelled()  # sem retry para requisição abandonada
+
             # Retry defensivo para casos de validação estrita de tipo.
             retry_args = dict(normalized_args)
             if "limite" in retry_args and retry_args["limite"] is not None:
@@ -619,6 +474,17 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
             )
             return _invoke(tool_to_run, retry_args)
 
+    async def _run_tool(self, tool_to_run: Any, func_name: str, func_args: Dict[str, Any]) -> Any:
+        """
+        Executa a ferramenta no ToolExecutor (pool cpu/io e limite declarados
+        no registro) em vez do executor padrão do loop.
+        """
+        if not settings.TOOL_EXECUTOR_ENABLED:
+            return await asyncio.to_thread(self._execute_tool_with_recovery, tool_to_run, func_name, func_args)
+        return await get_tool_executor().run(
+            func_name, self._execute_tool_with_recovery, tool_to_run, func_name, func_args
+        )
+
     def _tool_name(self, tool_obj: Any) -> str:
         return str(getattr(tool_obj, "name", None) or getattr(tool_obj, "__name__", "") or "")
 
@@ -672,7 +538,13 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
         }
         return mapping.get(str(tool_name or ""), f"tool.{str(tool_name or 'generic')}")
 
-    async def _emit_progress(self, on_progress: Optional[Callable[[Dict[str, Any]], Awaitable[None]]], tool_name: str, status: str) -> None:
+    async def _emit_progress(
+        self,
+        on_progress: Optional[Callable[[Dict[str, Any]], Awaitable[None]]],
+        tool_name: str,
+        status: str,
+        **extra: Any,
+    ) -> None:
         if not on_progress:
             return
         await on_progress(
@@ -680,9 +552,81 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
                 "type": "tool_progress",
                 "tool": self._normalize_progress_tool(tool_name),
                 "status": status,
+                **extra,
             }
         )
 
+    def _with_static_prefix(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Prefixa o system prompt como primeira mensagem. Junto com as tools, é a
+        parte estática da requisição: adapters com cache de prefixo enviam um
+        handle no lugar dela (ver prompt_cache.py).
+        """
+        system_prompt = getattr(self, "system_prompt", None)
+        if not system_prompt:
+            return messages
+        return [{"role": "system", "content": system_prompt}] + list(messages)
+
+    async def _get_completion_streaming(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Any,
+        on_progress: Callable[[Dict[str, Any]], Awaitable[None]],
+    ) -> Dict[str, Any]:
+        """
+        Consome o streaming do LLM e repassa cada token como evento SSE
+        {"type": "text"} enquanto o turno não pede ferramentas.
+
+        Usa `llm.astream_completion` (async nativo, pool HTTP compartilhado)
+        quando disponível; senão consome `stream_completion` em thread. Hits do
+        cache de completions chegam como um único chunk (um só evento "text").
+
+        Retorna o mesmo formato de `get_completion` (content / tool_calls / error).
+        Se o modelo emitir texto e depois tool calls, envia "text_replace" vazio
+        para descartar o preâmbulo já exibido.
+        """
+        if settings.LLM_ASYNC_ADAPTERS_ENABLED and hasattr(self.llm, "astream_completion"):
+            chunks = self.llm.astream_completion(messages, tools=tools)
+        else:
+            chunks = aiter_in_thread(lambda: self.llm.stream_completion(messages, tools=tools))
+
+        content_parts: List[str] = []
+        tool_calls: List[Dict[str, Any]] = []
+        error = None
+        provider = None
+        streamed = False
+
+        async for chunk in chunks:
+            if not isinstance(chunk, dict):
+                continue
+            provider = chunk.get("provider", provider)
+            if "error" in chunk:
+                error = chunk["error"]
+                continue
+            if chunk.get("tool_calls"):
+                tool_calls.extend(chunk["tool_calls"])
+            text = chunk.get("content")
+            if text:
+                content_parts.append(text)
+                if not tool_calls:
+                    await on_progress({"type": "text", "text": text, "done": False})
+                    streamed = True
+
+        if tool_calls and streamed:
+            await on_progress({"type": "text_replace", "text": "", "done": False})
+
+        if error and not content_parts and not tool_calls:
+            return {"error": error}
+        if error:
+            logger.warning(f"[STREAM] Streaming interrompido após resposta parcial: {error}")
+
+        response: Dict[str, Any] = {"content": "".join(content_parts)}
+        if tool_calls:
+            response["tool_calls"] = tool_calls
+        if provider:
+            response["provider"] = provider
+        return response
+
     def _requires_governed_path(self, intent: Any, tool_name: str, confidence: float, query: str) -> bool:
         """
         Fluxo governado para reduzir variação e aumentar assertividade em produção.
@@ -963,6 +907,189 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
             params["filtros"] = filtros
             tool_selection.tool_params = params
 
+    async def _try_deterministic_fast_path(
+        self,
+        query: str,
+        intent_result: Any,
+        on_progress: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Responde KPIs comuns executando a ferramenta roteada diretamente e
+        renderizando por template. Retorna None para seguir o fluxo normal.
+        """
+        from backend.app.core.utils.deterministic_fast_path import plan_fast_path, render_fast_path_answer
+
+        plan = plan_fast_path(query, intent_result=intent_result)
+        if plan is None:
+            return None
+
+        tool_to_run = self._find_tool_by_name(plan.tool_name)
+        if tool_to_run is None:
+            return None
+
+        logger.info(
+            f"[FAST PATH] Template {plan.template}: {plan.tool_name} sem rodada LLM "
+            f"(confidence={plan.confidence:.2f}, params={plan.tool_params})"
+        )
+        await self._emit_progress(on_progress, plan.tool_name, "executing")
+
+        response = None
+        try:
+            tool_result = await self._run_tool(
+                tool_to_run,
+                plan.tool_name,
+                plan.tool_params,
+            )
+            response = render_fast_path_answer(plan, tool_result)
+        except Exception as e:
+            logger.warning(f"[FAST PATH] Falha em {plan.template}: {e}. Fallback para fluxo LLM.")
+
+        try:
+            from backend.app.core.observability.metrics import DETERMINISTIC_FAST_PATH_TOTAL
+            DETERMINISTIC_FAST_PATH_TOTAL.labels(
+                template=plan.template,
+                outcome="served" if response is not None else "fallback",
+            ).inc()
+        except Exception:
+            pass
+
+        return response
+
+    def _start_speculative_prefetch(self, tool_selection: Any) -> Optional[Any]:
+        """
+        Inicia a execução especulativa da ferramenta prevista pelo roteador.
+        Retorna o handle de especulação da requisição (ou None).
+        """
+        if not settings.SPECULATIVE_PREFETCH_ENABLED:
+            return None
+        if float(tool_selection.confidence or 0) < settings.SPECULATIVE_PREFETCH_MIN_CONFIDENCE:
+            return None
+
+        from backend.app.core.utils.speculative_prefetch import SpeculativePrefetch
+
+        tool_to_run = self._find_tool_by_name(tool_selection.tool_name)
+        if tool_to_run is None:
+            return None
+
+        speculation = SpeculativePrefetch(self._normalize_tool_arguments)
+        params = dict(tool_selection.tool_params or {})
+        speculation.start(
+            tool_selection.tool_name,
+            params,
+            lambda: self._run_tool(
+                tool_to_run,
+                tool_selection.tool_name,
+                params,
+            ),
+        )
+        return speculation
+
+    def _open_tool_memo(self, session_id: Optional[str]) -> Optional[tuple]:
+        """
+        Memo de ferramentas da sessão: (memo, escopo, versão do dataset), ou None.
+        O escopo (role + segmentos) e a versão dos dados entram na chave.
+        """
+        if not session_id or not settings.TOOL_MEMO_ENABLED:
+            return None
+        try:
+            from backend.app.core.context import get_current_user_segments
+            from backend.app.core.data_source_manager import get_dataset_version
+            from backend.app.core.utils.tool_memo import get_tool_memo_store
+
+            segments = get_current_user_segments() or []
+            scope = (self.user_role, sorted(str(s) for s in segments))
+            return get_tool_memo_store().for_session(session_id), scope, get_dataset_version()
+        except Exception as e:
+            logger.warning(f"[TOOL MEMO] Desativado nesta requisição: {e}")
+            return None
+
+    def _memo_lookup(self, tool_memo: Optional[tuple], func_name: str, func_args: Dict[str, Any]) -> tuple:
+        """(chave, resultado memorizado ou None); chave None quando não há memo."""
+        if tool_memo is None:
+            return None, None
+        memo, memo_scope, dataset_version = tool_memo
+        memo_key = memo.key(func_name, self._normalize_tool_arguments(func_name, func_args), memo_scope, dataset_version)
+        return memo_key, memo.get(memo_key)
+
+    async def _plan_multi_intent(self, query: str) -> Optional[Any]:
+        """
+        Plano (DAG de ferramentas) para perguntas compostas, ou None.
+        Regras primeiro; a chamada LLM de planejamento é opcional.
+        """
+        if not settings.MULTI_INTENT_PLANNER_ENABLED:
+            return None
+
+        from backend.app.core.utils.multi_intent_planner import plan_compound_query, plan_with_llm
+
+        max_nodes = settings.MULTI_INTENT_MAX_NODES
+        plan = plan_compound_query(query, max_nodes=max_nodes)
+        if plan is None and settings.MULTI_INTENT_LLM_PLANNER_ENABLED:
+            tool_names = [self._tool_name(t) for t in self.bi_tools]
+            plan = await plan_with_llm(self.llm, query, tool_names, max_nodes=max_nodes)
+        if plan is None:
+            return None
+
+        missing = [n.tool_name for n in plan.nodes if self._find_tool_by_name(n.tool_name) is None]
+        if missing:
+            logger.info(f"[PLANNER] Ferramentas indisponíveis para o role {self.user_role}: {missing}. Plano descartado.")
+            return None
+
+        try:
+            from backend.app.core.observability.metrics import MULTI_INTENT_PLAN_TOTAL
+            MULTI_INTENT_PLAN_TOTAL.labels(source=plan.source).inc()
+        except Exception:
+            pass
+        return plan
+
+    async def _execute_multi_intent_plan(
+        self,
+        plan: Any,
+        tool_memo: Optional[tuple],
+        on_progress: Optional[Callable[[Dict[str, Any]], Awaitable[None]]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Executa o plano (ramos independentes em paralelo) e devolve as mensagens
+        model/function equivalentes, prontas para a rodada de síntese.
+        """
+        from backend.app.core.utils.multi_intent_planner import execute_plan
+
+        async def run_node(node: Any) -> Any:
+            await self._emit_progress(on_progress, node.tool_name, "executing")
+            memo_key, cached_output = self._memo_lookup(tool_memo, node.tool_name, node.tool_params)
+            if cached_output is not None:
+                await self._emit_progress(on_progress, node.tool_name, "cached", memo=tool_memo[0].get_stats())
+                return cached_output
+
+            tool_output = await self._run_tool(
+                self._find_tool_by_name(node.tool_name),
+                node.tool_name,
+                dict(node.tool_params),
+            )
+            if memo_key is not None:
+                tool_memo[0].put(memo_key, tool_output)
+            return tool_output
+
+        logger.info(f"[PLANNER] Executando {len(plan.nodes)} ferramentas em {len(plan.waves())} onda(s)")
+        results = await execute_plan(plan, run_node, max_concurrency=settings.MULTI_INTENT_MAX_CONCURRENCY)
+
+        tool_calls = [
+            {
+                "id": f"plan_{node.node_id}",
+                "type": "function",
+                "function": {"name": node.tool_name, "arguments": json.dumps(node.tool_params, ensure_ascii=False)},
+            }
+            for node in plan.nodes
+        ]
+        plan_messages: List[Dict[str, Any]] = [{"role": "model", "tool_calls": tool_calls}]
+        for node, tool_call in zip(plan.nodes, tool_calls):
+            plan_messages.append({
+                "role": "function",
+                "name": node.tool_name,
+                "tool_call_id": tool_call["id"],
+                "content": await asyncio.to_thread(safe_json_serialize, results[node.node_id]),
+            })
+        return plan_messages
+
     def _should_use_deterministic_path(self, tool_name: str, confidence: float) -> bool:
         """
         Define quando executar ferramenta diretamente sem rodada LLM,
@@ -1382,11 +1509,32 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
         self, 
         user_query: str, 
         chat_history: Optional[List[Dict]] = None,
-        on_progress: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+        on_progress: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        session_id: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Async version of run method with Universal Tool Selection System.
+
+        Com `session_id`, resultados de ferramentas read-only ficam no memo da
+        sessão e chamadas repetidas em turnos seguintes não reexecutam.
         """
+        speculations: List[Any] = []
+        try:
+            return await self._run_async(user_query, chat_history, on_progress, session_id, speculations)
+        finally:
+            # Rodada LLM falhou/levantou ou o turno terminou antes de consumir o
+            # prefetch: especulações pendentes são descartadas ("wasted")
+            for speculation in speculations:
+                speculation.discard()
+
+    async def _run_async(
+        self,
+        user_query: str,
+        chat_history: Optional[List[Dict]],
+        on_progress: Optional[Callable[[Dict[str, Any]], Awaitable[None]]],
+        session_id: Optional[str],
+        speculations: List[Any],
+    ) -> Dict[str, Any]:
         logger.info(f"CaculinhaBIAgent (Modern Async): Processing query: {user_query}")
         resolved_query = self._resolve_query_with_history_context(user_query, chat_history)
         if resolved_query != user_query:
@@ -1408,6 +1556,14 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
             f"patterns: {intent_result.matched_patterns})"
         )
         
+        # ========================================================================
+        # CAMADA 1.5: DETERMINISTIC FAST PATH (KPIs por template, sem LLM)
+        # ========================================================================
+        if settings.DETERMINISTIC_FAST_PATH_ENABLED:
+            fast_response = await self._try_deterministic_fast_path(resolved_query, intent_result, on_progress)
+            if fast_response is not None:
+                return fast_response
+
         # ========================================================================
         # CAMADA 2: QUERY ROUTING (NEW 2026-01-24)
         # ========================================================================
@@ -1439,18 +1595,31 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
             logger.info("[CLARIFICATION] Consulta vaga detectada. Retornando pergunta guiada.")
             return clarification
 
+        tool_memo = self._open_tool_memo(session_id)
+
+        # ========================================================================
+        # CAMADA 2.3: MULTI-INTENT PLAN (perguntas compostas)
+        # Ferramentas de todas as intenções executam em paralelo ANTES do loop;
+        # o LLM faz uma única rodada de síntese.
+        # ========================================================================
+        plan_messages = None
+        plan = await self._plan_multi_intent(resolved_query)
+        if plan is not None:
+            plan_messages = await self._execute_multi_intent_plan(plan, tool_memo, on_progress)
+
         # ========================================================================
         # CAMADA 2.4: GOVERNED TOOL EXECUTION (PRODUÇÃO)
         # Seleção controlada de ferramenta para reduzir variação e erro.
         # ========================================================================
-        if self._requires_governed_path(intent_result.intent, tool_selection.tool_name, tool_selection.confidence, resolved_query):
+        if plan_messages is None and self._requires_governed_path(
+            intent_result.intent, tool_selection.tool_name, tool_selection.confidence, resolved_query
+        ):
             tool_to_run = self._find_tool_by_name(tool_selection.tool_name)
             if tool_to_run is not None:
                 try:
                     await self._emit_progress(on_progress, tool_selection.tool_name, "executing")
 
-                    tool_result = await asyncio.to_thread(
-                        self._execute_tool_with_recovery,
+                    tool_result = await self._run_tool(
                         tool_to_run,
                         tool_selection.tool_name,
                         tool_selection.tool_params,
@@ -1473,7 +1642,7 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
         # CAMADA 2.5: DETERMINISTIC EXECUTION PATH (LOW COST / HIGH RELIABILITY)
         # Executa ferramentas determinísticas diretamente quando a confiança é alta.
         # ========================================================================
-        if self._should_use_deterministic_path(tool_selection.tool_name, tool_selection.confidence):
+        if plan_messages is None and self._should_use_deterministic_path(tool_selection.tool_name, tool_selection.confidence):
             logger.info(
                 f"[DETERMINISTIC] Executando {tool_selection.tool_name} sem rodada LLM "
                 f"(confidence={tool_selection.confidence:.2f})"
@@ -1484,8 +1653,7 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
             tool_to_run = self._find_tool_by_name(tool_selection.tool_name)
             if tool_to_run is not None:
                 try:
-                    tool_result = await asyncio.to_thread(
-                        self._execute_tool_with_recovery,
+                    tool_result = await self._run_tool(
                         tool_to_run,
                         tool_selection.tool_name,
                         tool_selection.tool_params,
@@ -1499,6 +1667,14 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
                 except Exception as e:
                     logger.warning(f"[DETERMINISTIC] Falhou, voltando para fluxo LLM: {e}")
 
+        # ========================================================================
+        # CAMADA 2.6: SPECULATIVE TOOL PREFETCH
+        # A ferramenta prevista já executa enquanto a 1a rodada LLM acontece.
+        # ========================================================================
+        speculation = self._start_speculative_prefetch(tool_selection) if plan_messages is None else None
+        if speculation is not None:
+            speculations.append(speculation)
+
         # START RAG WARMING
         await self._start_rag_warming()
 
@@ -1515,6 +1691,9 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
                 content = msg.get("content", "")
                 messages.append({"role": role, "content": content})
 
+        # Histórico fica no início de `messages` (hints/schema são inseridos antes da query)
+        history_len = len(messages)
+
         # [OK] FIX RAG: Context Fencing Injection com TIMEOUT
         # Em vez de adicionar mensagens fake, adicionamos um bloco de contexto na mensagem do usuário
         try:
@@ -1548,7 +1727,16 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
         # ========================================================================
         SYSTEM_HINT_THRESHOLD = 0.70
         
-        if tool_selection.confidence > SYSTEM_HINT_THRESHOLD:
+        if plan_messages is not None:
+            messages.insert(-1, {
+                "role": "user",
+                "content": (
+                    "SYSTEM_PLAN: A pergunta foi decomposta e as ferramentas abaixo já foram executadas "
+                    f"em paralelo: {', '.join(n.label or n.tool_name for n in plan.nodes)}. "
+                    "Responda sintetizando TODOS os resultados; não chame novas ferramentas."
+                ),
+            })
+        elif tool_selection.confidence > SYSTEM_HINT_THRESHOLD:
             logger.info(
                 f"[HINT] High confidence ({tool_selection.confidence:.2f}) - "
                 f"Injecting system hint for: {tool_selection.tool_name}"
@@ -1597,23 +1785,59 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
         
         # Determine tools to use (all tools available by default)
         tools_to_use = self.gemini_tools
+
+        if plan_messages is not None:
+            # Resultados do plano entram como uma rodada de ferramentas já concluída;
+            # a próxima rodada é só de síntese (sem ferramentas)
+            messages.extend(plan_messages)
+            tools_to_use = None
+
+        # Orçamento de contexto: compacta resultados de ferramenta/histórico ANTES
+        # de cada rodada (em vez de reagir a erros 413 no fallback)
+        budgeter = None
+        if settings.LLM_CONTEXT_BUDGET_ENABLED:
+            from backend.app.core.utils.context_budget import build_agent_budgeter
+            budgeter = build_agent_budgeter(getattr(self, "system_prompt", None), tools_to_use)
         
         max_turns = 15
         current_turn = 0
         successful_tool_calls = 0  # Track tool usage for final reporting
 
         while current_turn < max_turns:
+            # Cliente desconectou / prazo estourou: não gastar mais rodadas LLM
+            token = current_cancellation_token()
+            if token is not None and token.cancelled:
+                record_reclaimed("llm_turn", token)
+                token.raise_if_cancelled()
+
             try:
                 # Notify thinking
                 await self._emit_progress(on_progress, "Pensando", "start")
 
+                # `messages` segue íntegra para o pós-processamento (chart_data/resultados);
+                # o LLM recebe a cópia compactada
+                llm_messages = messages
+                if budgeter is not None:
+                    llm_messages, _ = budgeter.fit(messages, history_len=history_len)
+                llm_messages = self._with_static_prefix(llm_messages)
+
                 # Call LLM with tools (Blocking call wrapped in thread)
                 # self.llm is GeminiLLMAdapter which is synchronous
-                response = await asyncio.to_thread(
-                    self.llm.get_completion,
-                    messages,
-                    tools=tools_to_use
-                )
+                if on_progress and settings.LLM_STREAMING_ENABLED and hasattr(self.llm, "stream_completion"):
+                    # Tokens da resposta final vão direto para o SSE
+                    response = await self._get_completion_streaming(llm_messages, tools_to_use, on_progress)
+                elif settings.LLM_ASYNC_ADAPTERS_ENABLED and hasattr(self.llm, "aget_completion"):
+                    # Async nativo: sem thread por conversa, conexões keep-alive reaproveitadas
+                    response = await self.llm.aget_completion(llm_messages, tools=tools_to_use)
+                else:
+                    response = await asyncio.to_thread(
+                        self.llm.get_completion,
+                        llm_messages,
+                        tools=tools_to_use
+                    )
+
+                if speculation is not None:
+                    speculation.settle(response.get("tool_calls"))
 
                 if "error" in response:
                     logger.error(f"LLM Error: {response['error']}")
@@ -1651,16 +1875,28 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
                         await self._emit_progress(on_progress, func_name, "executing")
 
                         tool_to_run = self._find_tool_by_name(func_name)
+
+                        memo_key = None
+                        if tool_to_run:
+                            memo_key, cached_output = self._memo_lookup(tool_memo, func_name, func_args)
+                            if cached_output is not None:
+                                await self._emit_progress(on_progress, func_name, "cached", memo=tool_memo[0].get_stats())
+                                return func_name, cached_output
+
+                        speculative_task = speculation.take(func_name, func_args) if speculation is not None else None
                         
                         if tool_to_run:
                             try:
-                                # Execute tool (Blocking call wrapped in thread)
-                                tool_output = await asyncio.to_thread(
-                                    self._execute_tool_with_recovery,
-                                    tool_to_run,
-                                    func_name,
-                                    func_args,
-                                )
+                                if speculative_task is not None:
+                                    # Resultado já carregado durante a rodada LLM
+                                    tool_output = await speculative_task
+                                else:
+                                    # Execute tool (Blocking call wrapped in thread)
+                                    tool_output = await self._run_tool(
+                                        tool_to_run,
+                                        func_name,
+                                        func_args,
+                                    )
                                 
                                 # Convert MapComposite
                                 def convert_mapcomposite(obj):
@@ -1672,7 +1908,10 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
                                         return [convert_mapcomposite(item) for item in obj]
                                     return obj
                                 
-                                return func_name, convert_mapcomposite(tool_output)
+                                tool_output = convert_mapcomposite(tool_output)
+                                if memo_key is not None:
+                                    tool_memo[0].put(memo_key, tool_output)
+                                return func_name, tool_output
                             except Exception as e:
                                 logger.error(f"Error executing {func_name}: {e}")
                                 return func_name, {"error": str(e)}
@@ -1683,6 +1922,7 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
                     logger.info(f"[ASYNC] Disparando {len(tool_calls)} ferramentas em PARALELO")
                     tasks = [execute_single_tool(tc) for tc in tool_calls]
                     results = await asyncio.gather(*tasks)
+                    speculation = None  # especulação vale apenas para a 1a rodada
 
                     # Process results sequentially
                     should_exit_early = False
@@ -1927,6 +2167,8 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
             if len(filtered_history) > 30:
                 logger.info(f"[CONTEXT PRUNING] Histórico reduzido: {len(filtered_history)} → {len(recent_history)} mensagens (Llama-3 Extended)")
 
+        history_len = len(messages)
+
         # RAG: Retrieve similar examples before processing query
         # NOTE: run() is sync, so we skip RAG warming and use sync retrieve
         rag_context_str = ""
@@ -1969,15 +2211,25 @@ Use estas colunas preferencialmente para análises. Elas cobrem os principais ca
         # Determine tools to use
         tools_to_use = self.gemini_tools
 
+        budgeter = None
+        if settings.LLM_CONTEXT_BUDGET_ENABLED:
+            from backend.app.core.utils.context_budget import build_agent_budgeter
+            budgeter = build_agent_budgeter(getattr(self, "system_prompt", None), tools_to_use)
+
         max_turns = 15
         current_turn = 0
         successful_tool_calls = 0
 
         while current_turn < max_turns:
             try:
+                llm_messages = messages
+                if budgeter is not None:
+                    llm_messages, _ = budgeter.fit(messages, history_len=history_len)
+                llm_messages = self._with_static_prefix(llm_messages)
+
                 # Call LLM with tools
                 # Note: self.llm is GeminiLLMAdapter
-                response = self.llm.get_completion(messages, tools=tools_to_use)
+                response = self.llm.get_completion(llm_messages, tools=tools_to_use)
 
                 if "error" in response:
                     logger.error(f"LLM Error: {response['error']}")
@@ -0,0 +1,155 @@
+"""
+Cancellation - token de cancelamento por requisição
+
+Quando o usuário fecha a aba, o `event_generator` do SSE para, mas a task do
+agente, as threads das ferramentas (`asyncio.to_thread`) e a query DuckDB em
+curso continuavam consumindo CPU e tokens de LLM até terminar.
+
+O endpoint cria um `CancellationToken` por requisição e o instala com
+`cancellation_scope(token)` antes de criar a task do agente. ContextVars são
+copiadas para tasks e para `asyncio.to_thread`, então:
+
+- o loop do agente checa `raise_if_cancelled()` a cada rodada
+- `_execute_tool_with_recovery` não inicia (nem retenta) ferramentas
+- `ParquetCache.query` (SQL das ferramentas) usa um cursor próprio e registra `cursor.interrupt`
+  no token (`interrupt_on_cancel`), abortando a query em andamento
+
+Uso:
+    token = CancellationToken()
+    with cancellation_scope(token):
+        task = asyncio.create_task(agent.run_async(...))
+    ...
+    token.cancel("client_disconnected")   # SSE desconectado / timeout
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RequestCancelled(Exception):
+    """A requisição foi abandonada (cliente desconectou ou estourou o prazo)."""
+
+
+def record_reclaimed(kind: str, token: Optional["CancellationToken"] = None) -> None:
+    """
+    Conta trabalho interrompido antes do fim (request, llm_turn, tool, duckdb_query)
+    e, com o token, o tempo entre o cancelamento e a parada efetiva.
+    """
+    try:
+        from backend.app.core.observability.metrics import CANCELLATION_STOP_SECONDS, CANCELLED_WORK_TOTAL
+        CANCELLED_WORK_TOTAL.labels(kind=kind).inc()
+        if token is not None and token.cancelled_at is not None:
+            CANCELLATION_STOP_SECONDS.labels(kind=kind).observe(time.monotonic() - token.cancelled_at)
+    except Exception:
+        pass
+
+
+class CancellationToken:
+    """Sinal de cancelamento thread-safe com callbacks (ex.: interrupt de query)."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: Dict[int, Callable[[], Any]] = {}
+        self._next_id = 0
+        self.reason: Optional[str] = None
+        self.cancelled_at: Optional[float] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """Cancela e dispara os callbacks registrados; retorna False se já estava cancelado."""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self.cancelled_at = time.monotonic()
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+
+        logger.info(f"[CANCEL] Requisição cancelada ({reason}); interrompendo {len(callbacks)} operação(ões)")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"[CANCEL] Callback de cancelamento falhou: {e}")
+        return True
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise RequestCancelled(self.reason or "cancelled")
+
+    def add_callback(self, callback: Callable[[], Any]) -> Callable[[], None]:
+        """
+        Registra `callback` para o cancelamento; retorna a função que o remove.
+        Se o token já está cancelado, o callback roda imediatamente.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                callback_id = self._next_id
+                self._next_id += 1
+                self._callbacks[callback_id] = callback
+
+                def remove() -> None:
+                    with self._lock:
+                        self._callbacks.pop(callback_id, None)
+
+                return remove
+        callback()
+        return lambda: None
+
+    @contextmanager
+    def interrupt_on_cancel(self, connection: Any, kind: str = "duckdb_query") -> Iterator[Any]:
+        """
+        Executa o bloco com `connection.interrupt()` ligado ao token. Erros da
+        conexão interrompida viram RequestCancelled.
+        """
+        self.raise_if_cancelled()
+        remove = self.add_callback(connection.interrupt)
+        try:
+            yield connection
+        except Exception:
+            if self.cancelled:
+                record_reclaimed(kind, self)
+                raise RequestCancelled(self.reason or "cancelled")
+            raise
+        finally:
+            remove()
+
+
+_current_token: contextvars.ContextVar[Optional[CancellationToken]] = contextvars.ContextVar(
+    "caculinha_cancellation_token", default=None
+)
+
+
+def current_cancellation_token() -> Optional[CancellationToken]:
+    return _current_token.get()
+
+
+def raise_if_cancelled() -> None:
+    """Atalho para código sem acesso ao token (ferramentas, loops longos)."""
+    token = _current_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+@contextmanager
+def cancellation_scope(token: CancellationToken) -> Iterator[CancellationToken]:
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        try:
+            _current_token.reset(reset)
+        except ValueError:
+            # Contexto diferente (ex.: gerador retomado em outra task)
+            _current_token.set(None)
@@ -259,3 +259,12 @@ def get_data_manager() -> DataSourceManager:
     if _data_manager_instance is None:
         _data_manager_instance = DataSourceManager()
     return _data_manager_instance
+
+
+def get_dataset_version() -> str:
+    """Versão do parquet principal (mtime + tamanho); muda quando o arquivo é regravado."""
+    try:
+        stat = MAIN_DATA_FILE.stat()
+    except OSError:
+        return "missing"
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
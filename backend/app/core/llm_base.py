@@ -1,6 +1,66 @@
+import asyncio
+import threading
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+
+async def aiter_in_thread(make_iterator: Callable[[], Iterator[Dict[str, Any]]]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Bridges a blocking chunk iterator (sync streaming SDKs) into an async
+    iterator: the iterator runs in a worker thread and chunks are handed to
+    the event loop through a queue. Exceptions become {'error': str} chunks.
+
+    When the consumer stops early (cancel / aclose) the producer is told to
+    stop before pulling the next chunk and the sync iterator is closed, so the
+    provider stream is not drained in the background.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    end_of_stream = object()
+    stop = threading.Event()
+    iterators: List[Iterator[Dict[str, Any]]] = []
+
+    def _close(iterator: Iterator[Dict[str, Any]]) -> None:
+        close = getattr(iterator, "close", None)
+        if close is None:
+            return
+        try:
+            close()
+        except ValueError:
+            pass  # generator executing in the producer thread; it closes itself after the chunk
+
+    def _produce() -> None:
+        iterator = None
+        try:
+            iterator = make_iterator()
+            iterators.append(iterator)
+            for chunk in iterator:
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, chunk)
+        except Exception as e:
+            if not stop.is_set():
+                loop.call_soon_threadsafe(queue.put_nowait, {"error": str(e)})
+        finally:
+            if iterator is not None:
+                _close(iterator)
+            if not stop.is_set():
+                loop.call_soon_threadsafe(queue.put_nowait, end_of_stream)
+
+    producer = asyncio.ensure_future(asyncio.to_thread(_produce))
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is end_of_stream:
+                break
+            yield chunk
+    finally:
+        stop.set()
+        for iterator in iterators:
+            _close(iterator)
+        if producer.done():
+            await producer
 
 
 class BaseLLMAdapter(ABC):
@@ -10,9 +70,13 @@ class BaseLLMAdapter(ABC):
         tools: bool = False
         streaming: bool = False
         json_mode: bool = False
+        prompt_caching: bool = False  # cache explícito de prefixo (ver prompt_cache.py)
 
     provider: str = "unknown"
     model_name: str = ""
+    # Sampling temperature sent to the provider. None means "unknown", which
+    # keeps the adapter out of the completion cache (see llm_cache.py).
+    temperature: Optional[float] = None
 
     def get_capabilities(self) -> "BaseLLMAdapter.Capabilities":
         return BaseLLMAdapter.Capabilities()
@@ -24,3 +88,44 @@ class BaseLLMAdapter(ABC):
         tools: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         pass
+
+    def stream_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yields chunks {'content': str}, {'tool_calls': [...]} or {'error': str}.
+
+        Default for providers without native streaming: a single chunk with
+        the full completion.
+        """
+        yield self.get_completion(messages, tools)
+
+    async def aget_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Async completion. Adapters with an async SDK/HTTP path override this;
+        the default runs the blocking `get_completion` in a worker thread.
+        """
+        return await asyncio.to_thread(self.get_completion, messages, tools)
+
+    async def astream_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Async streaming, same chunk format as `stream_completion`."""
+        async for chunk in aiter_in_thread(lambda: self.stream_completion(messages, tools)):
+            yield chunk
+
+    def create_cached_prefix(self, prefix: Any, ttl_seconds: int) -> Optional[str]:
+        """
+        Creates a provider-side cache for the static prefix (system instruction
+        + tool declarations) and returns its handle name. Only called for
+        adapters reporting `prompt_caching=True`.
+        """
+        return None
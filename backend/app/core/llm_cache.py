@@ -0,0 +1,302 @@
+"""
+LLM Completion Cache - Content-Addressed
+
+Cache em memória das respostas de `get_completion`, endereçado pelo
+conteúdo da requisição (mensagens normalizadas, declarações de ferramentas,
+modelo, temperatura e system instruction).
+
+Regras:
+- Apenas adapters com temperatura determinística (<= LLM_CACHE_MAX_TEMPERATURE)
+  são cacheados; adapters sem temperatura conhecida nunca entram no cache
+- Respostas com "error" nunca são armazenadas
+- Eviction por tamanho (LRU) e por TTL
+- Métricas por call site (hit / miss / bypass)
+
+Uso:
+    with llm_call_site("intent_classification"):
+        result = llm.get_completion(messages)
+
+    with llm_call_site("proactive_insights", bypass=True):
+        ...  # força chamada ao provider
+"""
+
+import asyncio
+import copy
+import contextvars
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CALL_SITE = "default"
+
+_call_site_var: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "llm_cache_call_site", default=DEFAULT_CALL_SITE
+)
+_bypass_var: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "llm_cache_bypass", default=False
+)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@contextmanager
+def llm_call_site(name: str, bypass: bool = False):
+    """Marca as chamadas LLM do bloco com um call site (e opcionalmente ignora o cache)."""
+    site_token = _call_site_var.set(name)
+    bypass_token = _bypass_var.set(bypass)
+    try:
+        yield
+    finally:
+        _call_site_var.reset(site_token)
+        _bypass_var.reset(bypass_token)
+
+
+def current_call_site() -> str:
+    return _call_site_var.get()
+
+
+def _normalize_value(value: Any) -> Any:
+    """Normaliza whitespace de strings recursivamente (mesmo prompt => mesma chave)."""
+    if isinstance(value, str):
+        return _WHITESPACE_RE.sub(" ", value).strip()
+    if isinstance(value, dict):
+        return {str(k): _normalize_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_value(v) for v in value]
+    return value
+
+
+class LLMCompletionCache:
+    """
+    LRU + TTL thread-safe para completions de LLM.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 3600,
+        max_temperature: float = 0.1,
+        enabled: bool = True,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_temperature = max_temperature
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, result)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def is_cacheable(self, temperature: Optional[float]) -> bool:
+        return self.enabled and temperature is not None and temperature <= self.max_temperature
+
+    def make_key(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Any,
+        model: str,
+        temperature: Optional[float],
+        system_instruction: Optional[str] = None,
+    ) -> str:
+        payload = {
+            "messages": _normalize_value(messages),
+            "tools": _normalize_value(tools),
+            "model": model,
+            "temperature": temperature,
+            "system": _normalize_value(system_instruction),
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, call_site: str = DEFAULT_CALL_SITE) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self._record(call_site, "miss")
+                return None
+
+            self._entries.move_to_end(key)
+            self._record(call_site, "hit")
+            return copy.deepcopy(entry[1])
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        if not isinstance(result, dict) or "error" in result:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_bypass(self, call_site: str = DEFAULT_CALL_SITE) -> None:
+        with self._lock:
+            self._record(call_site, "bypass")
+
+    def _record(self, call_site: str, outcome: str) -> None:
+        site_stats = self._stats.setdefault(call_site, {"hit": 0, "miss": 0, "bypass": 0})
+        site_stats[outcome] += 1
+        try:
+            from backend.app.core.observability.metrics import LLM_CACHE_REQUESTS_TOTAL
+            LLM_CACHE_REQUESTS_TOTAL.labels(call_site=call_site, outcome=outcome).inc()
+        except Exception:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_site = {}
+            for site, counts in self._stats.items():
+                lookups = counts["hit"] + counts["miss"]
+                by_site[site] = {
+                    **counts,
+                    "hit_rate": round(counts["hit"] / lookups, 4) if lookups else 0.0,
+                }
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "call_sites": by_site,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats.clear()
+
+
+_llm_cache: Optional[LLMCompletionCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCompletionCache:
+    """Retorna instância singleton do cache de completions."""
+    global _llm_cache
+
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = LLMCompletionCache(
+                    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+                    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+                    max_temperature=settings.LLM_CACHE_MAX_TEMPERATURE,
+                    enabled=settings.LLM_CACHE_ENABLED,
+                )
+    return _llm_cache
+
+
+def _lookup(adapter: Any, messages: List[Dict[str, Any]], tools: Any):
+    """
+    Consulta o cache para a requisição.
+    Retorna (chave ou None se não cacheável, resultado em cache ou None).
+
+    A chave é calculada antes da chamada porque alguns adapters (Groq)
+    modificam a lista de mensagens in-place.
+    """
+    cache = get_llm_cache()
+    call_site = current_call_site()
+    temperature = getattr(adapter, "temperature", None)
+
+    if not cache.is_cacheable(temperature):
+        return None, None
+
+    if _bypass_var.get():
+        cache.record_bypass(call_site)
+        return None, None
+
+    key = cache.make_key(
+        messages,
+        tools,
+        model=f"{getattr(adapter, 'provider', 'unknown')}:{getattr(adapter, 'model_name', '')}",
+        temperature=temperature,
+        system_instruction=getattr(adapter, "system_instruction", None),
+    )
+    cached = cache.get(key, call_site)
+    if cached is not None:
+        logger.info(f"[LLM CACHE] HIT ({call_site})")
+    return key, cached
+
+
+def lookup_completion(adapter: Any, messages: List[Dict[str, Any]], tools: Any = None):
+    """
+    Consulta pública usada pelos caminhos de streaming, que montam a resposta
+    chunk a chunk: (chave ou None, resultado em cache ou None).
+    """
+    return _lookup(adapter, messages, tools)
+
+
+def store_completion(key: Optional[str], result: Dict[str, Any]) -> None:
+    """Armazena a resposta montada de um stream (no-op se a requisição não é cacheável)."""
+    if key is not None:
+        get_llm_cache().set(key, result)
+
+
+def _report_latency(on_latency: Optional[Callable[[float], None]], result: Any, start: float) -> None:
+    if on_latency is not None and isinstance(result, dict) and "error" not in result:
+        on_latency(time.perf_counter() - start)
+
+
+def cached_completion(
+    adapter: Any,
+    messages: List[Dict[str, Any]],
+    tools: Any = None,
+    on_latency: Optional[Callable[[float], None]] = None,
+    admit: Optional[Callable[[], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Executa `adapter.get_completion` passando pelo cache.
+    `on_latency` recebe a duração das chamadas reais bem-sucedidas (hits não contam).
+    `admit` roda só em miss, antes de chamar o adapter (controle de admissão
+    do provedor); pode levantar para recusar a chamada.
+    """
+    key, cached = _lookup(adapter, messages, tools)
+    if cached is not None:
+        return cached
+
+    if admit is not None:
+        admit()
+    start = time.perf_counter()
+    result = adapter.get_completion(messages, tools)
+    _report_latency(on_latency, result, start)
+    if key is not None:
+        get_llm_cache().set(key, result)
+    return result
+
+
+async def acached_completion(
+    adapter: Any,
+    messages: List[Dict[str, Any]],
+    tools: Any = None,
+    on_latency: Optional[Callable[[float], None]] = None,
+    admit: Optional[Callable[[], None]] = None,
+) -> Dict[str, Any]:
+    """Versão async: `adapter.aget_completion` (ou `get_completion` em thread) passando pelo cache."""
+    key, cached = _lookup(adapter, messages, tools)
+    if cached is not None:
+        return cached
+
+    if admit is not None:
+        admit()
+    start = time.perf_counter()
+    if hasattr(adapter, "aget_completion"):
+        result = await adapter.aget_completion(messages, tools)
+    else:
+        result = await asyncio.to_thread(adapter.get_completion, messages, tools)
+    _report_latency(on_latency, result, start)
+    if key is not None:
+        get_llm_cache().set(key, result)
+    return result
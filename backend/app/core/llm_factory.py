@@ -1,9 +1,28 @@
 import logging
 import sys
-from typing import Optional, List, Dict, Any
+import time
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterator
 from backend.app.config.settings import settings
 from backend.app.core.llm_groq_adapter import GroqLLMAdapter
-from backend.app.core.llm_base import BaseLLMAdapter
+from backend.app.core.llm_base import BaseLLMAdapter, aiter_in_thread
+from backend.app.core.llm_cache import (
+    acached_completion,
+    cached_completion,
+    get_llm_cache,
+    lookup_completion,
+    store_completion,
+)
+from backend.app.core.llm_hedging import (
+    COMPLETION,
+    FIRST_TOKEN,
+    get_hedge_budget,
+    get_latency_tracker,
+    hedge_deadline,
+    hedged_call,
+    hedged_stream,
+)
+from backend.app.core.llm_resilience import get_all_provider_guards_status, get_provider_guard
+from backend.app.core.prompt_cache import get_prompt_cache_registry
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +62,32 @@ class LLMFactory:
             raise
 
 
+class ProviderShed(Exception):
+    """Chamada recusada localmente pelo ProviderGuard (a cadeia segue para o próximo provedor)."""
+
+
+class _Admission:
+    """
+    Vaga no ProviderGuard tomada só quando a resposta não está no cache:
+    hits não esperam cota/circuito nem contam como sucesso no AIMD/breaker.
+    """
+
+    def __init__(self, smart: "SmartLLM", provider: str, kind: str = COMPLETION):
+        self.smart = smart
+        self.provider = provider
+        self.kind = kind
+        self.permit = None
+
+    def __call__(self) -> None:
+        self.permit, shed = self.smart._admit(self.provider, self.kind)
+        if shed:
+            raise ProviderShed(shed)
+
+    def release(self, outcome: str, latency: Optional[float] = None, error: Optional[str] = None) -> None:
+        self.smart._release(self.permit, outcome, latency=latency, error=error)
+        self.permit = None
+
+
 class SmartLLM:
     """
     Wrapper inteligente com fallback automático em tempo de execução.
@@ -176,9 +221,10 @@ class SmartLLM:
                     "tools": bool(getattr(caps, "tools", False)),
                     "streaming": bool(getattr(caps, "streaming", False)),
                     "json_mode": bool(getattr(caps, "json_mode", False)),
+                    "prompt_caching": bool(getattr(caps, "prompt_caching", False)),
                 }
             except Exception:
-                capabilities = {"chat": True, "tools": False, "streaming": False, "json_mode": False}
+                capabilities = {"chat": True, "tools": False, "streaming": False, "json_mode": False, "prompt_caching": False}
 
             providers.append(
                 {
@@ -189,7 +235,19 @@ class SmartLLM:
                 }
             )
 
-        return {"primary": self.primary, "chain": self.provider_chain, "providers": providers}
+        return {
+            "primary": self.primary,
+            "chain": self.provider_chain,
+            "providers": providers,
+            "cache": get_llm_cache().get_stats(),
+            "prompt_cache": get_prompt_cache_registry().get_stats(),
+            "hedging": {
+                "enabled": settings.LLM_HEDGING_ENABLED,
+                "budget": get_hedge_budget().get_stats(),
+                "latency": get_latency_tracker().get_stats(),
+            },
+            "admission": get_all_provider_guards_status(),
+        }
 
     def _is_rate_limit_error(self, error_str: str) -> bool:
         """Check if error indicates rate limiting"""
@@ -251,9 +309,7 @@ class SmartLLM:
             if adapter is None:
                 continue
             try:
-                if hasattr(adapter, "generate_response"):
-                    return await adapter.generate_response(prompt)
-                result = adapter.get_completion([{"role": "user", "content": prompt}], tools=None)
+                result = await acached_completion(adapter, [{"role": "user", "content": prompt}], None)
                 if "error" not in result:
                     return str(result.get("content", ""))
                 last_error = str(result.get("error", "erro desconhecido"))
@@ -303,26 +359,368 @@ class SmartLLM:
                 continue
 
             request_messages = self._prepare_messages_for_primary(messages) if idx == 0 else self._compact_messages_for_fallback(messages)
+            admission = _Admission(self, provider)
 
+            outcome, failure = "error", None
             try:
                 if self.system_instruction and hasattr(adapter, "system_instruction"):
                     adapter.system_instruction = self.system_instruction
 
-                result = adapter.get_completion(request_messages, tools)
+                result = cached_completion(
+                    adapter, request_messages, tools,
+                    on_latency=self._latency_recorder(provider), admit=admission,
+                )
                 if not isinstance(result, dict):
+                    failure = "resposta inválida"
                     errors.append(f"{provider}: resposta inválida")
                     continue
 
                 if "error" in result:
+                    failure = str(result.get("error"))
                     errors.append(f"{provider}: {result.get('error')}")
                     logger.warning(f"[RETRY] {provider} falhou: {result.get('error')}")
                     continue
 
+                outcome = "success"
                 result["provider"] = provider
                 return result
+            except ProviderShed as e:
+                errors.append(f"{provider}: {e}")
             except Exception as e:
+                failure = str(e)
                 errors.append(f"{provider}: {e}")
                 logger.warning(f"[RETRY] {provider} exceção: {e}", exc_info=True)
+            finally:
+                admission.release(outcome, error=failure)
+
+        final_error = " | ".join(errors) if errors else "Nenhum provedor LLM disponível"
+        return {"error": self._sanitize_user_error(final_error)}
+
+    def stream_completion(self, messages: List[Dict[str, str]], tools: Optional[Dict] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming completion with provider-chain fallback.
+
+        Falls back to the next provider only while nothing has been yielded;
+        once tokens reached the caller, a provider error ends the stream.
+        A completion-cache hit is yielded as a single chunk (no provider
+        permit); a fully streamed response is stored in the cache.
+        """
+        errors: List[str] = []
+
+        for idx, provider in enumerate(self.provider_chain):
+            adapter = self._get_adapter(provider)
+            if adapter is None:
+                errors.append(f"{provider}: indisponível")
+                continue
+
+            request_messages = self._prepare_messages_for_primary(messages) if idx == 0 else self._compact_messages_for_fallback(messages)
+            if self.system_instruction and hasattr(adapter, "system_instruction"):
+                adapter.system_instruction = self.system_instruction
+
+            key, cached = lookup_completion(adapter, request_messages, tools)
+            if cached is not None:
+                yield {**cached, "provider": provider}
+                return
+
+            permit, shed = self._admit(provider, FIRST_TOKEN)
+            if shed:
+                errors.append(f"{provider}: {shed}")
+                continue
+
+            emitted = False
+            content_parts: List[str] = []
+            tool_calls: List[Dict[str, Any]] = []
+            outcome, failure, first_token_latency = "cancelled", None, None
+            start = time.perf_counter()
+
+            try:
+                for chunk in adapter.stream_completion(request_messages, tools):
+                    if not isinstance(chunk, dict):
+                        continue
+                    if "error" in chunk:
+                        if emitted:
+                            outcome, failure = "error", str(chunk.get("error"))
+                            yield {"error": self._sanitize_user_error(str(chunk.get("error")))}
+                            return
+                        raise RuntimeError(chunk.get("error"))
+                    if not emitted:
+                        first_token_latency = time.perf_counter() - start
+                    emitted = True
+                    self._collect_chunk(chunk, content_parts, tool_calls)
+                    yield {**chunk, "provider": provider}
+
+                if emitted:
+                    outcome = "success"
+                    store_completion(key, self._assembled_response(content_parts, tool_calls))
+                    return
+                outcome, failure = "error", "resposta vazia"
+                errors.append(f"{provider}: resposta vazia")
+            except Exception as e:
+                outcome, failure = "error", str(e)
+                if emitted:
+                    logger.warning(f"[STREAM] {provider} interrompido: {e}")
+                    yield {"error": self._sanitize_user_error(str(e))}
+                    return
+                errors.append(f"{provider}: {e}")
+                logger.warning(f"[RETRY] {provider} falhou no streaming: {e}")
+            finally:
+                self._release(permit, outcome, latency=first_token_latency, error=failure)
+
+        final_error = " | ".join(errors) if errors else "Nenhum provedor LLM disponível"
+        yield {"error": self._sanitize_user_error(final_error)}
+
+    _SHED_MESSAGES = {
+        "rate_limited": "rate limit (cota do provedor esgotada, recusado localmente)",
+        "circuit_open": "circuito aberto (provedor degradado)",
+        "concurrency": "limite de concorrência do provedor atingido",
+    }
+
+    def _admit(self, provider: str, kind: str = COMPLETION):
+        """
+        Pede vaga ao ProviderGuard do provedor: (permit, "") ou (None, motivo
+        da recusa). Sem vaga a cadeia segue para o próximo provedor em vez de
+        empilhar chamadas. O mock não tem controle de admissão.
+        """
+        if provider == "mock" or not settings.LLM_ADAPTIVE_LIMIT_ENABLED:
+            return None, ""
+        permit, reason = get_provider_guard(provider).try_acquire(kind)
+        if permit is None:
+            logger.warning(f"[SHED] {provider} recusado ({reason})")
+            return None, self._SHED_MESSAGES.get(reason, reason)
+        return permit, ""
+
+    @staticmethod
+    def _release(permit, outcome: str, latency: Optional[float] = None, error: Optional[str] = None) -> None:
+        if permit is not None:
+            permit.release(outcome, latency=latency, error=error)
+
+    @staticmethod
+    def _collect_chunk(chunk: Dict[str, Any], content_parts: List[str], tool_calls: List[Dict[str, Any]]) -> None:
+        if chunk.get("content"):
+            content_parts.append(chunk["content"])
+        if chunk.get("tool_calls"):
+            tool_calls.extend(chunk["tool_calls"])
+
+    @staticmethod
+    def _assembled_response(content_parts: List[str], tool_calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Resposta final de um stream no formato de get_completion (para o cache)."""
+        response: Dict[str, Any] = {"content": "".join(content_parts)}
+        if tool_calls:
+            response["tool_calls"] = tool_calls
+        return response
+
+    def _latency_recorder(self, provider: str, kind: str = COMPLETION):
+        tracker = get_latency_tracker()
+        return lambda seconds: tracker.record(provider, kind, seconds)
+
+    def _request_messages(self, idx: int, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return self._prepare_messages_for_primary(messages) if idx == 0 else self._compact_messages_for_fallback(messages)
+
+    def _hedge_pair(self) -> Optional[List[tuple]]:
+        """
+        Primeiros dois provedores reais disponíveis da cadeia, (idx, provider),
+        quando LLM_HEDGING_ENABLED. O mock nunca participa: responderia
+        instantaneamente e sempre "venceria" a corrida.
+        """
+        if not settings.LLM_HEDGING_ENABLED:
+            return None
+        candidates = [
+            (idx, provider)
+            for idx, provider in enumerate(self.provider_chain)
+            if provider != "mock" and self._get_adapter(provider) is not None
+        ]
+        return candidates[:2] if len(candidates) >= 2 else None
+
+    async def _acall_provider(self, idx: int, provider: str, messages: List[Dict[str, str]], tools: Optional[Dict]) -> Dict[str, Any]:
+        """Uma chamada async a um provedor da cadeia; erros voltam como {"error": ...}."""
+        adapter = self._get_adapter(provider)
+        if adapter is None:
+            return {"error": "indisponível"}
+        admission = _Admission(self, provider)
+
+        outcome, failure = "cancelled", None
+        try:
+            if self.system_instruction and hasattr(adapter, "system_instruction"):
+                adapter.system_instruction = self.system_instruction
+
+            result = await acached_completion(
+                adapter, self._request_messages(idx, messages), tools,
+                on_latency=self._latency_recorder(provider), admit=admission,
+            )
+            if not isinstance(result, dict):
+                outcome, failure = "error", "resposta inválida"
+                return {"error": failure}
+            if "error" in result:
+                outcome, failure = "error", str(result.get("error"))
+                logger.warning(f"[RETRY] {provider} falhou: {result.get('error')}")
+                return {"error": result.get("error")}
+
+            outcome = "success"
+            result["provider"] = provider
+            return result
+        except ProviderShed as e:
+            return {"error": str(e)}
+        except Exception as e:
+            outcome, failure = "error", str(e)
+            logger.warning(f"[RETRY] {provider} exceção: {e}", exc_info=True)
+            return {"error": str(e)}
+        finally:
+            admission.release(outcome, error=failure)
+
+    async def aget_completion(self, messages: List[Dict[str, str]], tools: Optional[Dict] = None) -> Dict[str, Any]:
+        """
+        Async completion with provider-chain fallback (same rules as get_completion).
+        Adapters with native async paths run without worker threads.
+
+        With LLM_HEDGING_ENABLED the first two real providers race: the
+        secondary fires when the primary exceeds its p95 deadline (within the
+        hedge budget) and the loser is cancelled.
+        """
+        errors: List[str] = []
+        chain = list(enumerate(self.provider_chain))
+
+        pair = self._hedge_pair()
+        if pair:
+            (primary_idx, primary), (secondary_idx, secondary) = pair
+            budget = get_hedge_budget()
+            budget.record_request()
+            winner, result, hedge_errors = await hedged_call(
+                (primary, lambda: self._acall_provider(primary_idx, primary, messages, tools)),
+                (secondary, lambda: self._acall_provider(secondary_idx, secondary, messages, tools)),
+                hedge_deadline(primary, COMPLETION),
+                budget,
+            )
+            if winner is not None:
+                return result
+            errors.extend(hedge_errors)
+            chain = [(idx, provider) for idx, provider in chain if provider not in (primary, secondary)]
+
+        for idx, provider in chain:
+            result = await self._acall_provider(idx, provider, messages, tools)
+            if "error" not in result:
+                return result
+            errors.append(f"{provider}: {result.get('error')}")
 
         final_error = " | ".join(errors) if errors else "Nenhum provedor LLM disponível"
         return {"error": self._sanitize_user_error(final_error)}
+
+    async def _astream_provider(self, idx: int, provider: str, messages: List[Dict[str, str]], tools: Optional[Dict]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream de um provedor da cadeia. Falha antes do primeiro chunk gera um
+        único {"error": ...} (o chamador tenta o próximo); depois disso o erro
+        é repassado sanitizado e o stream termina.
+
+        Hit no cache de completions vira um único chunk, sem pedir vaga ao
+        provedor; um stream concluído é montado e armazenado no cache.
+        """
+        adapter = self._get_adapter(provider)
+        if adapter is None:
+            yield {"error": "indisponível"}
+            return
+
+        request_messages = self._request_messages(idx, messages)
+        if self.system_instruction and hasattr(adapter, "system_instruction"):
+            adapter.system_instruction = self.system_instruction
+
+        key, cached = lookup_completion(adapter, request_messages, tools)
+        if cached is not None:
+            yield {**cached, "provider": provider}
+            return
+
+        permit, shed = self._admit(provider, FIRST_TOKEN)
+        if shed:
+            yield {"error": shed}
+            return
+
+        emitted = False
+        content_parts: List[str] = []
+        tool_calls: List[Dict[str, Any]] = []
+        chunks = None
+        outcome, failure, first_token_latency = "cancelled", None, None
+        start = time.perf_counter()
+
+        try:
+            if hasattr(adapter, "astream_completion"):
+                chunks = adapter.astream_completion(request_messages, tools)
+            else:
+                chunks = aiter_in_thread(lambda: adapter.stream_completion(request_messages, tools))
+
+            async for chunk in chunks:
+                if not isinstance(chunk, dict):
+                    continue
+                if "error" in chunk:
+                    if emitted:
+                        outcome, failure = "error", str(chunk.get("error"))
+                        yield {"error": self._sanitize_user_error(str(chunk.get("error")))}
+                        return
+                    raise RuntimeError(chunk.get("error"))
+                if not emitted:
+                    first_token_latency = time.perf_counter() - start
+                    get_latency_tracker().record(provider, FIRST_TOKEN, first_token_latency)
+                emitted = True
+                self._collect_chunk(chunk, content_parts, tool_calls)
+                yield {**chunk, "provider": provider}
+
+            if emitted:
+                outcome = "success"
+                store_completion(key, self._assembled_response(content_parts, tool_calls))
+            else:
+                outcome, failure = "error", "resposta vazia"
+                yield {"error": "resposta vazia"}
+        except Exception as e:
+            outcome, failure = "error", str(e)
+            if emitted:
+                logger.warning(f"[STREAM] {provider} interrompido: {e}")
+                yield {"error": self._sanitize_user_error(str(e))}
+                return
+            logger.warning(f"[RETRY] {provider} falhou no streaming: {e}")
+            yield {"error": str(e)}
+        finally:
+            self._release(permit, outcome, latency=first_token_latency, error=failure)
+            if chunks is not None and hasattr(chunks, "aclose"):
+                await chunks.aclose()
+
+    async def astream_completion(self, messages: List[Dict[str, str]], tools: Optional[Dict] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async streaming with provider-chain fallback (same rules as stream_completion).
+        With LLM_HEDGING_ENABLED the race is for the first token.
+        """
+        errors: List[str] = []
+        chain = list(enumerate(self.provider_chain))
+
+        pair = self._hedge_pair()
+        if pair:
+            (primary_idx, primary), (secondary_idx, secondary) = pair
+            budget = get_hedge_budget()
+            budget.record_request()
+            emitted = False
+            async for _, chunk in hedged_stream(
+                (primary, lambda: self._astream_provider(primary_idx, primary, messages, tools)),
+                (secondary, lambda: self._astream_provider(secondary_idx, secondary, messages, tools)),
+                hedge_deadline(primary, FIRST_TOKEN),
+                budget,
+                errors,
+            ):
+                emitted = True
+                yield chunk
+            if emitted:
+                return
+            chain = [(idx, provider) for idx, provider in chain if provider not in (primary, secondary)]
+
+        for idx, provider in chain:
+            emitted = False
+            stream = self._astream_provider(idx, provider, messages, tools)
+            try:
+                async for chunk in stream:
+                    if not emitted and "error" in chunk:
+                        errors.append(f"{provider}: {chunk.get('error')}")
+                        break
+                    emitted = True
+                    yield chunk
+            finally:
+                await stream.aclose()
+            if emitted:
+                return
+
+        final_error = " | ".join(errors) if errors else "Nenhum provedor LLM disponível"
+        yield {"error": self._sanitize_user_error(final_error)}
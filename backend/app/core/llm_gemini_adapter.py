@@ -1,4 +1,5 @@
 from typing import List, Dict, Any, Optional
+import asyncio
 import logging
 import threading
 import time
@@ -6,6 +7,7 @@ from queue import Queue
 import json # Adicionado para json.dumps
 import os
 from backend.app.core.llm_base import BaseLLMAdapter
+from backend.app.core.llm_http import get_async_http_client, provider_slot
 from backend.app.config.settings import settings
 
 GEMINI_AVAILABLE = False # Assume false until all imports succeed
@@ -66,6 +68,8 @@ class GeminiLLMAdapter(BaseLLMAdapter):
 
         # Store configurable system instruction (default None)
         self.system_instruction = system_instruction
+        # Baixo para precisão em BI (function calling determinístico)
+        self.temperature = 0.1
 
         self.logger.info(f"Gemini adapter inicializado com modelo: {self.model_name}")
 
@@ -217,7 +221,7 @@ class GeminiLLMAdapter(BaseLLMAdapter):
             gemini_tools = []
 
         generation_config = genai.GenerationConfig(
-            temperature=0.1,
+            temperature=self.temperature,
             top_p=0.9,
             top_k=20,
             max_output_tokens=4096,
@@ -312,7 +316,7 @@ class GeminiLLMAdapter(BaseLLMAdapter):
                         # Configuração otimizada para Gemini 3 Flash + BI (precisão máxima)
                         # Ref: https://georgian.io/reduce-llm-costs-and-latency-guide/
                         generation_config = genai.GenerationConfig(
-                            temperature=0.1,  # Baixo para precisão em BI (function calling determinístico)
+                            temperature=self.temperature,  # Baixo para precisão em BI (function calling determinístico)
                             top_p=0.9,       # Reduzido para respostas mais determinísticas
                             top_k=20,        # Reduzido para menos variabilidade
                             max_output_tokens=4096,  # Reduzido (gráficos retornam JSON pequeno)
@@ -540,6 +544,19 @@ class GeminiLLMAdapter(BaseLLMAdapter):
 
         return {"error": f"Falha após {self.max_retries} tentativas"}
 
+    async def aget_completion(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Async nativo quando o caminho é REST (SDK novo / Gemini 3): sem thread
+        worker e com conexões keep-alive do pool. SDK legado segue em thread.
+        """
+        if getattr(self, "_sdk_mode", "legacy") == "new" or "gemini-3" in self.model_name or "thinking" in self.model_name:
+            return await self._agenerate_via_rest(messages, tools)
+        return await super().aget_completion(messages, tools)
+
     def _generate_via_rest(
         self,
         messages: List[Dict[str, str]],
@@ -552,7 +569,72 @@ class GeminiLLMAdapter(BaseLLMAdapter):
         import requests
         
         self.logger.info(f"Usando REST API Bypass para modelo {self.model_name}")
-        
+        url, headers, payload = self._build_rest_request(messages, tools)
+
+        # 3. Executar com retry
+        for attempt in range(self.max_retries):
+            try:
+                response = requests.post(url, json=payload, headers=headers, timeout=20)
+                
+                if response.status_code != 200:
+                    error_msg = response.text
+                    self.logger.warning(f"REST Error {response.status_code}: {error_msg}")
+                    # Lógica de retry simples para erros 5xx/429
+                    if response.status_code in [429, 500, 503] and attempt < self.max_retries - 1:
+                        time.sleep(1 * (attempt + 1))
+                        continue
+                    return {"error": f"REST Error {response.status_code}: {error_msg}"}
+                
+                return self._parse_rest_response(response.json())
+
+            except Exception as e:
+                self.logger.error(f"REST Exception: {e}", exc_info=True)
+                if attempt < self.max_retries - 1:
+                    time.sleep(1)
+                    continue
+                return {"error": str(e)}
+                
+        return {"error": "Max retries exceeded via REST"}
+
+    async def _agenerate_via_rest(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+    ) -> Dict[str, Any]:
+        """Mesmo fluxo de `_generate_via_rest`, sem thread, no pool HTTP compartilhado."""
+        url, headers, payload = self._build_rest_request(messages, tools)
+        client = get_async_http_client()
+
+        for attempt in range(self.max_retries):
+            try:
+                async with provider_slot(self.provider):
+                    response = await client.post(url, json=payload, headers=headers, timeout=20)
+
+                if response.status_code != 200:
+                    error_msg = response.text
+                    self.logger.warning(f"REST Error {response.status_code}: {error_msg}")
+                    if response.status_code in [429, 500, 503] and attempt < self.max_retries - 1:
+                        await asyncio.sleep(1 * (attempt + 1))
+                        continue
+                    return {"error": f"REST Error {response.status_code}: {error_msg}"}
+
+                return self._parse_rest_response(response.json())
+
+            except Exception as e:
+                self.logger.error(f"REST Exception (async): {e}", exc_info=True)
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(1)
+                    continue
+                return {"error": str(e)}
+
+        return {"error": "Max retries exceeded via REST"}
+
+    def _build_rest_request(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+    ):
+        """Monta (url, headers, payload) da chamada REST generateContent."""
         # Security: Send API Key in headers, not URL
         url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model_name}:generateContent"
         headers = {
@@ -567,7 +649,7 @@ class GeminiLLMAdapter(BaseLLMAdapter):
         payload = {
             "contents": gemini_messages,
             "generationConfig": {
-                "temperature": 0.1,
+                "temperature": self.temperature,
                 "topP": 0.9,
                 "topK": 20,
                 "maxOutputTokens": 4096
@@ -610,73 +692,52 @@ class GeminiLLMAdapter(BaseLLMAdapter):
                 "function_calling_config": {"mode": mode_rest}
             }
 
-        # 3. Executar com retry
-        for attempt in range(self.max_retries):
-            try:
-                response = requests.post(url, json=payload, headers=headers, timeout=20)
-                
-                if response.status_code != 200:
-                    error_msg = response.text
-                    self.logger.warning(f"REST Error {response.status_code}: {error_msg}")
-                    # Lógica de retry simples para erros 5xx/429
-                    if response.status_code in [429, 500, 503] and attempt < self.max_retries - 1:
-                        time.sleep(1 * (attempt + 1))
-                        continue
-                    return {"error": f"REST Error {response.status_code}: {error_msg}"}
-                
-                data = response.json()
-                
-                # 4. Processar resposta
-                content = ""
-                tool_calls = []
-                
-                candidates = data.get('candidates', [])
-                if candidates:
-                    candidate = candidates[0]
-                    parts = candidate.get('content', {}).get('parts', [])
+        return url, headers, payload
+
+    def _parse_rest_response(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Converte a resposta JSON do generateContent para o formato do adapter."""
+        # 4. Processar resposta
+        content = ""
+        tool_calls = []
+        
+        candidates = data.get('candidates', [])
+        if candidates:
+            candidate = candidates[0]
+            parts = candidate.get('content', {}).get('parts', [])
+            
+            for part in parts:
+                if 'functionCall' in part:
+                    # Capturar function call E thought signature
+                    fc = part['functionCall']
+                    tc = {
+                        "id": f"call_{fc['name']}",
+                        "type": "function",
+                        "function": {
+                            "name": fc['name'],
+                            # Args podem vir como objeto ou string vazia
+                            "arguments": json.dumps(fc.get('args', {}))
+                        }
+                    }
                     
-                    for part in parts:
-                        if 'functionCall' in part:
-                            # Capturar function call E thought signature
-                            fc = part['functionCall']
-                            tc = {
-                                "id": f"call_{fc['name']}",
-                                "type": "function",
-                                "function": {
-                                    "name": fc['name'],
-                                    # Args podem vir como objeto ou string vazia
-                                    "arguments": json.dumps(fc.get('args', {}))
-                                }
-                            }
-                            
-                            # A MÁGICA: Capturar thoughtSignature
-                            if 'thoughtSignature' in part:
-                                tc["thought_signature"] = part['thoughtSignature']
-                                self.logger.info(f"REST: thought_signature capturado: {part['thoughtSignature'][:15]}...")
-                            elif 'thought_signature' in part:
-                                tc["thought_signature"] = part['thought_signature']
-                            
-                            tool_calls.append(tc)
-                            content = "" # Se tem tool call, zerar content
-                            break # Assume 1 tool call por vez por simplicidade
-                        
-                        elif 'text' in part:
-                            content += part['text']
-                
-                result = {"content": content}
-                if tool_calls:
-                    result["tool_calls"] = tool_calls
+                    # A MÁGICA: Capturar thoughtSignature
+                    if 'thoughtSignature' in part:
+                        tc["thought_signature"] = part['thoughtSignature']
+                        self.logger.info(f"REST: thought_signature capturado: {part['thoughtSignature'][:15]}...")
+                    elif 'thought_signature' in part:
+                        tc["thought_signature"] = part['thought_signature']
                     
-                return result
-
-            except Exception as e:
-                self.logger.error(f"REST Exception: {e}", exc_info=True)
-                if attempt < self.max_retries - 1:
-                    time.sleep(1)
-                    continue
-                return {"error": str(e)}
+                    tool_calls.append(tc)
+                    content = "" # Se tem tool call, zerar content
+                    break # Assume 1 tool call por vez por simplicidade
                 
-        return {"error": "Max retries exceeded via REST"}
+                elif 'text' in part:
+                    content += part['text']
+        
+        result = {"content": content}
+        if tool_calls:
+            result["tool_calls"] = tool_calls
+            
+        return result
 
     def _convert_messages_rest(self, messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
         """
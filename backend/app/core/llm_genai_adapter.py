@@ -11,11 +11,20 @@ Key Changes:
 """
 
 from typing import List, Dict, Any, Optional
+import asyncio
 import logging
 import time
 import json
 import os
 from backend.app.core.llm_base import BaseLLMAdapter
+from backend.app.core.llm_http import get_async_http_client, provider_slot
+from backend.app.core.prompt_cache import (
+    PromptPrefix,
+    acquire_prompt_cache,
+    get_prompt_cache_registry,
+    is_cache_miss_error,
+    split_system_prefix,
+)
 from backend.app.config.settings import settings
 
 GENAI_AVAILABLE = False
@@ -62,12 +71,17 @@ class GenAILLMAdapter(BaseLLMAdapter):
         
         # Client Initialization (NEW SDK PATTERN)
         self.client = genai.Client(api_key=self.api_key)
+        self._aio_client = None
+        self._aio_http_client = None
         
         # Configuration
         # Keep retries short to avoid long user-facing stalls on quota exhaustion.
         self.max_retries = 2
         self.retry_delay = 0.5
         self.system_instruction = system_instruction
+        # Explicit low temperature (same as Gemini/Groq adapters) keeps BI answers
+        # deterministic and makes completions eligible for the LLM cache.
+        self.temperature = 0.1
         self.debug_dumps = os.getenv("GENAI_DEBUG_DUMPS", "false").lower() == "true"
 
         self.logger.info(f"[OK] GenAI adapter inicializado com modelo: {self.model_name}")
@@ -78,8 +92,29 @@ class GenAILLMAdapter(BaseLLMAdapter):
             tools=True,
             streaming=False,
             json_mode=True,
+            prompt_caching=True,
         )
 
+    def create_cached_prefix(self, prefix: PromptPrefix, ttl_seconds: int) -> Optional[str]:
+        """
+        Cria CachedContent com system instruction + tools (Gemini context caching).
+        O provedor exige um prefixo mínimo de tokens; abaixo disso a criação
+        falha e o registro volta a enviar o prefixo completo.
+        """
+        config = types.CreateCachedContentConfig(
+            display_name=f"caculinha-{prefix.key[:16]}",
+            system_instruction=prefix.system_instruction,
+            ttl=f"{int(ttl_seconds)}s",
+        )
+        converted_tools = self._convert_tools(prefix.tools) if prefix.tools else []
+        if converted_tools:
+            config.tools = converted_tools
+            config.tool_config = types.ToolConfig(
+                function_calling_config=types.FunctionCallingConfig(mode="AUTO")
+            )
+        cache = self.client.caches.create(model=self.model_name, config=config)
+        return cache.name
+
     def get_completion(self, messages: List[Dict[str, str]], tools: Optional[List] = None) -> Dict[str, Any]:
         """
         Gera completion usando novo SDK.
@@ -91,94 +126,18 @@ class GenAILLMAdapter(BaseLLMAdapter):
         Returns:
             {"content": str, "tool_calls": [...]} ou {"error": str}
         """
+        # Prefixo estático (mensagens system iniciais) vai como system_instruction
+        # ou, quando possível, como handle de cache no provedor
+        system_instruction, conversation = split_system_prefix(messages)
+        system_instruction = system_instruction or self.system_instruction
+
         for attempt in range(self.max_retries):
+            cached_content = None
             try:
-                # Convert messages to GenAI format
-                genai_messages = self._convert_messages(messages)
-                
-                # Build request config
-                # Build request config using GenerateContentConfig
-                # FIX 2026-01-24: New SDK requires 'config' parameter object
-                generate_config = types.GenerateContentConfig()
-                
-                if self.system_instruction:
-                    generate_config.system_instruction = self.system_instruction
-                
-                if tools:
-                    converted_tools = self._convert_tools(tools)
-                    self.logger.info(f"DEBUG TOOLS: Original count: {len(tools) if hasattr(tools, '__len__') else '?'}, Converted: {len(converted_tools)}")
-                    
-                    # Optional debug dump (disabled by default in production flow).
-                    if converted_tools and self.debug_dumps:
-                        import json
-                        from pathlib import Path
-                        from datetime import datetime
-                        
-                        debug_dir = Path("debug_llm_responses")
-                        debug_dir.mkdir(exist_ok=True)
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        tools_file = debug_dir / f"tools_{timestamp}.json"
-                        
-                        # Tentar serializar as ferramentas
-                        try:
-                            tools_dict = {
-                                "timestamp": timestamp,
-                                "original_tools_type": str(type(tools)),
-                                "original_tools_str": str(tools)[:5000],  # Limitar tamanho
-                                "converted_tools_count": len(converted_tools),
-                                "converted_tools": []
-                            }
-                            
-                            for i, tool in enumerate(converted_tools):
-                                tool_info = {
-                                    "index": i,
-                                    "type": str(type(tool)),
-                                    "str": str(tool)[:2000],  # Limitar
-                                    "repr": repr(tool)[:2000],
-                                }
-                                
-                                # Tentar extrair function_declarations se for um Tool
-                                if hasattr(tool, 'function_declarations'):
-                                    tool_info["has_function_declarations"] = True
-                                    tool_info["function_declarations_count"] = len(tool.function_declarations)
-                                    tool_info["function_declarations"] = []
-                                    
-                                    for j, func_decl in enumerate(tool.function_declarations):
-                                        func_info = {
-                                            "index": j,
-                                            "type": str(type(func_decl)),
-                                            "str": str(func_decl)[:1000],
-                                        }
-                                        
-                                        if hasattr(func_decl, 'name'):
-                                            func_info["name"] = func_decl.name
-                                        if hasattr(func_decl, 'description'):
-                                            func_info["description"] = func_decl.description
-                                        if hasattr(func_decl, 'parameters'):
-                                            func_info["parameters_type"] = str(type(func_decl.parameters))
-                                            func_info["parameters_str"] = str(func_decl.parameters)[:500]
-                                        
-                                        tool_info["function_declarations"].append(func_info)
-                                
-                                tools_dict["converted_tools"].append(tool_info)
-                            
-                            with open(tools_file, 'w', encoding='utf-8') as f:
-                                json.dump(tools_dict, f, indent=2, ensure_ascii=False)
-                            
-                            print(f"\n{'='*80}\n[DEBUG] Ferramentas salvas em: {tools_file}\n{'='*80}\n", flush=True)
-                            self.logger.info(f"[DEBUG] Ferramentas salvas em: {tools_file}")
-                        except Exception as e:
-                            self.logger.error(f"Erro ao salvar ferramentas: {e}")
-                    
-                    if converted_tools:
-                        generate_config.tools = converted_tools
-                        # Explicitly set mode to AUTO only if tools exist
-                        generate_config.tool_config = types.ToolConfig(
-                            function_calling_config=types.FunctionCallingConfig(
-                                mode="AUTO"
-                            )
-                        )
-                
+                genai_messages, generate_config, cached_content = self._build_generate_request(
+                    conversation, system_instruction, tools
+                )
+
                 # Call API
                 self.logger.info(f"[DEBUG] Chamando GenAI SDK (tentativa {attempt + 1}/{self.max_retries})")
                 response = self.client.models.generate_content(
@@ -191,25 +150,180 @@ class GenAILLMAdapter(BaseLLMAdapter):
                 return self._parse_response(response)
                 
             except Exception as e:
-                self.logger.warning(f"Erro na tentativa {attempt + 1}: {e}")
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay * (attempt + 1))
-                else:
-                    error_text = str(e).lower()
-                    if any(token in error_text for token in ["429", "quota", "resource_exhausted", "rate limit"]):
-                        return {
-                            "error": "Quota estourada / configure billing / tente depois",
-                            "error_type": "rate_limit",
-                        }
-                    if any(token in error_text for token in ["413", "payload too large", "tokens per minute", "request too large"]):
-                        return {
-                            "error": "Pedido muito grande para o modelo de fallback. Tente uma pergunta mais objetiva.",
-                            "error_type": "payload_too_large",
-                        }
-                    return {"error": "Serviço de IA indisponível no momento. Tente novamente em instantes."}
+                error, delay = self._attempt_failed(e, attempt, cached_content, system_instruction, tools)
+                if error:
+                    return error
+                time.sleep(delay)
         
         return {"error": "Max retries exceeded"}
 
+    async def aget_completion(self, messages: List[Dict[str, str]], tools: Optional[List] = None) -> Dict[str, Any]:
+        """
+        Versão async nativa (client.aio) sobre o pool HTTP compartilhado.
+        Mesmo contrato/retries de `get_completion`.
+        """
+        system_instruction, conversation = split_system_prefix(messages)
+        system_instruction = system_instruction or self.system_instruction
+
+        for attempt in range(self.max_retries):
+            cached_content = None
+            try:
+                # A criação do cache de prefixo (rara: 1x por TTL) é a única etapa síncrona
+                genai_messages, generate_config, cached_content = self._build_generate_request(
+                    conversation, system_instruction, tools
+                )
+                async with provider_slot(self.provider):
+                    response = await self._get_aio_client().models.generate_content(
+                        model=self.model_name,
+                        contents=genai_messages,
+                        config=generate_config
+                    )
+                return self._parse_response(response)
+
+            except Exception as e:
+                error, delay = self._attempt_failed(e, attempt, cached_content, system_instruction, tools)
+                if error:
+                    return error
+                await asyncio.sleep(delay)
+
+        return {"error": "Max retries exceeded"}
+
+    def _get_aio_client(self):
+        """Client async (`client.aio`) ligado ao httpx.AsyncClient compartilhado do loop atual."""
+        http_client = get_async_http_client()
+        if self._aio_client is None or self._aio_http_client is not http_client:
+            self._aio_client = genai.Client(
+                api_key=self.api_key,
+                http_options=types.HttpOptions(httpx_async_client=http_client),
+            )
+            self._aio_http_client = http_client
+        return self._aio_client.aio
+
+    def _build_generate_request(self, conversation: List[Dict[str, Any]], system_instruction: Optional[str], tools: Any):
+        """Monta (contents, config, handle do cache de prefixo) de uma chamada generate_content."""
+        # Convert messages to GenAI format
+        genai_messages = self._convert_messages(conversation)
+        
+        # Build request config
+        # Build request config using GenerateContentConfig
+        # FIX 2026-01-24: New SDK requires 'config' parameter object
+        generate_config = types.GenerateContentConfig(temperature=self.temperature)
+
+        cached_content = acquire_prompt_cache(self, system_instruction, tools)
+
+        if cached_content:
+            # system instruction + tools + tool_config já estão no cache
+            generate_config.cached_content = cached_content
+        elif system_instruction:
+            generate_config.system_instruction = system_instruction
+        
+        if tools and not cached_content:
+            converted_tools = self._convert_tools(tools)
+            self.logger.info(f"DEBUG TOOLS: Original count: {len(tools) if hasattr(tools, '__len__') else '?'}, Converted: {len(converted_tools)}")
+            
+            # Optional debug dump (disabled by default in production flow).
+            if converted_tools and self.debug_dumps:
+                import json
+                from pathlib import Path
+                from datetime import datetime
+                
+                debug_dir = Path("debug_llm_responses")
+                debug_dir.mkdir(exist_ok=True)
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                tools_file = debug_dir / f"tools_{timestamp}.json"
+                
+                # Tentar serializar as ferramentas
+                try:
+                    tools_dict = {
+                        "timestamp": timestamp,
+                        "original_tools_type": str(type(tools)),
+                        "original_tools_str": str(tools)[:5000],  # Limitar tamanho
+                        "converted_tools_count": len(converted_tools),
+                        "converted_tools": []
+                    }
+                    
+                    for i, tool in enumerate(converted_tools):
+                        tool_info = {
+                            "index": i,
+                            "type": str(type(tool)),
+                            "str": str(tool)[:2000],  # Limitar
+                            "repr": repr(tool)[:2000],
+                        }
+                        
+                        # Tentar extrair function_declarations se for um Tool
+                        if hasattr(tool, 'function_declarations'):
+                            tool_info["has_function_declarations"] = True
+                            tool_info["function_declarations_count"] = len(tool.function_declarations)
+                            tool_info["function_declarations"] = []
+                            
+                            for j, func_decl in enumerate(tool.function_declarations):
+                                func_info = {
+                                    "index": j,
+                                    "type": str(type(func_decl)),
+                                    "str": str(func_decl)[:1000],
+                                }
+                                
+                                if hasattr(func_decl, 'name'):
+                                    func_info["name"] = func_decl.name
+                                if hasattr(func_decl, 'description'):
+                                    func_info["description"] = func_decl.description
+                                if hasattr(func_decl, 'parameters'):
+                                    func_info["parameters_type"] = str(type(func_decl.parameters))
+                                    func_info["parameters_str"] = str(func_decl.parameters)[:500]
+                                
+                                tool_info["function_declarations"].append(func_info)
+                        
+                        tools_dict["converted_tools"].append(tool_info)
+                    
+                    with open(tools_file, 'w', encoding='utf-8') as f:
+                        json.dump(tools_dict, f, indent=2, ensure_ascii=False)
+                    
+                    print(f"\n{'='*80}\n[DEBUG] Ferramentas salvas em: {tools_file}\n{'='*80}\n", flush=True)
+                    self.logger.info(f"[DEBUG] Ferramentas salvas em: {tools_file}")
+                except Exception as e:
+                    self.logger.error(f"Erro ao salvar ferramentas: {e}")
+            
+            if converted_tools:
+                generate_config.tools = converted_tools
+                # Explicitly set mode to AUTO only if tools exist
+                generate_config.tool_config = types.ToolConfig(
+                    function_calling_config=types.FunctionCallingConfig(
+                        mode="AUTO"
+                    )
+                )
+
+        return genai_messages, generate_config, cached_content
+
+    def _attempt_failed(self, e: Exception, attempt: int, cached_content: Optional[str], system_instruction: Optional[str], tools: Any):
+        """
+        Trata a falha de uma tentativa.
+        Retorna (erro final, 0.0) ou (None, espera antes da próxima tentativa).
+        """
+        self.logger.warning(f"Erro na tentativa {attempt + 1}: {e}")
+        is_last = attempt >= self.max_retries - 1
+        if cached_content and is_cache_miss_error(e):
+            # Handle expirou/foi removido no provedor: próxima tentativa recria
+            get_prompt_cache_registry().invalidate(
+                self, PromptPrefix(system_instruction=system_instruction, tools=tools)
+            )
+            if not is_last:
+                return None, 0.0
+        if not is_last:
+            return None, self.retry_delay * (attempt + 1)
+
+        error_text = str(e).lower()
+        if any(token in error_text for token in ["429", "quota", "resource_exhausted", "rate limit"]):
+            return {
+                "error": "Quota estourada / configure billing / tente depois",
+                "error_type": "rate_limit",
+            }, 0.0
+        if any(token in error_text for token in ["413", "payload too large", "tokens per minute", "request too large"]):
+            return {
+                "error": "Pedido muito grande para o modelo de fallback. Tente uma pergunta mais objetiva.",
+                "error_type": "payload_too_large",
+            }, 0.0
+        return {"error": "Serviço de IA indisponível no momento. Tente novamente em instantes."}, 0.0
+
     async def generate_response(self, prompt: str) -> str:
         """Wrapper assíncrono para compatibilidade."""
         messages = [{"role": "user", "content": prompt}]
@@ -3,8 +3,9 @@ import os
 import logging
 import json
 from typing import List, Dict, Any, Optional
-from groq import Groq
+from groq import AsyncGroq, Groq
 from backend.app.core.llm_base import BaseLLMAdapter
+from backend.app.core.llm_http import get_async_http_client, provider_slot
 from backend.app.config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -15,7 +16,13 @@ class GroqLLMAdapter(BaseLLMAdapter):
     Utiliza modelos Llama 3 para inferência ultra-rápida.
     """
 
-    def __init__(self, model_name: Optional[str] = None, api_key: Optional[str] = None, system_instruction: Optional[str] = None):
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        api_key: Optional[str] = None,
+        system_instruction: Optional[str] = None,
+        base_url: Optional[str] = None,
+    ):
         self.logger = logging.getLogger(__name__)
         self.provider = "groq"
         
@@ -27,9 +34,14 @@ class GroqLLMAdapter(BaseLLMAdapter):
         if not api_key:
             raise ValueError("GROQ_API_KEY não configurada")
 
-        self.client = Groq(api_key=api_key)
+        self.api_key = api_key
+        self.base_url = base_url  # None => endpoint padrão do SDK (GROQ_BASE_URL)
+        self.client = Groq(api_key=api_key, base_url=base_url)
+        self._async_client: Optional[AsyncGroq] = None
+        self._async_http_client = None
         self.model_name = model_name or settings.GROQ_MODEL_NAME or "llama-3.3-70b-versatile"
         self.system_instruction = system_instruction
+        self.temperature = 0.1
         self.max_output_tokens = settings.LLM_MAX_OUTPUT_TOKENS if settings.DEV_FAST_MODE else max(settings.LLM_MAX_OUTPUT_TOKENS, 1024)
         
         self.logger.info(f"[OK] GroqLLMAdapter inicializado: {self.model_name}")
@@ -38,10 +50,52 @@ class GroqLLMAdapter(BaseLLMAdapter):
         return BaseLLMAdapter.Capabilities(
             chat=True,
             tools=True,
-            streaming=False,
+            streaming=True,
             json_mode=False,
         )
 
+    def _build_request_kwargs(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        stream: bool = False,
+    ) -> Dict[str, Any]:
+        # Injetar instrução de sistema se fornecida
+        if self.system_instruction:
+            # Se a primeira mensagem já for system, atualiza, senão insere
+            if messages and messages[0].get("role") == "system":
+                messages[0]["content"] = self.system_instruction
+            else:
+                messages.insert(0, {"role": "system", "content": self.system_instruction})
+
+        # Converter ferramentas para formato Groq (OpenAI-like)
+        groq_tools = None
+        tool_choice = None
+        
+        if tools:
+            groq_tools = self._convert_tools(tools)
+            if groq_tools:
+               tool_choice = "auto"
+
+        # Prepare arguments
+        kwargs = {
+            "model": self.model_name,
+            "messages": messages,
+            "temperature": self.temperature,
+            "max_tokens": self.max_output_tokens,
+            "top_p": 1,
+            "stream": stream
+        }
+        
+        if groq_tools:
+            kwargs["tools"] = groq_tools
+            kwargs["tool_choice"] = tool_choice
+
+        # Normalize messages (Gemini -> OpenAI format)
+        normalized_messages = self._normalize_messages(messages)
+        kwargs["messages"] = normalized_messages
+        return kwargs
+
     def get_completion(
         self, 
         messages: List[Dict[str, str]], 
@@ -52,65 +106,133 @@ class GroqLLMAdapter(BaseLLMAdapter):
         Compatível com o formato OpenAI/Gemini do projeto.
         """
         try:
-            # Injetar instrução de sistema se fornecida
-            if self.system_instruction:
-                # Se a primeira mensagem já for system, atualiza, senão insere
-                if messages and messages[0].get("role") == "system":
-                    messages[0]["content"] = self.system_instruction
-                else:
-                    messages.insert(0, {"role": "system", "content": self.system_instruction})
-
-            # Converter ferramentas para formato Groq (OpenAI-like)
-            groq_tools = None
-            tool_choice = None
-            
-            if tools:
-                groq_tools = self._convert_tools(tools)
-                if groq_tools:
-                   tool_choice = "auto"
-
-            # Prepare arguments
-            kwargs = {
-                "model": self.model_name,
-                "messages": messages,
-                "temperature": 0.1,
-                "max_tokens": self.max_output_tokens,
-                "top_p": 1,
-                "stream": False
-            }
-            
-            if groq_tools:
-                kwargs["tools"] = groq_tools
-                kwargs["tool_choice"] = tool_choice
-
-            # Normalize messages (Gemini -> OpenAI format)
-            normalized_messages = self._normalize_messages(messages)
-            kwargs["messages"] = normalized_messages
-
+            kwargs = self._build_request_kwargs(messages, tools)
             response = self.client.chat.completions.create(**kwargs)
+            return self._parse_completion(response)
 
-            message = response.choices[0].message
-            result = {"content": message.content or ""}
+        except Exception as e:
+            self.logger.error(f"[ERR] Erro ao chamar Groq: {e}", exc_info=True)
+            return {"error": str(e)}
 
-            if message.tool_calls:
-                tool_calls = []
-                for tc in message.tool_calls:
-                    tool_calls.append({
-                        "id": tc.id,
-                        "type": "function",
-                        "function": {
-                            "name": tc.function.name,
-                            "arguments": tc.function.arguments
-                        }
-                    })
-                result["tool_calls"] = tool_calls
+    def _get_async_client(self) -> AsyncGroq:
+        """AsyncGroq sobre o pool HTTP compartilhado do event loop atual."""
+        http_client = get_async_http_client()
+        if self._async_client is None or self._async_http_client is not http_client:
+            self._async_client = AsyncGroq(api_key=self.api_key, base_url=self.base_url, http_client=http_client)
+            self._async_http_client = http_client
+        return self._async_client
 
-            return result
+    async def aget_completion(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[Dict[str, List[Dict[str, Any]]]] = None
+    ) -> Dict[str, Any]:
+        """Completion nativa async (sem thread), com conexões keep-alive reaproveitadas."""
+        try:
+            kwargs = self._build_request_kwargs(messages, tools)
+            async with provider_slot(self.provider):
+                response = await self._get_async_client().chat.completions.create(**kwargs)
+            return self._parse_completion(response)
 
         except Exception as e:
-            self.logger.error(f"[ERR] Erro ao chamar Groq: {e}", exc_info=True)
+            self.logger.error(f"[ERR] Erro ao chamar Groq (async): {e}", exc_info=True)
             return {"error": str(e)}
 
+    async def astream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[Dict[str, List[Dict[str, Any]]]] = None
+    ):
+        """Streaming nativo async; mesmo formato de chunks de `stream_completion`."""
+        try:
+            kwargs = self._build_request_kwargs(messages, tools, stream=True)
+            pending_calls: Dict[int, Dict[str, Any]] = {}
+
+            async with provider_slot(self.provider):
+                stream = await self._get_async_client().chat.completions.create(**kwargs)
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    if getattr(delta, "content", None):
+                        yield {"content": delta.content}
+                    for tc in getattr(delta, "tool_calls", None) or []:
+                        self._accumulate_tool_call(pending_calls, tc)
+
+            if pending_calls:
+                yield {"tool_calls": [pending_calls[i] for i in sorted(pending_calls)]}
+
+        except Exception as e:
+            self.logger.error(f"[ERR] Erro no streaming Groq (async): {e}", exc_info=True)
+            yield {"error": str(e)}
+
+    @staticmethod
+    def _parse_completion(response: Any) -> Dict[str, Any]:
+        message = response.choices[0].message
+        result = {"content": message.content or ""}
+
+        if message.tool_calls:
+            tool_calls = []
+            for tc in message.tool_calls:
+                tool_calls.append({
+                    "id": tc.id,
+                    "type": "function",
+                    "function": {
+                        "name": tc.function.name,
+                        "arguments": tc.function.arguments
+                    }
+                })
+            result["tool_calls"] = tool_calls
+
+        return result
+
+    @staticmethod
+    def _accumulate_tool_call(pending_calls: Dict[int, Dict[str, Any]], tc: Any) -> None:
+        """Tool calls chegam fragmentadas por índice no streaming."""
+        call = pending_calls.setdefault(
+            tc.index,
+            {"id": None, "type": "function", "function": {"name": "", "arguments": ""}},
+        )
+        if tc.id:
+            call["id"] = tc.id
+        if tc.function is not None:
+            if tc.function.name:
+                call["function"]["name"] += tc.function.name
+            if tc.function.arguments:
+                call["function"]["arguments"] += tc.function.arguments
+
+    def stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        tools: Optional[Dict[str, List[Dict[str, Any]]]] = None
+    ):
+        """
+        Streaming da Groq API.
+        Yields {'content': str} por token; tool calls (que chegam fragmentadas
+        por índice) são acumuladas e emitidas em um único chunk no final.
+        """
+        try:
+            kwargs = self._build_request_kwargs(messages, tools, stream=True)
+            pending_calls: Dict[int, Dict[str, Any]] = {}
+
+            for chunk in self.client.chat.completions.create(**kwargs):
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+
+                if getattr(delta, "content", None):
+                    yield {"content": delta.content}
+
+                for tc in getattr(delta, "tool_calls", None) or []:
+                    self._accumulate_tool_call(pending_calls, tc)
+
+            if pending_calls:
+                yield {"tool_calls": [pending_calls[i] for i in sorted(pending_calls)]}
+
+        except Exception as e:
+            self.logger.error(f"[ERR] Erro no streaming Groq: {e}", exc_info=True)
+            yield {"error": str(e)}
+
     def _normalize_messages(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Converte mensagens do formato interno (Gemini-like) para formato OpenAI/Groq.
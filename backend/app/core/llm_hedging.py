@@ -0,0 +1,309 @@
+"""
+LLM Hedging - requisições "hedged" entre provedores
+
+A cadeia do SmartLLM é sequencial: um primário lento custa o timeout
+inteiro antes do fallback. Com hedging, se o primário não produzir a
+primeira resposta/token dentro de um prazo derivado do seu p95, o
+secundário é disparado em paralelo; vence quem responder primeiro e o
+perdedor é cancelado.
+
+Componentes:
+- LatencyTracker: janela deslizante de latências por (provedor, tipo)
+  -> p95 usado como prazo do hedge (+ histograma Prometheus)
+- HedgeBudget: orçamento de hedges (fração das requisições + limite de
+  hedges simultâneos), para o hedge não dobrar o custo em um incidente
+- hedged_call / hedged_stream: corrida entre primário e secundário
+
+Falha do primário antes do prazo dispara o secundário imediatamente
+(failover, fora do orçamento de hedge).
+"""
+
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COMPLETION = "completion"
+FIRST_TOKEN = "first_token"
+
+
+def _record_hedge(outcome: str) -> None:
+    try:
+        from backend.app.core.observability.metrics import LLM_HEDGE_TOTAL
+        LLM_HEDGE_TOTAL.labels(outcome=outcome).inc()
+    except Exception:
+        pass
+
+
+class LatencyTracker:
+    """
+    Latências recentes por (provedor, tipo) para derivar o prazo de hedge.
+
+    Args:
+        window: Amostras mantidas por chave
+        min_samples: Abaixo disso o p95 não é confiável (usa-se o prazo padrão)
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, kind: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault((provider, kind), deque(maxlen=self.window)).append(seconds)
+        try:
+            from backend.app.core.observability.metrics import LLM_PROVIDER_LATENCY_SECONDS
+            LLM_PROVIDER_LATENCY_SECONDS.labels(provider=provider, kind=kind).observe(seconds)
+        except Exception:
+            pass
+
+    def percentile(self, provider: str, kind: str, q: float = 0.95) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get((provider, kind), ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            keys = list(self._samples)
+        stats = {}
+        for provider, kind in keys:
+            with self._lock:
+                count = len(self._samples[(provider, kind)])
+            p95 = self.percentile(provider, kind)
+            stats[f"{provider}:{kind}"] = {"samples": count, "p95": round(p95, 4) if p95 is not None else None}
+        return stats
+
+
+class HedgeBudget:
+    """
+    Orçamento de hedges no estilo "retry budget": cada requisição deposita
+    `max_ratio` fichas (até `max_tokens`) e cada hedge consome uma. Além
+    disso, no máximo `max_inflight` hedges simultâneos.
+    """
+
+    def __init__(self, max_ratio: float = 0.1, max_inflight: int = 4, max_tokens: float = 10.0, initial_tokens: float = 1.0):
+        self.max_ratio = max_ratio
+        self.max_inflight = max_inflight
+        self.max_tokens = max_tokens
+        self._tokens = initial_tokens
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.max_ratio)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._inflight >= self.max_inflight or self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            self._inflight += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self._inflight = max(0, self._inflight - 1)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"tokens": round(self._tokens, 3), "inflight": self._inflight, "max_ratio": self.max_ratio}
+
+
+_tracker: Optional[LatencyTracker] = None
+_budget: Optional[HedgeBudget] = None
+_singleton_lock = threading.Lock()
+
+
+def get_latency_tracker() -> LatencyTracker:
+    """Retorna o rastreador global de latência por provedor (singleton)."""
+    global _tracker
+
+    if _tracker is None:
+        with _singleton_lock:
+            if _tracker is None:
+                from backend.app.config.settings import settings
+                _tracker = LatencyTracker(min_samples=settings.LLM_HEDGING_MIN_SAMPLES)
+    return _tracker
+
+
+def get_hedge_budget() -> HedgeBudget:
+    """Retorna o orçamento global de hedges (singleton)."""
+    global _budget
+
+    if _budget is None:
+        with _singleton_lock:
+            if _budget is None:
+                from backend.app.config.settings import settings
+                _budget = HedgeBudget(
+                    max_ratio=settings.LLM_HEDGING_MAX_RATIO,
+                    max_inflight=settings.LLM_HEDGING_MAX_INFLIGHT,
+                )
+    return _budget
+
+
+def hedge_deadline(provider: str, kind: str, tracker: Optional[LatencyTracker] = None) -> float:
+    """Prazo antes de disparar o hedge: p95 do primário (ou padrão sem amostras suficientes)."""
+    from backend.app.config.settings import settings
+
+    p95 = (tracker or get_latency_tracker()).percentile(provider, kind)
+    if p95 is None:
+        return settings.LLM_HEDGING_DEFAULT_DEADLINE_SECONDS
+    return max(settings.LLM_HEDGING_MIN_DEADLINE_SECONDS, p95 * settings.LLM_HEDGING_DEADLINE_MULTIPLIER)
+
+
+def _is_success(result: Any) -> bool:
+    return isinstance(result, dict) and "error" not in result
+
+
+async def _cancel(tasks: List[asyncio.Future]) -> None:
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def hedged_call(
+    primary: Tuple[str, Callable[[], Awaitable[Dict[str, Any]]]],
+    secondary: Tuple[str, Callable[[], Awaitable[Dict[str, Any]]]],
+    deadline: float,
+    budget: HedgeBudget,
+) -> Tuple[Optional[str], Dict[str, Any], List[str]]:
+    """
+    Corre primário e (após `deadline`) secundário; retorna
+    (provedor vencedor ou None, resultado, erros das chamadas que falharam).
+    """
+    primary_name, primary_call = primary
+    secondary_name, secondary_call = secondary
+    tasks: Dict[asyncio.Future, str] = {asyncio.ensure_future(primary_call()): primary_name}
+    secondary_started = False
+    hedged = False
+    errors: List[str] = []
+
+    try:
+        done, _ = await asyncio.wait(list(tasks), timeout=deadline)
+        if not done:
+            if budget.try_acquire():
+                hedged = True
+                secondary_started = True
+                tasks[asyncio.ensure_future(secondary_call())] = secondary_name
+                _record_hedge("fired")
+                logger.info(f"[HEDGE] {primary_name} sem resposta em {deadline:.2f}s; disparando {secondary_name}")
+            else:
+                _record_hedge("skipped_budget")
+
+        while tasks:
+            done, _ = await asyncio.wait(list(tasks), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = tasks.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    result = {"error": str(e)}
+
+                if _is_success(result):
+                    if hedged:
+                        _record_hedge("primary_won" if name == primary_name else "secondary_won")
+                    return name, result, errors
+
+                errors.append(f"{name}: {result.get('error') if isinstance(result, dict) else 'resposta inválida'}")
+                if name == primary_name and not secondary_started:
+                    secondary_started = True
+                    tasks[asyncio.ensure_future(secondary_call())] = secondary_name
+                    _record_hedge("failover")
+
+        return None, {"error": " | ".join(errors)}, errors
+    finally:
+        await _cancel(list(tasks))
+        if hedged:
+            budget.release()
+
+
+async def hedged_stream(
+    primary: Tuple[str, Callable[[], AsyncIterator[Dict[str, Any]]]],
+    secondary: Tuple[str, Callable[[], AsyncIterator[Dict[str, Any]]]],
+    deadline: float,
+    budget: HedgeBudget,
+    errors: List[str],
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Versão streaming: a corrida é pelo primeiro chunk válido. O stream
+    vencedor é repassado até o fim como (provedor, chunk); o perdedor é
+    cancelado. Erros antes do primeiro chunk vão para `errors` e nada é emitido.
+    """
+    primary_name, primary_factory = primary
+    secondary_name, secondary_factory = secondary
+    streams: Dict[str, AsyncIterator[Dict[str, Any]]] = {}
+    pending: Dict[asyncio.Future, str] = {}
+    secondary_started = False
+    hedged = False
+
+    def start(name: str, factory: Callable[[], AsyncIterator[Dict[str, Any]]]) -> None:
+        streams[name] = factory()
+        pending[asyncio.ensure_future(streams[name].__anext__())] = name
+
+    winner: Optional[str] = None
+    first_chunk: Optional[Dict[str, Any]] = None
+    try:
+        start(primary_name, primary_factory)
+        done, _ = await asyncio.wait(list(pending), timeout=deadline)
+        if not done:
+            if budget.try_acquire():
+                hedged = True
+                secondary_started = True
+                start(secondary_name, secondary_factory)
+                _record_hedge("fired")
+                logger.info(f"[HEDGE] {primary_name} sem primeiro token em {deadline:.2f}s; disparando {secondary_name}")
+            else:
+                _record_hedge("skipped_budget")
+
+        while pending and winner is None:
+            done, _ = await asyncio.wait(list(pending), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = pending.pop(task)
+                try:
+                    chunk = task.result()
+                except StopAsyncIteration:
+                    chunk = {"error": "resposta vazia"}
+                except Exception as e:
+                    chunk = {"error": str(e)}
+
+                if winner is None and _is_success(chunk):
+                    winner, first_chunk = name, chunk
+                    continue
+
+                if not _is_success(chunk):
+                    errors.append(f"{name}: {chunk.get('error') if isinstance(chunk, dict) else 'chunk inválido'}")
+                    if name == primary_name and not secondary_started:
+                        secondary_started = True
+                        start(secondary_name, secondary_factory)
+                        _record_hedge("failover")
+    finally:
+        await _cancel(list(pending))
+        for name, stream in streams.items():
+            if name != winner:
+                try:
+                    await stream.aclose()
+                except Exception:
+                    pass
+        if hedged:
+            budget.release()
+
+    if winner is None:
+        return
+
+    if hedged:
+        _record_hedge("primary_won" if winner == primary_name else "secondary_won")
+    try:
+        yield winner, first_chunk
+        async for chunk in streams[winner]:
+            yield winner, chunk
+    finally:
+        await streams[winner].aclose()
@@ -0,0 +1,116 @@
+"""
+LLM HTTP Pool - cliente HTTP assíncrono compartilhado pelos adapters
+
+Antes cada conversa ocupava uma thread (`asyncio.to_thread`) e os adapters
+abriam conexões novas por chamada. Agora os caminhos async (`aget_completion`,
+`astream_completion`) usam:
+
+- Um único `httpx.AsyncClient` por event loop, com keep-alive e HTTP/2
+  (multiplexa várias requisições na mesma conexão TLS com o provedor)
+- Concorrência limitada por provedor (semáforo): acima do limite as chamadas
+  esperam a vez em vez de abrir mais conexões e tomar 429
+
+Clientes e semáforos são ligados ao event loop onde foram criados, por isso
+são mantidos por loop (testes e scripts criam loops próprios).
+
+As respostas passam por um hook que repassa os headers de rate limit ao
+`ProviderGuard` do provedor da chamada (identificado pelo `provider_slot`).
+"""
+
+import asyncio
+import contextvars
+import logging
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from backend.app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+_current_provider: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("llm_http_provider", default=None)
+
+
+async def _observe_rate_limit_headers(response: httpx.Response) -> None:
+    provider = _current_provider.get()
+    if provider is None:
+        return
+    headers = response.headers
+    if "retry-after" in headers or any(name.startswith("x-ratelimit-") for name in headers):
+        from backend.app.core.llm_resilience import get_provider_guard
+        get_provider_guard(provider).observe_headers(headers)
+
+
+def _build_client() -> httpx.AsyncClient:
+    http2 = settings.LLM_HTTP2_ENABLED and HTTP2_AVAILABLE
+    client = httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=httpx.Timeout(settings.LLM_HTTP_TIMEOUT_SECONDS, connect=10.0),
+        event_hooks={"response": [_observe_rate_limit_headers]},
+    )
+    logger.info(
+        f"[OK] LLM HTTP pool criado (http2={http2}, "
+        f"max_connections={settings.LLM_HTTP_MAX_CONNECTIONS})"
+    )
+    return client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Cliente HTTP assíncrono compartilhado do event loop atual."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _build_client()
+        _clients[loop] = client
+    return client
+
+
+def _provider_semaphore(provider: str, limit: Optional[int] = None) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    per_loop = _semaphores.setdefault(loop, {})
+    semaphore = per_loop.get(provider)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(limit or settings.LLM_PROVIDER_MAX_CONCURRENCY)
+        per_loop[provider] = semaphore
+    return semaphore
+
+
+@asynccontextmanager
+async def provider_slot(provider: str) -> AsyncIterator[None]:
+    """Limita chamadas simultâneas ao provedor (LLM_PROVIDER_MAX_CONCURRENCY)."""
+    token = _current_provider.set(provider)
+    try:
+        async with _provider_semaphore(provider):
+            yield
+    finally:
+        try:
+            _current_provider.reset(token)
+        except ValueError:
+            pass  # stream finalizado em outra task (ex.: perdedor de um hedge)
+
+
+async def close_async_http_clients() -> None:
+    """Fecha o cliente do loop atual (shutdown da aplicação)."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    client = _clients.pop(loop, None)
+    _semaphores.pop(loop, None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
@@ -1,5 +1,9 @@
-from typing import Any, List, Optional
+import asyncio
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
 from langchain_core.messages import BaseMessage, AIMessage, ToolMessage
+from backend.app.core.llm_base import BaseLLMAdapter
 from backend.app.core.llm_langchain_adapter import CustomLangChainLLM
 
 class MockLLM(CustomLangChainLLM):
@@ -139,3 +143,165 @@ class MockLLM(CustomLangChainLLM):
     async def ainvoke(self, messages: List[BaseMessage], **kwargs) -> AIMessage:
         # Suporte Async simples
         return self.invoke(messages, **kwargs)
+
+
+class MockStreamingLLMAdapter(BaseLLMAdapter):
+    """
+    Provider local com streaming para testes/benchmarks (sem chamadas de API).
+
+    Devolve as respostas roteirizadas em ordem (uma por chamada). Respostas de
+    texto são emitidas token a token, simulando a latência do primeiro token
+    (`first_token_delay`) e entre tokens (`token_delay`).
+    """
+
+    provider = "mock"
+    model_name = "mock-streaming"
+
+    def __init__(
+        self,
+        responses: Optional[List[Dict[str, Any]]] = None,
+        first_token_delay: float = 0.0,
+        token_delay: float = 0.0,
+    ):
+        self.responses = list(responses or [])
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.system_instruction = None
+        self.calls: List[List[Dict[str, Any]]] = []
+
+    def get_capabilities(self) -> BaseLLMAdapter.Capabilities:
+        return BaseLLMAdapter.Capabilities(chat=True, tools=True, streaming=True, json_mode=False)
+
+    def _next_response(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        self.calls.append(list(messages))
+        if self.responses:
+            return self.responses.pop(0)
+        return {"content": "[MOCK] Resposta simulada."}
+
+    def get_completion(self, messages: List[Dict[str, Any]], tools: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        response = self._next_response(messages)
+        time.sleep(self.first_token_delay + self.token_delay * len(str(response.get("content", "")).split(" ")))
+        return dict(response)
+
+    def stream_completion(self, messages: List[Dict[str, Any]], tools: Optional[Dict[str, Any]] = None):
+        response = self._next_response(messages)
+        time.sleep(self.first_token_delay)
+
+        if "error" in response or "tool_calls" in response:
+            yield dict(response)
+            return
+
+        words = str(response.get("content", "")).split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.token_delay)
+            yield {"content": word if i == 0 else f" {word}"}
+
+    async def aget_completion(self, messages: List[Dict[str, Any]], tools: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        response = self._next_response(messages)
+        await asyncio.sleep(self.first_token_delay + self.token_delay * len(str(response.get("content", "")).split(" ")))
+        return dict(response)
+
+    async def astream_completion(self, messages: List[Dict[str, Any]], tools: Optional[Dict[str, Any]] = None):
+        response = self._next_response(messages)
+        await asyncio.sleep(self.first_token_delay)
+
+        if "error" in response or "tool_calls" in response:
+            yield dict(response)
+            return
+
+        words = str(response.get("content", "")).split(" ")
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            yield {"content": word if i == 0 else f" {word}"}
+
+
+class MockPromptCachingLLMAdapter(BaseLLMAdapter):
+    """
+    Provider local com cache de prefixo (contexto) para testes/benchmarks.
+
+    Simula o lado do provedor: caches criados via `create_cached_prefix`
+    expiram após o TTL e referências a caches inexistentes/expirados falham
+    como na API real. Contabiliza os tokens de entrada cobrados (o prefixo em
+    cache não é cobrado de novo) e simula latência de prefill por token.
+    """
+
+    provider = "mock-cache"
+    model_name = "mock-prompt-cache"
+
+    def __init__(
+        self,
+        registry: Any = None,
+        prefill_delay_per_1k_tokens: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.registry = registry
+        self.prefill_delay_per_1k_tokens = prefill_delay_per_1k_tokens
+        self.system_instruction = None
+        self._clock = clock
+        self.provider_caches: Dict[str, Dict[str, Any]] = {}
+        self.cache_creations = 0
+        self.input_tokens_billed = 0
+        self.cached_tokens_served = 0
+        self.calls_with_cache = 0
+        self.calls: List[Dict[str, Any]] = []
+
+    def get_capabilities(self) -> BaseLLMAdapter.Capabilities:
+        return BaseLLMAdapter.Capabilities(chat=True, tools=True, streaming=False, json_mode=False, prompt_caching=True)
+
+    @staticmethod
+    def _tokens(value: Any) -> int:
+        from backend.app.core.utils.context_budget import estimate_tokens
+        return estimate_tokens(value)
+
+    def create_cached_prefix(self, prefix: Any, ttl_seconds: int) -> Optional[str]:
+        name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+        self.provider_caches[name] = {
+            "prefix_key": prefix.key,
+            "tokens": self._tokens(prefix.system_instruction) + self._tokens(prefix.tools),
+            "expires_at": self._clock() + ttl_seconds,
+        }
+        self.cache_creations += 1
+        # Criar o cache processa o prefixo uma vez
+        self.input_tokens_billed += self.provider_caches[name]["tokens"]
+        return name
+
+    def get_completion(self, messages: List[Dict[str, Any]], tools: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        from backend.app.core.prompt_cache import (
+            PromptPrefix,
+            acquire_prompt_cache,
+            get_prompt_cache_registry,
+            split_system_prefix,
+        )
+
+        system_instruction, conversation = split_system_prefix(messages)
+        system_instruction = system_instruction or self.system_instruction
+        registry = self.registry or get_prompt_cache_registry()
+
+        # Mesmo fluxo do GenAI adapter: handle rejeitado => invalida e recria uma vez
+        for _attempt in range(2):
+            cached_name = acquire_prompt_cache(self, system_instruction, tools, registry=registry)
+            cache = self.provider_caches.get(cached_name) if cached_name else None
+            if cached_name and (cache is None or cache["expires_at"] <= self._clock()):
+                registry.invalidate(self, PromptPrefix(system_instruction=system_instruction, tools=tools))
+                continue
+            break
+        else:
+            return {"error": f"404 cached content {cached_name} not found or expired"}
+
+        conversation_tokens = sum(self._tokens(m.get("content")) for m in conversation)
+        if cached_name:
+            prefix_tokens = 0
+            self.cached_tokens_served += cache["tokens"]
+            self.calls_with_cache += 1
+        else:
+            prefix_tokens = self._tokens(system_instruction) + self._tokens(tools)
+
+        billed = prefix_tokens + conversation_tokens
+        self.input_tokens_billed += billed
+        self.calls.append({"cached_content": cached_name, "input_tokens": billed})
+        time.sleep(self.prefill_delay_per_1k_tokens * billed / 1000)
+
+        prompt = str(conversation[-1].get("content", "")) if conversation else ""
+        return {"content": f"[MOCK] Resposta simulada para: {prompt}"}
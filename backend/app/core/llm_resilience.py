@@ -0,0 +1,396 @@
+"""
+LLM Resilience - controle adaptativo de admissão por provedor
+
+`circuit_breaker.CircuitBreaker` conta falhas com timeout fixo e
+`retry_logic.retry_with_backoff` repete às cegas: numa degradação do
+provedor os dois aumentam a carga. O `ProviderGuard` decide, antes de
+cada chamada do SmartLLM, se o provedor deve receber mais tráfego:
+
+- AdaptiveConcurrencyLimit: limite AIMD guiado por latência. Cresce
+  +1/limite por resposta dentro do SLO; cai multiplicativamente em
+  respostas lentas ou sobrecarga (429/503/timeout)
+- RateLimitState: "token bucket" alimentado pelos headers
+  `x-ratelimit-*` / `retry-after` e pelas dicas de retry nas mensagens
+  de erro ("try again in 7.66s", "retryDelay": "33s")
+- LatencySLOBreaker: abre por taxa de erro OU por fração de chamadas
+  acima do SLO de latência; meia-abertura com uma sonda e tempo aberto
+  que dobra a cada reabertura
+
+Sem vaga o SmartLLM não espera: recusa na hora (shed) e passa para o
+próximo provedor da cadeia.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Mapping, Optional, Tuple
+
+from backend.app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+COMPLETION = "completion"
+FIRST_TOKEN = "first_token"
+
+_OVERLOAD_MARKERS = ("503", "502", "504", "overloaded", "unavailable", "timeout", "timed out", "deadline exceeded")
+_RATE_LIMIT_MARKERS = ("429", "rate limit", "quota", "resource_exhausted", "too many requests")
+_RETRY_HINT = re.compile(
+    r"(?:try again in|retry in|retry after|retrydelay['\"]?\s*[:=]\s*['\"]?)\s*([0-9hms.]+)",
+    re.IGNORECASE,
+)
+_DURATION_PART = re.compile(r"([0-9]*\.?[0-9]+)(ms|h|m|s)?")
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Converte "2m59.56s", "7.66s", "120ms" ou "30" (segundos) em segundos."""
+    if not value:
+        return None
+    total = 0.0
+    matched = False
+    for number, unit in _DURATION_PART.findall(value.strip().lower()):
+        matched = True
+        factor = {"ms": 0.001, "h": 3600.0, "m": 60.0}.get(unit, 1.0)
+        total += float(number) * factor
+    return total if matched else None
+
+
+def classify_error(message: str) -> str:
+    """
+    rate_limited | overload | client (erro do pedido, não da saúde do
+    provedor) | server (demais falhas: contam para o breaker, não para o limite).
+    """
+    lowered = (message or "").lower()
+    if any(marker in lowered for marker in _RATE_LIMIT_MARKERS):
+        return "rate_limited"
+    if any(marker in lowered for marker in _OVERLOAD_MARKERS):
+        return "overload"
+    if any(marker in lowered for marker in ("400", "401", "403", "404", "413", "invalid", "payload too large")):
+        return "client"
+    return "server"
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    Limite de concorrência AIMD com sinal de latência.
+
+    Uma queda só é aplicada para amostras que começaram depois da última
+    queda, para que uma rajada de respostas lentas da mesma "geração"
+    não derrube o limite várias vezes.
+    """
+
+    def __init__(self, initial: float, min_limit: float, max_limit: float, latency_target: float, backoff: float = 0.75):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._last_decrease = float("-inf")
+
+    @property
+    def limit(self) -> int:
+        return max(int(self.min_limit), int(self._limit))
+
+    def on_sample(self, started_at: float, latency: float, overloaded: bool, inflight: int) -> None:
+        if overloaded or latency > self.latency_target:
+            if started_at >= self._last_decrease:
+                self._limit = max(self.min_limit, self._limit * self.backoff)
+                self._last_decrease = started_at + latency
+            return
+        # Só cresce quando o limite está de fato sendo usado
+        if inflight + 1 >= self._limit / 2:
+            self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+
+
+class RateLimitState:
+    """Cota restante do provedor, conforme os headers de rate limit e erros 429."""
+
+    def __init__(self, default_backoff: float, clock: Callable[[], float] = time.monotonic):
+        self.default_backoff = default_backoff
+        self._clock = clock
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self._reset_at = 0.0
+        self._blocked_until = 0.0
+
+    def observe_headers(self, headers: Mapping[str, str]) -> None:
+        now = self._clock()
+        retry_after = parse_duration(headers.get("retry-after"))
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+
+        try:
+            if headers.get("x-ratelimit-remaining-requests") is not None:
+                self.remaining_requests = int(float(headers["x-ratelimit-remaining-requests"]))
+            if headers.get("x-ratelimit-remaining-tokens") is not None:
+                self.remaining_tokens = int(float(headers["x-ratelimit-remaining-tokens"]))
+        except (TypeError, ValueError):
+            return
+
+        resets = [
+            parse_duration(headers.get("x-ratelimit-reset-requests")) if self.remaining_requests == 0 else None,
+            parse_duration(headers.get("x-ratelimit-reset-tokens")) if self.remaining_tokens == 0 else None,
+        ]
+        resets = [r for r in resets if r]
+        if resets:
+            self._blocked_until = max(self._blocked_until, now + max(resets))
+        reset_requests = parse_duration(headers.get("x-ratelimit-reset-requests"))
+        if reset_requests:
+            self._reset_at = now + reset_requests
+
+    def observe_rate_limit_error(self, message: str) -> float:
+        match = _RETRY_HINT.search(message or "")
+        delay = parse_duration(match.group(1)) if match else None
+        delay = delay or self.default_backoff
+        self._blocked_until = max(self._blocked_until, self._clock() + delay)
+        return delay
+
+    def consume(self) -> None:
+        if self.remaining_requests is not None and self.remaining_requests > 0:
+            self.remaining_requests -= 1
+
+    def blocked_for(self) -> float:
+        now = self._clock()
+        if self.remaining_requests == 0 and now >= self._reset_at:
+            self.remaining_requests = None  # janela renovada; próximos headers atualizam
+        blocked = self._blocked_until - now
+        if self.remaining_requests == 0:
+            blocked = max(blocked, self._reset_at - now)
+        return max(0.0, blocked)
+
+
+class LatencySLOBreaker:
+    """Circuit breaker por janela deslizante de erros e violações de SLO."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        window: int,
+        min_calls: int,
+        error_ratio: float,
+        slow_ratio: float,
+        open_seconds: float,
+        max_open_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_calls = min_calls
+        self.error_ratio = error_ratio
+        self.slow_ratio = slow_ratio
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self._clock = clock
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window)  # (erro, lento)
+        self.state = self.CLOSED
+        self.open_seconds = open_seconds
+        self._opened_at = 0.0
+        self._probe_inflight = False
+        self.last_trip_reason: Optional[str] = None
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN:
+            if self._clock() - self._opened_at < self.open_seconds:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_inflight = False
+            logger.info("[BREAKER] half-open: liberando uma chamada de sonda")
+        if self.state == self.HALF_OPEN:
+            if self._probe_inflight:
+                return False
+            self._probe_inflight = True
+        return True
+
+    def release_probe(self) -> None:
+        self._probe_inflight = False
+
+    def record(self, error: bool, slow: bool) -> None:
+        if self.state == self.HALF_OPEN:
+            self._probe_inflight = False
+            if error or slow:
+                self._trip("probe_error" if error else "probe_slow", min(self.max_open_seconds, self.open_seconds * 2))
+            else:
+                self.state = self.CLOSED
+                self.open_seconds = self.base_open_seconds
+                self._outcomes.clear()
+            return
+
+        self._outcomes.append((error, slow))
+        total = len(self._outcomes)
+        if total < self.min_calls:
+            return
+        errors = sum(1 for e, _ in self._outcomes if e)
+        slow_calls = sum(1 for _, s in self._outcomes if s)
+        if errors / total >= self.error_ratio:
+            self._trip("error_rate", self.base_open_seconds)
+        elif slow_calls / total >= self.slow_ratio:
+            self._trip("latency_slo", self.base_open_seconds)
+
+    def _trip(self, reason: str, open_seconds: float) -> None:
+        self.state = self.OPEN
+        self.open_seconds = open_seconds
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+        self.last_trip_reason = reason
+        logger.warning(f"[BREAKER] aberto por {reason} ({open_seconds:.0f}s)")
+
+
+class Permit:
+    """Vaga concedida pelo ProviderGuard; `release` informa o resultado (idempotente)."""
+
+    def __init__(self, guard: "ProviderGuard", kind: str, started_at: float, probe: bool):
+        self.guard = guard
+        self.kind = kind
+        self.started_at = started_at
+        self.probe = probe
+        self._released = False
+
+    def release(self, outcome: str = "success", latency: Optional[float] = None, error: Optional[str] = None) -> None:
+        """outcome: success | error | cancelled. `latency` padrão: desde a concessão."""
+        if self._released:
+            return
+        self._released = True
+        if latency is None:
+            latency = self.guard._clock() - self.started_at
+        self.guard._on_release(self, outcome, latency, error)
+
+
+class ProviderGuard:
+    """Admissão de chamadas a um provedor: breaker + cota + limite adaptativo."""
+
+    def __init__(self, provider: str, clock: Callable[[], float] = time.monotonic):
+        self.provider = provider
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.inflight = 0
+        self.slo = {COMPLETION: settings.LLM_LATENCY_SLO_SECONDS, FIRST_TOKEN: settings.LLM_FIRST_TOKEN_SLO_SECONDS}
+        self.limiter = AdaptiveConcurrencyLimit(
+            initial=settings.LLM_ADAPTIVE_LIMIT_INITIAL,
+            min_limit=settings.LLM_ADAPTIVE_LIMIT_MIN,
+            max_limit=settings.LLM_PROVIDER_MAX_CONCURRENCY,
+            latency_target=settings.LLM_LATENCY_SLO_SECONDS,
+        )
+        self.rate = RateLimitState(settings.LLM_RATE_LIMIT_DEFAULT_BACKOFF_SECONDS, clock=clock)
+        self.breaker = LatencySLOBreaker(
+            window=settings.LLM_BREAKER_WINDOW,
+            min_calls=settings.LLM_BREAKER_MIN_CALLS,
+            error_ratio=settings.LLM_BREAKER_ERROR_RATIO,
+            slow_ratio=settings.LLM_BREAKER_SLOW_RATIO,
+            open_seconds=settings.LLM_BREAKER_OPEN_SECONDS,
+            max_open_seconds=settings.LLM_BREAKER_MAX_OPEN_SECONDS,
+            clock=clock,
+        )
+        self.shed: Dict[str, int] = {}
+
+    def try_acquire(self, kind: str = COMPLETION) -> Tuple[Optional[Permit], str]:
+        """Retorna (vaga, "") ou (None, motivo): circuit_open | rate_limited | concurrency."""
+        with self._lock:
+            reason = ""
+            if self.rate.blocked_for() > 0:
+                reason = "rate_limited"
+            elif self.inflight >= self.limiter.limit:
+                reason = "concurrency"
+            elif not self.breaker.allow():
+                reason = "circuit_open"
+
+            if reason:
+                self.shed[reason] = self.shed.get(reason, 0) + 1
+                self._export(shed_reason=reason)
+                return None, reason
+
+            self.inflight += 1
+            self.rate.consume()
+            permit = Permit(self, kind, self._clock(), probe=self.breaker.state == LatencySLOBreaker.HALF_OPEN)
+            self._export()
+            return permit, ""
+
+    def observe_headers(self, headers: Mapping[str, str]) -> None:
+        with self._lock:
+            self.rate.observe_headers(headers)
+
+    def _on_release(self, permit: Permit, outcome: str, latency: float, error: Optional[str]) -> None:
+        with self._lock:
+            self.inflight = max(0, self.inflight - 1)
+
+            if outcome == "cancelled":
+                if permit.probe:
+                    self.breaker.release_probe()
+                self._export()
+                return
+
+            error_kind = classify_error(error or "") if outcome == "error" else None
+            if error_kind == "rate_limited":
+                delay = self.rate.observe_rate_limit_error(error or "")
+                logger.warning(f"[RATE LIMIT] {self.provider} bloqueado por {delay:.1f}s")
+
+            slow = outcome == "success" and latency > self.slo.get(permit.kind, self.slo[COMPLETION])
+            overloaded = error_kind in ("overload", "rate_limited")
+            if error_kind == "client":
+                if permit.probe:
+                    self.breaker.release_probe()
+            else:
+                self.breaker.record(error=error_kind is not None, slow=slow)
+            # SLO de primeiro token é mais curto: normaliza para a meta do limitador
+            normalized = latency * self.limiter.latency_target / self.slo.get(permit.kind, self.limiter.latency_target)
+            self.limiter.on_sample(permit.started_at, normalized, overloaded, self.inflight)
+            self._export()
+
+    def _export(self, shed_reason: Optional[str] = None) -> None:
+        try:
+            from backend.app.core.observability.metrics import (
+                LLM_CIRCUIT_STATE,
+                LLM_PROVIDER_CONCURRENCY_LIMIT,
+                LLM_PROVIDER_INFLIGHT,
+                LLM_PROVIDER_SHED_TOTAL,
+            )
+            LLM_PROVIDER_CONCURRENCY_LIMIT.labels(provider=self.provider).set(self.limiter.limit)
+            LLM_PROVIDER_INFLIGHT.labels(provider=self.provider).set(self.inflight)
+            LLM_CIRCUIT_STATE.labels(provider=self.provider).set(
+                {LatencySLOBreaker.CLOSED: 0, LatencySLOBreaker.HALF_OPEN: 1, LatencySLOBreaker.OPEN: 2}[self.breaker.state]
+            )
+            if shed_reason:
+                LLM_PROVIDER_SHED_TOTAL.labels(provider=self.provider, reason=shed_reason).inc()
+        except Exception:
+            pass
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "provider": self.provider,
+                "state": self.breaker.state,
+                "last_trip_reason": self.breaker.last_trip_reason,
+                "limit": self.limiter.limit,
+                "inflight": self.inflight,
+                "rate_limited_for": round(self.rate.blocked_for(), 2),
+                "remaining_requests": self.rate.remaining_requests,
+                "remaining_tokens": self.rate.remaining_tokens,
+                "shed": dict(self.shed),
+            }
+
+
+_guards: Dict[str, ProviderGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def get_provider_guard(provider: str) -> ProviderGuard:
+    """Retorna o guard do provedor (um por processo)."""
+    guard = _guards.get(provider)
+    if guard is None:
+        with _guards_lock:
+            guard = _guards.get(provider)
+            if guard is None:
+                guard = ProviderGuard(provider)
+                _guards[provider] = guard
+    return guard
+
+
+def get_all_provider_guards_status() -> Dict[str, Any]:
+    return {provider: guard.get_status() for provider, guard in list(_guards.items())}
+
+
+def reset_provider_guards() -> None:
+    """Descarta o estado de todos os provedores (testes/troca de chaves)."""
+    with _guards_lock:
+        _guards.clear()
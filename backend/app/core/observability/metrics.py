@@ -45,6 +45,74 @@ LLM_COST_ESTIMATED_TOTAL = Counter(
     ["model", "tenant"]
 )
 
+LLM_CACHE_REQUESTS_TOTAL = Counter(
+    'caculinha_llm_cache_requests_total',
+    'LLM completion cache lookups',
+    ['call_site', 'outcome']  # outcome: hit, miss, bypass
+)
+
+LLM_PROMPT_CACHE_TOTAL = Counter(
+    'caculinha_llm_prompt_cache_total',
+    'Provider-side cached prefix (system prompt + tools) lookups',
+    ['provider', 'outcome']  # outcome: created, reused, refreshed, invalidated, error
+)
+
+LLM_PROVIDER_LATENCY_SECONDS = Histogram(
+    'caculinha_llm_provider_latency_seconds',
+    'LLM provider latency (full completion or time to first streamed token)',
+    ['provider', 'kind'],  # kind: completion, first_token
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+)
+
+LLM_HEDGE_TOTAL = Counter(
+    'caculinha_llm_hedge_total',
+    'Hedged LLM requests across providers',
+    ['outcome']  # outcome: fired, primary_won, secondary_won, skipped_budget, failover
+)
+
+DETERMINISTIC_FAST_PATH_TOTAL = Counter(
+    'caculinha_deterministic_fast_path_total',
+    'Queries answered by the deterministic fast path (no LLM loop)',
+    ['template', 'outcome']  # outcome: served, fallback
+)
+
+SPECULATIVE_TOOL_PREFETCH_TOTAL = Counter(
+    'caculinha_speculative_tool_prefetch_total',
+    'Speculative tool executions started while the first LLM call runs',
+    ['tool', 'outcome']  # outcome: started, hit, wasted, skipped_budget
+)
+
+TOOL_MEMO_TOTAL = Counter(
+    'caculinha_tool_memo_total',
+    'Per-session tool result memo lookups',
+    ['tool', 'outcome']  # outcome: hit, miss
+)
+
+MULTI_INTENT_PLAN_TOTAL = Counter(
+    'caculinha_multi_intent_plan_total',
+    'Compound questions executed as a parallel tool plan',
+    ['source']  # source: rules, llm
+)
+
+CANCELLED_WORK_TOTAL = Counter(
+    'caculinha_cancelled_work_total',
+    'Work stopped early because the request was abandoned (client disconnect/timeout)',
+    ['kind']  # kind: request, llm_turn, tool, duckdb_query
+)
+
+CANCELLATION_STOP_SECONDS = Histogram(
+    'caculinha_cancellation_stop_seconds',
+    'Time between request cancellation and the work actually stopping',
+    ['kind'],
+    buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+)
+
+CONTEXT_BUDGET_TOKENS_SAVED_TOTAL = Counter(
+    'caculinha_context_budget_tokens_saved_total',
+    'Estimated prompt tokens removed by the context budgeter before LLM calls',
+    ['action']  # action: digest, evict, truncate
+)
+
 RAG_RETRIEVALS_TOTAL = Counter(
     'caculinha_rag_retrievals_total',
     'Total RAG document retrievals',
@@ -97,6 +165,46 @@ RESPONSES_WARNING_TOTAL = Counter(
     ['tenant']
 )
 
+# --- LLM PROVIDER ADMISSION ---
+LLM_PROVIDER_CONCURRENCY_LIMIT = Gauge(
+    'caculinha_llm_provider_concurrency_limit',
+    'Adaptive concurrency limit per LLM provider',
+    ['provider']
+)
+
+LLM_PROVIDER_INFLIGHT = Gauge(
+    'caculinha_llm_provider_inflight',
+    'In-flight calls per LLM provider',
+    ['provider']
+)
+
+LLM_CIRCUIT_STATE = Gauge(
+    'caculinha_llm_circuit_state',
+    'LLM provider circuit state (0=closed, 1=half_open, 2=open)',
+    ['provider']
+)
+
+LLM_PROVIDER_SHED_TOTAL = Counter(
+    'caculinha_llm_provider_shed_total',
+    'LLM calls rejected before reaching the provider',
+    ['provider', 'reason']  # reason: circuit_open, rate_limited, concurrency
+)
+
+# --- TOOL EXECUTOR ---
+TOOL_QUEUE_SECONDS = Histogram(
+    'caculinha_tool_queue_seconds',
+    'Time a tool call waited (per-tool cap + pool queue) before starting',
+    ['pool', 'tool'],
+    buckets=[0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+)
+
+TOOL_EXECUTOR_INFLIGHT = Gauge(
+    'caculinha_tool_executor_inflight',
+    'Tool calls running per executor pool',
+    ['pool']  # pool: cpu, io
+)
+
+
 def get_metrics_content():
     """Generates the metrics output for the /metrics endpoint."""
     return generate_latest(), CONTENT_TYPE_LATEST
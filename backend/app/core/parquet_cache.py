@@ -20,8 +20,10 @@ Migration Benefits:
 from pathlib import Path
 import threading
 import logging
+import time
 import pandas as pd
 
+from backend.app.core.cancellation import current_cancellation_token
 from backend.app.infrastructure.data.duckdb_enhanced_adapter import get_duckdb_adapter
 
 logger = logging.getLogger(__name__)
@@ -67,11 +69,34 @@ class ParquetCache:
         table_name = self._adapter.get_memory_table(parquet_name)
 
         # Query da tabela em memória (instantâneo!)
-        df = self._adapter.query(f"SELECT * FROM {table_name}")
+        df = self.query(f"SELECT * FROM {table_name}")
 
         logger.info(f"[MEMORY] Query from {table_name}: {len(df):,} rows")
         return df
 
+    def query(self, sql: str) -> pd.DataFrame:
+        """
+        Executa SQL no DuckDB respeitando o cancelamento da requisição.
+
+        Dentro de uma requisição cancelável (ver core/cancellation.py) a query
+        roda em um cursor próprio cujo `interrupt()` fica ligado ao token:
+        o cancelamento aborta só esta query, nunca a conexão compartilhada.
+        Tabelas em memória (`get_memory_table`) são visíveis no cursor.
+        """
+        token = current_cancellation_token()
+        if token is None:
+            return self._adapter.query(sql)
+
+        start = time.time()
+        cursor = self._adapter.connection.cursor()
+        try:
+            with token.interrupt_on_cancel(cursor):
+                df = cursor.execute(sql).df()
+        finally:
+            cursor.close()
+        self._adapter.metrics.record(sql, time.time() - start, len(df))
+        return df
+
     def _resolve_path(self, parquet_name: str) -> str:
         """
         Resolve parquet file path (local development).
@@ -0,0 +1,228 @@
+"""
+Provider Prompt Cache - Prefixo estático (system prompt + tools) em cache no provedor
+
+Toda rodada do agente reenviava o mesmo system prompt (com schema injetado)
+e as mesmas declarações de ferramentas. Adapters com suporte a cache de
+contexto (ex.: Gemini `client.caches`) criam o prefixo UMA vez e passam a
+referenciá-lo por handle nas chamadas seguintes.
+
+Regras:
+- A chave é o hash do conteúdo (system prompt + tools) por provedor/modelo.
+  Equivale a (role, versão do prompt, conjunto de tools): roles diferentes
+  recebem tools diferentes e qualquer mudança no prompt muda o hash
+- Handles são renovados antes de expirar (TTL - margem de renovação)
+- Falha ao criar (prefixo pequeno demais, quota, etc.) => chamada segue com
+  o prefixo completo e nova tentativa só após LLM_PROMPT_CACHE_RETRY_SECONDS
+- Adapters sem `Capabilities.prompt_caching` nunca passam pelo registro
+  (Groq faz cache de prefixo automático; basta o system prompt vir primeiro)
+
+Uso (dentro do adapter):
+    system, messages = split_system_prefix(messages)
+    handle = acquire_prompt_cache(self, system, tools)
+    if handle: ... referenciar handle, sem reenviar system/tools
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PromptPrefix:
+    """Parte estática da requisição: system instruction + declarações de ferramentas."""
+
+    system_instruction: str
+    tools: Any = None
+
+    @property
+    def key(self) -> str:
+        raw = json.dumps(
+            {"system": self.system_instruction, "tools": self.tools},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedPrefixHandle:
+    name: str
+    created_at: float
+    expires_at: float
+
+
+def split_system_prefix(messages: List[Dict[str, Any]]) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """Separa as mensagens `system` iniciais (prefixo estático) do restante da conversa."""
+    system_parts: List[str] = []
+    idx = 0
+    while idx < len(messages) and messages[idx].get("role") == "system":
+        content = messages[idx].get("content")
+        if content:
+            system_parts.append(str(content))
+        idx += 1
+    return ("\n\n".join(system_parts) or None), list(messages[idx:])
+
+
+class PromptCacheRegistry:
+    """
+    Registro thread-safe de handles de prefixo em cache por (provedor, modelo, prefixo).
+
+    Args:
+        ttl_seconds: TTL pedido ao provedor na criação do cache
+        refresh_margin_seconds: Renova o handle quando faltar menos que isso para expirar
+        retry_seconds: Intervalo antes de tentar de novo após falha na criação
+        clock: Relógio monotônico (injetável em testes)
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = 3600,
+        refresh_margin_seconds: int = 60,
+        retry_seconds: int = 600,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.retry_seconds = retry_seconds
+        self._clock = clock
+        self._handles: Dict[Tuple[str, str, str], CachedPrefixHandle] = {}
+        self._failures: Dict[Tuple[str, str, str], float] = {}
+        self._key_locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "reused": 0, "refreshed": 0, "invalidated": 0, "error": 0}
+
+    @staticmethod
+    def _registry_key(adapter: Any, prefix: PromptPrefix) -> Tuple[str, str, str]:
+        return (getattr(adapter, "provider", "unknown"), getattr(adapter, "model_name", ""), prefix.key)
+
+    def _fresh_handle(self, key: Tuple[str, str, str]) -> Optional[CachedPrefixHandle]:
+        handle = self._handles.get(key)
+        if handle and handle.expires_at - self.refresh_margin_seconds > self._clock():
+            return handle
+        return None
+
+    def acquire(self, adapter: Any, prefix: PromptPrefix) -> Optional[str]:
+        """Retorna o nome do cache do prefixo (criando/renovando se preciso) ou None."""
+        key = self._registry_key(adapter, prefix)
+        provider = key[0]
+
+        with self._lock:
+            handle = self._fresh_handle(key)
+            if handle:
+                self._record(provider, "reused")
+                return handle.name
+            if self._failures.get(key, 0) > self._clock():
+                return None
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Criação fora do lock global: chamada de rede, só bloqueia o mesmo prefixo
+        with key_lock:
+            with self._lock:
+                handle = self._fresh_handle(key)
+                if handle:
+                    self._record(provider, "reused")
+                    return handle.name
+                refreshing = key in self._handles
+
+            try:
+                name = adapter.create_cached_prefix(prefix, self.ttl_seconds)
+            except Exception as e:
+                logger.warning(f"[PROMPT CACHE] Falha ao criar cache de prefixo ({provider}): {e}")
+                name = None
+
+            with self._lock:
+                if not name:
+                    self._handles.pop(key, None)
+                    self._failures[key] = self._clock() + self.retry_seconds
+                    self._record(provider, "error")
+                    return None
+
+                now = self._clock()
+                self._handles[key] = CachedPrefixHandle(name=name, created_at=now, expires_at=now + self.ttl_seconds)
+                self._failures.pop(key, None)
+                self._record(provider, "refreshed" if refreshing else "created")
+
+        logger.info(f"[PROMPT CACHE] Prefixo em cache ({provider}): {name}")
+        return name
+
+    def invalidate(self, adapter: Any, prefix: PromptPrefix) -> None:
+        """Descarta o handle (ex.: provedor respondeu que o cache expirou/não existe)."""
+        key = self._registry_key(adapter, prefix)
+        with self._lock:
+            if self._handles.pop(key, None) is not None:
+                self._record(key[0], "invalidated")
+
+    def _record(self, provider: str, outcome: str) -> None:
+        self._stats[outcome] += 1
+        try:
+            from backend.app.core.observability.metrics import LLM_PROMPT_CACHE_TOTAL
+            LLM_PROMPT_CACHE_TOTAL.labels(provider=provider, outcome=outcome).inc()
+        except Exception:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["reused"] + self._stats["created"] + self._stats["refreshed"]
+            return {
+                **self._stats,
+                "handles": len(self._handles),
+                "reuse_rate": round(self._stats["reused"] / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._handles.clear()
+            self._failures.clear()
+            self._stats = {k: 0 for k in self._stats}
+
+
+_registry: Optional[PromptCacheRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_prompt_cache_registry() -> PromptCacheRegistry:
+    """Retorna o registro global de prefixos em cache (singleton)."""
+    global _registry
+
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = PromptCacheRegistry(
+                    ttl_seconds=settings.LLM_PROMPT_CACHE_TTL_SECONDS,
+                    refresh_margin_seconds=settings.LLM_PROMPT_CACHE_REFRESH_MARGIN_SECONDS,
+                    retry_seconds=settings.LLM_PROMPT_CACHE_RETRY_SECONDS,
+                )
+    return _registry
+
+
+def acquire_prompt_cache(
+    adapter: Any,
+    system_instruction: Optional[str],
+    tools: Any = None,
+    registry: Optional[PromptCacheRegistry] = None,
+) -> Optional[str]:
+    """Handle do prefixo em cache para o adapter, ou None (enviar prefixo completo)."""
+    if not settings.LLM_PROMPT_CACHE_ENABLED or not system_instruction:
+        return None
+    try:
+        if not adapter.get_capabilities().prompt_caching:
+            return None
+    except Exception:
+        return None
+    registry = registry or get_prompt_cache_registry()
+    return registry.acquire(adapter, PromptPrefix(system_instruction=system_instruction, tools=tools))
+
+
+def is_cache_miss_error(error: Any) -> bool:
+    """Erro do provedor indicando que o handle referenciado não vale mais."""
+    text = str(error).lower()
+    return "cached" in text and any(x in text for x in ["not found", "expired", "404", "invalid", "permission"])
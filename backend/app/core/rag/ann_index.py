@@ -0,0 +1,233 @@
+"""
+ANN Index - índice HNSW incremental para busca vetorial do catálogo
+
+`VectorIndexAdapter.search` calculava `list_cosine_similarity` contra todas as
+linhas de `products_embeddings` da versão e ordenava tudo (varredura completa
+por query). Este índice usa HNSW (FAISS `IndexHNSWFlat`, produto interno
+sobre vetores L2-normalizados = cosseno):
+
+- Inserções incrementais (`upsert`) e remoções (`remove`, marcação lógica:
+  HNSW não remove nós; os marcados são filtrados na busca e descartados em
+  `compact()`)
+- Um índice por versão do catálogo, persistido em `<dir>/<versão>/`
+  (`index.faiss` + `ids.npz` + `meta.json`); a versão nova parte de uma cópia
+  da anterior e só recebe os produtos novos/alterados
+- Trade-off recall/latência ajustável: `m` e `ef_construction` na
+  construção, `ef_search` por busca (maior = mais recall, mais lento)
+
+Sem FAISS instalado cai para busca exata em NumPy (mesma API).
+"""
+
+import json
+import logging
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.app.core.rag.dense_index import l2_normalize
+
+logger = logging.getLogger(__name__)
+
+try:
+    import faiss
+    HAS_FAISS = True
+except ImportError:
+    logger.warning("faiss não instalado. ANN usará busca exata (NumPy). Install: pip install faiss-cpu")
+    HAS_FAISS = False
+
+INDEX_FILE = "index.faiss"
+IDS_FILE = "ids.npz"
+META_FILE = "meta.json"
+
+
+class ANNIndex:
+    """Índice de vizinhos aproximados com ids externos (ex.: product_id) e chave de conteúdo."""
+
+    def __init__(self, dimension: int, m: int = 32, ef_construction: int = 200, ef_search: int = 64):
+        self.dimension = dimension
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._index = self._new_index() if HAS_FAISS else None
+        self._exact: List[np.ndarray] = []  # fallback sem FAISS
+        self._labels = np.zeros(0, dtype=np.int64)  # posição interna -> id externo
+        self._keys: List[str] = []  # posição interna -> hash do texto indexado
+        self._alive = np.zeros(0, dtype=bool)
+        self._position: Dict[int, int] = {}  # id externo -> posição interna viva
+
+    def _new_index(self) -> Any:
+        index = faiss.IndexHNSWFlat(self.dimension, self.m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = self.ef_construction
+        index.hnsw.efSearch = self.ef_search
+        return index
+
+    # ------------------------------------------------------------------
+    # Estado
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._position)
+
+    def __contains__(self, external_id: object) -> bool:
+        return external_id in self._position
+
+    @property
+    def deleted(self) -> int:
+        return int(self._alive.size - len(self._position))
+
+    def key_of(self, external_id: int) -> Optional[str]:
+        """Chave de conteúdo com que o id foi indexado (para detectar alterações)."""
+        pos = self._position.get(int(external_id))
+        return None if pos is None else self._keys[pos]
+
+    def ids(self) -> List[int]:
+        return list(self._position)
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    def upsert(self, ids: Sequence[int], vectors: np.ndarray, keys: Optional[Sequence[str]] = None) -> int:
+        """Insere (ou substitui) os vetores dos ids. Retorna quantos foram gravados."""
+        ids = [int(i) for i in ids]
+        if not ids:
+            return 0
+        vectors = l2_normalize(np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dimension))
+        keys = list(keys) if keys is not None else [""] * len(ids)
+
+        start = self._alive.size
+        if self._index is not None:
+            self._index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+        else:
+            self._exact.append(vectors)
+        self._labels = np.concatenate([self._labels, np.asarray(ids, dtype=np.int64)])
+        self._alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+        self._keys.extend(keys)
+        for offset, external_id in enumerate(ids):
+            previous = self._position.get(external_id)
+            if previous is not None:
+                self._alive[previous] = False  # substitui: a versão antiga vira marcação
+            self._position[external_id] = start + offset
+        return len(ids)
+
+    def remove(self, ids: Iterable[int]) -> int:
+        removed = 0
+        for external_id in ids:
+            pos = self._position.pop(int(external_id), None)
+            if pos is not None:
+                self._alive[pos] = False
+                removed += 1
+        return removed
+
+    def _all_vectors(self) -> np.ndarray:
+        if self._index is not None:
+            return self._index.reconstruct_n(0, self._index.ntotal) if self._index.ntotal else np.zeros((0, self.dimension), np.float32)
+        return np.concatenate(self._exact) if self._exact else np.zeros((0, self.dimension), np.float32)
+
+    def compact(self) -> None:
+        """Reconstrói o grafo só com os nós vivos (após muitas remoções)."""
+        alive = np.flatnonzero(self._alive)
+        vectors = self._all_vectors()[alive]
+        labels = self._labels[alive]
+        keys = [self._keys[i] for i in alive]
+        self._index = self._new_index() if HAS_FAISS else None
+        self._exact = []
+        self._labels = np.zeros(0, dtype=np.int64)
+        self._keys = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._position = {}
+        self.upsert(labels.tolist(), vectors, keys)
+
+    # ------------------------------------------------------------------
+    # Busca
+    # ------------------------------------------------------------------
+
+    def search(self, query: Sequence[float], top_k: int = 10, ef_search: Optional[int] = None) -> List[Tuple[int, float]]:
+        """(id externo, cosseno) dos vizinhos aproximados, em ordem decrescente."""
+        if not self._position or top_k <= 0:
+            return []
+        q = l2_normalize(np.asarray(query, dtype=np.float32).reshape(1, self.dimension))
+
+        # Busca um pouco além de top_k para compensar nós removidos
+        fetch = min(self._alive.size, top_k + min(self.deleted, 4 * top_k))
+        if self._index is not None:
+            params = faiss.SearchParametersHNSW()
+            params.efSearch = max(ef_search or self.ef_search, fetch)
+            scores, positions = self._index.search(q, fetch, params=params)
+            candidates = zip(positions[0].tolist(), scores[0].tolist())
+        else:
+            all_scores = self._all_vectors() @ q[0]
+            order = np.argsort(-all_scores)[:fetch]
+            candidates = zip(order.tolist(), all_scores[order].tolist())
+
+        results = []
+        for pos, score in candidates:
+            if pos >= 0 and self._alive[pos]:
+                results.append((int(self._labels[pos]), float(score)))
+                if len(results) == top_k:
+                    break
+        return results
+
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+
+    def save(self, directory: Path, extra_meta: Optional[Dict[str, Any]] = None) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        if self.deleted > max(1000, len(self._position) // 5):
+            self.compact()  # grafo com muitos nós mortos: recupera recall/latência
+        if self._index is not None:
+            faiss.write_index(self._index, str(directory / INDEX_FILE))
+        else:
+            np.save(directory / "vectors.npy", self._all_vectors())
+        np.savez(directory / IDS_FILE, labels=self._labels, alive=self._alive, keys=np.asarray(self._keys, dtype=object))
+        meta = {
+            "dimension": self.dimension,
+            "m": self.m,
+            "ef_construction": self.ef_construction,
+            "ef_search": self.ef_search,
+            "backend": "faiss_hnsw" if self._index is not None else "exact",
+            "size": len(self),
+            **(extra_meta or {}),
+        }
+        (directory / META_FILE).write_text(json.dumps(meta), encoding="utf-8")
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["ANNIndex"]:
+        directory = Path(directory)
+        meta_path = directory / META_FILE
+        if not meta_path.exists():
+            return None
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            index = cls(meta["dimension"], meta["m"], meta["ef_construction"], meta["ef_search"])
+            if meta.get("backend") == "faiss_hnsw":
+                if not HAS_FAISS:
+                    return None
+                index._index = faiss.read_index(str(directory / INDEX_FILE))
+            else:
+                index._index = None
+                index._exact = [np.load(directory / "vectors.npy")]
+            with np.load(directory / IDS_FILE, allow_pickle=True) as data:
+                index._labels = data["labels"]
+                index._alive = data["alive"]
+                index._keys = [str(k) for k in data["keys"]]
+            index._position = {int(index._labels[p]): int(p) for p in np.flatnonzero(index._alive)}
+            return index
+        except (OSError, ValueError, KeyError, RuntimeError) as e:
+            logger.warning(f"[ANN] Índice inválido em {directory}: {e}")
+            return None
+
+    @staticmethod
+    def copy_version(source: Path, target: Path) -> bool:
+        """Copia o índice de uma versão como ponto de partida da próxima."""
+        source, target = Path(source), Path(target)
+        if not (source / META_FILE).exists():
+            return False
+        if target.exists():
+            shutil.rmtree(target)
+        shutil.copytree(source, target)
+        return True
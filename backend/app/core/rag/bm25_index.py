@@ -0,0 +1,207 @@
+"""
+BM25 Index - índice invertido com postings pré-computados
+
+Substitui o BM25 "força bruta" usado por HybridRetriever (`BM25Okapi.get_scores`
+pontua todos os documentos e ordena a lista inteira) e por
+BM25RankingAdapter (re-tokeniza todos os documentos e recalcula o IDF a cada
+chamada).
+
+- Postings por termo: {documento: tf}, congelados em arrays NumPy
+  (ids, tf) na primeira busca após uma alteração
+- Tamanhos dos documentos, avgdl e IDF mantidos no índice e recalculados só
+  quando o corpus muda
+- `add` / `remove` / `update` incrementais (um documento alterado só mexe nos
+  postings dos seus termos)
+- Busca term-at-a-time: acumula as contribuições só dos postings dos termos
+  da query e seleciona o top-k com `argpartition`; o custo é proporcional aos
+  postings encontrados, não ao tamanho do corpus
+
+Variantes de IDF (para manter os scores de cada consumidor):
+- "okapi": log((N - df + 0.5) / (df + 0.5)), IDF negativo vira
+  `epsilon * média dos IDFs` (mesma fórmula do rank_bm25.BM25Okapi)
+- "lucene": log(1 + (N - df + 0.5) / (df + 0.5)) (sempre positivo)
+"""
+
+import math
+from collections import Counter
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+IDF_VARIANTS = ("okapi", "lucene")
+
+
+class BM25Index:
+    """Índice BM25 incremental sobre documentos com chave arbitrária."""
+
+    def __init__(
+        self,
+        tokenizer: Callable[[str], List[str]],
+        k1: float = 1.5,
+        b: float = 0.75,
+        idf: str = "okapi",
+        epsilon: float = 0.25,
+        denominator_epsilon: float = 0.0,
+    ):
+        if idf not in IDF_VARIANTS:
+            raise ValueError(f"idf deve ser um de {IDF_VARIANTS}")
+        self.tokenizer = tokenizer
+        self.k1 = k1
+        self.b = b
+        self.idf_variant = idf
+        self.epsilon = epsilon  # piso do IDF (okapi)
+        self.denominator_epsilon = denominator_epsilon  # somado ao denominador do tf
+
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._frozen: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._slot: Dict[Hashable, int] = {}  # chave -> slot interno
+        self._keys: List[Optional[Hashable]] = []  # slot -> chave (None = livre)
+        self._terms: List[Tuple[str, ...]] = []  # slot -> termos distintos do documento
+        self._lengths: List[int] = []
+        self._free: List[int] = []
+        self._total_length = 0
+
+        # Derivados (recalculados após alterações)
+        self._norm: Optional[np.ndarray] = None
+        self._idf: Dict[str, float] = {}
+        self._idf_floor = 0.0
+        self._dirty = True
+
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[Hashable, str]], tokenizer: Callable[[str], List[str]], **params) -> "BM25Index":
+        index = cls(tokenizer, **params)
+        for key, text in documents:
+            index.add(key, text)
+        return index
+
+    # ------------------------------------------------------------------
+    # Estado
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._slot)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._slot
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._postings)
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    def add(self, key: Hashable, text: str) -> None:
+        """Indexa o documento (substitui se a chave já existe)."""
+        self.add_tokens(key, self.tokenizer(text or ""))
+
+    def add_tokens(self, key: Hashable, tokens: Sequence[str]) -> None:
+        if key in self._slot:
+            self.remove(key)
+        counts = Counter(tokens)
+        if self._free:
+            slot = self._free.pop()
+            self._keys[slot] = key
+            self._terms[slot] = tuple(counts)
+            self._lengths[slot] = len(tokens)
+        else:
+            slot = len(self._keys)
+            self._keys.append(key)
+            self._terms.append(tuple(counts))
+            self._lengths.append(len(tokens))
+        self._slot[key] = slot
+        self._total_length += len(tokens)
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[slot] = tf
+            self._frozen.pop(term, None)
+        self._dirty = True
+
+    def remove(self, key: Hashable) -> bool:
+        slot = self._slot.pop(key, None)
+        if slot is None:
+            return False
+        for term in self._terms[slot]:
+            postings = self._postings[term]
+            del postings[slot]
+            if not postings:
+                del self._postings[term]
+            self._frozen.pop(term, None)
+        self._total_length -= self._lengths[slot]
+        self._keys[slot] = None
+        self._terms[slot] = ()
+        self._lengths[slot] = 0
+        self._free.append(slot)
+        self._dirty = True
+        return True
+
+    def update(self, key: Hashable, text: str) -> None:
+        self.add(key, text)
+
+    # ------------------------------------------------------------------
+    # Busca
+    # ------------------------------------------------------------------
+
+    def _refresh(self) -> None:
+        if not self._dirty:
+            return
+        n_docs = len(self._slot)
+        avgdl = (self._total_length / n_docs) if n_docs else 0.0
+        lengths = np.asarray(self._lengths, dtype=np.float32)
+        # Parte do denominador que depende só do documento: k1 * (1 - b + b * dl / avgdl)
+        self._norm = self.k1 * (1 - self.b + self.b * lengths / avgdl) if avgdl else np.full_like(lengths, self.k1)
+
+        idf = {}
+        for term, postings in self._postings.items():
+            df = len(postings)
+            ratio = (n_docs - df + 0.5) / (df + 0.5)
+            idf[term] = math.log(ratio) if self.idf_variant == "okapi" else math.log(1 + ratio)
+        if self.idf_variant == "okapi" and idf:
+            self._idf_floor = self.epsilon * (sum(idf.values()) / len(idf))
+            idf = {term: (value if value >= 0 else self._idf_floor) for term, value in idf.items()}
+        self._idf = idf
+        self._dirty = False
+
+    def _postings_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        frozen = self._frozen.get(term)
+        if frozen is None:
+            postings = self._postings[term]
+            frozen = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float32, count=len(postings)),
+            )
+            self._frozen[term] = frozen
+        return frozen
+
+    def score_tokens(self, query_tokens: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(slots, scores) dos documentos com ao menos um termo da query."""
+        self._refresh()
+        slot_parts, score_parts = [], []
+        # Termos repetidos na query contam uma vez por ocorrência (como no BM25Okapi)
+        for term, qtf in Counter(query_tokens).items():
+            if term not in self._postings:
+                continue
+            slots, tf = self._postings_arrays(term)
+            contribution = self._idf[term] * tf * (self.k1 + 1) / (tf + self._norm[slots] + self.denominator_epsilon)
+            slot_parts.append(slots)
+            score_parts.append(contribution * qtf if qtf > 1 else contribution)
+        if not slot_parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        if len(slot_parts) == 1:
+            return slot_parts[0], score_parts[0]
+        slots, inverse = np.unique(np.concatenate(slot_parts), return_inverse=True)
+        return slots, np.bincount(inverse, weights=np.concatenate(score_parts)).astype(np.float32)
+
+    def search_tokens(self, query_tokens: Sequence[str], top_k: int = 10) -> List[Tuple[Hashable, float]]:
+        """Top-k (chave, score) em ordem decrescente; empates pela ordem de indexação."""
+        if top_k <= 0:
+            return []
+        slots, scores = self.score_tokens(query_tokens)
+        if slots.size > top_k:
+            keep = np.argpartition(-scores, top_k - 1)[:top_k]
+            slots, scores = slots[keep], scores[keep]
+        order = np.lexsort((slots, -scores))
+        return [(self._keys[slots[i]], float(scores[i])) for i in order]
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[Hashable, float]]:
+        return self.search_tokens(self.tokenizer(query or ""), top_k)
@@ -0,0 +1,152 @@
+"""
+Dense Matrix Index - busca densa vetorizada para o HybridRetriever
+
+Antes `_dense_search` percorria `self.documents` em Python, buscava a lista de
+floats de cada documento no dict `embeddings_cache` e calculava o cosseno com
+`sum(a * b ...)`, ordenando a lista inteira no fim.
+
+Agora os embeddings ficam numa matriz float32 contígua, com linhas
+L2-normalizadas e alinhadas às posições de `self.documents`:
+
+- Score = um produto matriz-vetor (BLAS) contra a query normalizada
+- Top-k com `np.argpartition` (O(n)) e ordenação só dos k selecionados
+- Persistida como `.npy` e aberta com `mmap_mode="r"`: o SO pagina sob
+  demanda e processos/workers compartilham as páginas
+- Um fingerprint (modelo + textos dos documentos, na ordem) no `.meta.json`
+  invalida a matriz quando os exemplos mudam
+
+Documentos sem embedding não entram na matriz; `doc_ids` mapeia linha ->
+posição em `self.documents`.
+"""
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def corpus_fingerprint(texts: Iterable[str], model_name: str = "") -> str:
+    """Hash estável de (modelo, textos na ordem) para validar a matriz em disco."""
+    digest = hashlib.sha256(model_name.encode("utf-8"))
+    for text in texts:
+        digest.update(b"\x00")
+        digest.update((text or "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+def l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    """Normaliza linhas para norma 1 (linhas nulas ficam nulas)."""
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class DenseMatrixIndex:
+    """Matriz (n, dim) float32 normalizada + posição de cada linha nos documentos."""
+
+    def __init__(self, matrix: np.ndarray, doc_ids: np.ndarray, fingerprint: str = ""):
+        self.matrix = matrix
+        self.doc_ids = doc_ids
+        self.fingerprint = fingerprint
+
+    @property
+    def size(self) -> int:
+        return int(self.matrix.shape[0])
+
+    @property
+    def dimension(self) -> int:
+        return int(self.matrix.shape[1]) if self.matrix.ndim == 2 else 0
+
+    @classmethod
+    def build(cls, vectors: Sequence[Optional[Sequence[float]]], fingerprint: str = "") -> "DenseMatrixIndex":
+        """
+        Monta a matriz a partir de um vetor (ou None) por documento, na ordem
+        dos documentos. Vetores com dimensão diferente da maioria são descartados.
+        """
+        present = [(i, v) for i, v in enumerate(vectors) if v is not None and len(v) > 0]
+        if not present:
+            return cls(np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.int64), fingerprint)
+
+        dims = [len(v) for _, v in present]
+        dim = max(set(dims), key=dims.count)
+        kept = [(i, v) for i, v in present if len(v) == dim]
+        if len(kept) < len(present):
+            logger.warning(f"[RAG] {len(present) - len(kept)} embeddings com dimensão != {dim} ignorados")
+
+        matrix = np.asarray([v for _, v in kept], dtype=np.float32)
+        doc_ids = np.fromiter((i for i, _ in kept), dtype=np.int64, count=len(kept))
+        return cls.from_matrix(matrix, doc_ids, fingerprint)
+
+    @classmethod
+    def from_matrix(cls, matrix: np.ndarray, doc_ids: np.ndarray, fingerprint: str = "") -> "DenseMatrixIndex":
+        """Monta a partir de linhas já empilhadas (ex.: EmbeddingStore.vectors[posições])."""
+        matrix = np.ascontiguousarray(l2_normalize(np.asarray(matrix, dtype=np.float32)), dtype=np.float32)
+        return cls(matrix, np.asarray(doc_ids, dtype=np.int64), fingerprint)
+
+    def search(self, query_vector: Sequence[float], top_k: int = 10) -> List[Tuple[int, float]]:
+        """(posição do documento, cosseno) dos top_k mais similares, em ordem decrescente."""
+        if self.size == 0 or top_k <= 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32).ravel()
+        if query.shape[0] != self.dimension:
+            logger.warning(f"[RAG] Embedding da query com dimensão {query.shape[0]} != índice {self.dimension}")
+            return []
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0:
+            return []
+
+        scores = self.matrix @ (query / norm)
+        k = min(top_k, scores.shape[0])
+        if k < scores.shape[0]:
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(scores.shape[0])
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(self.doc_ids[row]), float(scores[row])) for row in top]
+
+    # ------------------------------------------------------------------
+    # Persistência (.npy mapeado em memória + .meta.json)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _paths(path: Path) -> Tuple[Path, Path, Path]:
+        path = Path(path)
+        return path, path.with_suffix(".ids.npy"), path.with_suffix(".meta.json")
+
+    def save(self, path: Path) -> None:
+        matrix_path, ids_path, meta_path = self._paths(path)
+        matrix_path.parent.mkdir(parents=True, exist_ok=True)
+        # Escrita atômica: um leitor nunca vê matriz e ids de versões diferentes
+        for target, array in ((matrix_path, self.matrix), (ids_path, self.doc_ids)):
+            tmp = target.with_name(target.name + ".tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(array))
+            tmp.replace(target)
+        meta_path.write_text(
+            json.dumps({"fingerprint": self.fingerprint, "rows": self.size, "dimension": self.dimension}),
+            encoding="utf-8",
+        )
+
+    @classmethod
+    def load(cls, path: Path, fingerprint: Optional[str] = None, mmap: bool = True) -> Optional["DenseMatrixIndex"]:
+        """Abre a matriz salva; None se não existir ou se o fingerprint não bater."""
+        matrix_path, ids_path, meta_path = cls._paths(path)
+        if not (matrix_path.exists() and ids_path.exists() and meta_path.exists()):
+            return None
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if fingerprint is not None and meta.get("fingerprint") != fingerprint:
+                return None
+            matrix = np.load(matrix_path, mmap_mode="r" if mmap else None)
+            doc_ids = np.load(ids_path)
+            if matrix.dtype != np.float32 or matrix.shape[0] != doc_ids.shape[0]:
+                return None
+            return cls(matrix, doc_ids, meta.get("fingerprint", ""))
+        except (OSError, ValueError) as e:
+            logger.warning(f"[RAG] Matriz de embeddings inválida em {matrix_path}: {e}")
+            return None
@@ -0,0 +1,273 @@
+"""
+Embedding Pipeline - geração de embeddings em lote, retomável
+
+Compartilhado por HybridRetriever (exemplos de aprendizado), VectorIndexAdapter
+(catálogo de produtos) e product_retrieval (índice denso de produtos). Antes:
+uma chamada de API por documento num loop serial, `model.encode` do catálogo
+inteiro de uma vez, ou `FAISS.from_texts` sem checkpoint: uma falha no meio
+perdia todo o trabalho.
+
+O pipeline:
+- Deduplica por hash do conteúdo (textos repetidos viram um único embedding)
+- Pula o que já está no `EmbeddingStore` (checkpoint = store; cada lote
+  concluído é acrescentado e confirmado no disco)
+- Divide o restante em lotes de `batch_size` (tempo cresce linearmente)
+- Executa até `max_concurrency` lotes em paralelo; ao receber rate limit
+  (429 / RESOURCE_EXHAUSTED) todos os workers pausam pelo backoff antes de
+  tentar de novo
+- Lotes que falham após `max_retries` são contados e não interrompem os demais;
+  rodar de novo retoma só o que falta
+
+Backends: `GeminiEmbeddingBackend` (google-genai, lote nativo),
+`LangChainEmbeddingBackend` (`embed_documents`) e
+`SentenceTransformerBackend` (local/offline).
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from backend.app.core.rag.embedding_store import EmbeddingStore
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_MARKERS = ("429", "rate limit", "rate_limit", "resource_exhausted", "quota", "too many requests")
+
+
+def content_hash(text: str) -> str:
+    """Chave estável do texto (dedupe e id no store)."""
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    if getattr(error, "status_code", None) == 429 or getattr(error, "code", None) == 429:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+
+# ----------------------------------------------------------------------
+# Backends
+# ----------------------------------------------------------------------
+
+
+class GeminiEmbeddingBackend:
+    """google-genai `embed_content` com vários textos por chamada."""
+
+    max_batch_size = 100  # limite da API por requisição
+    max_concurrency = 8
+
+    def __init__(self, client: Any, model_name: str, task_type: str = "RETRIEVAL_DOCUMENT"):
+        self.client = client
+        self.model_name = model_name
+        self.task_type = task_type
+
+    def embed_batch(self, texts: Sequence[str]) -> List[List[float]]:
+        from google.genai import types
+
+        result = self.client.models.embed_content(
+            model=self.model_name,
+            contents=list(texts),
+            config=types.EmbedContentConfig(task_type=self.task_type),
+        )
+        return [e.values for e in result.embeddings]
+
+
+class LangChainEmbeddingBackend:
+    """Qualquer `langchain_core.embeddings.Embeddings` (`embed_documents`)."""
+
+    max_batch_size = 100
+    max_concurrency = 4
+
+    def __init__(self, embeddings: Any, model_name: Optional[str] = None):
+        self.embeddings = embeddings
+        self.model_name = model_name or getattr(embeddings, "model", None) or type(embeddings).__name__
+
+    def embed_batch(self, texts: Sequence[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(list(texts))
+
+
+class SentenceTransformerBackend:
+    """Backend local (offline) com sentence-transformers; o modelo carrega no primeiro lote."""
+
+    max_batch_size = 256
+    max_concurrency = 1  # um encode por vez: o modelo já usa todos os núcleos
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", model: Any = None):
+        self.model_name = model_name
+        self._model = model
+        self._lock = threading.Lock()
+
+    @property
+    def model(self) -> Any:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+
+                    logger.info(f"[EMBED] Carregando modelo local {self.model_name}")
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        return self.model.encode(list(texts), batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False)
+
+
+# ----------------------------------------------------------------------
+# Pipeline
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class PipelineResult:
+    total: int = 0  # textos recebidos
+    unique: int = 0  # após dedupe
+    cached: int = 0  # já estavam no store
+    embedded: int = 0  # gerados nesta execução
+    failed: int = 0  # ficaram sem embedding (lotes que falharam)
+    batches: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+
+    @property
+    def complete(self) -> bool:
+        return self.failed == 0
+
+
+class EmbeddingPipeline:
+    """Gera embeddings faltantes para `texts` e os grava no `store`."""
+
+    def __init__(
+        self,
+        backend: Any,
+        store: EmbeddingStore,
+        batch_size: int = 64,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        backoff_seconds: float = 1.0,
+        key_fn: Callable[[str], str] = content_hash,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.backend = backend
+        self.store = store
+        self.batch_size = max(1, min(batch_size, getattr(backend, "max_batch_size", batch_size)))
+        self.max_concurrency = max(1, min(max_concurrency, getattr(backend, "max_concurrency", max_concurrency)))
+        self.max_retries = max(0, max_retries)
+        self.backoff_seconds = backoff_seconds
+        self.key_fn = key_fn
+        self._sleep = sleep
+        self._pause_lock = threading.Lock()
+        self._pause_until = 0.0
+
+    def _wait_rate_gate(self) -> None:
+        with self._pause_lock:
+            delay = self._pause_until - time.monotonic()
+        if delay > 0:
+            self._sleep(delay)
+
+    def _trip_rate_gate(self, delay: float) -> None:
+        with self._pause_lock:
+            self._pause_until = max(self._pause_until, time.monotonic() + delay)
+
+    def _embed_with_retry(self, texts: List[str], result: PipelineResult) -> List[Sequence[float]]:
+        attempt = 0
+        while True:
+            self._wait_rate_gate()
+            try:
+                vectors = self.backend.embed_batch(texts)
+                if len(vectors) != len(texts):
+                    raise ValueError(f"backend devolveu {len(vectors)} vetores para {len(texts)} textos")
+                return vectors
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff_seconds * (2 ** attempt)
+                attempt += 1
+                result.retries += 1
+                if is_rate_limit_error(e):
+                    # Pausa compartilhada: os outros lotes também esperam
+                    self._trip_rate_gate(delay)
+                    logger.warning(f"[EMBED] Rate limit; pausando {delay:.1f}s (tentativa {attempt}/{self.max_retries})")
+                else:
+                    logger.warning(f"[EMBED] Lote falhou ({e}); nova tentativa em {delay:.1f}s")
+                    self._sleep(delay)
+
+    def run(self, texts: Sequence[str], on_progress: Optional[Callable[[PipelineResult], None]] = None) -> PipelineResult:
+        start = time.perf_counter()
+        result = PipelineResult(total=len(texts))
+
+        pending: Dict[str, str] = {}
+        seen = set()
+        for text in texts:
+            if not text:
+                continue
+            key = self.key_fn(text)
+            if key in seen:
+                continue
+            seen.add(key)
+            if key in self.store:
+                result.cached += 1
+            else:
+                pending[key] = text
+        result.unique = len(seen)
+
+        items = list(pending.items())
+        batches = [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+        if batches:
+            logger.info(
+                f"[EMBED] {len(items)} textos novos ({result.cached} reaproveitados) em {len(batches)} lote(s) "
+                f"de até {self.batch_size}, concorrência {self.max_concurrency}"
+            )
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="embed") as pool:
+            queue = iter(batches)
+            inflight: Dict[Future, List] = {}
+
+            def submit_next() -> None:
+                batch = next(queue, None)
+                if batch is not None:
+                    inflight[pool.submit(self._embed_with_retry, [t for _, t in batch], result)] = batch
+
+            for _ in range(self.max_concurrency):
+                submit_next()
+
+            while inflight:
+                done, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = inflight.pop(future)
+                    result.batches += 1
+                    try:
+                        vectors = future.result()
+                    except Exception as e:
+                        result.failed += len(batch)
+                        logger.error(f"[EMBED] Lote de {len(batch)} textos descartado após {self.max_retries} tentativas: {e}")
+                    else:
+                        # Checkpoint: grava (e confirma) o lote antes de seguir
+                        result.embedded += self.store.add_many({key: vec for (key, _), vec in zip(batch, vectors)})
+                    if on_progress is not None:
+                        on_progress(result)
+                    submit_next()
+
+        result.seconds = time.perf_counter() - start
+        if batches:
+            logger.info(
+                f"[EMBED] Concluído: {result.embedded} gerados, {result.cached} do store, "
+                f"{result.failed} falharam em {result.seconds:.1f}s"
+            )
+        return result
+
+    def vectors_for(self, texts: Sequence[str]) -> np.ndarray:
+        """Matriz float32 (len(texts), dim) na ordem de `texts`; linhas sem embedding ficam zeradas."""
+        positions = self.store.positions(self.key_fn(t) for t in texts)
+        dim = self.store.dimension or 0
+        out = np.zeros((len(texts), dim), dtype=np.float32)
+        found = positions >= 0
+        if found.any():
+            out[found] = self.store.vectors[positions[found]]
+        return out
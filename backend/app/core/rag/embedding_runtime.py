@@ -0,0 +1,292 @@
+"""
+Embedding Runtime - encoder local de queries (ONNX int8 + micro-batching)
+
+Antes, cada busca vetorial chamava `SentenceTransformer.encode(query)` no
+próprio request (PyTorch fp32, um forward pass por query, bloqueando o event
+loop). Sob carga concorrente, N buscas = N forward passes disputando a CPU.
+
+- `OnnxEmbeddingBackend`: o mesmo modelo exportado para ONNX e quantizado em
+  int8 (ex.: `onnx/model_qint8_avx2.onnx` do repositório do
+  sentence-transformers), executado com onnxruntime + tokenizers, sem torch.
+  Mean pooling + normalização L2 como o modelo original
+- `QueryEmbeddingRuntime`: fila de micro-batching. Um worker pega a primeira
+  query, espera até `batch_window_ms` por outras (até `max_batch_size`) e
+  codifica todas num único forward pass; textos repetidos no lote viram um
+  só. LRU de query -> embedding na frente da fila
+- `get_embedding_runtime`: um runtime por configuração de modelo no processo,
+  compartilhado por todos os adaptadores
+
+Dependências opcionais: sem onnxruntime/tokenizers (ou sem o modelo ONNX no
+disco) o backend é o `SentenceTransformerBackend`, ainda com micro-batching e
+cache.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.app.core.rag.embedding_pipeline import SentenceTransformerBackend
+
+logger = logging.getLogger(__name__)
+
+try:
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+
+    HAS_ONNX = True
+except ImportError:
+    ort = None
+    Tokenizer = None
+    HAS_ONNX = False
+
+DEFAULT_ONNX_MODEL_FILE = "onnx/model_qint8_avx2.onnx"
+
+
+def mean_pool(hidden: np.ndarray, attention_mask: np.ndarray, normalize: bool = True) -> np.ndarray:
+    """Média dos vetores de token (ignorando padding), como o pooling do sentence-transformers."""
+    mask = attention_mask[..., None].astype(np.float32)
+    pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+    if normalize:
+        pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+    return pooled.astype(np.float32)
+
+
+class OnnxEmbeddingBackend:
+    """Modelo sentence-transformers em ONNX (int8) via onnxruntime; carrega no primeiro lote."""
+
+    max_batch_size = 256
+    max_concurrency = 1  # um run por vez: a sessão já usa os núcleos configurados
+
+    def __init__(
+        self,
+        model_dir: str,
+        model_file: str = DEFAULT_ONNX_MODEL_FILE,
+        model_name: Optional[str] = None,
+        max_length: int = 256,
+        intra_op_threads: int = 0,
+        normalize: bool = True,
+    ):
+        self.model_dir = Path(model_dir)
+        self.model_file = model_file
+        self.model_name = model_name or f"{self.model_dir.name}-{Path(model_file).stem}"
+        self.max_length = max_length
+        self.intra_op_threads = intra_op_threads
+        self.normalize = normalize
+        self._session = None
+        self._tokenizer = None
+        self._input_names: set = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available(model_dir: Optional[str], model_file: str = DEFAULT_ONNX_MODEL_FILE) -> bool:
+        if not HAS_ONNX or not model_dir:
+            return False
+        return (Path(model_dir) / model_file).exists() and (Path(model_dir) / "tokenizer.json").exists()
+
+    def _load(self) -> None:
+        if self._session is not None:
+            return
+        with self._lock:
+            if self._session is not None:
+                return
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if self.intra_op_threads:
+                options.intra_op_num_threads = self.intra_op_threads
+            session = ort.InferenceSession(
+                str(self.model_dir / self.model_file), options, providers=["CPUExecutionProvider"]
+            )
+            tokenizer = Tokenizer.from_file(str(self.model_dir / "tokenizer.json"))
+            tokenizer.enable_truncation(max_length=self.max_length)
+            tokenizer.enable_padding()  # padding até o maior texto do lote
+            self._input_names = {i.name for i in session.get_inputs()}
+            self._tokenizer = tokenizer
+            self._session = session
+            logger.info(f"[EMBED] Modelo ONNX carregado: {self.model_dir / self.model_file}")
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        self._load()
+        encodings = self._tokenizer.encode_batch(list(texts))
+        input_ids = np.asarray([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self._session.run(None, feeds)[0]  # last_hidden_state: (lote, tokens, dim)
+        return mean_pool(hidden, attention_mask, self.normalize)
+
+
+def build_embedding_backend(
+    model_name: str = "all-MiniLM-L6-v2",
+    onnx_model_dir: Optional[str] = None,
+    onnx_model_file: str = DEFAULT_ONNX_MODEL_FILE,
+    onnx_threads: int = 0,
+) -> Any:
+    """Backend ONNX quando o runtime e o modelo exportado existem; senão sentence-transformers."""
+    if OnnxEmbeddingBackend.available(onnx_model_dir, onnx_model_file):
+        return OnnxEmbeddingBackend(
+            onnx_model_dir,
+            onnx_model_file,
+            model_name=f"{model_name}-{Path(onnx_model_file).stem}",
+            intra_op_threads=onnx_threads,
+        )
+    if onnx_model_dir:
+        logger.warning(
+            f"[WARNING] Modelo ONNX indisponível em {onnx_model_dir} (onnxruntime instalado: {HAS_ONNX}); "
+            f"usando sentence-transformers"
+        )
+    return SentenceTransformerBackend(model_name)
+
+
+class QueryEmbeddingRuntime:
+    """Codifica queries em micro-lotes (um forward pass para as queries concorrentes) com LRU."""
+
+    def __init__(
+        self,
+        backend: Any,
+        batch_window_ms: float = 5.0,
+        max_batch_size: int = 32,
+        cache_size: int = 4096,
+    ):
+        self.backend = backend
+        self.batch_window_s = batch_window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self.cache_size = cache_size
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self._stats = {"requests": 0, "cache_hits": 0, "batches": 0, "encoded": 0}
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self.backend, "model_name", type(self.backend).__name__)
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def submit(self, text: str) -> "Future[np.ndarray]":
+        future: "Future[np.ndarray]" = Future()
+        self._stats["requests"] += 1
+        with self._cache_lock:
+            cached = self._cache.get(text)
+            if cached is not None:
+                self._cache.move_to_end(text)
+                self._stats["cache_hits"] += 1
+                future.set_result(cached)
+                return future
+        self._ensure_worker()
+        self._queue.put((text, future))
+        return future
+
+    def embed_query(self, text: str, timeout: Optional[float] = None) -> np.ndarray:
+        """Embedding (somente leitura) de `text`; bloqueia até o lote ser processado."""
+        return self.submit(text).result(timeout)
+
+    async def aembed_query(self, text: str) -> np.ndarray:
+        """Versão assíncrona: aguarda o lote sem bloquear o event loop."""
+        return await asyncio.wrap_future(self.submit(text))
+
+    def get_stats(self) -> Dict[str, Any]:
+        batches = self._stats["batches"]
+        return {
+            **self._stats,
+            "avg_batch": self._stats["encoded"] / batches if batches else 0.0,
+            "cached_queries": len(self._cache),
+            "model": self.model_name,
+        }
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="query-embedding", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window_s
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._encode(batch)
+
+    def _encode(self, batch: List[Tuple[str, Future]]) -> None:
+        """
+        Codifica um lote. Qualquer falha (backend, nº de vetores incompatível,
+        pós-processamento) vai para os futures ainda pendentes; o worker segue
+        vivo para os próximos lotes.
+        """
+        pending = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not pending:
+            return
+        try:
+            texts = list(dict.fromkeys(text for text, _ in pending))
+            vectors = np.asarray(self.backend.embed_batch(texts), dtype=np.float32)
+            if len(vectors) != len(texts):
+                raise ValueError(f"backend devolveu {len(vectors)} vetores para {len(texts)} textos")
+
+            by_text = {}
+            for text, vector in zip(texts, vectors):
+                vector.setflags(write=False)  # compartilhado entre requests e cache
+                by_text[text] = vector
+            self._stats["batches"] += 1
+            self._stats["encoded"] += len(texts)
+            with self._cache_lock:
+                for text, vector in by_text.items():
+                    self._cache[text] = vector
+                    self._cache.move_to_end(text)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            for text, future in pending:
+                future.set_result(by_text[text])
+        except Exception as e:
+            logger.warning(f"[QUERY EMBEDDING] Falha no lote de {len(pending)} queries: {e}")
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+
+
+# Um runtime por configuração de modelo (modelo carregado uma vez por processo)
+_runtimes: Dict[Tuple, QueryEmbeddingRuntime] = {}
+_runtimes_lock = threading.Lock()
+
+
+def get_embedding_runtime(
+    model_name: str = "all-MiniLM-L6-v2",
+    onnx_model_dir: Optional[str] = None,
+    onnx_model_file: str = DEFAULT_ONNX_MODEL_FILE,
+    onnx_threads: int = 0,
+    batch_window_ms: float = 5.0,
+    max_batch_size: int = 32,
+    cache_size: int = 4096,
+) -> QueryEmbeddingRuntime:
+    key = (model_name, onnx_model_dir, onnx_model_file, onnx_threads)
+    runtime = _runtimes.get(key)
+    if runtime is None:
+        with _runtimes_lock:
+            runtime = _runtimes.get(key)
+            if runtime is None:
+                backend = build_embedding_backend(model_name, onnx_model_dir, onnx_model_file, onnx_threads)
+                runtime = QueryEmbeddingRuntime(backend, batch_window_ms, max_batch_size, cache_size)
+                _runtimes[key] = runtime
+    return runtime
@@ -0,0 +1,246 @@
+"""
+Embedding Store - armazenamento binário versionado de embeddings
+
+Substitui o `embeddings_cache.json` do HybridRetriever (todos os vetores em
+JSON indentado, relido e parseado a cada startup: dezenas de MB de texto e
+segundos de parse para alguns milhares de vetores de 768 dimensões).
+
+Layout em disco (`<dir>/<name>.v1.*`):
+
+- `.json`: cabeçalho (formato, versão, modelo, dimensão, dtype, contagem e
+  tamanho do manifesto de ids). É o ponto de commit: gravado por último,
+  com replace atômico
+- `.bin`: vetores float32/float16 linha a linha (row-major), sem header,
+  aberto com `np.memmap` (mode "r") na carga
+- `.ids`: um id (JSON) por linha, na mesma ordem das linhas do `.bin`
+
+Acréscimos (`add_many`) escrevem só as linhas novas no fim de `.bin` e
+`.ids` e depois regravam o cabeçalho; bytes além da contagem registrada
+(escrita interrompida) são descartados no próximo acréscimo. Um cabeçalho de
+outro modelo/dimensão invalida o store (os vetores não são comparáveis).
+
+Sem diretório (`directory=None`) o store vive só em memória.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT = "caculinha-embeddings"
+STORE_VERSION = 1
+SUPPORTED_DTYPES = ("float32", "float16")
+
+
+class EmbeddingStore:
+    """Mapa id -> vetor, persistido em binário e mapeado em memória."""
+
+    def __init__(
+        self,
+        directory: Optional[Path],
+        model_name: str,
+        dtype: str = "float32",
+        name: str = "embeddings",
+    ):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"dtype não suportado: {dtype} (use {SUPPORTED_DTYPES})")
+        self.directory = Path(directory) if directory is not None else None
+        self.model_name = model_name
+        self.dtype = np.dtype(dtype)
+        self.name = name
+        self._dimension: Optional[int] = None
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._vectors: np.ndarray = np.zeros((0, 0), dtype=self.dtype)
+        self._ids_bytes = 0
+
+    # ------------------------------------------------------------------
+    # Arquivos
+    # ------------------------------------------------------------------
+
+    def _path(self, suffix: str) -> Path:
+        return self.directory / f"{self.name}.v{STORE_VERSION}.{suffix}"
+
+    @property
+    def header_path(self) -> Optional[Path]:
+        return self._path("json") if self.directory is not None else None
+
+    def exists(self) -> bool:
+        return self.header_path is not None and self.header_path.exists()
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return self._dimension
+
+    @property
+    def ids(self) -> List[str]:
+        return list(self._ids)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Matriz (n, dim) no dtype do store (memmap somente leitura quando em disco)."""
+        return self._vectors
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._positions
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        pos = self._positions.get(key)
+        return None if pos is None else np.asarray(self._vectors[pos], dtype=np.float32)
+
+    def positions(self, keys: Iterable[str]) -> np.ndarray:
+        """Linha de cada id no store (-1 para ausentes)."""
+        return np.fromiter((self._positions.get(k, -1) for k in keys), dtype=np.int64)
+
+    def load(self) -> "EmbeddingStore":
+        """Abre o store do disco (no-op se não existir ou for de outro modelo)."""
+        if not self.exists():
+            return self
+        try:
+            header = json.loads(self.header_path.read_text(encoding="utf-8"))
+            if header.get("format") != STORE_FORMAT or header.get("version") != STORE_VERSION:
+                logger.warning(f"[RAG] Embedding store com formato desconhecido em {self.header_path}; ignorando")
+                return self
+            if header.get("model") != self.model_name or header.get("dtype") != self.dtype.name:
+                logger.warning(
+                    f"[RAG] Embedding store de outro modelo/dtype ({header.get('model')}/{header.get('dtype')}); "
+                    f"será recriado para {self.model_name}/{self.dtype.name}"
+                )
+                return self
+
+            count, dimension = int(header["count"]), int(header["dimension"])
+            ids_bytes = int(header["ids_bytes"])
+            with open(self._path("ids"), "rb") as f:
+                raw_ids = f.read(ids_bytes)
+            ids = [json.loads(line) for line in raw_ids.decode("utf-8").splitlines()]
+            if len(ids) != count:
+                raise ValueError(f"manifesto com {len(ids)} ids, cabeçalho diz {count}")
+
+            self._dimension = dimension
+            self._remap(count)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"[RAG] Embedding store corrompido em {self.directory}: {e}; será recriado")
+            self._dimension = None
+            self._vectors = np.zeros((0, 0), dtype=self.dtype)
+            return self
+
+        self._ids = ids
+        self._positions = {key: i for i, key in enumerate(ids)}
+        self._ids_bytes = ids_bytes
+        return self
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    def add_many(self, items: Mapping[str, Sequence[float]]) -> int:
+        """
+        Acrescenta vetores de ids novos (ids já presentes e dimensões
+        divergentes são ignorados). Retorna quantos foram gravados.
+        """
+        new_ids: List[str] = []
+        seen = set()
+        rows: List[Sequence[float]] = []
+        for key, vector in items.items():
+            if key in self._positions or key in seen or vector is None:
+                continue
+            if self._dimension is None:
+                self._dimension = len(vector)
+            if len(vector) != self._dimension:
+                logger.warning(f"[RAG] Embedding de '{key[:40]}' com dimensão {len(vector)} != {self._dimension}")
+                continue
+            seen.add(key)
+            new_ids.append(key)
+            rows.append(vector)
+        if not new_ids:
+            return 0
+
+        block = np.asarray(rows, dtype=self.dtype).reshape(len(new_ids), self._dimension)
+        start = len(self._ids)
+        if self.directory is not None:
+            self._append_to_disk(new_ids, block)
+        else:
+            self._vectors = np.concatenate([self._vectors.reshape(-1, self._dimension), block])
+
+        for offset, key in enumerate(new_ids):
+            self._positions[key] = start + offset
+        self._ids.extend(new_ids)
+        return len(new_ids)
+
+    def _append_to_disk(self, new_ids: List[str], block: np.ndarray) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        count = len(self._ids)
+        row_bytes = self._dimension * self.dtype.itemsize
+        ids_blob = "".join(json.dumps(key, ensure_ascii=False) + "\n" for key in new_ids).encode("utf-8")
+
+        # Fecha o memmap antes de crescer o arquivo (Windows não permite truncar arquivo mapeado)
+        self._vectors = np.zeros((0, self._dimension), dtype=self.dtype)
+        try:
+            for suffix, committed, blob in (
+                ("bin", count * row_bytes, block.tobytes(order="C")),
+                ("ids", self._ids_bytes, ids_blob),
+            ):
+                path = self._path(suffix)
+                with open(path, "r+b" if path.exists() else "w+b") as f:
+                    f.truncate(committed)  # descarta sobra de escrita interrompida
+                    f.seek(committed)
+                    f.write(blob)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            header = {
+                "format": STORE_FORMAT,
+                "version": STORE_VERSION,
+                "model": self.model_name,
+                "dimension": self._dimension,
+                "dtype": self.dtype.name,
+                "count": count + len(new_ids),
+                "ids_bytes": self._ids_bytes + len(ids_blob),
+            }
+            tmp = self.header_path.with_name(self.header_path.name + ".tmp")
+            tmp.write_text(json.dumps(header), encoding="utf-8")
+            tmp.replace(self.header_path)
+        except OSError:
+            # Cabeçalho antigo continua valendo: reabre as linhas já confirmadas
+            self._remap(count)
+            raise
+
+        self._ids_bytes += len(ids_blob)
+        self._remap(count + len(new_ids))
+
+    def _remap(self, count: int) -> None:
+        self._vectors = (
+            np.memmap(self._path("bin"), dtype=self.dtype, mode="r", shape=(count, self._dimension))
+            if count
+            else np.zeros((0, self._dimension), dtype=self.dtype)
+        )
+
+    def import_json(self, path: Path) -> int:
+        """Migra um cache legado `{texto: [floats]}` (embeddings_cache.json)."""
+        with open(path, "r", encoding="utf-8") as f:
+            legacy = json.load(f)
+        imported = self.add_many(legacy)
+        logger.info(f"[RAG] {imported} embeddings migrados de {path} para o store binário")
+        return imported
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "count": len(self._ids),
+            "dimension": self._dimension,
+            "dtype": self.dtype.name,
+            "model": self.model_name,
+            "bytes": int(len(self._ids) * (self._dimension or 0) * self.dtype.itemsize),
+            "path": str(self.directory) if self.directory is not None else None,
+        }
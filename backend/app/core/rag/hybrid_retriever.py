@@ -8,33 +8,34 @@ Implementa retrieval híbrido moderno combinando:
 
 Baseado em best practices 2025: +12-30% acurácia vs. métodos isolados.
 
+O BM25 usa o índice invertido de `bm25_index.BM25Index` (postings e IDF
+pré-computados; a busca só visita os postings dos termos da query).
+
 Author: Agent BI Team
 Date: 2025-12-27
 """
 
 import os
-import json
 import logging
 import functools
 import asyncio
+import threading
 from typing import Any, Dict, List, Optional
 from pathlib import Path
 
+import numpy as np
 import polars as pl
 
 from backend.app.config.settings import settings
+from backend.app.core.rag.bm25_index import BM25Index
+from backend.app.core.rag.dense_index import DenseMatrixIndex, corpus_fingerprint
+from backend.app.core.rag.embedding_pipeline import EmbeddingPipeline, GeminiEmbeddingBackend
+from backend.app.core.rag.embedding_store import EmbeddingStore
 from backend.app.core.rag.example_collector import ExampleCollector
 
 logger = logging.getLogger(__name__)
 
 # Lazy imports para otimizar cold start
-try:
-    from rank_bm25 import BM25Okapi
-    HAS_BM25 = True
-except ImportError:
-    logger.warning("rank_bm25 não instalado. BM25 retrieval não disponível. Install: pip install rank-bm25")
-    HAS_BM25 = False
-
 try:
     from google import genai
     from google.genai import types
@@ -79,15 +80,21 @@ class HybridRetriever:
         self.use_cache = use_cache
 
         # Caminhos
-        self.embeddings_cache_path = Path(self.examples_path) / "embeddings_cache.json"
+        self.embeddings_cache_path = Path(self.examples_path) / "embeddings_cache.json"  # legado (migrado p/ o store)
+        self.embedding_store_dir = Path(self.examples_path) / "embeddings"
         self.bm25_index_path = Path(self.examples_path) / "bm25_index.json"
+        self.embeddings_matrix_path = Path(self.examples_path) / "embeddings_matrix.npy"
 
         # Componentes
         self.example_collector = ExampleCollector(examples_dir=self.examples_path)
-        self.bm25_index: Optional[BM25Okapi] = None
-        self.embeddings_cache: Dict[str, List[float]] = {}
+        self.bm25_index: Optional[BM25Index] = None
+        self.embedding_store = EmbeddingStore(
+            self.embedding_store_dir if use_cache else None,
+            model_name=embedding_model,
+            dtype=settings.RAG_EMBEDDING_STORE_DTYPE,
+        )
+        self.dense_index: Optional[DenseMatrixIndex] = None  # matriz alinhada a self.documents
         self.documents: List[Dict[str, Any]] = []
-        self.tokenized_corpus: List[List[str]] = []
 
         # Embedding model (Gemini)
         self.embedding_model = None
@@ -130,14 +137,12 @@ class HybridRetriever:
                 logger.warning("Gemini não disponível. Dense retrieval desabilitado.")
 
             # 3. Inicializar BM25
-            if HAS_BM25:
-                self._initialize_bm25()
-            else:
-                logger.warning("BM25 não disponível")
+            self._initialize_bm25()
 
             # 4. Carregar/gerar embeddings
             if HAS_GEMINI:
                 self._load_or_generate_embeddings()
+                self._build_dense_index()
 
             self._initialized = True
             logger.info("HybridRetriever inicializado com sucesso")
@@ -154,53 +159,78 @@ class HybridRetriever:
         try:
             logger.info("Indexando documentos com BM25...")
 
-            # Tokenizar corpus
-            self.tokenized_corpus = [
-                self._tokenize(doc.get('query', ''))
-                for doc in self.documents
-            ]
-
-            # Criar índice BM25
-            self.bm25_index = BM25Okapi(self.tokenized_corpus)
+            # Postings indexados pela posição do documento em self.documents
+            self.bm25_index = BM25Index.build(
+                ((i, doc.get('query', '')) for i, doc in enumerate(self.documents)),
+                tokenizer=self._tokenize,
+            )
 
-            logger.info(f"BM25 index criado com {len(self.tokenized_corpus)} documentos")
+            logger.info(
+                f"BM25 index criado com {len(self.bm25_index)} documentos "
+                f"({self.bm25_index.vocabulary_size} termos)"
+            )
 
         except Exception as e:
             logger.error(f"Erro ao inicializar BM25: {e}")
 
     def _load_or_generate_embeddings(self) -> None:
         """
-        Carrega embeddings do cache ou gera novos.
+        Abre o store binário (mmap) e gera embeddings só para documentos novos.
         """
         try:
-            # Tentar carregar cache
-            if self.use_cache and self.embeddings_cache_path.exists():
-                logger.info("Carregando embeddings do cache...")
-                with open(self.embeddings_cache_path, 'r', encoding='utf-8') as f:
-                    self.embeddings_cache = json.load(f)
-                logger.info(f"Cache carregado: {len(self.embeddings_cache)} embeddings")
-
-            # Gerar embeddings faltantes
-            missing_docs = [
-                doc for doc in self.documents
-                if doc.get('query') not in self.embeddings_cache
-            ]
+            if self.use_cache:
+                self.embedding_store.load()
+                # Migração única do cache JSON legado
+                if len(self.embedding_store) == 0 and self.embeddings_cache_path.exists():
+                    self.embedding_store.import_json(self.embeddings_cache_path)
+                logger.info(f"Embedding store carregado: {len(self.embedding_store)} embeddings")
+
+            # Gerar embeddings faltantes em lote (cada lote concluído já vai para o store)
+            missing = [doc.get('query', '') for doc in self.documents if doc.get('query') not in self.embedding_store]
+            backend = self._embedding_backend()
+            if missing and backend is not None:
+                logger.info(f"Gerando embeddings para {len(missing)} novos documentos...")
+                pipeline = EmbeddingPipeline(
+                    backend,
+                    self.embedding_store,
+                    batch_size=settings.EMBEDDING_BATCH_SIZE,
+                    max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY,
+                    max_retries=settings.EMBEDDING_MAX_RETRIES,
+                    key_fn=str,  # o store do retriever é indexado pelo texto da query
+                )
+                pipeline.run(missing)
 
-            if missing_docs:
-                logger.info(f"Gerando embeddings para {len(missing_docs)} novos documentos...")
-                for doc in missing_docs:
-                    query = doc.get('query', '')
-                    if query:
-                        embedding = self._generate_embedding(query)
-                        if embedding:
-                            self.embeddings_cache[query] = embedding
+        except Exception as e:
+            logger.error(f"Erro ao carregar/gerar embeddings: {e}")
 
-                # Salvar cache atualizado
-                if self.use_cache:
-                    self._save_embeddings_cache()
+    def _embedding_backend(self) -> Optional[GeminiEmbeddingBackend]:
+        client = getattr(self, 'embedding_client', None)
+        if client is None:
+            return None
+        return GeminiEmbeddingBackend(client, self.embedding_model_name, task_type="RETRIEVAL_DOCUMENT")
 
+    def _build_dense_index(self) -> None:
+        """
+        Monta (ou abre do disco, via mmap) a matriz normalizada usada pela busca
+        densa. Reaproveita o `.npy` salvo quando os documentos não mudaram.
+        """
+        try:
+            fingerprint = corpus_fingerprint(
+                (doc.get('query', '') for doc in self.documents), self.embedding_model_name
+            )
+            positions = self.embedding_store.positions(doc.get('query', '') for doc in self.documents)
+            doc_ids = np.flatnonzero(positions >= 0)
+            index = DenseMatrixIndex.load(self.embeddings_matrix_path, fingerprint) if self.use_cache else None
+            if index is None or index.size != doc_ids.size:
+                rows = self.embedding_store.vectors[positions[doc_ids]] if doc_ids.size else np.zeros((0, 0))
+                index = DenseMatrixIndex.from_matrix(rows, doc_ids, fingerprint)
+                if self.use_cache and index.size:
+                    index.save(self.embeddings_matrix_path)
+            self.dense_index = index
+            logger.info(f"Matriz de embeddings pronta: {index.size} x {index.dimension}")
         except Exception as e:
-            logger.error(f"Erro ao carregar/gerar embeddings: {e}")
+            logger.error(f"Erro ao montar matriz de embeddings: {e}")
+            self.dense_index = None
 
     def _generate_embedding(self, text: str) -> Optional[List[float]]:
         """
@@ -227,17 +257,6 @@ class HybridRetriever:
             logger.error(f"Erro ao gerar embedding: {e}")
             return None
 
-    def _save_embeddings_cache(self) -> None:
-        """
-        Salva cache de embeddings em disco.
-        """
-        try:
-            with open(self.embeddings_cache_path, 'w', encoding='utf-8') as f:
-                json.dump(self.embeddings_cache, f, indent=2)
-            logger.info(f"Cache de embeddings salvo: {len(self.embeddings_cache)} entries")
-        except Exception as e:
-            logger.error(f"Erro ao salvar cache de embeddings: {e}")
-
     def _tokenize(self, text: str) -> List[str]:
         """
         Tokeniza texto para BM25.
@@ -274,24 +293,22 @@ class HybridRetriever:
         Returns:
             Lista de documentos com scores
         """
-        if not HAS_BM25 or self.bm25_index is None:
+        if self.bm25_index is None:
             return []
 
         try:
-            # Tokenizar query
-            tokenized_query = self._tokenize(query)
+            hits = self.bm25_index.search(query, top_k)
 
-            # Buscar
-            scores = self.bm25_index.get_scores(tokenized_query)
-
-            # Ranquear
-            doc_scores = [
-                {'doc': self.documents[i], 'score': scores[i], 'method': 'bm25'}
-                for i in range(len(scores))
-            ]
-            doc_scores.sort(key=lambda x: x['score'], reverse=True)
+            # Completa com documentos sem termo em comum (score 0), como a ordenação completa fazia
+            if len(hits) < top_k:
+                matched = {i for i, _ in hits}
+                for i in range(len(self.documents)):
+                    if len(hits) >= top_k:
+                        break
+                    if i not in matched:
+                        hits.append((i, 0.0))
 
-            return doc_scores[:top_k]
+            return [{'doc': self.documents[i], 'score': score, 'method': 'bm25'} for i, score in hits]
 
         except Exception as e:
             logger.error(f"Erro no BM25 search: {e}")
@@ -308,7 +325,7 @@ class HybridRetriever:
         Returns:
             Lista de documentos com scores
         """
-        if not HAS_GEMINI or not self.embeddings_cache:
+        if not HAS_GEMINI or self.dense_index is None or self.dense_index.size == 0:
             return []
 
         try:
@@ -317,23 +334,11 @@ class HybridRetriever:
             if not query_embedding:
                 return []
 
-            # Calcular similaridade de cosseno com cada documento
-            similarities = []
-            for doc in self.documents:
-                doc_query = doc.get('query', '')
-                if doc_query in self.embeddings_cache:
-                    doc_embedding = self.embeddings_cache[doc_query]
-                    similarity = self._cosine_similarity(query_embedding, doc_embedding)
-                    similarities.append({
-                        'doc': doc,
-                        'score': similarity,
-                        'method': 'dense'
-                    })
-
-            # Ranquear
-            similarities.sort(key=lambda x: x['score'], reverse=True)
-
-            return similarities[:top_k]
+            # Cosseno contra todos os documentos num produto matriz-vetor + top-k parcial
+            return [
+                {'doc': self.documents[doc_pos], 'score': score, 'method': 'dense'}
+                for doc_pos, score in self.dense_index.search(query_embedding, top_k)
+            ]
 
         except Exception as e:
             logger.error(f"Erro no dense search: {e}")
@@ -578,17 +583,20 @@ class HybridRetriever:
             'initialized': self._initialized,
             'warming': self._warming,  # NEW 2025-12-27
             'total_documents': len(self.documents),
-            'embeddings_cached': len(self.embeddings_cache),
-            'bm25_available': HAS_BM25 and self.bm25_index is not None,
-            'dense_available': HAS_GEMINI and bool(self.embeddings_cache),
+            'embeddings_cached': len(self.embedding_store),
+            'embedding_store': self.embedding_store.get_stats(),
+            'dense_matrix_rows': self.dense_index.size if self.dense_index is not None else 0,
+            'bm25_available': self.bm25_index is not None,
+            'dense_available': HAS_GEMINI and self.dense_index is not None and self.dense_index.size > 0,
             'embedding_model': self.embedding_model_name,
             'bm25_weight': self.bm25_weight,
             'dense_weight': self.dense_weight
         }
 
 
-# Singleton instance
+# Singleton instance (compartilhada pelos agentes de todos os roles)
 _hybrid_retriever: Optional[HybridRetriever] = None
+_hybrid_retriever_lock = threading.Lock()
 
 
 def get_hybrid_retriever() -> HybridRetriever:
@@ -597,5 +605,7 @@ def get_hybrid_retriever() -> HybridRetriever:
     """
     global _hybrid_retriever
     if _hybrid_retriever is None:
-        _hybrid_retriever = HybridRetriever()
+        with _hybrid_retriever_lock:
+            if _hybrid_retriever is None:
+                _hybrid_retriever = HybridRetriever()
     return _hybrid_retriever
@@ -0,0 +1,253 @@
+"""
+Product Autocomplete - índice de prefixo + trigramas para typeahead de produtos
+
+Resolve "nome digitado pela metade e com erro" -> produtos, sem varrer o
+catálogo (`str.contains` / ILIKE linha a linha):
+
+- Nomes normalizados e tokenizados com `PTBRNormalizer` (mesma normalização
+  do BM25 do `ProductRetrievalService`)
+- Linhas reordenadas por vendas (VENDA_30DD) decrescentes: o número da linha
+  já é o rank de vendas, então o desempate é uma comparação de inteiros
+- Vocabulário ordenado + postings achatados na mesma ordem: os termos com um
+  prefixo formam um intervalo contíguo (bisect) e suas linhas, uma fatia
+- Trigramas -> termos do vocabulário para tolerância a erros de digitação
+  (similaridade de Dice), usados só quando o token não existe (nem como prefixo)
+- Tokens combinados com AND (intersecção das linhas); score = soma por token
+  (exato 1.0, prefixo 0.9, fuzzy 0.8 * dice) e depois vendas
+- Consulta só numérica busca por prefixo do código do produto
+"""
+
+import bisect
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.application.services.pt_br_normalizer import PTBRNormalizer
+
+EXACT, PREFIX, FUZZY = 2, 1, 0
+MATCH_LABELS = {EXACT: "exact", PREFIX: "prefix", FUZZY: "fuzzy"}
+PREFIX_SCORE = 0.9
+FUZZY_WEIGHT = 0.8
+
+
+@dataclass(frozen=True)
+class AutocompleteHit:
+    product_id: int
+    name: str
+    sales: float
+    score: float
+    match: str  # "exact" | "prefix" | "fuzzy" (pior casamento entre os tokens)
+    segment: str = ""
+
+
+def _trigrams(term: str) -> List[str]:
+    padded = f"${term}$"
+    return list({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+class ProductAutocompleteIndex:
+    """Índice imutável de autocomplete sobre os produtos distintos de um snapshot."""
+
+    def __init__(
+        self,
+        product_ids: Sequence[int],
+        names: Sequence[str],
+        sales: Optional[Sequence[float]] = None,
+        segments: Optional[Sequence[str]] = None,
+        min_similarity: float = 0.45,
+        max_expansions: int = 20,
+    ):
+        product_ids = np.asarray(product_ids, dtype=np.int64)
+        sales = np.zeros(len(product_ids)) if sales is None else np.asarray(sales, dtype=np.float64)
+        order = np.lexsort((product_ids, -sales))  # vendas desc, código asc
+        self.product_ids = product_ids[order]
+        self.names = [str(names[i]) for i in order]
+        self.sales = sales[order]
+        self.segments = [str(segments[i]) for i in order] if segments is not None else None
+        self.min_similarity = min_similarity
+        self.max_expansions = max_expansions
+
+        postings: Dict[str, List[int]] = {}
+        for row, name in enumerate(self.names):
+            for token in dict.fromkeys(PTBRNormalizer.tokenize(name)):
+                postings.setdefault(token, []).append(row)
+        self.vocab = sorted(postings)
+        self._vocab_id = {term: i for i, term in enumerate(self.vocab)}
+        lengths = np.fromiter((len(postings[t]) for t in self.vocab), dtype=np.int64, count=len(self.vocab))
+        self._offsets = np.concatenate(([0], np.cumsum(lengths)))
+        self._flat = np.fromiter(
+            (row for t in self.vocab for row in postings[t]), dtype=np.int32, count=int(self._offsets[-1])
+        )
+
+        grams: Dict[str, List[int]] = {}
+        gram_count = np.zeros(len(self.vocab), dtype=np.int32)
+        for vid, term in enumerate(self.vocab):
+            term_grams = _trigrams(term)
+            gram_count[vid] = len(term_grams)
+            for gram in term_grams:
+                grams.setdefault(gram, []).append(vid)
+        self._grams = {g: np.asarray(v, dtype=np.int32) for g, v in grams.items()}
+        self._gram_count = gram_count
+
+        code_order = sorted(range(len(self.product_ids)), key=lambda r: str(self.product_ids[r]))
+        self._codes = [str(self.product_ids[r]) for r in code_order]
+        self._code_rows = np.asarray(code_order, dtype=np.int32)
+
+        if self.segments is not None:
+            labels, codes = np.unique(np.asarray(self.segments, dtype=object).astype(str), return_inverse=True)
+            self._segment_labels = {str(label): i for i, label in enumerate(labels)}
+            self._segment_codes = codes.astype(np.int32)
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    # ------------------------------------------------------------------
+    # Casamento por token
+    # ------------------------------------------------------------------
+
+    def _rows(self, vid: int) -> np.ndarray:
+        return self._flat[self._offsets[vid]:self._offsets[vid + 1]]
+
+    def _prefix_range(self, prefix: str) -> Tuple[int, int]:
+        lo = bisect.bisect_left(self.vocab, prefix)
+        hi = bisect.bisect_left(self.vocab, prefix + "\uffff", lo)
+        return lo, hi
+
+    def _fuzzy_terms(self, token: str) -> List[Tuple[int, float]]:
+        query_grams = [self._grams[g] for g in _trigrams(token) if g in self._grams]
+        if not query_grams:
+            return []
+        shared = np.bincount(np.concatenate(query_grams), minlength=len(self.vocab))
+        candidates = np.flatnonzero(shared)
+        dice = 2.0 * shared[candidates] / (len(_trigrams(token)) + self._gram_count[candidates])
+        keep = dice >= self.min_similarity
+        candidates, dice = candidates[keep], dice[keep]
+        if len(candidates) > self.max_expansions:
+            best = np.argpartition(-dice, self.max_expansions)[:self.max_expansions]
+            candidates, dice = candidates[best], dice[best]
+        return [(int(v), float(d)) for v, d in zip(candidates, dice)]
+
+    def _match_token(self, token: str, prefix: bool, fuzzy: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(linhas ordenadas, score, tipo de casamento) do token, melhor casamento por linha."""
+        parts: List[Tuple[np.ndarray, float, int]] = []
+        vid = self._vocab_id.get(token)
+        if vid is not None:
+            parts.append((self._rows(vid), 1.0, EXACT))
+        if prefix:
+            lo, hi = self._prefix_range(token)
+            if hi > lo:
+                parts.append((self._flat[self._offsets[lo]:self._offsets[hi]], PREFIX_SCORE, PREFIX))
+        if not parts and fuzzy and len(token) >= 3 and not token.isdigit():
+            for fvid, dice in sorted(self._fuzzy_terms(token), key=lambda x: -x[1]):
+                parts.append((self._rows(fvid), FUZZY_WEIGHT * dice, FUZZY))
+        if not parts:
+            empty = np.empty(0, dtype=np.int32)
+            return empty, np.empty(0), empty
+
+        if len(parts) == 1 and parts[0][2] == EXACT:
+            rows = parts[0][0]  # postings de um termo já são ordenados e sem repetição
+            return rows, np.full(len(rows), 1.0), np.full(len(rows), EXACT, dtype=np.int32)
+
+        if sum(len(p[0]) for p in parts) * 32 > len(self):
+            # Prefixos curtos cobrem boa parte do catálogo: espalhar em arrays densos
+            # (do pior para o melhor casamento, que sobrescreve) evita ordenar
+            best = np.zeros(len(self))
+            kind = np.zeros(len(self), dtype=np.int32)
+            for rows, score, k in reversed(parts):
+                best[rows] = score
+                kind[rows] = k
+            rows = np.flatnonzero(best).astype(np.int32)
+            return rows, best[rows], kind[rows]
+
+        rows = np.concatenate([p[0] for p in parts])
+        scores = np.concatenate([np.full(len(p[0]), p[1]) for p in parts])
+        kinds = np.concatenate([np.full(len(p[0]), p[2], dtype=np.int32) for p in parts])
+        # Partes já vêm do melhor para o pior casamento: a 1a ocorrência de cada linha é a melhor
+        rows, first = np.unique(rows, return_index=True)
+        return rows, scores[first], kinds[first]
+
+    @staticmethod
+    def _intersect(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Intersecção de arrays ordenados sem repetição: busca binária do menor no maior."""
+        small, big, swapped = (a, b, False) if len(a) <= len(b) else (b, a, True)
+        if not len(small):
+            return small, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(big, small), len(big) - 1)
+        hit = big[pos] == small
+        i_small, i_big = np.flatnonzero(hit), pos[hit]
+        return small[hit], *((i_big, i_small) if swapped else (i_small, i_big))
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def _segment_mask(self, rows: np.ndarray, segments: Iterable[str]) -> np.ndarray:
+        if self.segments is None:
+            return np.ones(len(rows), dtype=bool)
+        allowed = [self._segment_labels[s] for s in segments if s in self._segment_labels]
+        return np.isin(self._segment_codes[rows], allowed)
+
+    def _code_search(self, code: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        lo = bisect.bisect_left(self._codes, code)
+        hi = bisect.bisect_left(self._codes, code + "\uffff", lo)
+        rows = self._code_rows[lo:hi]
+        exact = np.asarray([self._codes[i] == code for i in range(lo, hi)], dtype=bool)
+        order = np.argsort(rows)
+        return rows[order], np.where(exact, 1.0, PREFIX_SCORE)[order], np.where(exact, EXACT, PREFIX)[order]
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        segments: Optional[Iterable[str]] = None,
+        prefix: bool = True,
+        fuzzy: bool = True,
+    ) -> List[AutocompleteHit]:
+        """
+        Sugestões para `query` (o último token é tratado como prefixo enquanto o
+        usuário digita). `segments` restringe aos segmentos permitidos.
+        """
+        tokens = PTBRNormalizer.tokenize(query or "")
+        if not tokens or limit <= 0 or not len(self):
+            return []
+
+        if len(tokens) == 1 and tokens[0].isdigit():
+            rows, scores, kinds = self._code_search(tokens[0])
+            if not len(rows):
+                rows, scores, kinds = self._match_token(tokens[0], prefix, fuzzy)
+        else:
+            rows = scores = kinds = None
+            for i, token in enumerate(tokens):
+                t_rows, t_scores, t_kinds = self._match_token(token, prefix and i == len(tokens) - 1, fuzzy)
+                if rows is None:
+                    rows, scores, kinds = t_rows, t_scores, t_kinds
+                else:
+                    rows, ia, ib = self._intersect(rows, t_rows)
+                    scores = scores[ia] + t_scores[ib]
+                    kinds = np.minimum(kinds[ia], t_kinds[ib])
+                if not len(rows):
+                    return []
+
+        if segments is not None:
+            mask = self._segment_mask(rows, segments)
+            rows, scores, kinds = rows[mask], scores[mask], kinds[mask]
+        if not len(rows):
+            return []
+
+        # Score (milésimos) desc e, no empate, linha asc (= mais vendido primeiro)
+        keys = -np.round(scores * 1000).astype(np.int64) * (len(self) + 1) + rows
+        k = min(limit, len(keys))
+        top = np.argpartition(keys, k - 1)[:k] if k < len(keys) else np.arange(len(keys))
+        top = top[np.argsort(keys[top])]
+        return [
+            AutocompleteHit(
+                product_id=int(self.product_ids[rows[i]]),
+                name=self.names[rows[i]],
+                sales=float(self.sales[rows[i]]),
+                score=round(float(scores[i]), 3),
+                match=MATCH_LABELS[int(kinds[i])],
+                segment=self.segments[rows[i]] if self.segments is not None else "",
+            )
+            for i in top
+        ]
@@ -0,0 +1,411 @@
+"""
+Product Retrieval - serviço único (in-process) de busca de produtos
+
+Antes a busca de produtos existia quatro vezes, cada uma com índice e
+aquecimento próprios: `buscar_produtos_inteligente` (FAISS + Gemini, caminho
+Windows fixo, LIKE no parquet), `ProductSearchService.search_deep` (Whoosh
+aberto a cada query), `WhooshBM25IndexAdapter` e `transfers.search_products`
+(ILIKE linha a linha). Agora todos usam este serviço:
+
+- Um snapshot por versão do catálogo (versão = tamanho + mtime do parquet,
+  verificada no máximo a cada `version_check_seconds`): produtos distintos,
+  atributos e um `BM25Index` montados uma única vez
+- Perna densa opcional (embeddings via EmbeddingPipeline + `ANNIndex`),
+  construída em background e persistida por versão; até ficar pronta, as
+  buscas seguem só com BM25
+- Fusão RRF, LRU de query -> resultados por versão e orçamento de latência:
+  a perna densa que estourar o orçamento é descartada naquela query (o
+  resultado degradado não entra no cache)
+- `match_attribute` resolve filtros "contém" (segmento/grupo/fabricante)
+  contra os valores distintos, para o SQL filtrar por igualdade (IN) em vez
+  de ILIKE em cada linha
+- `autocomplete` (typeahead por prefixo/trigramas, ordenado por vendas) usa
+  um `ProductAutocompleteIndex` montado sob demanda no mesmo snapshot
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import duckdb
+import numpy as np
+
+from backend.app.config.settings import settings
+from backend.app.core.rag.ann_index import ANNIndex
+from backend.app.core.rag.bm25_index import BM25Index
+from backend.app.core.rag.product_autocomplete import AutocompleteHit, ProductAutocompleteIndex
+from backend.application.services.pt_br_normalizer import PTBRNormalizer
+
+logger = logging.getLogger(__name__)
+
+ATTRIBUTE_COLUMNS = ("NOMESEGMENTO", "NOMEGRUPO", "NOMECATEGORIA", "NOMEFABRICANTE", "MARCA")
+EMBEDDING_MODEL = "models/embedding-001"
+RRF_K = 60
+
+
+@dataclass(frozen=True)
+class ProductHit:
+    product_id: int
+    score: float
+    source: str  # "bm25" | "dense" | "hybrid"
+
+
+def catalog_version(parquet_path: Path) -> str:
+    """Identifica a versão dos dados sem ler o arquivo."""
+    stat = Path(parquet_path).stat()
+    return f"{Path(parquet_path).stem}-{stat.st_size}-{stat.st_mtime_ns}"
+
+
+@dataclass
+class ProductCatalogSnapshot:
+    """Produtos distintos de uma versão do catálogo + índice BM25 (imutável após o build)."""
+
+    version: str
+    product_ids: np.ndarray
+    names: List[str]
+    attributes: Dict[str, List[str]]
+    lexical: BM25Index
+    sales: Optional[np.ndarray] = None  # VENDA_30DD somada entre as UNEs
+    _row: Dict[int, int] = field(default_factory=dict)
+    _distinct: Dict[str, List[str]] = field(default_factory=dict)
+    _autocomplete: Optional[ProductAutocompleteIndex] = None
+
+    def __post_init__(self) -> None:
+        self._row = {int(pid): i for i, pid in enumerate(self.product_ids)}
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    def embedding_text(self, row: int) -> str:
+        # Mesmo formato do antigo FAISS de produtos: o EmbeddingStore existente é reaproveitado
+        return f"{self.product_ids[row]} | {self.names[row]}"
+
+    def describe(self, product_id: int) -> Optional[Dict[str, Any]]:
+        row = self._row.get(int(product_id))
+        if row is None:
+            return None
+        info = {"product_id": int(product_id), "nome": self.names[row]}
+        info.update({col.lower(): values[row] for col, values in self.attributes.items()})
+        return info
+
+    def distinct_values(self, column: str) -> List[str]:
+        values = self._distinct.get(column)
+        if values is None:
+            values = sorted({v for v in self.attributes.get(column, []) if v})
+            self._distinct[column] = values
+        return values
+
+    def autocomplete_index(self) -> ProductAutocompleteIndex:
+        if self._autocomplete is None:
+            self._autocomplete = ProductAutocompleteIndex(
+                self.product_ids, self.names, self.sales, self.attributes.get("NOMESEGMENTO")
+            )
+        return self._autocomplete
+
+    @classmethod
+    def from_parquet(cls, parquet_path: Path, version: str) -> "ProductCatalogSnapshot":
+        con = duckdb.connect(":memory:")
+        try:
+            source = f"read_parquet('{Path(parquet_path).as_posix()}')"
+            columns = {row[0] for row in con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()}
+            attrs = [c for c in ATTRIBUTE_COLUMNS if c in columns]
+            select = ", ".join(
+                ["COALESCE(ANY_VALUE(CAST(NOME AS VARCHAR)), '') AS NOME" if "NOME" in columns else "'' AS NOME"]
+                + [f"COALESCE(ANY_VALUE(CAST({c} AS VARCHAR)), '') AS {c}" for c in attrs]
+                + ["COALESCE(SUM(TRY_CAST(VENDA_30DD AS DOUBLE)), 0) AS sales" if "VENDA_30DD" in columns else "0.0 AS sales"]
+            )
+            rows = con.execute(f"""
+                SELECT TRY_CAST(PRODUTO AS BIGINT) AS product_id, {select}
+                FROM {source}
+                WHERE TRY_CAST(PRODUTO AS BIGINT) IS NOT NULL
+                GROUP BY 1
+                ORDER BY 1
+            """).fetchnumpy()
+        finally:
+            con.close()
+
+        product_ids = np.asarray(rows["product_id"], dtype=np.int64)
+        names = [str(v) for v in rows["NOME"]]
+        attributes = {c: [str(v) for v in rows[c]] for c in attrs}
+        sales = np.asarray(rows["sales"], dtype=np.float64)
+        lexical = BM25Index(PTBRNormalizer.tokenize, idf="lucene")
+        for i, pid in enumerate(product_ids):
+            lexical.add(i, " ".join([str(pid), names[i], *(attributes[c][i] for c in attrs)]))
+        return cls(version, product_ids, names, attributes, lexical, sales)
+
+
+class ProductRetrievalService:
+    """Busca de produtos compartilhada (BM25 + densa opcional) com cache e orçamento de latência."""
+
+    def __init__(
+        self,
+        parquet_path: str,
+        embeddings: Any = None,
+        cache_dir: Optional[str] = None,
+        cache_size: int = 1024,
+        latency_budget_ms: float = 800,
+        version_check_seconds: float = 30,
+    ):
+        self.parquet_path = Path(parquet_path)
+        self.embeddings = embeddings  # langchain Embeddings (embed_documents/embed_query)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.cache_size = cache_size
+        self.latency_budget_s = latency_budget_ms / 1000
+        self.version_check_seconds = version_check_seconds
+
+        self._snapshot: Optional[ProductCatalogSnapshot] = None
+        self._checked_at = 0.0
+        self._dense: Optional[ANNIndex] = None
+        self._dense_version: Optional[str] = None
+        self._dense_building = False
+        self._cache: "OrderedDict[Tuple, List[ProductHit]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="product-search")
+        self._stats = {"queries": 0, "cache_hits": 0, "dense_timeouts": 0, "builds": 0}
+
+    # ------------------------------------------------------------------
+    # Versão / aquecimento
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> ProductCatalogSnapshot:
+        """Snapshot da versão atual; remonta só quando o parquet muda."""
+        now = time.monotonic()
+        snap = self._snapshot
+        if snap is not None and now - self._checked_at < self.version_check_seconds:
+            return snap
+        with self._lock:
+            version = catalog_version(self.parquet_path)
+            self._checked_at = time.monotonic()
+            if self._snapshot is None or self._snapshot.version != version:
+                start = time.perf_counter()
+                self._snapshot = ProductCatalogSnapshot.from_parquet(self.parquet_path, version)
+                self._cache.clear()
+                self._stats["builds"] += 1
+                logger.info(
+                    f"[OK] Índice de produtos {version}: {len(self._snapshot)} produtos "
+                    f"em {time.perf_counter() - start:.1f}s"
+                )
+            return self._snapshot
+
+    def warm(self) -> None:
+        snap = self.snapshot()
+        with self._lock:
+            snap.autocomplete_index()
+        self._ensure_dense(snap)
+
+    def invalidate(self) -> None:
+        """Descarta snapshot, índice denso em memória e cache (ex.: dados atualizados)."""
+        with self._lock:
+            self._snapshot = None
+            self._dense = None
+            self._dense_version = None
+            self._cache.clear()
+
+    def _dense_dir(self, version: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / "product_ann" / re.sub(r"[^A-Za-z0-9_.-]", "_", version)
+
+    def _ensure_dense(self, snap: ProductCatalogSnapshot) -> bool:
+        """True se o índice denso da versão está pronto; senão agenda a construção."""
+        if self.embeddings is None:
+            return False
+        with self._lock:
+            if self._dense_version == snap.version and self._dense is not None:
+                return True
+            if self._dense_building:
+                return False
+            self._dense_building = True
+        self._pool.submit(self._build_dense, snap)
+        return False
+
+    def _build_dense(self, snap: ProductCatalogSnapshot) -> None:
+        try:
+            directory = self._dense_dir(snap.version)
+            index = ANNIndex.load(directory) if directory else None
+            if index is None:
+                from backend.app.core.rag.embedding_pipeline import EmbeddingPipeline, LangChainEmbeddingBackend
+                from backend.app.core.rag.embedding_store import EmbeddingStore
+
+                texts = [snap.embedding_text(i) for i in range(len(snap))]
+                store_dir = self.cache_dir / "product_texts" if self.cache_dir else None
+                pipeline = EmbeddingPipeline(
+                    LangChainEmbeddingBackend(self.embeddings, model_name=EMBEDDING_MODEL),
+                    EmbeddingStore(store_dir, EMBEDDING_MODEL).load(),
+                    batch_size=settings.EMBEDDING_BATCH_SIZE,
+                    max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY,
+                    max_retries=settings.EMBEDDING_MAX_RETRIES,
+                )
+                result = pipeline.run(texts)
+                if not result.complete:
+                    logger.warning(f"[WARNING] Índice denso de produtos incompleto ({result.failed} falharam)")
+                    return
+                vectors = pipeline.vectors_for(texts)
+                index = ANNIndex(
+                    vectors.shape[1], settings.ANN_HNSW_M, settings.ANN_EF_CONSTRUCTION, settings.ANN_EF_SEARCH
+                )
+                index.upsert(snap.product_ids.tolist(), vectors)
+                if directory:
+                    index.save(directory, {"catalog_version": snap.version, "model": EMBEDDING_MODEL})
+            with self._lock:
+                if self._snapshot is None or self._snapshot.version == snap.version:
+                    self._dense, self._dense_version = index, snap.version
+            logger.info(f"[OK] Índice denso de produtos pronto ({len(index)} vetores)")
+        except Exception as e:
+            logger.error(f"Falha ao montar índice denso de produtos: {e}")
+        finally:
+            with self._lock:
+                self._dense_building = False
+
+    # ------------------------------------------------------------------
+    # Busca
+    # ------------------------------------------------------------------
+
+    def _dense_search(self, index: ANNIndex, query: str, top_k: int) -> List[Tuple[int, float]]:
+        return index.search(self.embeddings.embed_query(query), top_k)
+
+    def search(self, query: str, top_k: int = 10, mode: str = "hybrid") -> List[ProductHit]:
+        """
+        Top-k produtos para `query`. `mode`: "hybrid" (BM25 + densa com RRF),
+        "lexical" ou "dense" (cai para BM25 enquanto o índice denso não está pronto).
+        """
+        query = (query or "").strip()
+        if not query or top_k <= 0:
+            return []
+        snap = self.snapshot()
+        key = (snap.version, mode, top_k, " ".join(PTBRNormalizer.tokenize(query, remove_stopwords=False)))
+        self._stats["queries"] += 1
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._stats["cache_hits"] += 1
+                return list(cached)
+
+        deadline = time.monotonic() + self.latency_budget_s
+        dense_future = None
+        if mode != "lexical" and self._ensure_dense(snap):
+            dense_future = self._pool.submit(self._dense_search, self._dense, query, top_k * 2)
+
+        lexical = []
+        if mode != "dense" or dense_future is None:
+            lexical = [(int(snap.product_ids[row]), score) for row, score in snap.lexical.search(query, top_k * 2)]
+
+        dense, degraded = [], False
+        if dense_future is not None:
+            try:
+                dense = dense_future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeout:
+                degraded = True
+                self._stats["dense_timeouts"] += 1
+                logger.warning(f"[WARNING] Busca densa excedeu {self.latency_budget_s * 1000:.0f}ms; usando só BM25")
+            except Exception as e:
+                degraded = True
+                logger.warning(f"[WARNING] Busca densa falhou: {e}")
+            if degraded and not lexical:
+                lexical = [(int(snap.product_ids[row]), score) for row, score in snap.lexical.search(query, top_k * 2)]
+
+        hits = self._fuse(lexical, dense, top_k)
+        if not degraded:
+            with self._lock:
+                self._cache[key] = hits
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return list(hits)
+
+    @staticmethod
+    def _fuse(lexical: List[Tuple[int, float]], dense: List[Tuple[int, float]], top_k: int) -> List[ProductHit]:
+        if not dense:
+            return [ProductHit(pid, score, "bm25") for pid, score in lexical[:top_k]]
+        if not lexical:
+            return [ProductHit(pid, score, "dense") for pid, score in dense[:top_k]]
+        scores: Dict[int, float] = {}
+        for results in (lexical, dense):
+            for rank, (pid, _) in enumerate(results, start=1):
+                scores[pid] = scores.get(pid, 0.0) + 1 / (RRF_K + rank)
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
+        return [ProductHit(pid, score, "hybrid") for pid, score in ranked]
+
+    def match_attribute(self, column: str, fragment: str) -> List[str]:
+        """Valores distintos de `column` que contêm `fragment` (equivalente a ILIKE '%fragment%')."""
+        needle = (fragment or "").lower()
+        return [v for v in self.snapshot().distinct_values(column) if needle in v.lower()]
+
+    def autocomplete(
+        self,
+        query: str,
+        limit: int = 10,
+        segments: Optional[List[str]] = None,
+        prefix: bool = True,
+        fuzzy: bool = True,
+    ) -> List[AutocompleteHit]:
+        """Typeahead de produtos por nome/código (ver `ProductAutocompleteIndex.search`)."""
+        snap = self.snapshot()
+        if snap._autocomplete is None:
+            with self._lock:
+                snap.autocomplete_index()
+        return snap.autocomplete_index().search(query, limit, segments=segments, prefix=prefix, fuzzy=fuzzy)
+
+    def is_warm(self) -> bool:
+        """True se já há snapshot em memória (consultas não vão disparar a leitura do parquet)."""
+        return self._snapshot is not None
+
+    def describe(self, product_ids: List[int]) -> List[Dict[str, Any]]:
+        snap = self.snapshot()
+        return [d for d in (snap.describe(pid) for pid in product_ids) if d is not None]
+
+    def get_stats(self) -> Dict[str, Any]:
+        snap = self._snapshot
+        return {
+            **self._stats,
+            "version": snap.version if snap else None,
+            "products": len(snap) if snap else 0,
+            "dense_ready": self._dense is not None and snap is not None and self._dense_version == snap.version,
+            "cached_queries": len(self._cache),
+        }
+
+
+# Singleton (compartilhado pela tool semântica, catálogo e transferências)
+_product_retrieval: Optional[ProductRetrievalService] = None
+_product_retrieval_lock = threading.Lock()
+
+
+def _default_embeddings() -> Any:
+    if not settings.GEMINI_API_KEY:
+        return None
+    try:
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        return GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL, google_api_key=settings.GEMINI_API_KEY)
+    except Exception as e:
+        logger.warning(f"[WARNING] Embeddings indisponíveis; busca de produtos só com BM25: {e}")
+        return None
+
+
+def get_product_retrieval_service() -> ProductRetrievalService:
+    global _product_retrieval
+    if _product_retrieval is None:
+        with _product_retrieval_lock:
+            if _product_retrieval is None:
+                _product_retrieval = ProductRetrievalService(
+                    settings.PARQUET_DATA_PATH,
+                    embeddings=_default_embeddings(),
+                    cache_dir="backend/data/cache/embeddings",
+                    cache_size=settings.PRODUCT_SEARCH_CACHE_SIZE,
+                    latency_budget_ms=settings.PRODUCT_SEARCH_LATENCY_BUDGET_MS,
+                    version_check_seconds=settings.PRODUCT_SEARCH_VERSION_CHECK_SECONDS,
+                )
+    return _product_retrieval
+
+
+def get_warm_product_retrieval_service() -> Optional[ProductRetrievalService]:
+    """Serviço já aquecido, ou None (para caminhos que não podem esperar a leitura do parquet)."""
+    service = _product_retrieval
+    return service if service is not None and service.is_warm() else None
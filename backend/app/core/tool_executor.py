@@ -0,0 +1,359 @@
+"""
+Tool Executor - agendador de execução de ferramentas com pools separados
+
+Antes toda chamada de ferramenta (de todas as conversas) ia para o executor
+padrão do loop via `asyncio.to_thread`. Ferramentas pesadas em pandas
+(`sugerir_transferencias_automaticas`, `gerar_dashboard_executivo`,
+`analise_correlacao_produtos`) ocupavam todas as threads e as leves (DuckDB,
+dicionário de dados) e as chamadas LLM ficavam na fila atrás delas.
+
+Agora:
+- Dois pools de threads: "cpu" (estreito, ~núcleos) e "io" (largo: DuckDB
+  libera o GIL, pesquisa externa espera rede)
+- Cada ferramenta tem um `ToolExecutionProfile` declarado no registro
+  (`TOOL_EXECUTION_PROFILES` em tool_registry): pool, limite de execuções
+  simultâneas e se pode rodar em processo separado
+- Acima do limite da ferramenta a chamada espera numa fila própria, sem
+  ocupar thread do pool; o tempo de fila vai para
+  `caculinha_tool_queue_seconds{pool, tool}`
+- Opcional (TOOL_EXECUTOR_PROCESS_POOL_ENABLED): ferramentas com
+  `process=True` executam num ProcessPoolExecutor (spawn), sem disputar o
+  GIL com o servidor. A thread do pool "cpu" só aguarda o resultado.
+
+ContextVars (usuário/segmentos, token de cancelamento) são copiadas para a
+thread; no processo filho o escopo do usuário é recriado a partir de
+(role, segmentos).
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+POOLS = ("cpu", "io")
+
+
+@dataclass(frozen=True)
+class ToolExecutionProfile:
+    """Como uma ferramenta executa: pool, limite de concorrência e elegibilidade a processo."""
+
+    pool: str = "io"
+    max_concurrency: Optional[int] = None  # None = limitado só pelo pool
+    process: bool = False  # CPU pesado em pandas, argumentos/resultado serializáveis
+
+
+DEFAULT_PROFILE = ToolExecutionProfile()
+
+
+def invoke_tool(tool_obj: Any, tool_name: str, args: Dict[str, Any]) -> Any:
+    """Chama LangChain tools (`invoke`) e callables simples com os mesmos argumentos."""
+    if hasattr(tool_obj, "invoke"):
+        return tool_obj.invoke(args)
+    if callable(tool_obj):
+        return tool_obj(**args)
+    raise TypeError(f"Ferramenta '{tool_name}' não é invocável")
+
+
+def _import_target(tool_obj: Any, tool_name: str) -> Optional[Tuple[str, str]]:
+    """(módulo, atributo) que reimporta a mesma ferramenta no processo filho, ou None."""
+    func = getattr(tool_obj, "func", None) or tool_obj
+    module_name = getattr(func, "__module__", None)
+    module = sys.modules.get(module_name) if module_name else None
+    if module is not None and getattr(module, tool_name, None) is tool_obj:
+        return module_name, tool_name
+    return None
+
+
+def _current_user_scope() -> Optional[Tuple[str, list]]:
+    try:
+        from backend.app.core.context import get_current_user_context
+
+        user = get_current_user_context()
+        if user is None:
+            return None
+        return str(user.role), list(user.segments_list)
+    except Exception:
+        return None
+
+
+def _invoke_in_process(target: Tuple[str, str], args: Dict[str, Any], user_scope: Optional[Tuple[str, list]]) -> Any:
+    """Ponto de entrada no processo filho: recria o escopo do usuário e chama a ferramenta."""
+    if user_scope is not None:
+        from backend.app.core.context import set_current_user_context
+        from backend.app.infrastructure.database.models import User
+
+        role, segments = user_scope
+        set_current_user_context(User(username="tool_worker", role=role, allowed_segments=json.dumps(segments)))
+
+    module_name, attr = target
+    tool_obj = getattr(importlib.import_module(module_name), attr)
+    return invoke_tool(tool_obj, attr, args)
+
+
+def _record_queue_time(pool: str, tool_name: str, seconds: float) -> None:
+    try:
+        from backend.app.core.observability.metrics import TOOL_QUEUE_SECONDS
+        TOOL_QUEUE_SECONDS.labels(pool=pool, tool=tool_name).observe(seconds)
+    except Exception:
+        pass
+
+
+def _set_inflight(pool: str, value: int) -> None:
+    try:
+        from backend.app.core.observability.metrics import TOOL_EXECUTOR_INFLIGHT
+        TOOL_EXECUTOR_INFLIGHT.labels(pool=pool).set(value)
+    except Exception:
+        pass
+
+
+class _Job:
+    __slots__ = ("future", "fn", "args", "context", "enqueued_at")
+
+    def __init__(self, fn: Callable[..., Any], args: Tuple[Any, ...]):
+        self.future: Future = Future()
+        self.fn = fn
+        self.args = args
+        self.context = contextvars.copy_context()
+        self.enqueued_at = time.monotonic()
+
+
+class ToolExecutor:
+    """
+    Agendador thread-safe (independe de event loop): `submit` devolve um
+    concurrent.futures.Future; `run` é o equivalente awaitable.
+    """
+
+    def __init__(
+        self,
+        profiles: Optional[Mapping[str, ToolExecutionProfile]] = None,
+        cpu_workers: int = 4,
+        io_workers: int = 16,
+        process_pool_enabled: bool = False,
+        process_workers: int = 2,
+    ):
+        if profiles is None:
+            from backend.app.core.tools.tool_registry import TOOL_EXECUTION_PROFILES
+            profiles = TOOL_EXECUTION_PROFILES
+        self._profiles = dict(profiles)
+        self._workers = {"cpu": max(1, cpu_workers), "io": max(1, io_workers)}
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self._process_pool_enabled = process_pool_enabled
+        self._process_workers = max(1, process_workers)
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._running: Dict[str, int] = {}
+        self._waiting: Dict[str, Deque[_Job]] = {}
+        self._inflight = {pool: 0 for pool in POOLS}
+        self._stats = {"submitted": 0, "queued": 0, "process": 0}
+
+    def profile(self, tool_name: str) -> ToolExecutionProfile:
+        return self._profiles.get(tool_name, DEFAULT_PROFILE)
+
+    def _pool(self, name: str) -> ThreadPoolExecutor:
+        pool = self._pools.get(name)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(name)
+                if pool is None:
+                    pool = ThreadPoolExecutor(max_workers=self._workers[name], thread_name_prefix=f"tool-{name}")
+                    self._pools[name] = pool
+        return pool
+
+    def submit(self, tool_name: str, fn: Callable[..., Any], *args: Any) -> Future:
+        """Agenda `fn(*args)` no pool da ferramenta, respeitando o limite dela."""
+        job = _Job(fn, args)
+        cap = self.profile(tool_name).max_concurrency
+        with self._lock:
+            self._stats["submitted"] += 1
+            if cap is not None and self._running.get(tool_name, 0) >= cap:
+                self._stats["queued"] += 1
+                self._waiting.setdefault(tool_name, deque()).append(job)
+                return job.future
+            self._running[tool_name] = self._running.get(tool_name, 0) + 1
+        self._dispatch(tool_name, job)
+        return job.future
+
+    async def run(self, tool_name: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """Versão awaitable de `submit`; cancelar a task descarta a chamada ainda na fila."""
+        future = self.submit(tool_name, fn, *args)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # wrap_future só repassa o cancelamento na próxima iteração do loop;
+            # até lá um `_release` poderia tirar a chamada da fila e executá-la
+            self._discard(tool_name, future)
+            raise
+
+    def _discard(self, tool_name: str, future: Future) -> None:
+        """Remove da fila a chamada de `future` (se ainda estiver lá) e a cancela."""
+        with self._lock:
+            waiting = self._waiting.get(tool_name)
+            if waiting:
+                for job in waiting:
+                    if job.future is future:
+                        waiting.remove(job)
+                        break
+            future.cancel()
+
+    def _dispatch(self, tool_name: str, job: _Job) -> None:
+        pool_name = self.profile(tool_name).pool
+        if pool_name not in self._workers:
+            pool_name = "io"
+        try:
+            self._pool(pool_name).submit(self._run_job, pool_name, tool_name, job)
+        except RuntimeError as e:  # pool encerrado
+            if job.future.set_running_or_notify_cancel():
+                job.future.set_exception(e)
+            self._release(tool_name)
+
+    def _run_job(self, pool_name: str, tool_name: str, job: _Job) -> None:
+        try:
+            if not job.future.set_running_or_notify_cancel():
+                return  # cancelada enquanto esperava
+            _record_queue_time(pool_name, tool_name, time.monotonic() - job.enqueued_at)
+            with self._lock:
+                self._inflight[pool_name] += 1
+                inflight = self._inflight[pool_name]
+            _set_inflight(pool_name, inflight)
+            try:
+                result = job.context.run(job.fn, *job.args)
+            except BaseException as e:
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+            finally:
+                with self._lock:
+                    self._inflight[pool_name] -= 1
+                    inflight = self._inflight[pool_name]
+                _set_inflight(pool_name, inflight)
+        finally:
+            self._release(tool_name)
+
+    def _release(self, tool_name: str) -> None:
+        """Libera a vaga da ferramenta e despacha a próxima chamada da fila dela."""
+        with self._lock:
+            waiting = self._waiting.get(tool_name)
+            next_job = waiting.popleft() if waiting else None
+            if next_job is None:
+                self._running[tool_name] = max(0, self._running.get(tool_name, 1) - 1)
+        if next_job is not None:
+            self._dispatch(tool_name, next_job)
+
+    def invoke(self, tool_obj: Any, tool_name: str, args: Dict[str, Any]) -> Any:
+        """
+        Chama a ferramenta; as com `process=True` vão para o pool de processos
+        quando habilitado (fallback para a thread atual se não for possível).
+        """
+        if not (self._process_pool_enabled and self.profile(tool_name).process):
+            return invoke_tool(tool_obj, tool_name, args)
+
+        target = _import_target(tool_obj, tool_name)
+        if target is None:
+            return invoke_tool(tool_obj, tool_name, args)
+
+        from backend.app.core.cancellation import current_cancellation_token
+
+        try:
+            future = self._get_process_pool().submit(_invoke_in_process, target, args, _current_user_scope())
+        except Exception as e:
+            logger.warning(f"[TOOL EXECUTOR] Pool de processos indisponível ({e}); executando {tool_name} em thread")
+            return invoke_tool(tool_obj, tool_name, args)
+
+        with self._lock:
+            self._stats["process"] += 1
+        token = current_cancellation_token()
+        remove = token.add_callback(future.cancel) if token is not None else None
+        try:
+            return future.result()
+        except concurrent.futures.CancelledError:
+            if token is not None:
+                token.raise_if_cancelled()
+            raise
+        except concurrent.futures.process.BrokenProcessPool as e:
+            logger.warning(f"[TOOL EXECUTOR] Pool de processos quebrado ({e}); executando {tool_name} em thread")
+            with self._lock:
+                self._process_pool = None
+            return invoke_tool(tool_obj, tool_name, args)
+        finally:
+            if remove is not None:
+                remove()
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            with self._lock:
+                if self._process_pool is None:
+                    import multiprocessing
+
+                    # spawn: não herda threads do DuckDB/httpx do processo pai
+                    self._process_pool = ProcessPoolExecutor(
+                        max_workers=self._process_workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._process_pool
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "inflight": dict(self._inflight),
+                "waiting": {name: len(q) for name, q in self._waiting.items() if q},
+                "workers": dict(self._workers),
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            pools = list(self._pools.values())
+            process_pool = self._process_pool
+            self._pools.clear()
+            self._process_pool = None
+        for pool in pools:
+            pool.shutdown(wait=wait, cancel_futures=True)
+        if process_pool is not None:
+            process_pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_executor: Optional[ToolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_tool_executor() -> ToolExecutor:
+    """Retorna o ToolExecutor do processo (pools criados sob demanda)."""
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                from backend.app.config.settings import settings
+
+                cpu_workers = settings.TOOL_EXECUTOR_CPU_WORKERS or min(4, os.cpu_count() or 1)
+                _executor = ToolExecutor(
+                    cpu_workers=cpu_workers,
+                    io_workers=settings.TOOL_EXECUTOR_IO_WORKERS,
+                    process_pool_enabled=settings.TOOL_EXECUTOR_PROCESS_POOL_ENABLED,
+                    process_workers=settings.TOOL_EXECUTOR_PROCESS_WORKERS or cpu_workers,
+                )
+                logger.info(
+                    f"[OK] Tool executor: cpu={cpu_workers} io={settings.TOOL_EXECUTOR_IO_WORKERS} "
+                    f"processos={'on' if settings.TOOL_EXECUTOR_PROCESS_POOL_ENABLED else 'off'}"
+                )
+    return _executor
+
+
+def shutdown_tool_executor(wait: bool = False) -> None:
+    global _executor
+
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
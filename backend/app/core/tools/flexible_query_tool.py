@@ -294,7 +294,7 @@ def consultar_dados_flexivel(
             logger.warning("[SQL VALIDATOR] Módulo não disponível, executando sem validação")
         
         # 3. Executar
-        result = cache._adapter.query(sql_query)
+        result = cache.query(sql_query)
         
         # Converter para DataFrame Pandas para manter compatibilidade com serialização existente
         if hasattr(result, 'to_pandas'):
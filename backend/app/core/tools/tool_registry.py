@@ -0,0 +1,309 @@
+"""
+Tool Registry - registro de ferramentas do agente compartilhado pelo processo
+
+Antes cada `CaculinhaBIAgent` (um por role no ChatServiceV3) reimportava as
+ferramentas opcionais, recriava a busca de catálogo, refiltrava com
+`ToolPermissionManager` e reconvertia tudo para function declarations.
+
+Agora:
+- As ferramentas são montadas uma única vez (lazy, na primeira construção)
+- As declarations no formato do provedor são pré-calculadas por ferramenta
+- A visão de cada role é só um subconjunto de índices, memorizado por role
+
+O registro é imutável: para trocar o conjunto de ferramentas use
+`reset_tool_registry()` (testes) e deixe a próxima chamada reconstruir.
+
+`TOOL_EXECUTION_PROFILES` declara, por ferramenta, em que pool do
+`ToolExecutor` ela roda e quantas execuções simultâneas são permitidas.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from backend.app.config.settings import settings
+from backend.app.core.tool_executor import ToolExecutionProfile
+from backend.app.core.utils.tool_scoping import ToolPermissionManager
+
+logger = logging.getLogger(__name__)
+
+# Perfil de execução por ferramenta (ausente = pool "io", sem limite próprio).
+# "cpu": pandas/numpy seguram o GIL; limites baixos evitam que uma ferramenta
+# pesada ocupe o pool inteiro. process=True: elegível ao pool de processos.
+TOOL_EXECUTION_PROFILES: Dict[str, ToolExecutionProfile] = {
+    # Pesadas em pandas (varrem o Parquet inteiro)
+    "sugerir_transferencias_automaticas": ToolExecutionProfile(pool="cpu", max_concurrency=2, process=True),
+    "gerar_dashboard_executivo": ToolExecutionProfile(pool="cpu", max_concurrency=2, process=True),
+    "analise_correlacao_produtos": ToolExecutionProfile(pool="cpu", max_concurrency=2, process=True),
+    "analise_regressao_vendas": ToolExecutionProfile(pool="cpu", max_concurrency=2, process=True),
+    "detectar_anomalias_vendas": ToolExecutionProfile(pool="cpu", max_concurrency=2, process=True),
+    "analisar_anomalias": ToolExecutionProfile(pool="cpu", max_concurrency=2, process=True),
+    "prever_demanda": ToolExecutionProfile(pool="cpu", max_concurrency=2, process=True),
+    "alocar_estoque_lojas": ToolExecutionProfile(pool="cpu", max_concurrency=2, process=True),
+    "encontrar_rupturas_criticas": ToolExecutionProfile(pool="cpu", max_concurrency=3),
+    "analisar_produto_todas_lojas": ToolExecutionProfile(pool="cpu", max_concurrency=3),
+    "gerar_grafico_universal_v2": ToolExecutionProfile(pool="cpu", max_concurrency=4),
+    # Leves / IO (DuckDB libera o GIL; pesquisa externa espera rede)
+    "consultar_dados_flexivel": ToolExecutionProfile(pool="io"),
+    "consultar_dicionario_dados": ToolExecutionProfile(pool="io"),
+    "pesquisar_precos_concorrentes": ToolExecutionProfile(pool="io", max_concurrency=4),
+}
+
+
+def tool_name(tool: Any) -> Optional[str]:
+    """Nome da ferramenta para LangChain tools e callables simples."""
+    return getattr(tool, "name", None) or getattr(tool, "__name__", None)
+
+
+def clean_tool_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Recursively cleans Pydantic JSON Schema for Gemini compatibility.
+    """
+    if not isinstance(schema, dict):
+        return schema
+
+    new_schema = schema.copy()
+
+    # Remove incompatible keys
+    for key in ("title", "default", "additionalProperties"):
+        new_schema.pop(key, None)
+
+    # Handle anyOf
+    if "anyOf" in new_schema:
+        options = new_schema.pop("anyOf")
+        non_null_options = [opt for opt in options if opt.get("type") != "null"]
+
+        # Se houver múltiplos tipos primitivos (ex: boolean|string), usamos string
+        # para evitar validação estrita entre providers (Groq/Gemini).
+        primitive_types = {
+            opt.get("type")
+            for opt in non_null_options
+            if isinstance(opt, dict) and opt.get("type") in {"string", "boolean", "integer", "number"}
+        }
+        if len(primitive_types) > 1:
+            new_schema["type"] = "string"
+        else:
+            valid_option = non_null_options[0] if non_null_options else None
+            if valid_option:
+                new_schema.update(clean_tool_schema(valid_option))
+            else:
+                new_schema["type"] = "string"
+
+    # Recurse
+    if "properties" in new_schema:
+        new_schema["properties"] = {
+            prop: clean_tool_schema(prop_schema) for prop, prop_schema in new_schema["properties"].items()
+        }
+
+    if "items" in new_schema:
+        new_schema["items"] = clean_tool_schema(new_schema["items"])
+
+    return new_schema
+
+
+def tool_to_declaration(tool: Any) -> Optional[Dict[str, Any]]:
+    """Function declaration (formato Gemini/OpenAI-like) de uma ferramenta, ou None sem nome."""
+    name = tool_name(tool)
+    description = getattr(tool, "description", None) or getattr(tool, "__doc__", "") or ""
+    if not name:
+        logger.warning(f"Skipping tool without resolvable name: {type(tool)}")
+        return None
+
+    # LangChain tools expõem o schema; callables simples ficam com objeto vazio
+    schema = {}
+    if hasattr(tool, "get_input_schema"):
+        try:
+            schema = tool.get_input_schema().model_json_schema()
+        except AttributeError:
+            if getattr(tool, "args_schema", None) and hasattr(tool.args_schema, "schema"):
+                schema = tool.args_schema.schema()
+    elif getattr(tool, "args_schema", None) and hasattr(tool.args_schema, "schema"):
+        schema = tool.args_schema.schema()
+
+    cleaned = clean_tool_schema(schema)
+    return {
+        "name": str(name),
+        "description": str(description).strip(),
+        "parameters": {
+            "type": "object",
+            "properties": cleaned.get("properties", {}),
+            "required": cleaned.get("required", []),
+        },
+    }
+
+
+def convert_tools_to_declarations(tools: Sequence[Any]) -> Dict[str, List[Dict[str, Any]]]:
+    declarations = [d for d in (tool_to_declaration(t) for t in tools) if d is not None]
+    return {"function_declarations": declarations}
+
+
+@dataclass(frozen=True)
+class RoleToolView:
+    """Subconjunto do registro visível para um role."""
+
+    role: str
+    indices: Tuple[int, ...]
+    tools: Tuple[Any, ...]
+    declarations: Dict[str, List[Dict[str, Any]]]
+
+
+class ToolRegistry:
+    """Conjunto imutável de ferramentas com declarations pré-calculadas."""
+
+    def __init__(self, tools: Sequence[Any]):
+        tools = [t for t in tools if t is not None]
+        self.tools: Tuple[Any, ...] = tuple(tools)
+        self.declarations: Tuple[Optional[Dict[str, Any]], ...] = tuple(tool_to_declaration(t) for t in tools)
+        self._views: Dict[str, RoleToolView] = {}
+        self._lock = threading.Lock()
+
+    def view(self, role: str) -> RoleToolView:
+        """Visão do role (filtrada por ToolPermissionManager); calculada uma vez por role."""
+        key = (role or "viewer").lower()
+        cached = self._views.get(key)
+        if cached is not None:
+            return cached
+
+        allowed = {id(t) for t in ToolPermissionManager.get_tools_for_role(list(self.tools), user_role=key)}
+        indices = tuple(i for i, t in enumerate(self.tools) if id(t) in allowed)
+        view = RoleToolView(
+            role=key,
+            indices=indices,
+            tools=tuple(self.tools[i] for i in indices),
+            declarations={
+                "function_declarations": [self.declarations[i] for i in indices if self.declarations[i] is not None]
+            },
+        )
+        with self._lock:
+            return self._views.setdefault(key, view)
+
+    def __len__(self) -> int:
+        return len(self.tools)
+
+
+def _build_catalog_search_tool() -> Optional[Any]:
+    try:
+        from backend.app.core.tools.catalog_search_tool import create_catalog_search_tool
+        from backend.application.services.product_search_service import ProductSearchService
+        from backend.infrastructure.adapters.search.product_retrieval_index_adapter import ProductRetrievalIndexAdapter
+        from backend.infrastructure.adapters.search.vector_index_adapter import VectorIndexAdapter
+        from backend.infrastructure.adapters.search.hybrid_ranking_adapter import HybridRankingAdapter
+        from backend.infrastructure.adapters.repository.duckdb_catalog_repository import DuckDBCatalogRepository
+    except ImportError as e:
+        logger.warning(f"Catalog Search dependencies missing: {e}")
+        return None
+
+    try:
+        db_path = "backend/data/product_catalog.duckdb"
+
+        repo = DuckDBCatalogRepository(db_path)
+        vec = VectorIndexAdapter(
+            db_path,
+            hnsw_m=settings.ANN_HNSW_M,
+            ef_construction=settings.ANN_EF_CONSTRUCTION,
+            ef_search=settings.ANN_EF_SEARCH,
+            onnx_model_dir=settings.EMBEDDING_ONNX_MODEL_DIR,
+            onnx_model_file=settings.EMBEDDING_ONNX_MODEL_FILE,
+            onnx_threads=settings.EMBEDDING_ONNX_THREADS,
+            query_batch_window_ms=settings.EMBEDDING_QUERY_BATCH_WINDOW_MS,
+            query_max_batch=settings.EMBEDDING_QUERY_MAX_BATCH,
+            query_cache_size=settings.EMBEDDING_QUERY_CACHE_SIZE,
+        )
+        search_service = ProductSearchService(
+            ProductRetrievalIndexAdapter(repository=repo), vec, HybridRankingAdapter(repo), repo
+        )
+        tool = create_catalog_search_tool(search_service)
+        logger.info("[OK] Deep Catalog Search tool registered successfully")
+        return tool
+    except Exception as e:
+        logger.error(f"Failed to initialize Catalog Search tool: {e}")
+        return None
+
+
+def _build_optional_tools() -> List[Any]:
+    """Ferramentas com dependências pesadas (SciPy/StatsModels/Sklearn)."""
+    if settings.DEV_FAST_MODE:
+        logger.info("[DEV_FAST_MODE] Optional expensive tools disabled by default.")
+        return []
+
+    optional_tools: List[Any] = []
+    try:
+        from backend.app.core.tools.anomaly_detection import analisar_anomalias
+        optional_tools.append(analisar_anomalias)
+    except ImportError:
+        logger.warning("[WARNING] Anomaly Detection tools missing (dependency issue).")
+
+    try:
+        from backend.app.core.tools.purchasing_tools import alocar_estoque_lojas, calcular_eoq, prever_demanda
+        optional_tools.extend([calcular_eoq, prever_demanda, alocar_estoque_lojas])
+    except ImportError:
+        logger.warning("[WARNING] Purchasing tools missing (likely StatsModels/Torch issue).")
+
+    try:
+        from backend.app.core.tools.advanced_analytics_tool import (
+            analise_correlacao_produtos,
+            analise_regressao_vendas,
+            detectar_anomalias_vendas,
+        )
+        optional_tools.extend([analise_regressao_vendas, detectar_anomalias_vendas, analise_correlacao_produtos])
+        logger.info("[OK] Advanced Analytics tools loaded (Gemini 2.5 Pro STEM features)")
+    except ImportError as e:
+        logger.warning(f"[WARNING] Advanced Analytics tools missing (SciPy/Sklearn issue): {e}")
+
+    return optional_tools
+
+
+def build_default_tools() -> List[Any]:
+    """Ferramentas do CaculinhaBIAgent: core + busca de catálogo + opcionais."""
+    from backend.app.core.tools.metadata_tools import consultar_dicionario_dados
+    from backend.app.core.tools.une_tools import (
+        analisar_produto_todas_lojas,
+        calcular_abastecimento_une,
+        encontrar_rupturas_criticas,
+    )
+    from backend.app.core.tools.universal_chart_generator import gerar_grafico_universal_v2
+
+    try:
+        from backend.app.core.tools.flexible_query_tool import consultar_dados_flexivel
+    except (ImportError, OSError):
+        consultar_dados_flexivel = None
+    try:
+        from backend.app.core.tools.competitive_intelligence_tool import pesquisar_precos_concorrentes
+    except (ImportError, OSError):
+        pesquisar_precos_concorrentes = None
+
+    core_tools = [
+        consultar_dados_flexivel,  # Consulta genérica
+        gerar_grafico_universal_v2,  # Visualização
+        pesquisar_precos_concorrentes,  # Pesquisa concorrencial externa
+        calcular_abastecimento_une,  # Abastecimento
+        encontrar_rupturas_criticas,  # Rupturas
+        consultar_dicionario_dados,  # Schema discovery
+        analisar_produto_todas_lojas,  # Análise multi-loja
+        _build_catalog_search_tool(),  # Deep Catalog Search (BM25 + vetorial)
+    ]
+    return [t for t in core_tools if t is not None] + _build_optional_tools()
+
+
+_registry: Optional[ToolRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_tool_registry(builder: Callable[[], Sequence[Any]] = build_default_tools) -> ToolRegistry:
+    """Retorna o registro de ferramentas do processo (construído uma vez)."""
+    global _registry
+
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ToolRegistry(builder())
+                logger.info(f"[OK] Tool registry construído com {len(_registry)} ferramentas")
+    return _registry
+
+
+def reset_tool_registry() -> None:
+    global _registry
+
+    with _registry_lock:
+        _registry = None
@@ -260,7 +260,7 @@ def gerar_grafico_universal_v2(
         logger.info(f"[DUCKDB OPTIMIZATION] Executando SQL: {sql_query}")
         
         # 3. Executar via Adapter
-        result = cache._adapter.query(sql_query)
+        result = cache.query(sql_query)
         
         if hasattr(result, 'df'):
             df = result.df()
@@ -407,7 +407,7 @@ def gerar_grafico_universal_v2(
         logger.info(f"[DUCKDB AGGREGATION] Executando SQL: {full_sql}")
         
         # Executar
-        result = cache._adapter.query(full_sql)
+        result = cache.query(full_sql)
         
         if hasattr(result, 'df'):
             df_agg = result.df()
@@ -0,0 +1,276 @@
+"""
+Context Budget - Orçamento de tokens por rodada LLM
+
+Antes de cada chamada ao LLM o agente passa `messages` pelo ContextBudgeter,
+que devolve uma CÓPIA compactada (a lista original continua íntegra, pois o
+pós-processamento do agente lê chart_data/resultados das mensagens de função).
+
+Estratégia, em ordem, até caber no orçamento:
+1. Resultados de ferramenta acima de `tool_result_max_tokens` viram digests
+   tipados (amostra top-k + agregados numéricos + metadados)
+2. Histórico antigo da conversa é descartado (mais antigo primeiro)
+3. Digests mais agressivos (top-k reduzido) para resultados de turnos antigos
+4. Truncamento duro do conteúdo restante mais longo
+
+Estimativa de tokens: ~4 caracteres por token (mesma heurística de
+context_builder.py), suficiente para decisões de orçamento.
+"""
+
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Campos pesados que não agregam para o raciocínio do LLM (já entregues ao usuário)
+HEAVY_FIELDS = {"chart_data", "chart_spec", "figure", "plotly_json", "html"}
+
+
+def _record(report: "BudgetReport") -> None:
+    try:
+        from backend.app.core.observability.metrics import CONTEXT_BUDGET_TOKENS_SAVED_TOTAL
+        for action, saved in report.tokens_saved.items():
+            CONTEXT_BUDGET_TOKENS_SAVED_TOTAL.labels(action=action).inc(saved)
+    except Exception:
+        pass
+
+
+def estimate_tokens(value: Any) -> int:
+    """Estimativa rápida de tokens para string ou estrutura serializável."""
+    if value is None:
+        return 0
+    if not isinstance(value, str):
+        try:
+            value = json.dumps(value, ensure_ascii=False, default=str)
+        except Exception:
+            value = str(value)
+    return (len(value) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_message_tokens(message: Dict[str, Any]) -> int:
+    tokens = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.get("content"))
+    if message.get("tool_calls"):
+        tokens += estimate_tokens(message["tool_calls"])
+    return tokens
+
+
+def _numeric_aggregates(rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    aggregates: Dict[str, Dict[str, float]] = {}
+    for row in rows:
+        if not isinstance(row, dict):
+            continue
+        for col, val in row.items():
+            if isinstance(val, bool) or not isinstance(val, (int, float)):
+                continue
+            agg = aggregates.setdefault(col, {"soma": 0.0, "min": float(val), "max": float(val), "n": 0})
+            agg["soma"] += float(val)
+            agg["min"] = min(agg["min"], float(val))
+            agg["max"] = max(agg["max"], float(val))
+            agg["n"] += 1
+
+    for agg in aggregates.values():
+        agg["media"] = round(agg["soma"] / agg["n"], 4) if agg["n"] else 0.0
+        agg["soma"] = round(agg["soma"], 4)
+    return aggregates
+
+
+def digest_tool_result(result: Any, top_k: int = 10) -> Dict[str, Any]:
+    """
+    Converte o resultado de uma ferramenta em um digest tipado e compacto.
+
+    - Listas de registros: total, colunas, amostra top-k e agregados numéricos
+    - Campos de gráfico: removidos (o gráfico já foi entregue ao usuário)
+    - Textos longos: truncados
+    """
+    if isinstance(result, str):
+        try:
+            result = json.loads(result)
+        except (json.JSONDecodeError, TypeError):
+            return {"_digest": "texto", "conteudo": result[: top_k * 200]}
+
+    if isinstance(result, list):
+        result = {"resultados": result}
+    if not isinstance(result, dict):
+        return {"_digest": "valor", "conteudo": str(result)[: top_k * 200]}
+
+    digest: Dict[str, Any] = {"_digest": "objeto"}
+    for key, value in result.items():
+        if key in HEAVY_FIELDS:
+            digest[key] = "[omitido no contexto: já entregue ao usuário]"
+        elif isinstance(value, list) and value and all(isinstance(r, dict) for r in value[:5]):
+            digest["_digest"] = "tabela"
+            digest[key] = value[:top_k]
+            digest[f"{key}_total"] = len(value)
+            columns: List[str] = []
+            for row in value[:top_k]:
+                columns.extend(c for c in row.keys() if c not in columns)
+            digest[f"{key}_colunas"] = columns
+            aggregates = _numeric_aggregates(value)
+            if aggregates:
+                digest[f"{key}_agregados"] = aggregates
+        elif isinstance(value, list) and len(value) > top_k:
+            digest[key] = value[:top_k]
+            digest[f"{key}_total"] = len(value)
+        elif isinstance(value, str) and len(value) > top_k * 200:
+            digest[key] = value[: top_k * 200] + "... [truncado]"
+        else:
+            digest[key] = value
+    return digest
+
+
+@dataclass
+class BudgetReport:
+    tokens_before: int = 0
+    tokens_after: int = 0
+    digested: int = 0
+    evicted: int = 0
+    truncated: int = 0
+    tokens_saved: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def compacted(self) -> bool:
+        return bool(self.digested or self.evicted or self.truncated)
+
+
+class ContextBudgeter:
+    """
+    Mantém o prompt de cada rodada abaixo de `max_tokens`.
+
+    Args:
+        max_tokens: Orçamento total de entrada (mensagens + prompt estático)
+        tool_result_max_tokens: Limite individual para resultados de ferramenta
+        top_k: Linhas mantidas nos digests
+        reserved_tokens: Tokens fixos fora de `messages` (system prompt + tools)
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 24000,
+        tool_result_max_tokens: int = 2500,
+        top_k: int = 10,
+        reserved_tokens: int = 0,
+    ):
+        self.max_tokens = max_tokens
+        self.tool_result_max_tokens = tool_result_max_tokens
+        self.top_k = top_k
+        self.reserved_tokens = reserved_tokens
+
+    @property
+    def message_budget(self) -> int:
+        return max(0, self.max_tokens - self.reserved_tokens)
+
+    def _digest_message(self, message: Dict[str, Any], top_k: int) -> Dict[str, Any]:
+        compacted = dict(message)
+        digest = digest_tool_result(message.get("content"), top_k=top_k)
+        compacted["content"] = json.dumps(digest, ensure_ascii=False, default=str)
+        return compacted
+
+    def fit(
+        self,
+        messages: List[Dict[str, Any]],
+        history_len: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], BudgetReport]:
+        """
+        Retorna (cópia compactada de messages, relatório).
+
+        Args:
+            messages: Mensagens da rodada (não são modificadas)
+            history_len: Quantas mensagens iniciais são histórico da conversa
+                (elegíveis para descarte)
+        """
+        result = [dict(m) for m in messages]
+        costs = [estimate_message_tokens(m) for m in result]
+        report = BudgetReport(tokens_before=sum(costs) + self.reserved_tokens)
+        budget = self.message_budget
+
+        stage_start = sum(costs)
+
+        def close_stage(action: str) -> None:
+            nonlocal stage_start
+            current = sum(costs)
+            if stage_start > current:
+                report.tokens_saved[action] = report.tokens_saved.get(action, 0) + stage_start - current
+            stage_start = current
+
+        # 1. Digest de resultados de ferramenta grandes
+        for i, msg in enumerate(result):
+            if msg.get("role") in ("function", "tool") and costs[i] > self.tool_result_max_tokens:
+                result[i] = self._digest_message(msg, self.top_k)
+                costs[i] = estimate_message_tokens(result[i])
+                report.digested += 1
+        close_stage("digest")
+
+        # 2. Descarte do histórico antigo (nunca a pergunta atual nem o ciclo de ferramentas)
+        evictable = min(history_len, len(result))
+        evict_idx = 0
+        while sum(costs) > budget and evict_idx < evictable:
+            costs[evict_idx] = 0
+            result[evict_idx] = None
+            evict_idx += 1
+            report.evicted += 1
+        close_stage("evict")
+
+        # 3. Digest agressivo de resultados antigos (mantém o mais recente intacto)
+        if sum(costs) > budget:
+            tool_idx = [i for i, m in enumerate(result) if m and m.get("role") in ("function", "tool")]
+            for i in tool_idx[:-1]:
+                if sum(costs) <= budget:
+                    break
+                result[i] = self._digest_message(result[i], max(1, self.top_k // 5))
+                costs[i] = estimate_message_tokens(result[i])
+                report.digested += 1
+        close_stage("digest")
+
+        # 4. Truncamento duro do maior conteúdo restante (até um piso por mensagem)
+        exhausted = set()
+        while sum(costs) > budget:
+            candidates = [
+                k for k, m in enumerate(result)
+                if m and k not in exhausted and isinstance(m.get("content"), str)
+                and costs[k] > MESSAGE_OVERHEAD_TOKENS + 64
+            ]
+            if not candidates:
+                break
+            i = max(candidates, key=lambda k: costs[k])
+            content = result[i]["content"]
+            excess_chars = (sum(costs) - budget) * CHARS_PER_TOKEN
+            keep = max(256, len(content) - excess_chars)
+            truncated = dict(result[i], content=content[:keep] + "\n[conteúdo truncado pelo orçamento de contexto]")
+            cost = estimate_message_tokens(truncated)
+            if keep >= len(content) or cost >= costs[i]:
+                exhausted.add(i)  # já no piso: truncar de novo não reduz
+                continue
+            result[i], costs[i] = truncated, cost
+            report.truncated += 1
+        close_stage("truncate")
+
+        compacted = [m for m in result if m is not None]
+        report.tokens_after = sum(costs) + self.reserved_tokens
+        if sum(costs) > budget:
+            logger.warning(
+                f"[WARNING] [CONTEXT BUDGET] Mensagens no piso de truncamento ainda excedem o orçamento "
+                f"({sum(costs)} > {budget} tokens); seguindo acima do orçamento"
+            )
+        if report.compacted:
+            logger.info(
+                f"[CONTEXT BUDGET] {report.tokens_before} -> {report.tokens_after} tokens "
+                f"(digests={report.digested}, evicted={report.evicted}, truncated={report.truncated})"
+            )
+            _record(report)
+        return compacted, report
+
+
+def build_agent_budgeter(system_prompt: Optional[str] = None, tools: Any = None) -> ContextBudgeter:
+    """Budgeter configurado pelos settings, reservando o prompt estático do agente."""
+    from backend.app.config.settings import settings
+
+    return ContextBudgeter(
+        max_tokens=settings.LLM_CONTEXT_BUDGET_TOKENS,
+        tool_result_max_tokens=settings.LLM_TOOL_RESULT_MAX_TOKENS,
+        top_k=settings.LLM_TOOL_RESULT_TOP_K,
+        reserved_tokens=estimate_tokens(system_prompt) + estimate_tokens(tools),
+    )
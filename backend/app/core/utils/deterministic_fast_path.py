@@ -0,0 +1,406 @@
+"""
+Deterministic Fast Path - Respostas de KPI sem rodada LLM
+
+Perguntas de KPI comuns ("vendas da UNE 1685", "estoque do produto 369947",
+"top 10 produtos mais vendidos", "rupturas críticas") têm ferramenta e
+parâmetros totalmente determinados pela query. Para elas o agente executa a
+ferramenta diretamente e renderiza a resposta a partir de templates,
+pulando o loop LLM.
+
+Fluxo:
+1. `plan_fast_path(query)`: classifica a intenção (intent_classifier), casa a
+   query com um template de KPI e extrai parâmetros (extract_une_filter,
+   extract_product_code, extract_top_limit, extract_segment_filter); sem
+   código, o produto pode ser resolvido pelo nome no índice de autocomplete
+   (só quando o nome casa com exatamente um produto)
+2. O agente executa `plan.tool_name` com `plan.tool_params`
+3. `render_fast_path_answer(plan, tool_result)`: resposta final; retorna None
+   quando o resultado não permite resposta segura (fallback para o LLM)
+
+A classificação de intenção funciona como veto: intenções de alta confiança
+fora do escopo de KPI (previsão, cálculo, otimização, anomalia, metadados)
+nunca usam o fast path.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.app.core.utils.intent_classifier import IntentClassification, IntentType, classify_intent
+from backend.app.core.utils.query_router import (
+    extract_product_code,
+    extract_segment_filter,
+    extract_top_limit,
+    extract_une_filter,
+)
+from backend.application.services.pt_br_normalizer import PTBRNormalizer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_CONFIDENCE = 0.80
+MAX_TOP_LIMIT = 50
+
+# Intenções compatíveis com respostas de KPI por template
+KPI_INTENTS = {IntentType.DATA_QUERY, IntentType.ANALYSIS, IntentType.VISUALIZATION}
+
+# Marcadores de perguntas abertas que exigem raciocínio/síntese do LLM
+OPEN_ENDED_MARKERS = [
+    "por que", "porque", "explique", "explica", "compare", "compara", "tendência", "tendencia",
+    "sugira", "sugest", "recomend", "estratégia", "estrategia", "analise", "análise", "analisar",
+    "previs", "prever", "gráfico", "grafico", "plot", "visual", "concorr", "melhores", "piores",
+    "negativ", "ruins", "transfer", "período", "periodo", "histórico", "historico",
+]
+
+_SALES_RE = re.compile(r"\bvend\w*")
+_STOCK_RE = re.compile(r"\bestoque\b|\bsaldo\b")
+_RUPTURE_RE = re.compile(r"ruptur\w*|falta\s+de\s+estoque|sem\s+estoque")
+_PRODUCTS_RE = re.compile(r"\bprodutos?\b|\bitens\b|\bskus?\b")
+
+# Palavras da pergunta que não fazem parte do nome do produto
+_NAME_NOISE = {
+    "qual", "quais", "quanto", "quantos", "quanta", "quantas", "como", "esta", "estao", "foi", "foram",
+    "tem", "temos", "ha", "me", "mostre", "mostra", "diga", "informe", "total", "atual", "hoje",
+    "produto", "produtos", "item", "itens", "sku", "nome", "estoque", "saldo", "une", "loja", "lojas",
+    "ultimos", "dias", "mes", "venda", "vendas", "vendeu", "vendido", "vendidos", "vendida", "vendidas",
+}
+
+# Confiança base de cada template quando as entidades obrigatórias foram extraídas
+TEMPLATE_CONFIDENCE = {
+    "rupturas_rede": 0.90,
+    "kpi_produto": 0.88,
+    "kpi_une": 0.85,
+    "top_produtos": 0.85,
+}
+
+
+@dataclass
+class FastPathPlan:
+    """Plano de execução determinística (ferramenta + parâmetros + template)."""
+    template: str
+    tool_name: str
+    tool_params: Dict[str, Any]
+    confidence: float
+    intent: str
+    context: Dict[str, Any] = field(default_factory=dict)
+
+
+def _match_template(query: str) -> Optional[FastPathPlan]:
+    q = query.lower()
+
+    if any(m in q for m in OPEN_ENDED_MARKERS):
+        return None
+
+    une = extract_une_filter(query)
+    product = extract_product_code(query)
+    segment = extract_segment_filter(query)
+    wants_sales = bool(_SALES_RE.search(q))
+    wants_stock = bool(_STOCK_RE.search(q))
+
+    if _RUPTURE_RE.search(q):
+        # encontrar_rupturas_criticas só aceita `limite`; recortes por UNE/segmento
+        # ficam com o fluxo LLM para não responder com a rede inteira.
+        if une or segment or product:
+            return None
+        limit = min(extract_top_limit(query) or 20, MAX_TOP_LIMIT)
+        return FastPathPlan(
+            template="rupturas_rede",
+            tool_name="encontrar_rupturas_criticas",
+            tool_params={"limite": limit},
+            confidence=TEMPLATE_CONFIDENCE["rupturas_rede"],
+            intent="",
+        )
+
+    top_limit = extract_top_limit(query)
+    # KPI por UNE tem precedência: uma palavra solta que case exatamente com o
+    # nome de um produto não pode desviar a pergunta para o caminho de produto
+    une_kpi = bool(une) and top_limit is None and wants_sales != wants_stock
+
+    resolved_name = None
+    if product is None and (wants_sales or wants_stock) and not segment and top_limit is None and not une_kpi:
+        resolved = _resolve_product_name(query)
+        if resolved is not None:
+            product, resolved_name = resolved
+
+    if product is not None and (wants_sales or wants_stock):
+        filtros: Dict[str, Any] = {"PRODUTO": product}
+        if une:
+            filtros["UNE"] = int(une)
+        return FastPathPlan(
+            template="kpi_produto",
+            tool_name="consultar_dados_flexivel",
+            tool_params={
+                "filtros": filtros,
+                "colunas": ["PRODUTO", "NOME", "UNE", "VENDA_30DD", "ESTOQUE_UNE"],
+                "ordenar_por": "VENDA_30DD",
+                "ordem_desc": True,
+                "limite": 500,
+            },
+            confidence=TEMPLATE_CONFIDENCE["kpi_produto"],
+            intent="",
+            context={"produto": product, "une": une, "nome_resolvido": resolved_name},
+        )
+
+    if top_limit and wants_sales and _PRODUCTS_RE.search(q):
+        filtros = {}
+        if une:
+            filtros["UNE"] = int(une)
+        if segment:
+            filtros["NOMESEGMENTO"] = segment
+        params: Dict[str, Any] = {
+            "agregacao": "SUM",
+            "coluna_agregacao": "VENDA_30DD",
+            "agrupar_por": ["PRODUTO", "NOME"],
+            "ordenar_por": "valor",
+            "ordem_desc": True,
+            "limite": min(top_limit, MAX_TOP_LIMIT),
+        }
+        if filtros:
+            params["filtros"] = filtros
+        return FastPathPlan(
+            template="top_produtos",
+            tool_name="consultar_dados_flexivel",
+            tool_params=params,
+            confidence=TEMPLATE_CONFIDENCE["top_produtos"],
+            intent="",
+            context={"une": une, "segmento": segment},
+        )
+
+    if une_kpi and product is None:
+        metric = "VENDA_30DD" if wants_sales else "ESTOQUE_UNE"
+        filtros = {"UNE": int(une)}
+        if segment:
+            filtros["NOMESEGMENTO"] = segment
+        return FastPathPlan(
+            template="kpi_une",
+            tool_name="consultar_dados_flexivel",
+            tool_params={
+                "filtros": filtros,
+                "agregacao": "SUM",
+                "coluna_agregacao": metric,
+            },
+            confidence=TEMPLATE_CONFIDENCE["kpi_une"],
+            intent="",
+            context={"une": une, "segmento": segment, "metrica": metric},
+        )
+
+    return None
+
+
+def _resolve_product_name(query: str) -> Optional[Tuple[int, str]]:
+    """
+    (código, nome) do produto citado pelo nome, ou None. Usa o índice de
+    autocomplete só se o serviço de busca já estiver aquecido (o fast path
+    não pode esperar a leitura do parquet) e só aceita casamento exato de
+    todos os termos com um único produto; ambiguidade fica com o LLM.
+    """
+    terms = [t for t in PTBRNormalizer.tokenize(query) if t not in _NAME_NOISE and not t.isdigit()]
+    if not terms:
+        return None
+    try:
+        from backend.app.core.rag.product_retrieval import get_warm_product_retrieval_service
+
+        service = get_warm_product_retrieval_service()
+        if service is None:
+            return None
+        hits = service.autocomplete(" ".join(terms), limit=2, prefix=False, fuzzy=False)
+    except Exception as e:
+        logger.warning(f"[FAST PATH] Resolução de produto por nome falhou: {e}")
+        return None
+    if len(hits) != 1:
+        return None
+    logger.info(f"[FAST PATH] Produto resolvido pelo nome: {hits[0].product_id} ({hits[0].name})")
+    return hits[0].product_id, hits[0].name
+
+
+def plan_fast_path(
+    query: str,
+    intent_result: Optional[IntentClassification] = None,
+    min_confidence: Optional[float] = None,
+) -> Optional[FastPathPlan]:
+    """
+    Retorna o plano determinístico para a query, ou None se ela exige o LLM.
+
+    Args:
+        query: Pergunta do usuário (já resolvida com o histórico)
+        intent_result: Classificação já calculada (evita reclassificar)
+        min_confidence: Limiar de confiança (default: settings)
+    """
+    if not query or not query.strip():
+        return None
+
+    if min_confidence is None:
+        try:
+            from backend.app.config.settings import settings
+            min_confidence = settings.DETERMINISTIC_FAST_PATH_MIN_CONFIDENCE
+        except Exception:
+            min_confidence = DEFAULT_MIN_CONFIDENCE
+
+    plan = _match_template(query)
+    if plan is None:
+        return None
+
+    intent_result = intent_result or classify_intent(query)
+    if intent_result.intent not in KPI_INTENTS and intent_result.confidence >= 0.60:
+        logger.info(
+            f"[FAST PATH] Vetado pela intenção {intent_result.intent.value} "
+            f"(confidence={intent_result.confidence:.2f})"
+        )
+        return None
+
+    plan.intent = intent_result.intent.value
+    plan.confidence = max(plan.confidence, intent_result.confidence if intent_result.intent in KPI_INTENTS else 0.0)
+    if plan.confidence < min_confidence:
+        return None
+
+    return plan
+
+
+def _fmt_num(value: Any, decimals: int = 2) -> str:
+    try:
+        fv = float(value or 0)
+    except (TypeError, ValueError):
+        return str(value)
+    return f"{fv:,.{decimals}f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _recorte(context: Dict[str, Any]) -> str:
+    parts = []
+    if context.get("produto") is not None:
+        parts.append(f"Produto: {context['produto']}")
+    if context.get("une"):
+        parts.append(f"Loja (UNE): {context['une']}")
+    if context.get("segmento"):
+        parts.append(f"Segmento: {context['segmento']}")
+    return "\n".join(f"- {p}" for p in parts) if parts else "- Toda a rede"
+
+
+def _render_rupturas(tool_result: Dict[str, Any]) -> str:
+    total = int(tool_result.get("total_criticos", 0) or 0)
+    produtos = tool_result.get("produtos_criticos", []) or []
+    if total == 0:
+        return tool_result.get("mensagem") or "Não encontrei rupturas críticas no recorte atual."
+
+    seg_counts: Dict[str, int] = {}
+    for p in produtos:
+        seg = str(p.get("segmento") or p.get("nomesegmento") or "N/A")
+        seg_counts[seg] = seg_counts.get(seg, 0) + 1
+    top_segments = sorted(seg_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+
+    tabela = "| Segmento | Produtos críticos |\n|---|---|\n"
+    tabela += "\n".join(f"| {s} | {c} |" for s, c in top_segments) or "| - | - |"
+    return (
+        "## Resumo executivo\n"
+        f"- {total} produtos em ruptura crítica na rede.\n"
+        "\n## Tabela operacional\n"
+        f"{tabela}\n"
+        "\n## Recorte e evidência\n"
+        "- Regra: estoque_cd <= 0 e estoque_atual < linha_verde.\n"
+        f"- Amostra exibida: {len(produtos)} produtos."
+    )
+
+
+def _render_kpi_produto(tool_result: Dict[str, Any], context: Dict[str, Any]) -> str:
+    rows: List[Dict[str, Any]] = tool_result.get("resultados", []) or []
+    produto = context.get("produto")
+    if not rows:
+        alvo = f" na UNE {context['une']}" if context.get("une") else ""
+        return f"Não encontrei o produto {produto}{alvo} na base atual."
+
+    nome = str(rows[0].get("NOME") or "-")
+    venda_total = sum(_to_float(r.get("VENDA_30DD")) for r in rows)
+    estoque_total = sum(_to_float(r.get("ESTOQUE_UNE")) for r in rows)
+    unes = {r.get("UNE") for r in rows}
+
+    top_rows = sorted(rows, key=lambda r: _to_float(r.get("VENDA_30DD")), reverse=True)[:8]
+    tabela = "| UNE | Venda 30 dias (R$) | Estoque |\n|---|---|---|\n"
+    tabela += "\n".join(
+        f"| {r.get('UNE', '-')} | {_fmt_num(r.get('VENDA_30DD'))} | {_fmt_num(r.get('ESTOQUE_UNE'), 0)} |"
+        for r in top_rows
+    )
+    return (
+        "## Resumo executivo\n"
+        f"- Produto {produto} ({nome}).\n"
+        f"- Venda 30 dias: R$ {_fmt_num(venda_total)}.\n"
+        f"- Estoque total: {_fmt_num(estoque_total, 0)} unidades em {len(unes)} UNE(s).\n"
+        "\n## Tabela operacional\n"
+        f"{tabela}\n"
+        "\n## Recorte e evidência\n"
+        f"{_recorte(context)}"
+    )
+
+
+def _render_top_produtos(tool_result: Dict[str, Any], context: Dict[str, Any], limit: int) -> str:
+    rows: List[Dict[str, Any]] = tool_result.get("resultados", []) or []
+    if not rows:
+        return tool_result.get("mensagem") or "Nenhum produto com vendas no recorte informado."
+
+    tabela = "| # | Produto | Nome | Venda 30 dias (R$) |\n|---|---|---|---|\n"
+    tabela += "\n".join(
+        f"| {i} | {r.get('PRODUTO', '-')} | {r.get('NOME', '-')} | {_fmt_num(r.get('valor'))} |"
+        for i, r in enumerate(rows[:limit], start=1)
+    )
+    total = sum(_to_float(r.get("valor")) for r in rows[:limit])
+    return (
+        "## Resumo executivo\n"
+        f"- Top {min(limit, len(rows))} produtos somam R$ {_fmt_num(total)} em vendas nos últimos 30 dias.\n"
+        "\n## Tabela operacional\n"
+        f"{tabela}\n"
+        "\n## Recorte e evidência\n"
+        f"{_recorte(context)}"
+    )
+
+
+def _render_kpi_une(tool_result: Dict[str, Any], context: Dict[str, Any]) -> Optional[str]:
+    agregado = tool_result.get("resultado_agregado")
+    if not isinstance(agregado, dict):
+        if tool_result.get("total_resultados") == 0:
+            return f"Não encontrei dados para a UNE {context.get('une')} no recorte informado."
+        return None
+
+    valor = agregado.get("valor")
+    if context.get("metrica") == "ESTOQUE_UNE":
+        linha = f"- Estoque total: {_fmt_num(valor, 0)} unidades."
+    else:
+        linha = f"- Venda 30 dias: R$ {_fmt_num(valor)}."
+    return (
+        "## Resumo executivo\n"
+        f"- Loja (UNE) {context.get('une')}.\n"
+        f"{linha}\n"
+        "\n## Recorte e evidência\n"
+        f"{_recorte(context)}"
+    )
+
+
+def render_fast_path_answer(plan: FastPathPlan, tool_result: Any) -> Optional[Dict[str, Any]]:
+    """
+    Renderiza a resposta final do template.
+
+    Returns:
+        Resposta no formato do agente ({"type": "text", "result": {"mensagem": ...}})
+        ou None quando o resultado não é utilizável (fallback para o LLM).
+    """
+    if not isinstance(tool_result, dict) or tool_result.get("error") or tool_result.get("erro"):
+        return None
+
+    if plan.template == "rupturas_rede":
+        msg = _render_rupturas(tool_result)
+    elif plan.template == "kpi_produto":
+        msg = _render_kpi_produto(tool_result, plan.context)
+    elif plan.template == "top_produtos":
+        msg = _render_top_produtos(tool_result, plan.context, int(plan.tool_params.get("limite", 10)))
+    elif plan.template == "kpi_une":
+        msg = _render_kpi_une(tool_result, plan.context)
+    else:
+        msg = None
+
+    if not msg:
+        return None
+    return {"type": "text", "result": {"mensagem": msg}}
@@ -0,0 +1,302 @@
+"""
+Multi-Intent Planner - Decomposição de perguntas compostas em um DAG de ferramentas
+
+Perguntas como "compare vendas e rupturas da UNE 1685 com a 1700 e gere um
+gráfico" faziam o loop ReAct descobrir uma ferramenta por rodada LLM. O
+planner decompõe a pergunta ANTES do loop:
+
+1. `plan_compound_query(query)`: regras (intent_classifier + extratores do
+   query_router) geram um nó por faceta (vendas, estoque, rupturas, gráfico)
+   e por UNE citada
+2. `plan_with_llm(...)`: opcional, uma única chamada LLM de planejamento
+   quando a pergunta parece composta mas as regras não a cobrem
+3. `execute_plan(plan, runner)`: executa os nós respeitando `depends_on`;
+   ramos independentes rodam em paralelo
+
+O agente então faz UMA rodada de síntese com todos os resultados.
+"""
+
+import asyncio
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from backend.app.core.utils.intent_classifier import IntentType, classify_intent
+from backend.app.core.utils.query_router import extract_segment_filter, extract_une_filter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_NODES = 8
+
+# Intenções que exigem ferramentas específicas (previsão, cálculo...): ficam com o LLM
+_NON_DECOMPOSABLE_INTENTS = {
+    IntentType.FORECASTING,
+    IntentType.CALCULATION,
+    IntentType.OPTIMIZATION,
+    IntentType.ANOMALY_DETECTION,
+    IntentType.METADATA,
+}
+
+_SALES_RE = re.compile(r"\bvend\w*")
+_STOCK_RE = re.compile(r"\bestoques?\b|\bsaldos?\b")
+_RUPTURE_RE = re.compile(r"ruptur\w*|falta\s+de\s+estoque|sem\s+estoque")
+_CHART_RE = re.compile(r"gr[aá]fico|plot\w*|visualiz\w*")
+_UNE_ANCHOR_RE = re.compile(r"\bu+nes?\b|\blojas?\b", re.IGNORECASE)
+# UNEs adicionais após a primeira: "com a 1700", "e da 1700", "e 2365", "x 135", "vs 520", ", 1685"
+_UNE_FOLLOW_RE = re.compile(
+    r"(?:\bcom\s+(?:a|o)\b|\be\s+d?[ao]\b|\be\b|\bx\b|\bvs\.?|\bversus\b|,)\s*(?:(?:une|loja)\s+)?(\d{3,4})\b(?!\s*dias)",
+    re.IGNORECASE,
+)
+# Conectores entre cláusulas ("... e gere um gráfico", "...; depois ...")
+_CLAUSE_SPLIT_RE = re.compile(r"\s+e\s+(?=[a-zà-ú]{3,})|;|\s+depois\s+|\s+al[eé]m\s+disso\s+", re.IGNORECASE)
+
+
+@dataclass
+class PlanNode:
+    """Uma chamada de ferramenta do plano."""
+    node_id: str
+    tool_name: str
+    tool_params: Dict[str, Any]
+    depends_on: Tuple[str, ...] = ()
+    label: str = ""
+
+
+@dataclass
+class QueryPlan:
+    """DAG de chamadas de ferramenta (nós em ordem topológica)."""
+    nodes: List[PlanNode]
+    source: str = "rules"  # rules | llm
+    context: Dict[str, Any] = field(default_factory=dict)
+
+    def waves(self) -> List[List[PlanNode]]:
+        """Níveis do DAG: cada onda só depende das anteriores."""
+        level: Dict[str, int] = {}
+        for node in self.nodes:
+            level[node.node_id] = 1 + max((level[d] for d in node.depends_on), default=-1)
+        waves: List[List[PlanNode]] = [[] for _ in range(max(level.values(), default=-1) + 1)]
+        for node in self.nodes:
+            waves[level[node.node_id]].append(node)
+        return waves
+
+
+def extract_une_list(query: str) -> List[str]:
+    """Extrai todas as UNEs citadas ("UNE 1685 com a 1700", "lojas 520 e 2365")."""
+    first = extract_une_filter(query)
+    anchor = _UNE_ANCHOR_RE.search(query)
+    if first is None:
+        # "lojas 520 e 2365": extract_une_filter só cobre o singular
+        plural = re.search(r"\b(?:u+nes|lojas)\s+(\d{3,4})\b", query, re.IGNORECASE)
+        if plural is None:
+            return []
+        first = plural.group(1)
+
+    unes = [first]
+    start = anchor.start() if anchor else 0
+    for match in _UNE_FOLLOW_RE.finditer(query, start):
+        une = match.group(1)
+        if une not in unes:
+            unes.append(une)
+    return unes
+
+
+def _looks_compound(query: str) -> bool:
+    """Duas ou mais cláusulas com intenção reconhecida (sem fallback)."""
+    clauses = [c for c in _CLAUSE_SPLIT_RE.split(query) if c and c.strip()]
+    if len(clauses) < 2:
+        return False
+    recognized = 0
+    for clause in clauses:
+        result = classify_intent(clause)
+        if result.matched_patterns and result.matched_patterns != ["<fallback>"]:
+            recognized += 1
+    return recognized >= 2
+
+
+def _facet_nodes(facet: str, unes: Sequence[Optional[str]], segment: Optional[str]) -> List[PlanNode]:
+    nodes = []
+    for une in unes:
+        suffix = f"_{une}" if une else ""
+        filtros: Dict[str, Any] = {}
+        if une:
+            filtros["UNE"] = int(une)
+        if segment:
+            filtros["NOMESEGMENTO"] = segment
+
+        if facet == "rupturas" and not une:
+            # Visão de rede: ferramenta especializada (aceita apenas `limite`)
+            nodes.append(PlanNode("rupturas", "encontrar_rupturas_criticas", {"limite": 20}, label="rupturas da rede"))
+            continue
+
+        if facet == "rupturas":
+            # Recorte por UNE: itens com estoque zerado na loja
+            filtros["ESTOQUE_UNE"] = 0
+            params = {"filtros": filtros, "agregacao": "COUNT", "coluna_agregacao": "PRODUTO"}
+            label = f"rupturas da UNE {une}"
+        else:
+            metric = "VENDA_30DD" if facet == "vendas" else "ESTOQUE_UNE"
+            params = {"agregacao": "SUM", "coluna_agregacao": metric}
+            if filtros:
+                params["filtros"] = filtros
+            label = f"{facet} da UNE {une}" if une else f"{facet} da rede"
+        nodes.append(PlanNode(f"{facet}{suffix}", "consultar_dados_flexivel", params, label=label))
+    return nodes
+
+
+def plan_compound_query(query: str, max_nodes: int = DEFAULT_MAX_NODES) -> Optional[QueryPlan]:
+    """
+    Plano por regras para perguntas compostas; None quando a pergunta é simples
+    (menos de dois nós) ou foge do escopo das regras.
+    """
+    if not query or not query.strip():
+        return None
+
+    q = query.lower()
+    intent = classify_intent(query)
+    if intent.intent in _NON_DECOMPOSABLE_INTENTS and intent.confidence >= 0.60:
+        return None
+
+    facets = []
+    if _SALES_RE.search(q):
+        facets.append("vendas")
+    if _STOCK_RE.search(_RUPTURE_RE.sub(" ", q)):  # "sem estoque" é ruptura, não consulta de estoque
+        facets.append("estoque")
+    if _RUPTURE_RE.search(q):
+        facets.append("rupturas")
+    wants_chart = bool(_CHART_RE.search(q))
+
+    unes: List[Optional[str]] = list(extract_une_list(query)) or [None]
+    segment = extract_segment_filter(query)
+
+    nodes: List[PlanNode] = []
+    for facet in facets:
+        nodes.extend(_facet_nodes(facet, unes, segment))
+
+    if wants_chart and nodes:
+        params: Dict[str, Any] = {"descricao": query, "tipo_grafico": "bar"}
+        if len(unes) == 1 and unes[0]:
+            params["filtro_une"] = unes[0]
+        if segment:
+            params["filtro_segmento"] = segment
+        nodes.append(PlanNode("grafico", "gerar_grafico_universal_v2", params, label="gráfico"))
+
+    if len(nodes) < 2 or len(nodes) > max_nodes:
+        return None
+
+    logger.info(f"[PLANNER] Pergunta composta decomposta em {len(nodes)} nós: {[n.node_id for n in nodes]}")
+    return QueryPlan(nodes=nodes, source="rules", context={"unes": [u for u in unes if u], "facets": facets})
+
+
+_PLANNER_PROMPT = (
+    "Você é o planejador de ferramentas de um agente de BI. Decomponha a pergunta em chamadas "
+    "de ferramenta independentes sempre que possível. Responda APENAS com JSON no formato "
+    '{{"steps": [{{"id": "s1", "tool": "<nome>", "params": {{...}}, "depends_on": []}}]}}. '
+    "Use somente estas ferramentas: {tools}. No máximo {max_nodes} passos. "
+    'Se a pergunta não for composta, responda {{"steps": []}}.'
+)
+
+
+def parse_llm_plan(content: str, tool_names: Iterable[str], max_nodes: int = DEFAULT_MAX_NODES) -> Optional[QueryPlan]:
+    """Valida o JSON do LLM (ferramentas conhecidas, ids únicos, dependências acíclicas)."""
+    if not content:
+        return None
+    match = re.search(r"\{.*\}", content, re.DOTALL)
+    if match is None:
+        return None
+    try:
+        steps = json.loads(match.group(0)).get("steps") or []
+    except (json.JSONDecodeError, AttributeError):
+        return None
+
+    allowed = set(tool_names)
+    nodes: List[PlanNode] = []
+    seen: Dict[str, PlanNode] = {}
+    for step in steps[:max_nodes]:
+        if not isinstance(step, dict):
+            return None
+        node_id, tool = str(step.get("id") or ""), step.get("tool")
+        params = step.get("params") or {}
+        deps = tuple(str(d) for d in (step.get("depends_on") or []))
+        # Dependências só para passos anteriores: garante ordem topológica e ausência de ciclos
+        if not node_id or node_id in seen or tool not in allowed or not isinstance(params, dict):
+            return None
+        if any(d not in seen for d in deps):
+            return None
+        node = PlanNode(node_id, tool, params, deps, label=tool)
+        seen[node_id] = node
+        nodes.append(node)
+
+    if len(nodes) < 2:
+        return None
+    return QueryPlan(nodes=nodes, source="llm")
+
+
+async def plan_with_llm(
+    llm: Any,
+    query: str,
+    tool_names: Sequence[str],
+    max_nodes: int = DEFAULT_MAX_NODES,
+) -> Optional[QueryPlan]:
+    """Uma única chamada LLM de planejamento (sem ferramentas); só para perguntas compostas."""
+    if llm is None or not _looks_compound(query):
+        return None
+
+    messages = [
+        {"role": "system", "content": _PLANNER_PROMPT.format(tools=", ".join(tool_names), max_nodes=max_nodes)},
+        {"role": "user", "content": query},
+    ]
+    try:
+        if hasattr(llm, "aget_completion"):
+            response = await llm.aget_completion(messages, tools=None)
+        else:
+            response = await asyncio.to_thread(llm.get_completion, messages, tools=None)
+    except Exception as e:
+        logger.warning(f"[PLANNER] Falha na chamada de planejamento: {e}")
+        return None
+
+    if not isinstance(response, dict) or "error" in response:
+        return None
+    plan = parse_llm_plan(response.get("content", ""), tool_names, max_nodes)
+    if plan is not None:
+        logger.info(f"[PLANNER] Plano LLM com {len(plan.nodes)} nós")
+    return plan
+
+
+def _is_error(result: Any) -> bool:
+    return isinstance(result, dict) and ("error" in result or result.get("status") == "error")
+
+
+async def execute_plan(
+    plan: QueryPlan,
+    runner: Callable[[PlanNode], Awaitable[Any]],
+    max_concurrency: int = 4,
+) -> Dict[str, Any]:
+    """
+    Executa o DAG: cada nó começa assim que suas dependências terminam.
+    Nós cujas dependências falharam não executam. Retorna {node_id: resultado}.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run(node: PlanNode) -> Any:
+        dep_results = [await tasks[d] for d in node.depends_on]
+        failed = [d for d, r in zip(node.depends_on, dep_results) if _is_error(r)]
+        if failed:
+            return {"error": f"Dependências falharam: {', '.join(failed)}"}
+        async with semaphore:
+            try:
+                return await runner(node)
+            except Exception as e:
+                logger.error(f"[PLANNER] Nó {node.node_id} ({node.tool_name}) falhou: {e}")
+                return {"error": str(e)}
+
+    # Nós chegam em ordem topológica: a task de cada dependência já existe
+    for node in plan.nodes:
+        tasks[node.node_id] = asyncio.ensure_future(run(node))
+    try:
+        results = await asyncio.gather(*tasks.values())
+    finally:
+        for task in tasks.values():
+            task.cancel()
+    return dict(zip(tasks.keys(), results))
@@ -0,0 +1,215 @@
+"""
+Speculative Tool Prefetch
+
+Enquanto a primeira rodada LLM está em andamento (segundos), a ferramenta
+prevista pelo intent_classifier + query_router já começa a executar. Se o
+LLM pedir exatamente a mesma chamada (mesma ferramenta, mesmos argumentos
+normalizados), o resultado é entregue sem nova execução.
+
+Regras:
+- Só ferramentas read-only (SPECULATIVE_SAFE_TOOLS) são especuladas
+- Orçamento global de especulações simultâneas (SPECULATIVE_PREFETCH_MAX_INFLIGHT);
+  sem vaga, a especulação é ignorada
+- Especulações não aproveitadas são contabilizadas como "wasted"
+
+Uso (por requisição):
+    prefetch = SpeculativePrefetch(key_fn)
+    prefetch.start("consultar_dados_flexivel", params, runner)
+    response = llm.get_completion(...)
+    prefetch.settle(response.get("tool_calls"))
+    task = prefetch.take(func_name, func_args)  # None => executar normalmente
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Ferramentas sem efeitos colaterais (apenas leitura de dados)
+SPECULATIVE_SAFE_TOOLS = {
+    "consultar_dados_flexivel",
+    "encontrar_rupturas_criticas",
+    "analisar_produto_todas_lojas",
+    "calcular_abastecimento_une",
+    "consultar_dicionario_dados",
+    "gerar_grafico_universal_v2",
+}
+
+
+def _record(tool_name: str, outcome: str) -> None:
+    try:
+        from backend.app.core.observability.metrics import SPECULATIVE_TOOL_PREFETCH_TOTAL
+        SPECULATIVE_TOOL_PREFETCH_TOTAL.labels(tool=tool_name, outcome=outcome).inc()
+    except Exception:
+        pass
+
+
+class SpeculationBudget:
+    """
+    Limite global (thread-safe) de especulações em execução e estatísticas.
+    """
+
+    def __init__(self, max_inflight: int = 4):
+        self.max_inflight = max_inflight
+        self._inflight = 0
+        self._lock = threading.Lock()
+        self._stats = {"started": 0, "hit": 0, "wasted": 0, "skipped_budget": 0}
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._inflight >= self.max_inflight:
+                self._stats["skipped_budget"] += 1
+                return False
+            self._inflight += 1
+            self._stats["started"] += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self._inflight = max(0, self._inflight - 1)
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            resolved = self._stats["hit"] + self._stats["wasted"]
+            return {
+                **self._stats,
+                "inflight": self._inflight,
+                "max_inflight": self.max_inflight,
+                "hit_rate": round(self._stats["hit"] / resolved, 4) if resolved else 0.0,
+            }
+
+
+_budget: Optional[SpeculationBudget] = None
+_budget_lock = threading.Lock()
+
+
+def get_speculation_budget() -> SpeculationBudget:
+    """Retorna o orçamento global de especulação (singleton)."""
+    global _budget
+
+    if _budget is None:
+        with _budget_lock:
+            if _budget is None:
+                from backend.app.config.settings import settings
+                _budget = SpeculationBudget(max_inflight=settings.SPECULATIVE_PREFETCH_MAX_INFLIGHT)
+    return _budget
+
+
+class SpeculativePrefetch:
+    """
+    Especulações de uma única requisição do agente.
+
+    Args:
+        normalize_args: Normalizador de argumentos (mesmo usado na execução real),
+            garantindo que "50" e 50 gerem a mesma chave.
+        budget: Orçamento global (default: singleton)
+    """
+
+    def __init__(
+        self,
+        normalize_args: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+        budget: Optional[SpeculationBudget] = None,
+    ):
+        self._normalize_args = normalize_args
+        self._budget = budget or get_speculation_budget()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._tool_names: Dict[str, str] = {}
+        self._settled = False
+
+    def _key(self, tool_name: str, args: Dict[str, Any]) -> str:
+        normalized = self._normalize_args(tool_name, dict(args or {}))
+        return f"{tool_name}:{json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)}"
+
+    def start(self, tool_name: str, args: Dict[str, Any], runner: Callable[[], Awaitable[Any]]) -> bool:
+        """Dispara a execução especulativa; retorna False se não especulou."""
+        if tool_name not in SPECULATIVE_SAFE_TOOLS or self._settled:
+            return False
+
+        key = self._key(tool_name, args)
+        if key in self._tasks:
+            return False
+
+        if not self._budget.try_acquire():
+            logger.info(f"[SPECULATIVE] Orçamento esgotado, sem prefetch para {tool_name}")
+            _record(tool_name, "skipped_budget")
+            return False
+
+        task = asyncio.ensure_future(runner())
+        task.add_done_callback(lambda _t: self._budget.release())
+        self._tasks[key] = task
+        self._tool_names[key] = tool_name
+        logger.info(f"[SPECULATIVE] Prefetch iniciado: {tool_name}")
+        _record(tool_name, "started")
+        return True
+
+    def settle(self, tool_calls: Optional[List[Dict[str, Any]]]) -> None:
+        """
+        Confronta as especulações com as chamadas pedidas pelo LLM.
+
+        Especulações não pedidas são descartadas e contabilizadas como "wasted"
+        (a execução em thread não é interrompida, mas segue contando no
+        orçamento até terminar).
+        """
+        if self._settled:
+            return
+        self._settled = True
+
+        requested = set()
+        for tc in tool_calls or []:
+            try:
+                fn = tc["function"]
+                requested.add(self._key(fn["name"], json.loads(fn.get("arguments") or "{}")))
+            except Exception:
+                continue
+
+        for key in [k for k in self._tasks if k not in requested]:
+            tool_name = self._waste(key)
+            logger.info(f"[SPECULATIVE] Prefetch descartado (LLM escolheu outra chamada): {tool_name}")
+
+    def discard(self) -> None:
+        """
+        Fim da requisição: especulações não aproveitadas (não confrontadas ou
+        pedidas mas não consumidas) são descartadas como "wasted", com a
+        exceção recuperada.
+        """
+        self._settled = True
+        for key in list(self._tasks):
+            tool_name = self._waste(key)
+            logger.info(f"[SPECULATIVE] Prefetch descartado (requisição encerrada): {tool_name}")
+
+    def _waste(self, key: str) -> str:
+        tool_name = self._tool_names.pop(key)
+        task = self._tasks.pop(key)
+        task.add_done_callback(_consume_exception)
+        self._budget.count("wasted")
+        _record(tool_name, "wasted")
+        return tool_name
+
+    def take(self, tool_name: str, args: Dict[str, Any]) -> Optional[asyncio.Task]:
+        """Retorna a execução especulativa correspondente (uma única vez)."""
+        if not self._tasks:
+            return None
+
+        key = self._key(tool_name, args)
+        task = self._tasks.pop(key, None)
+        if task is None:
+            return None
+
+        self._tool_names.pop(key, None)
+        self._budget.count("hit")
+        _record(tool_name, "hit")
+        logger.info(f"[SPECULATIVE] Prefetch aproveitado: {tool_name}")
+        return task
+
+
+def _consume_exception(task: asyncio.Future) -> None:
+    # Evita "Task exception was never retrieved" em especulações descartadas.
+    if not task.cancelled():
+        task.exception()
@@ -0,0 +1,175 @@
+"""
+Tool Memo - reaproveitamento de resultados de ferramenta dentro da conversa
+
+Perguntas de acompanhamento ("e o estoque?") costumam fazer o agente chamar
+de novo a mesma ferramenta com os mesmos argumentos. O memo da sessão guarda
+os resultados bem-sucedidos das ferramentas read-only e, no turno seguinte,
+`execute_single_tool` os entrega sem nova execução.
+
+Chave: ferramenta + argumentos normalizados + escopo (role e segmentos
+permitidos do usuário) + versão do dataset (mtime/tamanho do parquet), de
+modo que uma troca de permissão ou uma recarga dos dados invalida o memo.
+
+Uso (por turno do agente):
+    memo = get_tool_memo_store().for_session(session_id)
+    key = memo.key(func_name, normalized_args, scope, dataset_version)
+    cached = memo.get(key)            # None => executar normalmente
+    memo.put(key, result)             # só resultados sem erro
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from backend.app.core.utils.speculative_prefetch import SPECULATIVE_SAFE_TOOLS
+
+logger = logging.getLogger(__name__)
+
+# Ferramentas read-only cujo resultado só depende dos argumentos, do escopo e dos dados
+MEMOIZABLE_TOOLS = SPECULATIVE_SAFE_TOOLS | {"consultar_dados_gerais"}
+
+
+def _record(tool_name: str, outcome: str) -> None:
+    try:
+        from backend.app.core.observability.metrics import TOOL_MEMO_TOTAL
+        TOOL_MEMO_TOTAL.labels(tool=tool_name, outcome=outcome).inc()
+    except Exception:
+        pass
+
+
+def _canonical(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str, separators=(",", ":"))
+
+
+def is_memoizable(tool_name: str, result: Any) -> bool:
+    if tool_name not in MEMOIZABLE_TOOLS or not isinstance(result, dict):
+        return False
+    return "error" not in result and result.get("status") != "error"
+
+
+class ToolMemo:
+    """
+    Memo de uma sessão (LRU com TTL). Resultados são copiados na entrada e na
+    saída: o pós-processamento do agente não altera o que fica guardado.
+    """
+
+    def __init__(self, max_entries: int = 64, ttl_seconds: float = 900.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, digest, result)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.lookups = 0
+        self.last_used = clock()
+
+    @staticmethod
+    def key(tool_name: str, args: Dict[str, Any], scope: Sequence[Any], dataset_version: str) -> str:
+        payload = _canonical({"tool": tool_name, "args": args, "scope": list(scope), "data": dataset_version})
+        return f"{tool_name}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    def get(self, key: str) -> Optional[Any]:
+        tool_name = key.split(":", 1)[0]
+        now = self._clock()
+        with self._lock:
+            self.lookups += 1
+            self.last_used = now
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                _record(tool_name, "miss")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        _record(tool_name, "hit")
+        logger.info(f"[TOOL MEMO] HIT {tool_name} (digest={entry[1]})")
+        return copy.deepcopy(entry[2])
+
+    def put(self, key: str, result: Any) -> Optional[str]:
+        """Guarda o resultado (se memoizável); retorna o digest guardado."""
+        tool_name = key.split(":", 1)[0]
+        if not is_memoizable(tool_name, result):
+            return None
+        digest = hashlib.sha256(_canonical(result).encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, digest, copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return digest
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "lookups": self.lookups,
+                "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+class ToolMemoStore:
+    """Memos por sessão, com limite de sessões (LRU) e expiração por inatividade."""
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        max_entries: int = 64,
+        ttl_seconds: float = 900.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_sessions = max_sessions
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._sessions: "OrderedDict[str, ToolMemo]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def for_session(self, session_id: str) -> ToolMemo:
+        now = self._clock()
+        with self._lock:
+            memo = self._sessions.get(session_id)
+            if memo is not None and now - memo.last_used > self.ttl_seconds:
+                memo = None
+            if memo is None:
+                memo = ToolMemo(self.max_entries, self.ttl_seconds, clock=self._clock)
+                self._sessions[session_id] = memo
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return memo
+
+    def drop(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+
+
+_store: Optional[ToolMemoStore] = None
+_store_lock = threading.Lock()
+
+
+def get_tool_memo_store() -> ToolMemoStore:
+    """Retorna o store global de memos por sessão (singleton)."""
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from backend.app.config.settings import settings
+                _store = ToolMemoStore(
+                    max_sessions=settings.TOOL_MEMO_MAX_SESSIONS,
+                    max_entries=settings.TOOL_MEMO_MAX_ENTRIES,
+                    ttl_seconds=settings.TOOL_MEMO_TTL_SECONDS,
+                )
+    return _store
@@ -26,6 +26,7 @@ from dataclasses import dataclass
 
 # Componentes do agente
 from backend.app.core.agents.caculinha_bi_agent import CaculinhaBIAgent
+from backend.app.core.cancellation import RequestCancelled
 from backend.app.core.agents.code_gen_agent import CodeGenAgent
 
 # Componentes existentes
@@ -233,7 +234,8 @@ class ChatServiceV3:
             agent_response = await agent.run_async(
                 query,
                 agent_history, # Pass converted history directly
-                on_progress=emit_progress # Pass progress callback if supported
+                on_progress=emit_progress, # Pass progress callback if supported
+                session_id=session_id, # Memo de ferramentas por conversa
             )
             logger.info(f"[DEBUG] [DEBUG] agent.run_async() RETORNOU: {type(agent_response)}")
             logger.info(f"[DEBUG] [DEBUG] Resposta do agente: {str(agent_response)[:200]}...")
@@ -261,7 +263,11 @@ class ChatServiceV3:
             
             logger.info(f"[AGENT] Resposta gerada com sucesso")
             return response
-            
+
+        except RequestCancelled as e:
+            # Cliente foi embora: nada a responder nem a gravar no histórico
+            logger.info(f"[AGENT] Processamento abandonado ({e})")
+            raise
         except Exception as e:
             logger.error(f"Erro em process_message: {e}", exc_info=True)
             return {
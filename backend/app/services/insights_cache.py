@@ -0,0 +1,303 @@
+"""
+Insights Cache Service - Stale-While-Revalidate
+
+Mantém o cache em arquivo dos insights proativos e garante que a leitura
+seja sempre barata:
+- Cache fresco (< 24h): servido diretamente
+- Cache expirado: servido imediatamente (stale) enquanto uma tarefa em
+  background (BackgroundTaskManager) regenera os insights
+- Após cada refresh do dataset: regeneração agendada para todos os escopos
+  de segmento conhecidos
+"""
+
+import json
+import hashlib
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from backend.app.services.background_tasks import TaskStatus, get_task_manager
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+CACHE_DIR = Path("data/cache/insights")
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+CACHE_TTL_HOURS = 24  # Cache insights for 24 hours
+
+# cache_key -> task_id da regeneração em andamento (evita gerações duplicadas)
+_inflight_regenerations: Dict[str, str] = {}
+
+
+def is_degraded_insight_item(item: dict) -> bool:
+    text = f"{item.get('title', '')} {item.get('description', '')}".lower()
+    markers = [
+        "sistema de insights em manutenção",
+        "falha após",
+        "resource_exhausted",
+        "quota",
+        "you exceeded your current quota",
+    ]
+    return any(m in text for m in markers)
+
+
+def is_degraded_cached_payload(cached: dict) -> bool:
+    insights = cached.get("insights", []) if isinstance(cached, dict) else []
+    return any(is_degraded_insight_item(item) for item in insights if isinstance(item, dict))
+
+
+def get_cache_key(filters: dict) -> str:
+    """Generate cache key based on filters"""
+    filter_str = json.dumps(filters or {}, sort_keys=True)
+    return hashlib.md5(filter_str.encode()).hexdigest()
+
+
+def get_cached_insights(cache_key: str) -> Optional[dict]:
+    """
+    Load cached insights regardless of age.
+
+    Returns None only when there is no readable cache file. Expired entries
+    are returned with ``stale=True`` so callers can serve them while a
+    regeneration runs in background.
+    """
+    cache_file = CACHE_DIR / f"{cache_key}.json"
+
+    if not cache_file.exists():
+        return None
+
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached_data = json.load(f)
+
+        cached_at = datetime.fromisoformat(cached_data.get('generated_at', '2020-01-01'))
+        age_hours = (datetime.utcnow() - cached_at).total_seconds() / 3600
+        stale = age_hours >= CACHE_TTL_HOURS
+
+        if stale:
+            logger.info(f"[TIME] Cache STALE for key {cache_key} (age: {age_hours:.1f}h)")
+        else:
+            logger.info(f"[OK] Cache HIT for key {cache_key} (age: {age_hours:.1f}h)")
+
+        return {
+            'insights': cached_data.get('insights', []),
+            'filters': cached_data.get('filters', {}),
+            'cached': True,
+            'stale': stale,
+            'cache_age_hours': age_hours
+        }
+
+    except Exception as e:
+        logger.warning(f"Error reading cache: {e}")
+        return None
+
+
+def save_insights_to_cache(cache_key: str, insights: List[dict], filters: Optional[dict] = None):
+    """Save insights to cache (filters are stored so the scope can be regenerated later)"""
+    cache_file = CACHE_DIR / f"{cache_key}.json"
+
+    try:
+        cache_data = {
+            'insights': insights,
+            'generated_at': datetime.utcnow().isoformat(),
+            'cache_key': cache_key,
+            'filters': filters or {}
+        }
+
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump(cache_data, f, indent=2, ensure_ascii=False)
+
+        logger.info(f"💾 Insights cached to {cache_file}")
+
+    except Exception as e:
+        logger.error(f"Error saving cache: {e}")
+
+
+def known_insight_scopes() -> List[dict]:
+    """
+    Lista os escopos de filtro (segmentos) que já possuem cache.
+
+    O escopo global ({}) está sempre incluído.
+    """
+    scopes: Dict[str, dict] = {get_cache_key({}): {}}
+
+    for cache_file in CACHE_DIR.glob("*.json"):
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                filters = json.load(f).get('filters')
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable insights cache {cache_file.name}: {e}")
+            continue
+
+        if isinstance(filters, dict):
+            scopes[get_cache_key(filters)] = filters
+
+    return list(scopes.values())
+
+
+async def generate_insights(filters: Optional[dict] = None) -> List[dict]:
+    """Gera insights (heurística offline ou LLM) para o escopo informado."""
+    from backend.app.config.settings import settings
+
+    if settings.LLM_PROVIDER == "mock" or settings.DEV_FAST_MODE:
+        logger.info("⚡ [INSIGHTS] Gerando insights via Heurística (Offline Mode)")
+        return await generate_offline_insights()
+
+    from backend.app.services.llm_insights import LLMInsightsService
+
+    logger.info(f"[SEARCH] Filtrando insights para segmentos: {(filters or {}).get('segments', 'all')}")
+    return await LLMInsightsService.generate_proactive_insights(filters=filters)
+
+
+async def regenerate_insights(filters: Optional[dict] = None) -> List[dict]:
+    """
+    Gera e persiste insights para o escopo informado.
+
+    Um resultado degradado (quota, manutenção) nunca sobrescreve o cache:
+    os insights anteriores continuam sendo servidos até a próxima tentativa.
+    """
+    cache_key = get_cache_key(filters)
+    try:
+        raw_insights = await generate_insights(filters)
+        if any(is_degraded_insight_item(item) for item in raw_insights if isinstance(item, dict)):
+            previous = get_cached_insights(cache_key)
+            logger.warning(f"[INSIGHTS] Degraded regeneration for key {cache_key}; keeping previous cache")
+            return previous['insights'] if previous else raw_insights
+
+        save_insights_to_cache(cache_key, raw_insights, filters)
+        return raw_insights
+    finally:
+        _inflight_regenerations.pop(cache_key, None)
+
+
+def _is_regeneration_inflight(cache_key: str) -> bool:
+    task_id = _inflight_regenerations.get(cache_key)
+    if task_id is None:
+        return False
+
+    task = get_task_manager().get_task(task_id)
+    if task is None or task.status not in (TaskStatus.PENDING, TaskStatus.RUNNING):
+        _inflight_regenerations.pop(cache_key, None)
+        return False
+    return True
+
+
+async def schedule_insights_regeneration(filters: Optional[dict] = None) -> Optional[str]:
+    """
+    Agenda a regeneração dos insights de um escopo em background.
+
+    Returns:
+        ID da tarefa criada, ou None se já existe uma regeneração em andamento
+        para o mesmo escopo.
+    """
+    cache_key = get_cache_key(filters)
+    if _is_regeneration_inflight(cache_key):
+        logger.info(f"[INSIGHTS] Regeneration already in flight for key {cache_key}")
+        return None
+
+    task_id = await get_task_manager().add_task(
+        regenerate_insights,
+        filters,
+        name=f"insights_regeneration:{cache_key}"
+    )
+    _inflight_regenerations[cache_key] = task_id
+    return task_id
+
+
+async def schedule_insights_refresh_for_all_scopes() -> List[str]:
+    """Agenda a regeneração de todos os escopos conhecidos (após refresh do dataset)."""
+    task_ids = []
+    for filters in known_insight_scopes():
+        task_id = await schedule_insights_regeneration(filters)
+        if task_id:
+            task_ids.append(task_id)
+
+    logger.info(f"[INSIGHTS] Scheduled {len(task_ids)} insight regenerations after dataset refresh")
+    return task_ids
+
+
+async def generate_offline_insights() -> List[dict]:
+    """
+    Gera insights determinísticos usando DuckDB diretamente.
+    Substitui o LLM no modo offline.
+    """
+    from backend.app.infrastructure.data.duckdb_enhanced_adapter import get_duckdb_adapter
+
+    insights = []
+
+    try:
+        adapter = get_duckdb_adapter()
+        # 1. Insight de Vendas/Valor
+        # Análise 1: Top Produtos por Valor (Mais seguro que Grupo)
+        df_top = adapter.load_data(
+            columns=["NOME", "LIQUIDO_38"],
+            order_by="LIQUIDO_38 DESC",
+            limit=1
+        )
+
+        if not df_top.empty:
+            item = df_top.iloc[0]
+            val = item.get('LIQUIDO_38', 0)
+            insights.append({
+                "title": "Produto de Maior Impacto",
+                "description": f"O produto '{item['NOME']}' tem valor unitário de R$ {float(val):,.2f}.",
+                "category": "finance",
+                "severity": "medium",
+                "recommendation": "Verificar disponibilidade em todas as lojas."
+            })
+
+        # Análise 2: Quantidade de Produtos (Count)
+        # Mais seguro que soma de estoque se o tipo for incerto
+        df_count = adapter.execute_aggregation(
+             agg_col="PRODUTO",
+             agg_func="count",
+             group_by=[],
+             limit=1
+        )
+        if not df_count.empty:
+            qtde = df_count.iloc[0].get('valor', df_count.iloc[0, 0])
+            insights.append({
+                "title": "Total de Produtos",
+                "description": f"A base conta com {int(qtde)} produtos cadastrados.",
+                "category": "inventory",
+                "severity": "info",
+                "recommendation": None
+            })
+
+        # Análise 3: Produtos de Alto Valor
+        df_par = adapter.load_data(
+            columns=["PRODUTO", "NOME", "LIQUIDO_38"],
+            order_by="LIQUIDO_38 DESC",
+            limit=1
+        )
+        if not df_par.empty:
+            item = df_par.iloc[0]
+            insights.append({
+                "title": "Item Mais Valioso",
+                "description": f"'{item['NOME']}' (R$ {item['LIQUIDO_38']}).",
+                "category": "product",
+                "severity": "low",
+                "recommendation": "Destaque este item na vitrine."
+            })
+
+    except Exception as e:
+        logger.error(f"Erro na geração de insights offline: {e}")
+        insights.append({
+            "title": "Erro na Análise Local",
+            "description": f"Falha ao calcular métricas: {str(e)}",
+            "category": "system",
+            "severity": "high",
+            "recommendation": None
+        })
+
+    # Se nada gerou (Ex: tabela vazia)
+    if not insights:
+        insights.append({
+            "title": "Sem Dados Suficientes",
+            "description": "A base de dados parece vazia ou inacessível no momento.",
+            "category": "data",
+            "severity": "low",
+            "recommendation": "Verifique a carga do arquivo parquet."
+        })
+
+    return insights
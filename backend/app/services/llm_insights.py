@@ -3,6 +3,7 @@ import logging
 import json
 from typing import List, Dict, Any
 from backend.app.core.llm_factory import LLMFactory
+from backend.app.core.llm_cache import llm_call_site
 from backend.app.services.data_aggregation import DataAggregationService
 
 logger = logging.getLogger(__name__)
@@ -145,7 +146,8 @@ class LLMInsightsService:
             # Reforçando que queremos apenas JSON
             user_message_final = user_message + "\n\nRESPOSTA (APENAS JSON):"
 
-            response_text = await llm.generate_response(user_message_final)
+            with llm_call_site("proactive_insights"):
+                response_text = await llm.generate_response(user_message_final)
             logger.info(f"LLM Raw Response ({settings.LLM_PROVIDER}): {response_text[:200]}...") # Log parcial
             
             # 4. Parse e Limpeza
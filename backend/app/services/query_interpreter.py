@@ -391,8 +391,12 @@ JSON:"""
         try:
             # Usar get_completion (sync) compatível com SmartLLM
             messages = [{"role": "user", "content": prompt}]
-            # SmartLLM.get_completion espera messages e tools (opcional)
-            llm_result = self.llm_adapter.get_completion(messages)
+            # Cache também para adapters crus; o SmartLLM (sem temperature) já
+            # cacheia por provedor e passa direto aqui
+            from backend.app.core.llm_cache import cached_completion, llm_call_site
+
+            with llm_call_site("intent_classification"):
+                llm_result = cached_completion(self.llm_adapter, messages)
             
             if "error" in llm_result:
                 raise Exception(llm_result["error"])
@@ -2,6 +2,8 @@
 CatalogBuilderService — Serviço de Construção do Catálogo
 
 Orquestra o pipeline: Source -> Extraction -> Normalization -> Persistence.
+Rebuilds são incrementais: só produtos novos/alterados (hash do conteúdo
+bruto) são normalizados e indexados; os demais são copiados da versão ativa.
 
 Autor: Backend Specialist Agent
 Data: 2026-02-07
@@ -18,9 +20,14 @@ from backend.domain.ports.product_catalog_ports import (
     ICatalogVersionPort,
     INormalizationPort
 )
+from backend.domain.ports.product_search_ports import IRetrievalIndexPort
 
 logger = structlog.get_logger(__name__)
 
+# Colunas brutas que definem o conteúdo de um produto (updated_at fica de fora)
+CONTENT_COLUMNS = ("product_id", "name_raw", "brand", "dept", "category", "subcategory")
+
+
 class CatalogBuilderService:
     """
     Serviço que reconstrói o catálogo canônico a partir da fonte bruta.
@@ -31,20 +38,28 @@ class CatalogBuilderService:
         source: IProductSourcePort,
         repository: IProductCatalogRepository,
         version_manager: ICatalogVersionPort,
-        normalizer: INormalizationPort
+        normalizer: INormalizationPort,
+        vector_index: Optional[IRetrievalIndexPort] = None
     ):
         self.source = source
         self.repository = repository
         self.version_manager = version_manager
         self.normalizer = normalizer
+        self.vector_index = vector_index
 
-    async def rebuild_catalog(self, description: str = "Full Catalog Rebuild") -> str:
+    async def rebuild_catalog(self, description: str = "Full Catalog Rebuild", full: bool = False) -> str:
         """
-        Executa o pipeline completo de reconstrução (Vetorizado).
+        Executa o pipeline de reconstrução (Vetorizado).
+
+        Incremental por padrão: cada linha da fonte recebe um hash do conteúdo
+        bruto; produtos com o mesmo hash na versão ativa são copiados para a
+        nova versão (linhas e embeddings) e só os novos/alterados passam pela
+        normalização e pelo embedding. Os que sumiram da fonte não são
+        copiados. `full=True` (ou versão ativa sem hashes) reprocessa todas as
+        linhas; o índice ANN ainda só recebe os textos que mudaram.
         """
         import pandas as pd
-        import json
-        logger.info("rebuild_catalog_started_vectorized", description=description)
+        logger.info("rebuild_catalog_started_vectorized", description=description, full=full)
         
         # 1. Criar nova versão
         catalog_version = await self.version_manager.create_version(description)
@@ -54,11 +69,57 @@ class CatalogBuilderService:
         if not raw_items:
             return ""
 
-        # Converter para DataFrame
+        # Converter para DataFrame (um registro canônico por produto)
         df = pd.DataFrame(raw_items)
         del raw_items
+        df['product_id'] = pd.to_numeric(df['product_id'], errors='coerce')
+        df = df.dropna(subset=['product_id'])
+        df['product_id'] = df['product_id'].astype('int64')
+        df['content_hash'] = content_hashes(df)
+        df = df.sort_values(['product_id', 'content_hash'], kind='stable').drop_duplicates('product_id')
+
+        # 3. Diff contra a versão ativa
+        # (o índice ANN parte da versão ativa mesmo com full: é diffado pelo texto)
+        base_version = await self.version_manager.get_active_version()
+        kept_ids: List[int] = []
+        if base_version and not full:
+            try:
+                base = await self.repository.get_content_hashes(base_version)
+            except NotImplementedError:
+                base = None
+            if base is not None and not base.empty:
+                base_hash = base.drop_duplicates('product_id').set_index('product_id')['content_hash']
+                unchanged = df['product_id'].map(base_hash).eq(df['content_hash']).to_numpy()
+                kept_ids = df.loc[unchanged, 'product_id'].tolist()
+                df = df.loc[~unchanged]
+        logger.info(
+            "catalog_diff_computed",
+            base_version=base_version, full=full, unchanged=len(kept_ids), changed=len(df),
+        )
+
+        # 4. Transformação Vetorizada (só novos/alterados)
+        output_df = self._transform(df, catalog_version)
+        
+        # 5. Salvar: inalterados copiados dentro do banco + alterados
+        if kept_ids:
+            copied = await self.repository.copy_products(base_version, catalog_version, kept_ids)
+            if copied < len(kept_ids):
+                logger.error("rebuild_failed_during_copy", expected=len(kept_ids), copied=copied)
+                return ""
+        success = await self.repository.save_products_df(output_df, catalog_version)
         
-        # 3. Transformação Vetorizada
+        if success:
+            await self._update_vector_index(output_df, catalog_version, base_version, kept_ids)
+            await self.version_manager.activate_version(catalog_version)
+            logger.info("rebuild_catalog_completed", version_id=catalog_version)
+            return catalog_version
+        else:
+            logger.error("rebuild_failed_during_save")
+            return ""
+
+    def _transform(self, df, catalog_version: str):
+        """Normalização + texto de busca das linhas brutas, no esquema do repositório."""
+        df = df.copy()
         logger.info("transforming_data_vectorized", rows=len(df))
         
         # Normalizar colunas principais
@@ -81,20 +142,52 @@ class CatalogBuilderService:
         df['attributes_json'] = "{}" 
         
         # Ajustar colunas para o esquema do Repo (DuckDB)
-        # Ordem: product_id, name_raw, name_canonical, brand, dept, category, subcategory, attributes_json, status, updated_at, searchable_text, catalog_version
-        output_df = df[[
+        return df[[
             'product_id', 'name_raw', 'name_canonical', 'brand', 'dept', 
             'category', 'subcategory', 'attributes_json', 'status', 
-            'updated_at', 'searchable_text', 'catalog_version'
-        ]].copy()
-        
-        # 4. Salvar
-        success = await self.repository.save_products_df(output_df, catalog_version)
-        
-        if success:
-            await self.version_manager.activate_version(catalog_version)
-            logger.info("rebuild_catalog_completed", version_id=catalog_version)
-            return catalog_version
-        else:
-            logger.error("rebuild_failed_during_save")
-            return ""
+            'updated_at', 'searchable_text', 'catalog_version', 'content_hash'
+        ]]
+
+    async def _update_vector_index(
+        self,
+        df,
+        catalog_version: str,
+        base_version: Optional[str] = None,
+        kept_ids: Optional[List[int]] = None,
+    ) -> None:
+        """
+        Atualiza o índice vetorial da nova versão a partir da versão base:
+        embeddings dos inalterados são copiados, só os novos/alterados são
+        gerados. Se a base não tiver os embeddings, indexa a versão inteira.
+        Falhas não bloqueiam a ativação: sem índice ANN a busca vetorial cai
+        para o SQL.
+        """
+        if self.vector_index is None:
+            return
+        try:
+            ids = df['product_id'].astype('int64').tolist()
+            texts = df['searchable_text'].fillna("").tolist()
+            ok = False
+            if kept_ids:
+                ok = await self.vector_index.build_index_from_texts(
+                    ids, texts, catalog_version, base_version, kept_ids=kept_ids
+                )
+                if not ok:
+                    logger.warning("vector_index_incremental_fallback", version_id=catalog_version)
+                    full = await self.repository.get_product_texts(catalog_version)
+                    ids = full['product_id'].astype('int64').tolist()
+                    texts = full['searchable_text'].fillna("").tolist()
+            if not ok:
+                ok = await self.vector_index.build_index_from_texts(ids, texts, catalog_version, base_version)
+            if not ok:
+                logger.warning("vector_index_update_incomplete", version_id=catalog_version)
+        except Exception as e:
+            logger.error("vector_index_update_failed", version_id=catalog_version, error=str(e))
+
+
+def content_hashes(df) -> "pd.Series":
+    """Hash (uint64) do conteúdo bruto de cada linha: igual = produto inalterado."""
+    import pandas as pd
+    return pd.util.hash_pandas_object(
+        df[list(CONTENT_COLUMNS)].astype(str), index=False
+    ).astype('uint64')
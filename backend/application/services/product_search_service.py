@@ -50,7 +50,9 @@ class ProductSearchService:
             logger.error("deep_search_failed_no_active_version")
             return []
             
-        # 2. Executar buscas em paralelo (Retrieval)
+        # 2. Executar buscas em paralelo (Retrieval); as duas pernas ficam
+        # restritas aos produtos de active_version (a lexical filtra os hits do
+        # snapshot do parquet pelos ids da versão)
         import asyncio
         p_start = time.perf_counter()
         bm25_task = self.bm25_adapter.search(query, active_version, top_k=50)
@@ -10,11 +10,40 @@ Data: 2026-02-07
 
 import re
 import unicodedata
-from typing import List, Set
+from functools import lru_cache
+from typing import Dict, List, Set, Tuple
 import structlog
 
 logger = structlog.get_logger(__name__)
 
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9\s]')
+_SPACES_RE = re.compile(r'\s+')
+
+
+def _fold_slow(text: str) -> str:
+    """Normalização de referência (lower + NFD sem marcas + só [a-z0-9])."""
+    text = "".join(c for c in unicodedata.normalize('NFD', text.lower()) if unicodedata.category(c) != 'Mn')
+    return _SPACES_RE.sub(' ', _NON_ALNUM_RE.sub(' ', text)).strip()
+
+
+def _build_fold_table(limit: int = 0x250) -> Dict[int, str]:
+    """
+    Tabela de `str.translate` pré-computada para Latin-1 + Latin Extended-A/B:
+    cada caractere vira o resultado de `_fold_slow` (minúsculo, sem acento,
+    não alfanumérico -> espaço). Caracteres fora da faixa usam o caminho lento.
+    """
+    table = {}
+    for code in range(limit):
+        folded = "".join(
+            c for c in unicodedata.normalize('NFD', chr(code).lower()) if unicodedata.category(c) != 'Mn'
+        )
+        table[code] = "".join(c if ('a' <= c <= 'z' or '0' <= c <= '9') else ' ' for c in folded)
+    return table
+
+
+_FOLD_TABLE = _build_fold_table()
+
+
 class PTBRNormalizer:
     """
     Utilitário para processamento de texto pt-BR.
@@ -45,42 +74,37 @@ class PTBRNormalizer:
         """Normalização para string individual."""
         if not text or not isinstance(text, str):
             return ""
-        text = text.lower()
-        text = "".join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
-        text = re.sub(r'[^a-z0-9\s]', ' ', text)
-        return re.sub(r'\s+', ' ', text).strip()
+        folded = text.translate(_FOLD_TABLE)
+        if not folded.isascii():
+            return _fold_slow(text)
+        return " ".join(folded.split())
 
     @classmethod
     def normalize_series(cls, series: "pd.Series") -> "pd.Series":
         """
-        Normalização vetorizada para Pandas Series.
-        Muito mais rápida para 1M+ registros.
+        Normalização de uma Series inteira (mesmo resultado de `normalize_text`
+        em cada valor; nulos e não-strings viram "").
+        Valores repetidos (marca, categoria) são normalizados uma única vez.
         """
+        import numpy as np
         import pandas as pd
-        # 1. Lowercase e remover nulos
-        s = series.fillna("").str.lower()
-        
-        # 2. Remover acentos (usando normalize do pandas)
-        s = s.str.normalize('NFD').str.encode('ascii', errors='ignore').str.decode('utf-8')
-        
-        # 3. Remover caracteres especiais e espaços extras
-        s = s.str.replace(r'[^a-z0-9\s]', ' ', regex=True)
-        s = s.str.replace(r'\s+', ' ', regex=True).str.strip()
-        
-        return s
+        codes, uniques = pd.factorize(series)  # nulos -> -1 (último item: "")
+        table = _FOLD_TABLE
+        folded = [
+            (" ".join(f.split()) if (f := v.translate(table)).isascii() else _fold_slow(v)) if isinstance(v, str) else ""
+            for v in uniques.tolist()
+        ]
+        folded.append("")
+        return pd.Series(np.asarray(folded, dtype=object)[codes], index=series.index, name=series.name)
 
     @classmethod
     def tokenize(cls, text: str, remove_stopwords: bool = True) -> List[str]:
         """
         Tokeniza o texto normalizado.
         """
-        normalized = cls.normalize_text(text)
-        tokens = normalized.split()
-        
-        if remove_stopwords:
-            tokens = [t for t in tokens if t not in cls.STOPWORDS]
-            
-        return tokens
+        if not text or not isinstance(text, str):
+            return []
+        return list(_tokenize_cached(text, remove_stopwords))
 
     @classmethod
     def prepare_searchable_text(cls, fields: List[str]) -> str:
@@ -89,3 +113,13 @@ class PTBRNormalizer:
         """
         combined = " ".join([str(f) for f in fields if f])
         return cls.normalize_text(combined)
+
+
+@lru_cache(maxsize=16384)
+def _tokenize_cached(text: str, remove_stopwords: bool) -> Tuple[str, ...]:
+    # Queries se repetem muito (typeahead, cache de busca, fast path): memoiza por string
+    tokens = PTBRNormalizer.normalize_text(text).split()
+    if remove_stopwords:
+        stopwords = PTBRNormalizer.STOPWORDS
+        return tuple(t for t in tokens if t not in stopwords)
+    return tuple(tokens)
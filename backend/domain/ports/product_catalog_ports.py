@@ -8,7 +8,7 @@ Data: 2026-02-07
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set
 from datetime import datetime
 
 from backend.domain.entities.product_canonical import ProductCanonical
@@ -48,6 +48,22 @@ class IProductCatalogRepository(ABC):
         """Lista produtos de uma versão específica."""
         pass
 
+    async def get_content_hashes(self, version: str) -> "pd.DataFrame":
+        """(product_id, content_hash) das linhas da versão (base do rebuild incremental)."""
+        raise NotImplementedError
+
+    async def copy_products(self, from_version: str, to_version: str, product_ids: List[int]) -> int:
+        """Copia produtos inalterados para a nova versão; retorna quantos foram copiados."""
+        raise NotImplementedError
+
+    async def get_product_texts(self, version: str) -> "pd.DataFrame":
+        """(product_id, searchable_text) de todos os produtos da versão."""
+        raise NotImplementedError
+
+    async def get_product_ids(self, version: str) -> Set[int]:
+        """Ids dos produtos presentes na versão."""
+        raise NotImplementedError
+
 
 class ISynonymRepository(ABC):
     """Porta para gestão de sinônimos e termos canônicos."""
@@ -27,6 +27,22 @@ class IRetrievalIndexPort(ABC):
         """Realiza busca e retorna candidatos com scores brutos."""
         pass
 
+    async def build_index_from_texts(
+        self,
+        ids: List[int],
+        texts: List[str],
+        version: str,
+        base_version: Optional[str] = None,
+        kept_ids: Optional[List[int]] = None
+    ) -> bool:
+        """
+        Indexa a partir de (product_id, searchable_text). Com `base_version`, o
+        índice dessa versão é reaproveitado e só as diferenças são aplicadas.
+        Com `kept_ids`, `ids`/`texts` trazem só os produtos novos/alterados e
+        os de `kept_ids` são copiados da base (False se a base não os tiver).
+        """
+        raise NotImplementedError
+
 
 class IRankingFusionPort(ABC):
     """Porta para fusão de rankings e aplicação de regras de negócio."""
@@ -3,6 +3,10 @@ BM25RankingAdapter — Adapter de Ranking BM25
 
 Implementação de ranking usando BM25 (sparse retrieval).
 
+`rank_bm25` mantém um BM25Index entre chamadas: documentos já vistos (mesmo
+id e conteúdo) não são re-tokenizados e o IDF só é recalculado quando o
+conjunto muda.
+
 Autor: Backend Specialist Agent
 Data: 2026-02-07
 """
@@ -14,6 +18,7 @@ import re
 
 import structlog
 
+from backend.app.core.rag.bm25_index import BM25Index
 from backend.domain.ports.ranking_port import IRankingPort, RankedDocument
 from backend.domain.entities.document import Document
 
@@ -46,6 +51,9 @@ class BM25RankingAdapter(IRankingPort):
         self.k1 = k1
         self.b = b
         self.epsilon = epsilon
+        # Índice invertido reaproveitado entre chamadas (postings + IDF pré-computados)
+        self._index = BM25Index(self._tokenize, k1=k1, b=b, idf="lucene", denominator_epsilon=epsilon)
+        self._contents: Dict[str, str] = {}
     
     def _tokenize(self, text: str) -> List[str]:
         """Tokeniza texto em palavras."""
@@ -57,45 +65,20 @@ class BM25RankingAdapter(IRankingPort):
         stopwords = {'a', 'o', 'e', 'de', 'da', 'do', 'em', 'para', 'com', 'que', 'the', 'is', 'at', 'on', 'in'}
         return [t for t in tokens if t not in stopwords and len(t) > 1]
     
-    def _compute_idf(self, documents: List[Document]) -> Dict[str, float]:
-        """Calcula IDF para cada termo."""
-        n_docs = len(documents)
-        doc_freq = defaultdict(int)
-        
-        for doc in documents:
-            tokens = set(self._tokenize(doc.content))
-            for token in tokens:
-                doc_freq[token] += 1
-        
-        idf = {}
-        for term, freq in doc_freq.items():
-            idf[term] = math.log((n_docs - freq + 0.5) / (freq + 0.5) + 1)
-        
-        return idf
-    
-    def _compute_bm25_score(
-        self,
-        query_tokens: List[str],
-        doc_tokens: List[str],
-        avg_doc_len: float,
-        idf: Dict[str, float],
-    ) -> float:
-        """Calcula score BM25 para um documento."""
-        doc_len = len(doc_tokens)
-        term_freq = defaultdict(int)
-        
-        for token in doc_tokens:
-            term_freq[token] += 1
-        
-        score = 0.0
-        for token in query_tokens:
-            if token in idf:
-                tf = term_freq.get(token, 0)
-                numerator = tf * (self.k1 + 1)
-                denominator = tf + self.k1 * (1 - self.b + self.b * doc_len / avg_doc_len)
-                score += idf[token] * numerator / (denominator + self.epsilon)
-        
-        return score
+    def _sync_index(self, documents: List[Document]) -> Dict[str, Document]:
+        """
+        Alinha o índice invertido com `documents`: só documentos novos ou com
+        conteúdo alterado são (re)tokenizados; os ausentes saem do índice.
+        """
+        current = {doc.id: doc for doc in documents}
+        for doc_id in [d for d in self._contents if d not in current]:
+            self._index.remove(doc_id)
+            del self._contents[doc_id]
+        for doc_id, doc in current.items():
+            if self._contents.get(doc_id) != doc.content:
+                self._index.add(doc_id, doc.content)
+                self._contents[doc_id] = doc.content
+        return current
     
     async def rank_bm25(
         self,
@@ -111,23 +94,19 @@ class BM25RankingAdapter(IRankingPort):
         if not query_tokens:
             return []
         
-        # Tokeniza todos os documentos
-        doc_tokens_list = [self._tokenize(doc.content) for doc in documents]
-        avg_doc_len = sum(len(tokens) for tokens in doc_tokens_list) / len(documents)
-        
-        # Calcula IDF
-        idf = self._compute_idf(documents)
+        by_id = self._sync_index(documents)
+        scored_docs = [(by_id[doc_id], score) for doc_id, score in self._index.search_tokens(query_tokens, top_k)]
         
-        # Calcula scores
-        scored_docs = []
-        for doc, doc_tokens in zip(documents, doc_tokens_list):
-            score = self._compute_bm25_score(query_tokens, doc_tokens, avg_doc_len, idf)
-            scored_docs.append((doc, score))
+        # Completa com documentos sem termo em comum (score 0), na ordem recebida
+        if len(scored_docs) < top_k:
+            matched = {doc.id for doc, _ in scored_docs}
+            for doc in documents:
+                if len(scored_docs) >= top_k:
+                    break
+                if doc.id not in matched:
+                    matched.add(doc.id)
+                    scored_docs.append((doc, 0.0))
         
-        # Ordena por score
-        scored_docs.sort(key=lambda x: x[1], reverse=True)
-        
-        # Retorna top_k
         return [
             RankedDocument(
                 document=doc,
@@ -135,7 +114,7 @@ class BM25RankingAdapter(IRankingPort):
                 rank=i + 1,
                 method="bm25",
             )
-            for i, (doc, score) in enumerate(scored_docs[:top_k])
+            for i, (doc, score) in enumerate(scored_docs)
         ]
     
     async def rank_neural(
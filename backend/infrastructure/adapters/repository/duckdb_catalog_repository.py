@@ -9,7 +9,7 @@ Data: 2026-02-07
 
 import duckdb
 import pandas as pd
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set
 from datetime import datetime
 import json
 import structlog
@@ -56,6 +56,9 @@ class DuckDBCatalogRepository(IProductCatalogRepository, ISynonymRepository, ICa
                     catalog_version TEXT
                 );
                 
+                -- Hash do conteúdo bruto da linha (rebuild incremental); NULL em versões antigas
+                ALTER TABLE products_canonical ADD COLUMN IF NOT EXISTS content_hash UBIGINT;
+                
                 CREATE INDEX IF NOT EXISTS idx_prod_version ON products_canonical(catalog_version);
                 
                 CREATE TABLE IF NOT EXISTS synonyms (
@@ -85,12 +88,54 @@ class DuckDBCatalogRepository(IProductCatalogRepository, ISynonymRepository, ICa
         
         try:
             with duckdb.connect(str(self.db_path)) as con:
-                con.execute("INSERT INTO products_canonical SELECT * FROM df")
+                con.execute("INSERT INTO products_canonical BY NAME SELECT * FROM df")
             return True
         except Exception as e:
             logger.error("duckdb_df_save_failed", error=str(e))
             return False
 
+    async def get_content_hashes(self, version: str) -> "pd.DataFrame":
+        """(product_id, content_hash) da versão; linhas sem hash (versões antigas) ficam de fora."""
+        with duckdb.connect(str(self.db_path)) as con:
+            return con.execute("""
+                SELECT product_id, content_hash FROM products_canonical
+                WHERE catalog_version = ? AND content_hash IS NOT NULL
+            """, [version]).df()
+
+    async def copy_products(self, from_version: str, to_version: str, product_ids: List[int]) -> int:
+        """
+        Copia as linhas de `product_ids` de uma versão para outra dentro do
+        DuckDB (sem passar pelo Python). Retorna quantas linhas foram copiadas.
+        """
+        if not product_ids:
+            return 0
+        keep = pd.DataFrame({"product_id": pd.Series(product_ids, dtype="int64")})
+        try:
+            with duckdb.connect(str(self.db_path)) as con:
+                return con.execute("""
+                    INSERT INTO products_canonical
+                    SELECT * REPLACE (CAST(? AS TEXT) AS catalog_version)
+                    FROM products_canonical
+                    WHERE catalog_version = ? AND product_id IN (SELECT product_id FROM keep)
+                """, [to_version, from_version]).fetchone()[0]
+        except Exception as e:
+            logger.error("duckdb_copy_products_failed", error=str(e))
+            return 0
+
+    async def get_product_texts(self, version: str) -> "pd.DataFrame":
+        """(product_id, searchable_text) da versão (entrada do índice vetorial)."""
+        with duckdb.connect(str(self.db_path)) as con:
+            return con.execute("""
+                SELECT product_id, searchable_text FROM products_canonical WHERE catalog_version = ?
+            """, [version]).df()
+
+    async def get_product_ids(self, version: str) -> Set[int]:
+        with duckdb.connect(str(self.db_path)) as con:
+            rows = con.execute(
+                "SELECT product_id FROM products_canonical WHERE catalog_version = ?", [version]
+            ).fetchnumpy()
+        return set(rows["product_id"].tolist())
+
     async def get_product(self, product_id: int, version: str) -> Optional[ProductCanonical]:
         with duckdb.connect(str(self.db_path)) as con:
             res = con.execute("""
@@ -0,0 +1,96 @@
+"""
+ProductRetrievalIndexAdapter — Busca Lexical via Serviço Compartilhado
+
+Implementa IRetrievalIndexPort sobre o `ProductRetrievalService` do processo
+(BM25 em memória, aquecido uma vez por versão dos dados e com cache de
+queries), no lugar do índice Whoosh aberto do disco a cada busca.
+
+O serviço segue o parquet, não o catálogo canônico: com o repositório, os
+hits são restritos aos produtos da versão pedida (a mesma que a busca
+vetorial e a hidratação usam).
+
+Autor: Backend Specialist Agent
+Data: 2026-10-19
+"""
+
+import asyncio
+from typing import List, Optional, Set, Tuple
+
+import structlog
+
+from backend.app.core.rag.product_retrieval import ProductRetrievalService, get_product_retrieval_service
+from backend.domain.entities.product_canonical import ProductCanonical
+from backend.domain.entities.retrieval import RetrievedItem
+from backend.domain.ports.product_catalog_ports import IProductCatalogRepository
+from backend.domain.ports.product_search_ports import IRetrievalIndexPort
+
+logger = structlog.get_logger(__name__)
+
+
+class ProductRetrievalIndexAdapter(IRetrievalIndexPort):
+    """
+    Adaptador lexical (BM25) que delega ao serviço único de busca de produtos.
+    """
+
+    # Hits extras pedidos ao serviço para compensar os filtrados pela versão
+    VERSION_OVERFETCH = 2
+
+    def __init__(
+        self,
+        service: Optional[ProductRetrievalService] = None,
+        repository: Optional[IProductCatalogRepository] = None,
+    ):
+        self._service = service
+        self.repository = repository
+        self._version_ids: Optional[Tuple[str, Set[int]]] = None  # versões são imutáveis
+
+    @property
+    def service(self) -> ProductRetrievalService:
+        if self._service is None:
+            self._service = get_product_retrieval_service()
+        return self._service
+
+    async def build_index(self, products: List[ProductCanonical], version: str) -> bool:
+        """
+        O índice é montado a partir da fonte (parquet) quando ela muda; aqui só
+        descartamos o snapshot atual e aquecemos o novo.
+        """
+        try:
+            self.service.invalidate()
+            await asyncio.to_thread(self.service.warm)
+            return True
+        except Exception as e:
+            logger.error("shared_index_build_failed", error=str(e))
+            return False
+
+    async def search(self, query: str, version: str, top_k: int = 100) -> List[RetrievedItem]:
+        """
+        Busca BM25 no snapshot atual, restrita aos produtos de `version` quando
+        há repositório (sem ele, `version` não filtra).
+        """
+        if not query:
+            return []
+
+        try:
+            allowed = await self._ids_for(version)
+            limit = top_k * self.VERSION_OVERFETCH if allowed is not None else top_k
+            hits = await asyncio.to_thread(self.service.search, query, limit, "lexical")
+            if allowed is not None:
+                hits = [h for h in hits if h.product_id in allowed][:top_k]
+            return [RetrievedItem(product_id=h.product_id, score=h.score, source='bm25') for h in hits]
+        except Exception as e:
+            logger.error("shared_index_search_failed", error=str(e))
+            return []
+
+    async def _ids_for(self, version: str) -> Optional[Set[int]]:
+        if self.repository is None or not version:
+            return None
+        cached = self._version_ids
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        try:
+            ids = await self.repository.get_product_ids(version)
+        except NotImplementedError:
+            return None
+        self._version_ids = (version, ids)
+        return ids
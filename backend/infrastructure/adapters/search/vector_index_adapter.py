@@ -4,42 +4,114 @@ VectorIndexAdapter — Adaptador de Busca Vetorial (Semântica)
 Implementa indexação e busca por similaridade semântica utilizando 
 sentence-transformers e DuckDB.
 
+Os embeddings do catálogo são gerados pelo EmbeddingPipeline (lotes,
+dedupe por hash do texto, checkpoint no EmbeddingStore em
+`<db_dir>/embeddings/catalog_<modelo>`): um rebuild interrompido retoma de
+onde parou e textos iguais entre versões não são recalculados.
+
+A busca usa um índice ANN (HNSW) por versão em `<db_dir>/ann/<versão>`, em vez
+de `list_cosine_similarity` sobre todas as linhas da versão. A versão nova
+parte do índice da versão base e recebe só os produtos novos/alterados
+(detectados pelo hash do texto) e a remoção dos que saíram. Sem índice para a
+versão, a busca cai para o SQL de antes.
+
+No DuckDB, um rebuild incremental grava só os vetores novos/alterados; os
+inalterados ficam em `products_embedding_refs` apontando para a versão que
+guarda a linha (em vez de copiar todos os vetores a cada versão).
+
+Embeddings de query vêm do `QueryEmbeddingRuntime` compartilhado (modelo
+ONNX int8 quando disponível, micro-batching das queries concorrentes e LRU),
+aguardado sem bloquear o event loop.
+
 Autor: Backend Specialist Agent
 Data: 2026-02-07
 """
 
+import asyncio
+import re
+import threading
+
 import duckdb
 import numpy as np
-from typing import List, Optional, Dict, Any
+from typing import Any, List, Optional, Dict
 import structlog
 from pathlib import Path
 
+from backend.app.core.rag.ann_index import ANNIndex
+from backend.app.core.rag.embedding_pipeline import EmbeddingPipeline, content_hash
+from backend.app.core.rag.embedding_runtime import (
+    DEFAULT_ONNX_MODEL_FILE,
+    QueryEmbeddingRuntime,
+    get_embedding_runtime,
+)
+from backend.app.core.rag.embedding_store import EmbeddingStore
 from backend.domain.entities.retrieval import RetrievedItem
 from backend.domain.entities.product_canonical import ProductCanonical
 from backend.domain.ports.product_search_ports import IRetrievalIndexPort
 
 logger = structlog.get_logger(__name__)
+
+# Índices ANN carregados por diretório de versão (versões são imutáveis após o build)
+_ANN_CACHE: Dict[str, ANNIndex] = {}
+_ANN_CACHE_LOCK = threading.Lock()
+
+# Embeddings de uma versão: linhas próprias (produtos novos/alterados) + as
+# referenciadas em products_embedding_refs (inalterados num rebuild
+# incremental, apontando para a versão que tem a linha física)
+_VERSION_EMBEDDINGS = """
+    version_embeddings AS (
+        SELECT product_id, embedding FROM products_embeddings WHERE catalog_version = $version
+        UNION ALL
+        SELECT e.product_id, e.embedding
+        FROM products_embedding_refs r
+        JOIN products_embeddings e ON e.catalog_version = r.source_version AND e.product_id = r.product_id
+        WHERE r.catalog_version = $version
+    )
+"""
+
+
 class VectorIndexAdapter(IRetrievalIndexPort):
     """
     Adaptador para busca semântica.
     Utiliza embeddings vetoriais persistidos no DuckDB.
     """
     
-    def __init__(self, db_path: str, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        db_path: str,
+        model_name: str = "all-MiniLM-L6-v2",
+        batch_size: int = 256,
+        hnsw_m: int = 32,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+        onnx_model_dir: Optional[str] = None,
+        onnx_model_file: str = DEFAULT_ONNX_MODEL_FILE,
+        onnx_threads: int = 0,
+        query_batch_window_ms: float = 5.0,
+        query_max_batch: int = 32,
+        query_cache_size: int = 4096,
+        backend: Any = None,
+    ):
         self.db_path = Path(db_path)
-        self.model_name = model_name
-        self._model = None # Lazy loading
+        self.batch_size = batch_size
+        if backend is not None:
+            self.runtime = QueryEmbeddingRuntime(backend, query_batch_window_ms, query_max_batch, query_cache_size)
+        else:
+            # Modelo (lazy) e fila de queries compartilhados pelos adaptadores do processo
+            self.runtime = get_embedding_runtime(
+                model_name, onnx_model_dir, onnx_model_file, onnx_threads,
+                query_batch_window_ms, query_max_batch, query_cache_size,
+            )
+        self.backend = self.runtime.backend
+        # Nome do backend (ex.: sufixo do ONNX quantizado): vetores de modelos diferentes não se misturam
+        self.model_name = self.runtime.model_name
+        self.embeddings_dir = self.db_path.parent / "embeddings" / f"catalog_{re.sub(r'[^A-Za-z0-9_.-]', '_', self.model_name)}"
+        self.ann_dir = self.db_path.parent / "ann"
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
         self._ensure_tables()
 
-    @property
-    def model(self):
-        """Lazy loader para o modelo transformer."""
-        if self._model is None:
-            logger.info("loading_sentence_transformer_model", model=self.model_name)
-            from sentence_transformers import SentenceTransformer
-            self._model = SentenceTransformer(self.model_name)
-        return self._model
-
     def _ensure_tables(self):
         """Cria tabela de embeddings se não existir."""
         with duckdb.connect(str(self.db_path)) as con:
@@ -50,48 +122,191 @@ class VectorIndexAdapter(IRetrievalIndexPort):
                     catalog_version TEXT
                 );
                 CREATE INDEX IF NOT EXISTS idx_vec_version ON products_embeddings(catalog_version);
+
+                -- Inalterados de um rebuild incremental: referência em vez de cópia do vetor
+                CREATE TABLE IF NOT EXISTS products_embedding_refs (
+                    catalog_version TEXT,
+                    product_id BIGINT,
+                    source_version TEXT
+                );
             """)
 
+    def _ann_path(self, version: str) -> Path:
+        return self.ann_dir / re.sub(r'[^A-Za-z0-9_.-]', '_', version)
+
+    def _load_ann(self, version: str) -> Optional[ANNIndex]:
+        key = str(self._ann_path(version))
+        with _ANN_CACHE_LOCK:
+            index = _ANN_CACHE.get(key)
+            if index is None:
+                index = ANNIndex.load(Path(key))
+                if index is not None:
+                    _ANN_CACHE[key] = index
+        return index
+
     async def build_index(self, products: List[ProductCanonical], version: str) -> bool:
         """
-        Gera embeddings para os produtos e os salva no DuckDB.
+        Gera embeddings para os produtos e os salva no DuckDB e no índice ANN.
+        """
+        return await self.build_index_from_texts(
+            [p.product_id for p in products], [p.searchable_text for p in products], version
+        )
+
+    async def build_index_from_texts(
+        self,
+        ids: List[int],
+        texts: List[str],
+        version: str,
+        base_version: Optional[str] = None,
+        kept_ids: Optional[List[int]] = None,
+    ) -> bool:
         """
-        if not products:
+        Indexa (product_id, searchable_text) na versão. Com `base_version`, parte
+        do índice ANN dessa versão e aplica só inserções/alterações/remoções.
+
+        Com `kept_ids` (rebuild incremental), `ids`/`texts` são só os produtos
+        novos/alterados: os embeddings de `kept_ids` são referenciados na base
+        (sem regravar os vetores). Retorna False se a base não tiver todos eles.
+        """
+        incremental = kept_ids is not None and base_version is not None
+        if not ids and not incremental:
             return True
             
-        logger.info("building_vector_index", count=len(products), version=version)
+        logger.info(
+            "building_vector_index",
+            count=len(ids), kept=len(kept_ids or []), version=version, base_version=base_version,
+        )
         
         try:
-            # 1. Preparar textos para embedding
-            texts = [p.searchable_text for p in products]
-            ids = [p.product_id for p in products]
-            
-            # 2. Gerar embeddings (CPU por padrão)
-            logger.info("generating_embeddings", model=self.model_name)
-            embeddings = self.model.encode(texts, show_progress_bar=True)
-            
-            # 3. Salvar no DuckDB
-            data = []
-            for i, product_id in enumerate(ids):
-                data.append((product_id, embeddings[i].tolist(), version))
-            
-            import pandas as pd
-            df = pd.DataFrame(data, columns=['product_id', 'embedding', 'catalog_version'])
-            
-            with duckdb.connect(str(self.db_path)) as con:
-                # Limpar embeddings antigos da mesma versão se existirem
-                con.execute("DELETE FROM products_embeddings WHERE catalog_version = ?", [version])
-                con.execute("INSERT INTO products_embeddings SELECT * FROM df")
+            # 1. Gerar embeddings em lotes (retomável; textos já no store são reaproveitados)
+            embeddings = None
+            if ids:
+                logger.info("generating_embeddings", model=self.model_name)
+                pipeline = EmbeddingPipeline(
+                    self.backend,
+                    EmbeddingStore(self.embeddings_dir, self.model_name).load(),
+                    batch_size=self.batch_size,
+                )
+                result = await asyncio.to_thread(pipeline.run, texts)
+                if not result.complete:
+                    logger.error("vector_index_incomplete", failed=result.failed, version=version)
+                    return False
+                embeddings = pipeline.vectors_for(texts)
+
+            # 2. Salvar no DuckDB (fallback SQL e consumidores da tabela)
+            if incremental:
+                copied = await asyncio.to_thread(
+                    self._save_embeddings, ids, embeddings, version, base_version, kept_ids
+                )
+                if copied < len(kept_ids):
+                    logger.warning(
+                        "vector_base_embeddings_missing", expected=len(kept_ids), copied=copied, version=version
+                    )
+                    return False
+            else:
+                await asyncio.to_thread(self._save_embeddings, ids, embeddings, version)
+
+            # 3. Índice ANN: reaproveita a versão base e aplica o diff
+            await asyncio.to_thread(self._update_ann, ids, texts, embeddings, version, base_version, kept_ids)
                 
-            logger.info("vector_index_built_successfully", rows=len(df))
+            logger.info("vector_index_built_successfully", rows=len(ids) + len(kept_ids or []))
             return True
         except Exception as e:
             logger.error("vector_index_build_failed", error=str(e))
             return False
 
+    def _save_embeddings(
+        self,
+        ids: List[int],
+        embeddings: Optional[np.ndarray],
+        version: str,
+        base_version: Optional[str] = None,
+        kept_ids: Optional[List[int]] = None,
+    ) -> int:
+        """
+        Grava os embeddings da versão. Os de `kept_ids` não são regravados: viram
+        referências às linhas da base (resolvidas até a versão que as contém).
+        Retorna quantos `kept_ids` foram encontrados na base.
+        """
+        import pandas as pd
+
+        copied = 0
+        with duckdb.connect(str(self.db_path)) as con:
+            # Limpar embeddings antigos da mesma versão se existirem
+            con.execute("DELETE FROM products_embeddings WHERE catalog_version = ?", [version])
+            con.execute("DELETE FROM products_embedding_refs WHERE catalog_version = ?", [version])
+            if kept_ids:
+                kept = pd.DataFrame({'product_id': np.asarray(kept_ids, dtype=np.int64)})
+                copied = con.execute("""
+                    INSERT INTO products_embedding_refs
+                    SELECT $version, product_id, $base FROM products_embeddings
+                    WHERE catalog_version = $base AND product_id IN (SELECT product_id FROM kept)
+                    UNION ALL
+                    SELECT $version, product_id, source_version FROM products_embedding_refs
+                    WHERE catalog_version = $base AND product_id IN (SELECT product_id FROM kept)
+                """, {"version": version, "base": base_version}).fetchone()[0]
+            if ids:
+                df = pd.DataFrame({
+                    'product_id': ids,
+                    'embedding': embeddings.tolist(),
+                    'catalog_version': version,
+                })
+                con.execute("INSERT INTO products_embeddings SELECT * FROM df")
+        return copied
+
+    def _load_embeddings(self, version: str, product_ids: List[int]):
+        import pandas as pd
+
+        wanted = pd.DataFrame({'product_id': np.asarray(product_ids, dtype=np.int64)})
+        with duckdb.connect(str(self.db_path)) as con:
+            rows = con.execute(f"""
+                WITH {_VERSION_EMBEDDINGS}
+                SELECT product_id, embedding FROM version_embeddings
+                WHERE product_id IN (SELECT product_id FROM wanted)
+            """, {"version": version}).fetchall()
+        return [int(r[0]) for r in rows], np.asarray([r[1] for r in rows], dtype=np.float32)
+
+    def _update_ann(
+        self,
+        ids: List[int],
+        texts: List[str],
+        embeddings: Optional[np.ndarray],
+        version: str,
+        base_version: Optional[str],
+        kept_ids: Optional[List[int]] = None,
+    ) -> Dict[str, int]:
+        dim = embeddings.shape[1] if embeddings is not None else None
+        index = None
+        if base_version and base_version != version:
+            index = ANNIndex.load(self._ann_path(base_version))  # cópia própria (não a do cache)
+            if index is not None and dim is not None and index.dimension != dim:
+                index = None
+        if index is None and kept_ids:
+            # Base sem índice ANN: parte dos embeddings (referenciados) da versão
+            stored_ids, stored = self._load_embeddings(version, kept_ids)
+            index = ANNIndex(stored.shape[1], self.hnsw_m, self.ef_construction, self.ef_search)
+            index.upsert(stored_ids, stored)
+        if index is None:
+            index = ANNIndex(dim, self.hnsw_m, self.ef_construction, self.ef_search)
+
+        keys = [content_hash(t) for t in texts]
+        changed = [i for i, (pid, key) in enumerate(zip(ids, keys)) if index.key_of(pid) != key]
+        current = {int(pid) for pid in ids} | {int(pid) for pid in kept_ids or []}
+        removed = index.remove([pid for pid in index.ids() if pid not in current])
+        if changed:
+            index.upsert([ids[i] for i in changed], embeddings[changed], [keys[i] for i in changed])
+
+        path = self._ann_path(version)
+        index.save(path, {"catalog_version": version, "base_version": base_version, "model": self.model_name})
+        with _ANN_CACHE_LOCK:
+            _ANN_CACHE[str(path)] = index
+        stats = {"upserted": len(changed), "removed": removed, "size": len(index)}
+        logger.info("ann_index_updated", version=version, **stats)
+        return stats
+
     async def search(self, query: str, version: str, top_k: int = 100) -> List[RetrievedItem]:
         """
-        Busca por similaridade de cosseno via SQL no DuckDB.
+        Busca por similaridade de cosseno: índice ANN da versão ou, sem ele, SQL no DuckDB.
         """
         if not query:
             return []
@@ -99,35 +314,41 @@ class VectorIndexAdapter(IRetrievalIndexPort):
         logger.info("vector_search_started", query=query, version=version)
         
         try:
-            # 1. Gerar embedding da query
-            query_embedding = self.model.encode(query).tolist()
-            
-            # 2. Busca via similaridade de cosseno (DuckDB suporta list_cosine_similarity)
-            # Nota: O DuckDB precisa do array de floats como literal ou parâmetro.
-            
-            sql = f"""
-                SELECT 
-                    product_id, 
-                    list_cosine_similarity(embedding, ?::FLOAT[]) as similarity
-                FROM products_embeddings
-                WHERE catalog_version = ?
-                ORDER BY similarity DESC
-                LIMIT ?
-            """
-            
-            with duckdb.connect(str(self.db_path)) as con:
-                df = con.execute(sql, [query_embedding, version, top_k]).df()
-                
-                results = []
-                for _, row in df.iterrows():
-                    results.append(RetrievedItem(
-                        product_id=int(row['product_id']),
-                        score=float(row['similarity']),
-                        source='vector'
-                    ))
-                
-                logger.info("vector_search_completed", results_count=len(results))
+            # 1. Gerar embedding da query (micro-lote compartilhado + LRU)
+            query_embedding = (await self.runtime.aembed_query(query)).tolist()
+
+            # Carga do índice (disco) e busca HNSW rodam fora do event loop
+            index = await asyncio.to_thread(self._load_ann, version)
+            if index is not None:
+                hits = await asyncio.to_thread(index.search, query_embedding, top_k, self.ef_search)
+                results = [RetrievedItem(product_id=pid, score=score, source='vector') for pid, score in hits]
+                logger.info("vector_search_completed", results_count=len(results), engine="ann")
                 return results
+
+            # 2. Busca via similaridade de cosseno (DuckDB suporta list_cosine_similarity)
+            results = await asyncio.to_thread(self._sql_search, query_embedding, version, top_k)
+            logger.info("vector_search_completed", results_count=len(results))
+            return results
         except Exception as e:
             logger.error("vector_search_failed", error=str(e))
             return []
+
+    def _sql_search(self, query_embedding: List[float], version: str, top_k: int) -> List[RetrievedItem]:
+        """Fallback sem índice ANN: varredura por cosseno no DuckDB (bloqueante)."""
+        sql = f"""
+            WITH {_VERSION_EMBEDDINGS}
+            SELECT 
+                product_id, 
+                list_cosine_similarity(embedding, $query::FLOAT[]) as similarity
+            FROM version_embeddings
+            ORDER BY similarity DESC
+            LIMIT $top_k
+        """
+
+        with duckdb.connect(str(self.db_path)) as con:
+            df = con.execute(sql, {"query": query_embedding, "version": version, "top_k": top_k}).df()
+
+        return [
+            RetrievedItem(product_id=int(row['product_id']), score=float(row['similarity']), source='vector')
+            for _, row in df.iterrows()
+        ]
@@ -60,6 +60,14 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("application_shutting_down")
 
+    # Fechar pool HTTP dos adapters LLM (conexões keep-alive)
+    from backend.app.core.llm_http import close_async_http_clients
+    await close_async_http_clients()
+
+    # Encerrar pools do executor de ferramentas
+    from backend.app.core.tool_executor import shutdown_tool_executor
+    shutdown_tool_executor()
+
 
 # =============================================================================
 # APPLICATION
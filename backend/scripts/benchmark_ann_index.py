@@ -0,0 +1,86 @@
+"""
+Benchmark: ANN Index (HNSW) vs busca exata
+Mede recall@10 e latência por query do ANNIndex para vários efSearch,
+comparando com a busca exata (produto escalar sobre a matriz normalizada,
+equivalente ao `list_cosine_similarity` + ORDER BY do SQL antigo), além do
+custo de uma atualização incremental (novos/alterados) vs rebuild completo.
+
+Execução:
+    python backend/scripts/benchmark_ann_index.py
+    python backend/scripts/benchmark_ann_index.py --count 200000 --dim 384 --m 32 --ef 16 32 64 128 256
+
+- Vetores sintéticos em clusters (parecido com embeddings de catálogo)
+- Latência = média de queries single-thread, uma por vez (como na API)
+
+Date: 2026-10-19
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path (imports usam o pacote backend.*)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.app.core.rag.ann_index import HAS_FAISS, ANNIndex  # noqa: E402
+from backend.app.core.rag.dense_index import l2_normalize  # noqa: E402
+
+
+def synthetic(count: int, dim: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, count // 50), dim))
+    return (centers[rng.integers(0, len(centers), count)] + 0.5 * rng.normal(size=(count, dim))).astype(np.float32)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--m", type=int, default=32)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    parser.add_argument("--changed", type=float, default=0.02, help="fração alterada na atualização incremental")
+    args = parser.parse_args()
+
+    vectors = synthetic(args.count, args.dim)
+    ids = np.arange(args.count)
+    queries = vectors[np.random.default_rng(1).choice(args.count, args.queries)] + 0.1
+    print(f"{args.count} vetores x {args.dim}, {args.queries} queries, backend={'faiss_hnsw' if HAS_FAISS else 'exact'}\n")
+
+    start = time.perf_counter()
+    index = ANNIndex(args.dim, args.m, args.ef_construction)
+    index.upsert(ids.tolist(), vectors)
+    build_s = time.perf_counter() - start
+
+    matrix = l2_normalize(vectors)
+    start = time.perf_counter()
+    truth = []
+    for q in l2_normalize(queries):
+        scores = matrix @ q
+        top = np.argpartition(-scores, 10)[:10]
+        truth.append(set(ids[top].tolist()))
+    exact_ms = (time.perf_counter() - start) / args.queries * 1000
+
+    print(f"build HNSW (M={args.m}, efConstruction={args.ef_construction}): {build_s:.1f}s")
+    print(f"\n{'modo':<14} {'recall@10':>10} {'ms/query':>10} {'speedup':>8}")
+    print(f"{'exato':<14} {1.0:10.3f} {exact_ms:10.3f} {1.0:8.1f}")
+    for ef in args.ef:
+        start = time.perf_counter()
+        found = [index.search(q, 10, ef_search=ef) for q in queries]
+        ann_ms = (time.perf_counter() - start) / args.queries * 1000
+        recall = np.mean([len(t & {pid for pid, _ in f}) / 10 for t, f in zip(truth, found)])
+        print(f"{'efSearch=' + str(ef):<14} {recall:10.3f} {ann_ms:10.3f} {exact_ms / ann_ms:8.1f}")
+
+    changed = np.random.default_rng(2).choice(args.count, int(args.count * args.changed), replace=False)
+    start = time.perf_counter()
+    index.upsert(ids[changed].tolist(), synthetic(len(changed), args.dim, seed=3))
+    incremental_s = time.perf_counter() - start
+    print(f"\natualização incremental ({len(changed)} alterados): {incremental_s:.2f}s vs rebuild {build_s:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark: Async LLM adapters vs to_thread
+Mede a vazão de conversas simultâneas contra um provedor falso local
+(endpoint compatível com OpenAI/Groq servido por uvicorn em 127.0.0.1).
+
+Execução:
+    python backend/scripts/benchmark_async_llm.py
+    python backend/scripts/benchmark_async_llm.py --conversations 200 --turns 3 --latency-ms 300
+
+Modos comparados (mesmo GroqLLMAdapter, mesmo servidor):
+- to_thread: `await asyncio.to_thread(adapter.get_completion, ...)` (fluxo antigo
+  do agente; cada chamada ocupa uma thread do executor padrão)
+- async:     `await adapter.aget_completion(...)` (pool httpx compartilhado,
+  keep-alive, limite LLM_PROVIDER_MAX_CONCURRENCY por provedor)
+
+Métricas: rodadas/s, latência p50/p95 por rodada, pico de threads e
+conexões TCP abertas no servidor.
+
+Date: 2026-10-19
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+# Add project root to path (imports usam o pacote backend.*)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+os.environ.setdefault("SECRET_KEY", "benchmark-only-secret-key-0123456789abcdef")
+
+import uvicorn  # noqa: E402
+from starlette.applications import Starlette  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from backend.app.config.settings import settings  # noqa: E402
+from backend.app.core.llm_groq_adapter import GroqLLMAdapter  # noqa: E402
+from backend.app.core.llm_http import close_async_http_clients  # noqa: E402
+
+
+class FakeProvider:
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+        self.connections = set()
+
+    async def chat_completions(self, request: Request) -> JSONResponse:
+        self.connections.add((request.client.host, request.client.port))
+        await request.json()
+        await asyncio.sleep(self.latency_s)
+        return JSONResponse({
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "fake-model",
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": "A UNE 1685 vendeu R$ 10.000 nos últimos 30 dias."},
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 12, "total_tokens": 22},
+        })
+
+
+def start_server(provider: FakeProvider, port: int) -> uvicorn.Server:
+    app = Starlette(routes=[Route("/openai/v1/chat/completions", provider.chat_completions, methods=["POST"])])
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", limit_concurrency=10000))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def _pct(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+async def run_mode(mode: str, adapter: GroqLLMAdapter, conversations: int, turns: int):
+    latencies: List[float] = []
+    peak_threads = threading.active_count()
+
+    async def conversation(idx: int) -> None:
+        nonlocal peak_threads
+        history = []
+        for turn in range(turns):
+            history.append({"role": "user", "content": f"vendas da une {idx} (rodada {turn})"})
+            start = time.perf_counter()
+            if mode == "async":
+                result = await adapter.aget_completion(list(history))
+            else:
+                result = await asyncio.to_thread(adapter.get_completion, list(history))
+            latencies.append((time.perf_counter() - start) * 1000)
+            peak_threads = max(peak_threads, threading.active_count())
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            history.append({"role": "assistant", "content": result["content"]})
+
+    start = time.perf_counter()
+    await asyncio.gather(*[conversation(i) for i in range(conversations)])
+    elapsed = time.perf_counter() - start
+    await close_async_http_clients()
+    return elapsed, latencies, peak_threads
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark async adapters vs to_thread")
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Latência simulada do provedor")
+    parser.add_argument("--port", type=int, default=18765)
+    args = parser.parse_args()
+
+    provider = FakeProvider(args.latency_ms / 1000)
+    server = start_server(provider, args.port)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    print("=" * 70)
+    print(
+        f"Async LLM — {args.conversations} conversas x {args.turns} rodadas, "
+        f"provedor falso com {args.latency_ms:.0f} ms"
+    )
+    print(f"LLM_PROVIDER_MAX_CONCURRENCY={settings.LLM_PROVIDER_MAX_CONCURRENCY} | HTTP/2={settings.LLM_HTTP2_ENABLED}")
+    print("=" * 70)
+
+    for mode in ["to_thread", "async"]:
+        provider.connections.clear()
+        adapter = GroqLLMAdapter(api_key="benchmark", base_url=base_url)
+        elapsed, latencies, peak_threads = asyncio.run(run_mode(mode, adapter, args.conversations, args.turns))
+        total = args.conversations * args.turns
+        print(
+            f"{mode:>10}: {total / elapsed:8.1f} rodadas/s | "
+            f"p50 {statistics.median(latencies):7.1f} ms | p95 {_pct(latencies, .95):7.1f} ms | "
+            f"threads pico {peak_threads:3d} | conexões {len(provider.connections):4d}"
+        )
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: BM25 Index (postings) vs BM25 força bruta
+Compara a latência por query do BM25Index (term-at-a-time sobre os postings
+dos termos da query + top-k) com `rank_bm25.BM25Okapi.get_scores` seguido da
+ordenação completa (caminho antigo do HybridRetriever), para vários tamanhos
+de corpus.
+
+Execução:
+    python backend/scripts/benchmark_bm25_index.py
+    python backend/scripts/benchmark_bm25_index.py --sizes 10000 100000 --vocab 50000
+
+- Corpus sintético com frequências de termos Zipf (como texto real)
+- Queries de 2-4 termos sorteadas do mesmo vocabulário
+
+Date: 2026-10-19
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path (imports usam o pacote backend.*)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.app.core.rag.bm25_index import BM25Index  # noqa: E402
+
+try:
+    from rank_bm25 import BM25Okapi
+except ImportError:
+    BM25Okapi = None
+
+
+def synthetic(size: int, vocab: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    ranks = np.minimum(rng.zipf(1.2, size=size * 8), vocab) - 1
+    lengths = rng.integers(3, 14, size=size)
+    docs, offset = [], 0
+    for length in lengths:
+        docs.append([f"t{r}" for r in ranks[offset:offset + length]])
+        offset += length
+    queries = [[f"t{r}" for r in rng.integers(0, vocab // 10, size=rng.integers(2, 5))] for _ in range(100)]
+    return docs, queries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--vocab", type=int, default=20000)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'docs':>8} {'build s':>8} {'postings ms':>12} {'força bruta ms':>15} {'speedup':>8}")
+    for size in args.sizes:
+        docs, queries = synthetic(size, args.vocab)
+
+        start = time.perf_counter()
+        index = BM25Index(tokenizer=str.split)
+        for i, tokens in enumerate(docs):
+            index.add_tokens(i, tokens)
+        index.search_tokens(queries[0], args.top_k)  # congela derivados (IDF, normas)
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for q in queries:
+            index.search_tokens(q, args.top_k)
+        postings_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        brute_ms = float("nan")
+        if BM25Okapi is not None:
+            reference = BM25Okapi(docs)
+            start = time.perf_counter()
+            for q in queries:
+                scores = reference.get_scores(q)
+                sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:args.top_k]
+            brute_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        print(f"{size:>8} {build_s:>8.2f} {postings_ms:>12.3f} {brute_ms:>15.3f} {brute_ms / postings_ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
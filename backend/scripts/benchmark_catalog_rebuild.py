@@ -0,0 +1,134 @@
+"""
+Benchmark: rebuild do catálogo completo vs incremental
+Constrói uma versão inicial com N produtos sintéticos e mede um segundo
+rebuild em que uma fração `--churn` dos produtos mudou (metade alterada,
+metade trocada por produtos novos):
+
+- full: `rebuild_catalog(full=True)`, normaliza, grava e diffa o índice ANN
+  de todos os produtos (textos já vistos vêm do EmbeddingStore)
+- incremental: hash do conteúdo bruto, só os alterados passam pela
+  normalização/embedding; linhas dos demais são copiadas no DuckDB e os
+  embeddings apenas referenciados (`products_embedding_refs`)
+
+O encoder é sintético (custo fixo por texto, `--embed-us`; dimensão `--dim`,
+384 como o MiniLM) para não depender do modelo; o tempo de embedding real só
+aumenta a diferença.
+
+Execução:
+    python backend/scripts/benchmark_catalog_rebuild.py
+    python backend/scripts/benchmark_catalog_rebuild.py --rows 200000 --churn 0.05
+
+Date: 2026-10-19
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path (imports usam o pacote backend.*)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.application.services.catalog_builder_service import CatalogBuilderService  # noqa: E402
+from backend.application.services.pt_br_normalizer import PTBRNormalizer  # noqa: E402
+from backend.infrastructure.adapters.repository.duckdb_catalog_repository import DuckDBCatalogRepository  # noqa: E402
+from backend.infrastructure.adapters.search.vector_index_adapter import VectorIndexAdapter  # noqa: E402
+
+WORDS = ["CANETA", "LÁPIS", "CADERNO", "TECIDO", "ALGODÃO", "AZUL", "BRANCO", "KIT", "C/12", "LINHA", "AGULHA"]
+
+
+class MemorySource:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def load_full_catalog(self):
+        return self.rows
+
+    async def load_incremental_catalog(self, since):
+        return []
+
+
+class SyntheticBackend:
+    """Vetores aleatórios com custo fixo por texto (simula o forward pass)."""
+
+    max_batch_size = 1024
+    max_concurrency = 1
+    model_name = "synthetic"
+
+    def __init__(self, embed_us: float, dim: int = 64):
+        self.embed_s = embed_us / 1e6
+        self.dim = dim
+        self.embedded = 0
+
+    def embed_batch(self, texts):
+        time.sleep(self.embed_s * len(texts))
+        self.embedded += len(texts)
+        return np.random.default_rng(self.embedded).normal(size=(len(texts), self.dim)).astype(np.float32)
+
+
+def make_rows(rng, ids):
+    return [
+        {
+            "product_id": int(pid),
+            "name_raw": " ".join(rng.choice(WORDS, size=4)) + f" {pid}",
+            "brand": "ACME", "dept": "PAPELARIA", "category": "ESCRITA", "subcategory": "DIVERSOS",
+            "updated_at": datetime(2026, 1, 1),
+        }
+        for pid in ids
+    ]
+
+
+async def timed_rebuild(builder, backend, full):
+    backend.embedded = 0
+    start = time.perf_counter()
+    version = await builder.rebuild_catalog("benchmark", full=full)
+    return time.perf_counter() - start, backend.embedded, version
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--churn", type=float, default=0.01, help="fração de produtos alterados/novos")
+    parser.add_argument("--embed-us", type=float, default=200.0, help="custo sintético por texto (µs)")
+    parser.add_argument("--dim", type=int, default=384, help="dimensão dos vetores")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    rows = make_rows(rng, range(args.rows))
+    changed = int(args.rows * args.churn)
+    picked = rng.choice(args.rows, size=changed, replace=False)
+    updated = list(rows)
+    for i in picked[: changed // 2]:
+        updated[i] = {**updated[i], "name_raw": updated[i]["name_raw"] + " NOVO"}
+    for j, i in enumerate(picked[changed // 2:]):
+        updated[i] = make_rows(rng, [args.rows + j])[0]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "catalog.duckdb")
+        repo = DuckDBCatalogRepository(db_path)
+        backend = SyntheticBackend(args.embed_us, args.dim)
+        source = MemorySource(rows)
+        builder = CatalogBuilderService(
+            source, repo, repo, PTBRNormalizer(), VectorIndexAdapter(db_path, backend=backend)
+        )
+        initial, _, base_version = await timed_rebuild(builder, backend, full=True)
+        print(f"versão inicial: {args.rows} produtos em {initial:.2f}s")
+
+        source.rows = updated
+        print(f"{'modo':<14} {'s':>7} {'embedados':>10}")
+        for label, full in (("full", True), ("incremental", False)):
+            # Os dois partem da versão inicial; textos já vistos vêm do
+            # EmbeddingStore em ambos, mas o full normaliza e grava tudo
+            await repo.activate_version(base_version)
+            seconds, embedded, version = await timed_rebuild(builder, backend, full)
+            print(f"{label:<14} {seconds:>7.2f} {embedded:>10}")
+            assert version
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
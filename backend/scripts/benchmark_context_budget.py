@@ -0,0 +1,182 @@
+"""
+Benchmark: Context Budget
+Mede tokens de prompt antes/depois do ContextBudgeter e a latência por rodada
+em conversas gravadas.
+
+Execução:
+    python backend/scripts/benchmark_context_budget.py
+    python backend/scripts/benchmark_context_budget.py --sessions data/sessions
+    python backend/scripts/benchmark_context_budget.py --conversations conversas.jsonl
+    python backend/scripts/benchmark_context_budget.py --live   # chama o LLM configurado
+
+- --sessions: diretório de sessões do chat ({uuid}.json com "history").
+  Cada sessão é reproduzida rodada a rodada (histórico acumulado + pergunta).
+- --conversations: JSONL com {"messages": [...], "history_len": N} por linha
+  (ex.: mensagens exportadas de run_async, incluindo resultados de ferramenta).
+- Sem entradas gravadas, usa conversas sintéticas com resultados de ferramenta
+  grandes (consultas de 50 a 2000 linhas), que é onde o orçamento atua.
+- --live: mede também a latência real da rodada LLM (prompt original vs
+  compactado) via SmartLLM. Requer chave de API; sem ela mede apenas o
+  overhead do budgeter.
+
+Date: 2026-10-19
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+# Add project root to path (imports usam o pacote backend.*)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.app.core.utils.context_budget import ContextBudgeter, estimate_message_tokens  # noqa: E402
+
+Turn = Tuple[List[Dict[str, Any]], int]
+
+
+def _rows(n: int, offset: int = 0) -> List[Dict[str, Any]]:
+    return [
+        {
+            "PRODUTO": 100000 + offset + i,
+            "NOME": f"PRODUTO EXEMPLO {offset + i}",
+            "UNE": 1685,
+            "NOMESEGMENTO": "PAPELARIA",
+            "VENDA_30DD": float((i * 37) % 500),
+            "ESTOQUE_UNE": float((i * 11) % 90),
+            "LIQUIDO_38": round(1.5 + (i % 40) * 0.75, 2),
+        }
+        for i in range(n)
+    ]
+
+
+def synthetic_turns() -> List[Turn]:
+    """Conversas com histórico crescente e resultados de ferramenta grandes."""
+    turns: List[Turn] = []
+    history: List[Dict[str, Any]] = []
+    for turn_idx, n_rows in enumerate([50, 200, 800, 2000, 400, 1200]):
+        query = {"role": "user", "content": f"liste os produtos do segmento papelaria (pergunta {turn_idx})"}
+        tool_call = {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{
+                "id": f"call_{turn_idx}",
+                "type": "function",
+                "function": {"name": "consultar_dados_flexivel", "arguments": json.dumps({"limite": n_rows})},
+            }],
+        }
+        payload = {
+            "total_resultados": n_rows,
+            "resultados": _rows(n_rows, offset=turn_idx * 10000),
+            "chart_data": json.dumps({"data": [{"x": list(range(n_rows)), "y": list(range(n_rows))}]}),
+        }
+        tool_result = {"role": "function", "name": "consultar_dados_flexivel", "content": json.dumps(payload)}
+        turns.append((history + [query, tool_call, tool_result], len(history)))
+
+        answer = "Resumo: " + ", ".join(f"produto {r['PRODUTO']}" for r in payload["resultados"][:40])
+        history = history + [query, {"role": "assistant", "content": answer}]
+    return turns
+
+
+def session_turns(directory: Path) -> List[Turn]:
+    turns: List[Turn] = []
+    for path in sorted(directory.glob("*.json")):
+        try:
+            history = json.loads(path.read_text(encoding="utf-8")).get("history", [])
+        except Exception:
+            continue
+        for idx, msg in enumerate(history):
+            if msg.get("role") == "user":
+                prior = [{"role": m.get("role", "user"), "content": m.get("content", "")} for m in history[:idx]]
+                turns.append((prior + [{"role": "user", "content": msg.get("content", "")}], len(prior)))
+    return turns
+
+
+def jsonl_turns(path: Path) -> List[Turn]:
+    turns: List[Turn] = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if line.strip():
+            record = json.loads(line)
+            turns.append((record["messages"], int(record.get("history_len", 0))))
+    return turns
+
+
+def _pct(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _live_latency(llm, messages: List[Dict[str, Any]]) -> float:
+    start = time.perf_counter()
+    llm.get_completion(messages, tools=None)
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark do orçamento de contexto")
+    parser.add_argument("--sessions", type=Path, help="Diretório de sessões gravadas")
+    parser.add_argument("--conversations", type=Path, help="JSONL de mensagens gravadas")
+    parser.add_argument("--max-tokens", type=int, default=24000)
+    parser.add_argument("--tool-result-max-tokens", type=int, default=2500)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--reserved-tokens", type=int, default=6000, help="System prompt + tools")
+    parser.add_argument("--live", action="store_true", help="Mede latência real do LLM configurado")
+    args = parser.parse_args()
+
+    turns: List[Turn] = []
+    source = "sintético"
+    if args.conversations:
+        turns, source = jsonl_turns(args.conversations), str(args.conversations)
+    elif args.sessions and args.sessions.is_dir():
+        turns, source = session_turns(args.sessions), str(args.sessions)
+    if not turns:
+        turns, source = synthetic_turns(), "sintético"
+
+    budgeter = ContextBudgeter(
+        max_tokens=args.max_tokens,
+        tool_result_max_tokens=args.tool_result_max_tokens,
+        top_k=args.top_k,
+        reserved_tokens=args.reserved_tokens,
+    )
+
+    llm = None
+    if args.live:
+        from backend.app.core.llm_factory import LLMFactory
+        llm = LLMFactory.get_adapter(use_smart=True)
+
+    before, after, overhead_ms, live_before, live_after = [], [], [], [], []
+    over_budget = 0
+    for messages, history_len in turns:
+        start = time.perf_counter()
+        compacted, report = budgeter.fit(messages, history_len=history_len)
+        overhead_ms.append((time.perf_counter() - start) * 1000)
+
+        raw_tokens = sum(estimate_message_tokens(m) for m in messages) + args.reserved_tokens
+        before.append(raw_tokens)
+        after.append(report.tokens_after)
+        over_budget += raw_tokens > args.max_tokens
+
+        if llm is not None:
+            live_before.append(_live_latency(llm, messages))
+            live_after.append(_live_latency(llm, compacted))
+
+    print("=" * 70)
+    print(f"Context Budget — {len(turns)} rodadas ({source})")
+    print(f"Orçamento: {args.max_tokens} tokens (reservado: {args.reserved_tokens})")
+    print("=" * 70)
+    print(f"Tokens de prompt  p50: {_pct(before, .5):>8.0f} -> {_pct(after, .5):>8.0f}")
+    print(f"Tokens de prompt  p95: {_pct(before, .95):>8.0f} -> {_pct(after, .95):>8.0f}")
+    print(f"Tokens de prompt  max: {max(before):>8.0f} -> {max(after):>8.0f}")
+    print(f"Redução total:         {1 - sum(after) / max(1, sum(before)):.1%}")
+    print(f"Rodadas acima do orçamento sem budgeter: {over_budget}/{len(turns)}")
+    print(f"Overhead do budgeter  p50: {statistics.median(overhead_ms):.2f} ms | p95: {_pct(overhead_ms, .95):.2f} ms")
+    if live_before:
+        print(f"Latência LLM por rodada p50: {statistics.median(live_before):.0f} ms -> {statistics.median(live_after):.0f} ms")
+        print(f"Latência LLM por rodada p95: {_pct(live_before, .95):.0f} ms -> {_pct(live_after, .95):.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark: Dense Search (HybridRetriever)
+Compara a busca densa antiga (loop Python + cosseno por documento + sort da
+lista inteira) com a DenseMatrixIndex (matriz float32 normalizada, produto
+matriz-vetor + argpartition), em corpora de 1k, 10k e 100k exemplos.
+
+Execução:
+    python backend/scripts/benchmark_dense_search.py
+    python backend/scripts/benchmark_dense_search.py --sizes 1000 10000 --dim 768 --queries 50
+    python backend/scripts/benchmark_dense_search.py --no-baseline   # só a matriz
+
+- Embeddings sintéticos (normal padrão, seed fixa) com a dimensão do
+  text-embedding-004 (768). A geração do embedding da query não entra na conta.
+- O baseline usa um subconjunto das queries em corpora grandes (--baseline-queries),
+  pois leva segundos por query a 100k.
+- Também mede o tempo de abertura da matriz salva (np.load com mmap) e o
+  recall@k da matriz contra o baseline (deve ser 1.0: a busca é exata).
+
+Date: 2026-10-19
+"""
+
+import argparse
+import math
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Add project root to path (imports usam o pacote backend.*)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.app.core.rag.dense_index import DenseMatrixIndex  # noqa: E402
+
+
+def _cosine(vec1: Sequence[float], vec2: Sequence[float]) -> float:
+    """Mesma implementação do antigo HybridRetriever._cosine_similarity."""
+    dot_product = sum(a * b for a, b in zip(vec1, vec2))
+    magnitude1 = math.sqrt(sum(a * a for a in vec1))
+    magnitude2 = math.sqrt(sum(b * b for b in vec2))
+    if magnitude1 == 0 or magnitude2 == 0:
+        return 0.0
+    return dot_product / (magnitude1 * magnitude2)
+
+
+def baseline_search(documents: List[Dict[str, str]], cache: Dict[str, List[float]], query: List[float], top_k: int):
+    similarities = []
+    for doc in documents:
+        doc_query = doc.get("query", "")
+        if doc_query in cache:
+            similarities.append({"doc": doc, "score": _cosine(query, cache[doc_query]), "method": "dense"})
+    similarities.sort(key=lambda x: x["score"], reverse=True)
+    return similarities[:top_k]
+
+
+def _ms(samples: List[float]) -> str:
+    return f"{statistics.median(samples) * 1000:9.2f}"
+
+
+def run_size(n: int, dim: int, n_queries: int, baseline_queries: int, top_k: int, baseline: bool) -> None:
+    rng = np.random.default_rng(42)
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    queries = rng.normal(size=(n_queries, dim)).astype(np.float32)
+
+    start = time.perf_counter()
+    index = DenseMatrixIndex.build(vectors)
+    build_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "embeddings_matrix.npy"
+        index.save(path)
+        start = time.perf_counter()
+        mapped = DenseMatrixIndex.load(path)
+        load_s = time.perf_counter() - start
+
+        matrix_times = []
+        for q in queries:
+            t0 = time.perf_counter()
+            mapped.search(q, top_k)
+            matrix_times.append(time.perf_counter() - t0)
+
+        line = f"{n:>8} {build_s * 1000:10.1f} {load_s * 1000:9.2f} {_ms(matrix_times)}"
+
+        if baseline:
+            documents = [{"query": f"exemplo {i}"} for i in range(n)]
+            cache = {doc["query"]: vectors[i].tolist() for i, doc in enumerate(documents)}
+            base_times, recalls = [], []
+            for q in queries[: max(1, min(baseline_queries, n_queries))]:
+                q_list = q.tolist()
+                t0 = time.perf_counter()
+                expected = baseline_search(documents, cache, q_list, top_k)
+                base_times.append(time.perf_counter() - t0)
+                got = {pos for pos, _ in mapped.search(q, top_k)}
+                recalls.append(len(got & {int(r["doc"]["query"].split()[1]) for r in expected}) / top_k)
+            speedup = statistics.median(base_times) / statistics.median(matrix_times)
+            line += f" {_ms(base_times)} {speedup:8.0f}x {statistics.mean(recalls):9.2f}"
+        del mapped
+    print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--baseline-queries", type=int, default=5)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--no-baseline", action="store_true")
+    args = parser.parse_args()
+
+    header = f"{'docs':>8} {'build ms':>10} {'mmap ms':>9} {'matriz p50':>9}"
+    if not args.no_baseline:
+        header += f" {'loop p50':>9} {'speedup':>9} {'recall@k':>9}"
+    print(f"dim={args.dim} top_k={args.top_k} queries={args.queries}\n")
+    print(header)
+    for n in args.sizes:
+        run_size(n, args.dim, args.queries, args.baseline_queries, args.top_k, not args.no_baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Benchmark: Deterministic Fast Path
+Mede a fração do tráfego respondida sem loop LLM e a latência p50 desse caminho.
+
+Execução:
+    python backend/scripts/benchmark_deterministic_fast_path.py
+    python backend/scripts/benchmark_deterministic_fast_path.py --queries consultas.txt
+    python backend/scripts/benchmark_deterministic_fast_path.py --dry-run   # sem Parquet
+
+- --queries: arquivo com uma pergunta por linha (ex.: export do histórico de chat).
+  Sem o arquivo, usa uma amostra representativa de perguntas comerciais.
+- --dry-run: não executa as ferramentas; mede apenas planejamento + template
+  com resultados sintéticos (útil em máquinas sem o admmat.parquet).
+
+Date: 2026-10-19
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path (imports usam o pacote backend.*)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.app.core.utils.deterministic_fast_path import plan_fast_path, render_fast_path_answer  # noqa: E402
+
+SAMPLE_TRAFFIC = [
+    "vendas da une 1685",
+    "venda total da loja 520",
+    "estoque da une 2365",
+    "qual o estoque do produto 369947",
+    "quanto vendeu o produto 25",
+    "qual a venda do produto 25 na une 1685",
+    "top 10 produtos mais vendidos na une 2365",
+    "top 5 produtos mais vendidos do segmento PAPELARIA",
+    "rupturas criticas",
+    "quais produtos estão sem estoque",
+    "gere um gráfico de vendas por segmento",
+    "por que as vendas caíram na une 1685?",
+    "compare as vendas de tecidos e papelaria",
+    "preveja a demanda do produto 25 para os próximos 30 dias",
+    "quais grupos estão com vendas negativas na une 135?",
+    "analise as vendas do segmento ARMARINHO",
+    "pesquisar preço de concorrentes para cola branca",
+    "quais colunas existem na base?",
+    "sugira transferências entre lojas para o produto 25",
+    "rupturas críticas na une 1685",
+]
+
+SYNTHETIC_RESULTS = {
+    "kpi_une": {"total_resultados": 1, "resultado_agregado": {"valor": 123456.78}},
+    "kpi_produto": {
+        "total_resultados": 2,
+        "resultados": [
+            {"PRODUTO": 25, "NOME": "PRODUTO 25", "UNE": 1685, "VENDA_30DD": 100.0, "ESTOQUE_UNE": 10},
+            {"PRODUTO": 25, "NOME": "PRODUTO 25", "UNE": 2365, "VENDA_30DD": 50.0, "ESTOQUE_UNE": 5},
+        ],
+    },
+    "top_produtos": {
+        "total_resultados": 3,
+        "resultados": [{"PRODUTO": i, "NOME": f"PRODUTO {i}", "valor": 1000.0 / i} for i in range(1, 4)],
+    },
+    "rupturas_rede": {
+        "total_criticos": 2,
+        "produtos_criticos": [{"segmento": "PAPELARIA"}, {"segmento": "TECIDOS"}],
+    },
+}
+
+
+def _load_tools():
+    from backend.app.core.tools.flexible_query_tool import consultar_dados_flexivel
+    from backend.app.core.tools.une_tools import encontrar_rupturas_criticas
+
+    return {
+        "consultar_dados_flexivel": consultar_dados_flexivel,
+        "encontrar_rupturas_criticas": encontrar_rupturas_criticas,
+    }
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+async def run(queries, dry_run: bool, iterations: int):
+    tools = {} if dry_run else _load_tools()
+    served, fallback, llm_path = [], [], []
+    latencies_ms = []
+
+    for query in queries:
+        plan = plan_fast_path(query)
+        if plan is None:
+            llm_path.append(query)
+            continue
+
+        response = None
+        for _ in range(iterations):
+            start = time.perf_counter()
+            plan = plan_fast_path(query)
+            if dry_run:
+                tool_result = SYNTHETIC_RESULTS[plan.template]
+            else:
+                tool = tools[plan.tool_name]
+                tool_result = await asyncio.to_thread(tool.invoke, plan.tool_params)
+            response = render_fast_path_answer(plan, tool_result)
+            latencies_ms.append((time.perf_counter() - start) * 1000)
+
+        (served if response is not None else fallback).append((query, plan.template))
+
+    total = len(queries)
+    print("=" * 80)
+    print("BENCHMARK: Deterministic Fast Path")
+    print("=" * 80)
+    print(f"Modo: {'dry-run (resultados sintéticos)' if dry_run else 'ferramentas reais (Parquet)'}")
+    print(f"Consultas: {total}\n")
+
+    for query, template in served:
+        print(f"  [FAST] {template:<14} {query}")
+    for query, template in fallback:
+        print(f"  [FALLBACK] {template:<10} {query}")
+    for query in llm_path:
+        print(f"  [LLM]  {'-':<14} {query}")
+
+    share = len(served) / total if total else 0.0
+    print("\n" + "-" * 80)
+    print(f"Fração servida pelo fast path: {share:.1%} ({len(served)}/{total})")
+    print(f"Fallback para LLM após execução: {len(fallback)}")
+    if latencies_ms:
+        print(f"Latência fast path p50: {statistics.median(latencies_ms):.2f} ms")
+        print(f"Latência fast path p95: {_percentile(latencies_ms, 95):.2f} ms")
+    print("-" * 80)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do deterministic fast path")
+    parser.add_argument("--queries", type=str, help="Arquivo com uma pergunta por linha")
+    parser.add_argument("--dry-run", action="store_true", help="Não executa ferramentas (resultados sintéticos)")
+    parser.add_argument("--iterations", type=int, default=5, help="Execuções por consulta servida")
+    args = parser.parse_args()
+
+    if args.queries:
+        lines = Path(args.queries).read_text(encoding="utf-8").splitlines()
+        queries = [line.strip() for line in lines if line.strip()]
+    else:
+        queries = SAMPLE_TRAFFIC
+
+    asyncio.run(run(queries, args.dry_run, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark: embeddings de query sob carga concorrente
+Compara, com C clientes simultâneos enviando Q queries cada:
+
+- encode por request: cada query faz o seu forward pass (caminho antigo do
+  VectorIndexAdapter: `model.encode(query)`)
+- QueryEmbeddingRuntime: micro-lotes (janela `--window-ms`) + LRU
+
+Mede latência por query (p50/p99), vazão e tempo de CPU do processo por
+query. Usa o backend configurado (ONNX int8 se disponível, senão
+sentence-transformers); com `--simulate` (ou sem nenhum dos dois
+instalado) usa um encoder sintético em NumPy com o custo de um MiniLM
+(6 camadas, dim 384) para isolar o efeito do micro-batching.
+
+Execução:
+    python backend/scripts/benchmark_embedding_runtime.py
+    python backend/scripts/benchmark_embedding_runtime.py --clients 32 --queries 20 --simulate
+
+Date: 2026-10-19
+"""
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path (imports usam o pacote backend.*)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.app.config.settings import settings  # noqa: E402
+from backend.app.core.rag.embedding_runtime import (  # noqa: E402
+    HAS_ONNX,
+    OnnxEmbeddingBackend,
+    QueryEmbeddingRuntime,
+    build_embedding_backend,
+    mean_pool,
+)
+
+
+class SyntheticMiniLM:
+    """Encoder NumPy com o formato de custo de um transformer pequeno (lote x tokens x 384)."""
+
+    model_name = "synthetic-minilm"
+    max_batch_size = 256
+    max_concurrency = 1
+
+    def __init__(self, layers: int = 6, dim: int = 384, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.embedding = rng.normal(size=(30522, dim)).astype(np.float32)
+        self.layers = [
+            (rng.normal(size=(dim, dim * 4)).astype(np.float32) / dim, rng.normal(size=(dim * 4, dim)).astype(np.float32) / dim)
+            for _ in range(layers)
+        ]
+
+    def embed_batch(self, texts):
+        tokens = [[hash(w) % 30522 for w in t.lower().split()][:64] or [0] for t in texts]
+        width = max(len(t) for t in tokens)
+        ids = np.zeros((len(texts), width), dtype=np.int64)
+        mask = np.zeros((len(texts), width), dtype=np.int64)
+        for i, t in enumerate(tokens):
+            ids[i, :len(t)], mask[i, :len(t)] = t, 1
+        hidden = self.embedding[ids]
+        for w1, w2 in self.layers:
+            hidden = hidden + np.maximum(hidden @ w1, 0) @ w2
+        return mean_pool(hidden, mask)
+
+
+def run(clients: int, queries_per_client: int, encode, texts):
+    latencies, lock = [], threading.Lock()
+
+    def client(offset: int) -> None:
+        for i in range(queries_per_client):
+            text = texts[(offset * queries_per_client + i) % len(texts)]
+            start = time.perf_counter()
+            encode(text)
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    wall, cpu = time.perf_counter(), time.process_time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    total = clients * queries_per_client
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return p50, p99, total / wall, cpu / total * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=20, help="queries por cliente")
+    parser.add_argument("--window-ms", type=float, default=settings.EMBEDDING_QUERY_BATCH_WINDOW_MS)
+    parser.add_argument("--repeat-rate", type=float, default=0.2, help="fração de queries repetidas (LRU)")
+    parser.add_argument("--simulate", action="store_true")
+    args = parser.parse_args()
+
+    if args.simulate:
+        backend = SyntheticMiniLM()
+    else:
+        backend = build_embedding_backend(
+            settings.RAG_EMBEDDING_MODEL, settings.EMBEDDING_ONNX_MODEL_DIR, settings.EMBEDDING_ONNX_MODEL_FILE
+        )
+        try:
+            backend.embed_batch(["aquecimento"])
+        except ImportError as e:
+            print(f"[WARNING] Backend indisponível ({e}); usando encoder sintético")
+            backend = SyntheticMiniLM()
+    print(f"backend: {getattr(backend, 'model_name', type(backend).__name__)} (onnxruntime: {HAS_ONNX}, "
+          f"onnx: {isinstance(backend, OnnxEmbeddingBackend)})")
+
+    rng = np.random.default_rng(0)
+    words = ["caneta", "azul", "tecido", "algodao", "cola", "branca", "papel", "a4", "linha", "agulha", "kit", "escolar"]
+    total = args.clients * args.queries
+    distinct = max(1, int(total * (1 - args.repeat_rate)))
+    texts = [" ".join(rng.choice(words, size=rng.integers(2, 6))) + f" {i}" for i in range(distinct)]
+    texts = [texts[i] for i in rng.integers(0, distinct, size=total)]
+
+    print(f"{'modo':<22} {'p50 ms':>8} {'p99 ms':>8} {'queries/s':>10} {'CPU ms/query':>13}")
+    p50, p99, qps, cpu = run(args.clients, args.queries, lambda t: backend.embed_batch([t]), texts)
+    print(f"{'encode por request':<22} {p50:>8.2f} {p99:>8.2f} {qps:>10.1f} {cpu:>13.2f}")
+
+    runtime = QueryEmbeddingRuntime(backend, batch_window_ms=args.window_ms, max_batch_size=settings.EMBEDDING_QUERY_MAX_BATCH)
+    p50, p99, qps, cpu = run(args.clients, args.queries, runtime.embed_query, texts)
+    stats = runtime.get_stats()
+    print(f"{'micro-batching + LRU':<22} {p50:>8.2f} {p99:>8.2f} {qps:>10.1f} {cpu:>13.2f}")
+    print(f"lotes: {stats['batches']}, média {stats['avg_batch']:.1f} queries/lote, cache hits: {stats['cache_hits']}")
+
+
+if __name__ == "__main__":
+    main()
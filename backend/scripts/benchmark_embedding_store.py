@@ -0,0 +1,106 @@
+"""
+Benchmark: Embedding Store
+Compara a carga do antigo `embeddings_cache.json` (json.load de todos os
+vetores) com a abertura do EmbeddingStore binário (cabeçalho + ids + memmap)
+e a montagem da matriz da busca densa a partir de cada um.
+
+Execução:
+    python backend/scripts/benchmark_embedding_store.py
+    python backend/scripts/benchmark_embedding_store.py --count 20000 --dim 768 --dtype float16
+
+- Vetores sintéticos; cada modo roda num subprocesso novo para que o RSS
+  medido (delta do RSS residente após a carga) seja só o daquele modo.
+- "abrir" = tempo até os embeddings estarem disponíveis; "matriz" = carga +
+  DenseMatrixIndex pronta para a primeira query.
+
+Date: 2026-10-19
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path (imports usam o pacote backend.*)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.app.core.rag.dense_index import DenseMatrixIndex  # noqa: E402
+from backend.app.core.rag.embedding_store import EmbeddingStore  # noqa: E402
+
+MODEL = "models/text-embedding-004"
+
+
+def _rss_mb() -> float:
+    """RSS atual (Linux: /proc); fallback para o pico (ru_maxrss)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / (1024 * 1024)
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def prepare(directory: Path, count: int, dim: int, dtype: str) -> None:
+    vectors = np.random.default_rng(0).normal(size=(count, dim)).astype(np.float32)
+    cache = {f"exemplo de pergunta {i}": vectors[i].tolist() for i in range(count)}
+    with open(directory / "embeddings_cache.json", "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2)
+    EmbeddingStore(directory / "embeddings", MODEL, dtype=dtype).add_many(cache)
+
+
+def measure(mode: str, directory: Path, dtype: str) -> None:
+    baseline_rss = _rss_mb()
+    start = time.perf_counter()
+    if mode == "json":
+        with open(directory / "embeddings_cache.json", "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        open_s = time.perf_counter() - start
+        index = DenseMatrixIndex.build(list(cache.values()))
+    else:
+        store = EmbeddingStore(directory / "embeddings", MODEL, dtype=dtype).load()
+        open_s = time.perf_counter() - start
+        index = DenseMatrixIndex.from_matrix(store.vectors, np.arange(len(store)))
+    matrix_s = time.perf_counter() - start
+    rss_mb = _rss_mb() - baseline_rss  # embeddings + matriz vivos neste ponto
+    print(json.dumps({"open_s": open_s, "matrix_s": matrix_s, "rss_mb": rss_mb, "rows": index.size}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--measure", choices=["json", "store"], help=argparse.SUPPRESS)
+    parser.add_argument("--dir", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure, args.dir, args.dtype)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        prepare(directory, args.count, args.dim, args.dtype)
+        json_mb = (directory / "embeddings_cache.json").stat().st_size / 1e6
+        store_mb = sum(p.stat().st_size for p in (directory / "embeddings").iterdir()) / 1e6
+        print(f"{args.count} vetores x {args.dim} ({args.dtype})")
+        print(f"disco: JSON={json_mb:.1f}MB  store={store_mb:.1f}MB\n")
+        print(f"{'modo':<8} {'abrir ms':>10} {'matriz ms':>10} {'RSS +MB':>9}")
+        for mode in ("json", "store"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--measure", mode, "--dir", str(directory), "--dtype", args.dtype],
+                check=True, capture_output=True, text=True,
+            ).stdout.strip().splitlines()[-1]
+            r = json.loads(out)
+            print(f"{mode:<8} {r['open_s'] * 1000:10.1f} {r['matrix_s'] * 1000:10.1f} {r['rss_mb']:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
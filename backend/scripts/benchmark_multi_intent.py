@@ -0,0 +1,118 @@
+"""
+Benchmark: Multi-Intent Planner
+Conta rodadas LLM e tempo de parede em perguntas compostas, comparando o loop
+ReAct (uma ferramenta descoberta por rodada) com o plano paralelo + uma
+rodada de síntese.
+
+Execução:
+    python backend/scripts/benchmark_multi_intent.py
+    python backend/scripts/benchmark_multi_intent.py --llm-ms 1200 --tool-ms 350
+    python backend/scripts/benchmark_multi_intent.py --queries consultas.txt
+
+- LLM e ferramentas são simulados com latência fixa (--llm-ms/--tool-ms):
+  o objetivo é medir a estrutura de execução (rodadas e paralelismo), não
+  o provedor nem o Parquet. Os planos são os reais (`plan_compound_query`).
+- Perguntas que o planner não decompõe contam igual nos dois modos.
+
+Date: 2026-10-19
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+# Add project root to path (imports usam o pacote backend.*)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.app.core.utils.multi_intent_planner import execute_plan, plan_compound_query  # noqa: E402
+
+COMPOUND_QUERIES = [
+    "compare vendas e rupturas da UNE 1685 com a 1700 e gere um gráfico",
+    "vendas e estoque da loja 520",
+    "vendas das lojas 520 e 2365",
+    "estoque da une 1685, 1700 e 2365",
+    "quais produtos estão sem estoque na une 1685 e qual a venda",
+    "compare as vendas da une 135 x 1685 e mostre um gráfico",
+    "vendas, estoque e rupturas da une 2365",
+    "rupturas criticas e vendas da rede",
+    "vendas da une 1685",  # simples: controle
+    "top 10 produtos mais vendidos na une 2365",  # simples: controle
+]
+
+
+async def _llm_turn(llm_s: float) -> None:
+    await asyncio.sleep(llm_s)
+
+
+async def _tool_call(tool_s: float) -> dict:
+    await asyncio.sleep(tool_s)
+    return {"status": "success"}
+
+
+async def run_react(n_tools: int, llm_s: float, tool_s: float) -> Tuple[int, float]:
+    """Loop ReAct: cada rodada descobre a próxima ferramenta; a última só responde."""
+    start = time.perf_counter()
+    turns = 0
+    for _ in range(n_tools):
+        await _llm_turn(llm_s)
+        turns += 1
+        await _tool_call(tool_s)
+    await _llm_turn(llm_s)
+    turns += 1
+    return turns, time.perf_counter() - start
+
+
+async def run_planned(query: str, llm_s: float, tool_s: float, concurrency: int) -> Tuple[int, float, int]:
+    start = time.perf_counter()
+    plan = plan_compound_query(query)
+    if plan is None:
+        turns, elapsed = await run_react(1, llm_s, tool_s)
+        return turns, elapsed, 1
+    await execute_plan(plan, lambda node: _tool_call(tool_s), max_concurrency=concurrency)
+    await _llm_turn(llm_s)  # rodada única de síntese
+    return 1, time.perf_counter() - start, len(plan.nodes)
+
+
+async def main_async(queries: List[str], llm_s: float, tool_s: float, concurrency: int) -> None:
+    print(f"LLM={llm_s * 1000:.0f}ms  ferramenta={tool_s * 1000:.0f}ms  concorrência={concurrency}\n")
+    print(f"{'pergunta':<62} {'nós':>3} {'rodadas':>11} {'tempo (s)':>15}")
+
+    react_times, planned_times, react_turns, planned_turns = [], [], 0, 0
+    for query in queries:
+        p_turns, p_time, n_tools = await run_planned(query, llm_s, tool_s, concurrency)
+        r_turns, r_time = await run_react(n_tools, llm_s, tool_s)
+        react_times.append(r_time)
+        planned_times.append(p_time)
+        react_turns += r_turns
+        planned_turns += p_turns
+        print(f"{query[:60]:<62} {n_tools:>3} {r_turns:>5} -> {p_turns:<3} {r_time:>6.2f} -> {p_time:<6.2f}")
+
+    print()
+    print(f"Rodadas LLM totais: ReAct={react_turns}  planner={planned_turns}")
+    print(
+        f"Tempo p50: ReAct={statistics.median(react_times):.2f}s  planner={statistics.median(planned_times):.2f}s  "
+        f"(total {sum(react_times):.2f}s -> {sum(planned_times):.2f}s)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=Path, help="Arquivo com uma pergunta por linha")
+    parser.add_argument("--llm-ms", type=float, default=900.0, help="Latência simulada de uma rodada LLM")
+    parser.add_argument("--tool-ms", type=float, default=250.0, help="Latência simulada de uma ferramenta")
+    parser.add_argument("--concurrency", type=int, default=4, help="MULTI_INTENT_MAX_CONCURRENCY")
+    args = parser.parse_args()
+
+    queries = COMPOUND_QUERIES
+    if args.queries:
+        queries = [line.strip() for line in args.queries.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+    asyncio.run(main_async(queries, args.llm_ms / 1000, args.tool_ms / 1000, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
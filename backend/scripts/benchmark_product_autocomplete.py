@@ -0,0 +1,92 @@
+"""
+Benchmark: autocomplete de produtos (prefixo + trigramas) vs varredura
+Mede a latência por tecla do ProductAutocompleteIndex (cada prefixo da
+consulta, como o typeahead envia) contra a varredura `str.contains` sobre os
+nomes normalizados (caminho de DataSourceManager.search / ILIKE).
+
+Execução:
+    python backend/scripts/benchmark_product_autocomplete.py
+    python backend/scripts/benchmark_product_autocomplete.py --sizes 50000 200000 --typo-rate 0.3
+
+- Catálogo sintético: nomes de 3-6 palavras sorteadas (Zipf) de um
+  vocabulário de palavras pseudo-portuguesas, vendas log-normais
+- Consultas de 1-3 palavras de nomes existentes, digitadas letra a letra,
+  com erro de digitação (troca de letra) em uma fração delas
+
+Date: 2026-10-19
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path (imports usam o pacote backend.*)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.app.core.rag.product_autocomplete import ProductAutocompleteIndex  # noqa: E402
+from backend.application.services.pt_br_normalizer import PTBRNormalizer  # noqa: E402
+
+SYLLABLES = ["ca", "ne", "ta", "co", "la", "pa", "pel", "tec", "do", "li", "nha", "bran", "az", "ul", "gel", "ro", "sa"]
+
+
+def synthetic(size: int, vocab: int, typo_rate: float, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    words = sorted({"".join(rng.choice(SYLLABLES, size=rng.integers(2, 5))) for _ in range(vocab * 2)})[:vocab]
+    ranks = np.minimum(rng.zipf(1.3, size=size * 6), len(words)) - 1
+    names, offset = [], 0
+    for length in rng.integers(3, 7, size=size):
+        names.append(" ".join(words[r] for r in ranks[offset:offset + length]).upper())
+        offset += length
+    sales = rng.lognormal(3, 1.5, size=size)
+
+    queries = []
+    for _ in range(100):
+        name_words = names[rng.integers(size)].lower().split()
+        query = " ".join(name_words[: rng.integers(1, 4)])
+        if rng.random() < typo_rate and len(query) > 4:
+            pos = int(rng.integers(1, len(query) - 1))
+            query = query[:pos] + "x" + query[pos + 1:]
+        queries.append(query)
+    return names, sales, queries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000])
+    parser.add_argument("--vocab", type=int, default=5000)
+    parser.add_argument("--typo-rate", type=float, default=0.2)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'produtos':>9} {'build s':>8} {'tecla p50 ms':>13} {'tecla p99 ms':>13} {'varredura ms':>13}")
+    for size in args.sizes:
+        names, sales, queries = synthetic(size, args.vocab, args.typo_rate)
+
+        start = time.perf_counter()
+        index = ProductAutocompleteIndex(np.arange(1, size + 1), names, sales)
+        build_s = time.perf_counter() - start
+
+        latencies = []
+        for query in queries:
+            for end in range(2, len(query) + 1):  # uma consulta por tecla
+                start = time.perf_counter()
+                index.search(query[:end], args.limit)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        normalized = PTBRNormalizer.normalize_series(pd.Series(names))
+        start = time.perf_counter()
+        for query in queries:
+            mask = normalized.str.contains(PTBRNormalizer.normalize_text(query), regex=False)
+            pd.Series(sales)[mask].nlargest(args.limit)
+        scan_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"{size:>9} {build_s:>8.2f} {p50:>13.3f} {p99:>13.3f} {scan_ms:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark: normalização pt-BR de nomes de produto
+Compara, sobre N nomes sintéticos (default 1M), o tempo de:
+
+- legado: pipeline `Series.str` (lower, NFD -> ascii, 2 regex, strip)
+- PTBRNormalizer.normalize_series: tabela `str.translate` pré-computada,
+  split/join e memo de valores repetidos
+- Arrow compute (utf8_lower, utf8_normalize NFD, regex RE2), se pyarrow
+- DuckDB (lower, strip_accents, regexp_replace)
+
+e a tokenização de queries repetidas (memo) vs normalização a cada chamada.
+
+Execução:
+    python backend/scripts/benchmark_pt_br_normalizer.py
+    python backend/scripts/benchmark_pt_br_normalizer.py --rows 200000 --distinct 0.1
+
+Date: 2026-10-19
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+# Add project root to path (imports usam o pacote backend.*)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.application.services.pt_br_normalizer import PTBRNormalizer  # noqa: E402
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
+WORDS = [
+    "CANETA", "ESFEROGRÁFICA", "AÇÚCAR", "LÁPIS", "Nº2", "CORAÇÃO", "TECIDO", "ALGODÃO", "90G", "1,5L",
+    "PÃO-DE-LÓ", "MAÇÃ", "AZUL", "BRANCO", "KIT", "C/12", "TRICOLINE", "ESTAMPADO", "LINHA", "AGULHA",
+]
+
+
+def legacy(series: pd.Series) -> pd.Series:
+    s = series.fillna("").str.lower()
+    s = s.str.normalize("NFD").str.encode("ascii", errors="ignore").str.decode("utf-8")
+    s = s.str.replace(r"[^a-z0-9\s]", " ", regex=True)
+    return s.str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def arrow(series: pd.Series) -> list:
+    arr = pc.utf8_normalize(pc.utf8_lower(pa.array(series.fillna(""), type=pa.string())), "NFD")
+    arr = pc.replace_substring_regex(arr, r"\p{Mn}+", "")
+    arr = pc.replace_substring_regex(arr, r"[^a-z0-9]+", " ")
+    return pc.utf8_trim_whitespace(arr).to_pylist()
+
+
+def duck(series: pd.Series) -> list:
+    frame = pd.DataFrame({"nome": series})
+    con = duckdb.connect()
+    try:
+        return con.execute(
+            "SELECT trim(regexp_replace(strip_accents(lower(nome)), '[^a-z0-9]+', ' ', 'g')) FROM frame"
+        ).fetchdf().iloc[:, 0].tolist()
+    finally:
+        con.close()
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=float, default=1.0, help="fração de nomes distintos")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    distinct = max(1, int(args.rows * args.distinct))
+    pool = [" ".join(rng.choice(WORDS, size=rng.integers(3, 8))) + f" {i}" for i in range(distinct)]
+    names = pd.Series([pool[i] for i in rng.integers(0, distinct, size=args.rows)])
+
+    base_s, expected = timed(legacy, names)
+    new_s, result = timed(PTBRNormalizer.normalize_series, names)
+    print(f"{'engine':<28} {'s':>7} {'speedup':>8}")
+    print(f"{'legado (Series.str)':<28} {base_s:>7.2f} {1.0:>8.1f}")
+    print(f"{'normalize_series (translate)':<28} {new_s:>7.2f} {base_s / new_s:>8.1f}")
+    if pa is not None:
+        arrow_s, _ = timed(arrow, names)
+        print(f"{'arrow compute':<28} {arrow_s:>7.2f} {base_s / arrow_s:>8.1f}")
+    duck_s, _ = timed(duck, names)
+    print(f"{'duckdb strip_accents':<28} {duck_s:>7.2f} {base_s / duck_s:>8.1f}")
+    # O legado descarta caracteres não ASCII (ex.: "Nº2" -> "n2"); normalize_series
+    # segue normalize_text ("n 2"), igual à normalização das queries
+    print(f"valores diferentes do legado: {(expected != result).sum()}")
+
+    queries = [pool[i] for i in rng.integers(0, min(distinct, 500), size=100_000)]
+    raw_s, _ = timed(lambda: [PTBRNormalizer.normalize_text(q).split() for q in queries])
+    memo_s, _ = timed(lambda: [PTBRNormalizer.tokenize(q) for q in queries])
+    print(f"tokenize 100k queries (500 distintas): {raw_s:.2f}s sem memo, {memo_s:.2f}s com memo")
+
+
+if __name__ == "__main__":
+    main()
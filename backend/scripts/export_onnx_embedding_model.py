@@ -0,0 +1,64 @@
+"""
+Prepara o modelo de embeddings ONNX int8 usado pelo QueryEmbeddingRuntime.
+
+Padrão: baixa do Hugging Face só o tokenizer e a variante já quantizada
+(int8 dinâmico) publicada pelo sentence-transformers. Com `--quantize`,
+gera a variante int8 localmente a partir do `onnx/model.onnx` (fp32), com
+`onnxruntime.quantization.quantize_dynamic` (útil para CPUs sem AVX2/AVX512
+ou para outro modelo).
+
+Execução:
+    python backend/scripts/export_onnx_embedding_model.py
+    python backend/scripts/export_onnx_embedding_model.py --variant model_qint8_avx512.onnx
+    python backend/scripts/export_onnx_embedding_model.py --quantize
+
+Requer: huggingface_hub, onnxruntime (e tokenizers para rodar o runtime).
+O diretório de saída é o EMBEDDING_ONNX_MODEL_DIR (settings).
+
+Date: 2026-10-19
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add project root to path (imports usam o pacote backend.*)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.app.config.settings import settings  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repo", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--output", default=settings.EMBEDDING_ONNX_MODEL_DIR)
+    parser.add_argument("--variant", default=Path(settings.EMBEDDING_ONNX_MODEL_FILE).name)
+    parser.add_argument("--quantize", action="store_true", help="quantiza localmente onnx/model.onnx em int8")
+    args = parser.parse_args()
+
+    from huggingface_hub import snapshot_download
+
+    output = Path(args.output)
+    source = "model.onnx" if args.quantize else args.variant
+    snapshot_download(
+        args.repo,
+        local_dir=output,
+        allow_patterns=["tokenizer.json", "config.json", f"onnx/{source}"],
+    )
+
+    if args.quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        target = output / "onnx" / args.variant
+        quantize_dynamic(output / "onnx" / "model.onnx", target, weight_type=QuantType.QInt8)
+        fp32_mb = (output / "onnx" / "model.onnx").stat().st_size / 1e6
+        print(f"[OK] Quantizado: {target} ({target.stat().st_size / 1e6:.1f} MB; fp32 {fp32_mb:.1f} MB)")
+    else:
+        print(f"[OK] Modelo em {output / 'onnx' / args.variant}")
+
+    if f"onnx/{args.variant}" != settings.EMBEDDING_ONNX_MODEL_FILE:
+        print(f"[WARNING] Ajuste EMBEDDING_ONNX_MODEL_FILE=onnx/{args.variant}")
+
+
+if __name__ == "__main__":
+    main()
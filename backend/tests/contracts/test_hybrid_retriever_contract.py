@@ -9,7 +9,7 @@ from backend.app.core.rag.hybrid_retriever import HybridRetriever
 @pytest.fixture
 def mock_retriever_dependencies():
     """Mock completo das dependências externas do HybridRetriever."""
-    with patch("app.core.rag.hybrid_retriever.BM25Okapi") as mock_bm25, \
+    with patch("app.core.rag.hybrid_retriever.BM25Index") as mock_bm25, \
          patch("app.core.rag.hybrid_retriever.genai") as mock_genai, \
          patch("app.core.rag.hybrid_retriever.ExampleCollector") as mock_collector:
             
@@ -22,9 +22,9 @@ def mock_retriever_dependencies():
         ]
         
         # Mock BM25
-        mock_bm25_instance = mock_bm25.return_value
+        mock_bm25_instance = mock_bm25.build.return_value
         # Scores simulados para doc1 e doc2
-        mock_bm25_instance.get_scores.return_value = [10.0, 5.0] 
+        mock_bm25_instance.search.return_value = [(0, 10.0), (1, 5.0)]
         
         # Mock GenAI
         mock_genai.embed_content.return_value = {"embedding": [0.1, 0.2, 0.3]}
@@ -0,0 +1,95 @@
+import hashlib
+import threading
+
+import numpy as np
+
+from backend.app.core.rag.ann_index import ANNIndex
+from backend.app.core.rag.dense_index import l2_normalize
+from backend.infrastructure.adapters.search.vector_index_adapter import VectorIndexAdapter
+
+
+def _embed(text):
+    seed = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+    return np.random.default_rng(seed).normal(size=16).astype(np.float32)
+
+
+class FakeBackend:
+    max_batch_size = 1000
+    max_concurrency = 1
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_batch(self, texts):
+        self.embedded.extend(texts)
+        return [_embed(t) for t in texts]
+
+
+def test_hnsw_matches_brute_force_and_survives_reload(tmp_path):
+    vectors = np.random.default_rng(0).normal(size=(2000, 32)).astype(np.float32)
+    ids = list(range(1000, 3000))
+    index = ANNIndex(32, m=16, ef_construction=100, ef_search=64)
+    index.upsert(ids, vectors)
+
+    queries = np.random.default_rng(1).normal(size=(20, 32)).astype(np.float32)
+    exact = l2_normalize(queries) @ l2_normalize(vectors).T
+    hits = 0
+    for q, scores in zip(queries, exact):
+        expected = {ids[i] for i in np.argsort(-scores)[:10]}
+        hits += len(expected & {pid for pid, _ in index.search(q, 10)})
+    assert hits / 200 >= 0.9
+
+    index.save(tmp_path / "v1")
+    reloaded = ANNIndex.load(tmp_path / "v1")
+    assert len(reloaded) == 2000
+    assert reloaded.search(queries[0], 5) == index.search(queries[0], 5)
+
+
+def test_upsert_replaces_and_remove_hides_ids():
+    index = ANNIndex(4)
+    index.upsert([1, 2, 3], np.eye(4, dtype=np.float32)[:3], ["a", "b", "c"])
+    index.upsert([2], np.array([[0, 0, 0, 1]], dtype=np.float32), ["b2"])
+    index.remove([3])
+
+    assert len(index) == 2 and index.deleted == 2
+    assert index.key_of(2) == "b2" and 3 not in index
+    assert index.search([0, 0, 0, 1], 1)[0][0] == 2
+    assert all(pid != 3 for pid, _ in index.search([0, 0, 1, 0], 3))
+
+    index.compact()
+    assert index.deleted == 0 and sorted(index.ids()) == [1, 2]
+
+
+async def test_new_catalog_version_only_indexes_changed_products(tmp_path):
+    adapter = VectorIndexAdapter(str(tmp_path / "catalog.duckdb"), backend=FakeBackend())
+
+    assert await adapter.build_index_from_texts([1, 2, 3], ["arroz tipo 1", "feijao preto", "cafe"], "v1")
+    adapter.backend.embedded.clear()
+    assert await adapter.build_index_from_texts(
+        [1, 2, 4], ["arroz tipo 1", "feijao carioca", "acucar"], "v2", base_version="v1"
+    )
+
+    assert sorted(adapter.backend.embedded) == ["acucar", "feijao carioca"]
+    v2 = ANNIndex.load(tmp_path / "ann" / "v2")
+    assert sorted(v2.ids()) == [1, 2, 4]
+    results = await adapter.search("feijao carioca", "v2", top_k=3)
+    assert results[0].product_id == 2 and results[0].score > 0.99
+    assert [r.product_id for r in await adapter.search("cafe", "v1", top_k=1)] == [3]
+
+
+async def test_search_loads_and_queries_the_ann_index_off_the_event_loop(tmp_path, monkeypatch):
+    adapter = VectorIndexAdapter(str(tmp_path / "catalog.duckdb"), backend=FakeBackend())
+    assert await adapter.build_index_from_texts([1, 2], ["arroz tipo 1", "feijao preto"], "v1")
+    threads = []
+    load_ann = adapter._load_ann
+
+    def spying_load(version):
+        threads.append(threading.current_thread())
+        return load_ann(version)
+
+    monkeypatch.setattr(adapter, "_load_ann", spying_load)
+
+    results = await adapter.search("feijao preto", "v1", top_k=1)
+
+    assert results[0].product_id == 2
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+
+import httpx
+
+from backend.app.config.settings import settings
+from backend.app.core import llm_http
+from backend.app.core.llm_base import aiter_in_thread
+from backend.app.core.llm_factory import SmartLLM
+from backend.app.core.llm_groq_adapter import GroqLLMAdapter
+from backend.app.core.llm_mock import MockStreamingLLMAdapter
+
+
+def _chat_completion(content):
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "fake-model",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+    }
+
+
+async def test_groq_async_calls_share_pool_and_respect_provider_limit(monkeypatch):
+    inflight = 0
+    peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal inflight, peak
+        inflight += 1
+        peak = max(peak, inflight)
+        await asyncio.sleep(0.02)
+        inflight -= 1
+        return httpx.Response(200, json=_chat_completion("ok"))
+
+    clients = []
+
+    def build_client():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        clients.append(client)
+        return client
+
+    monkeypatch.setattr(llm_http, "_build_client", build_client)
+    monkeypatch.setattr(settings, "LLM_PROVIDER_MAX_CONCURRENCY", 2)
+    await llm_http.close_async_http_clients()
+
+    adapter = GroqLLMAdapter(api_key="test-key", base_url="http://fake-provider")
+    results = await asyncio.gather(
+        *[adapter.aget_completion([{"role": "user", "content": f"q{i}"}]) for i in range(6)]
+    )
+
+    assert [r["content"] for r in results] == ["ok"] * 6
+    assert len(clients) == 1
+    assert peak == 2
+    await llm_http.close_async_http_clients()
+
+
+async def test_smart_llm_async_falls_back_to_next_provider():
+    class _FailingAsync(MockStreamingLLMAdapter):
+        provider = "groq"
+
+        async def aget_completion(self, messages, tools=None):
+            return {"error": "503 unavailable"}
+
+    smart = SmartLLM(primary="mock")
+    adapters = {"groq": _FailingAsync(), "mock": MockStreamingLLMAdapter(responses=[{"content": "via fallback"}])}
+    smart.provider_chain = ["groq", "mock"]
+    smart._get_adapter = adapters.get
+
+    result = await smart.aget_completion([{"role": "user", "content": "oi"}])
+
+    assert result["content"] == "via fallback"
+    assert result["provider"] == "mock"
+
+
+async def test_aiter_in_thread_stops_producer_when_consumer_closes_early():
+    pulled = []
+    closed = threading.Event()
+
+    def provider_stream():
+        try:
+            for i in range(1000):
+                time.sleep(0.005)
+                pulled.append(i)
+                yield {"content": str(i)}
+        finally:
+            closed.set()
+
+    stream = aiter_in_thread(provider_stream)
+    first = await stream.__anext__()
+    await stream.aclose()
+
+    assert first == {"content": "0"}
+    assert await asyncio.to_thread(closed.wait, 1)
+    assert len(pulled) < 10
@@ -0,0 +1,69 @@
+import random
+
+import numpy as np
+import pytest
+
+from backend.app.core.rag.bm25_index import BM25Index
+from backend.domain.entities.document import Document
+from backend.infrastructure.adapters.bm25_ranking_adapter import BM25RankingAdapter
+
+
+def _corpus(n=500, seed=0):
+    rng = random.Random(seed)
+    vocab = [f"termo{i}" for i in range(120)]
+    return [" ".join(rng.choice(vocab) for _ in range(rng.randint(1, 10))) for _ in range(n)], vocab
+
+
+def test_scores_match_rank_bm25_okapi():
+    rank_bm25 = pytest.importorskip("rank_bm25")
+    texts, vocab = _corpus()
+    reference = rank_bm25.BM25Okapi([t.split() for t in texts])
+    index = BM25Index.build(enumerate(texts), tokenizer=str.split)
+
+    for query in (["termo1", "termo2"], ["termo7", "termo7", "termo99"], ["inexistente"]):
+        expected = reference.get_scores(query)
+        hits = index.search_tokens(query, 10)
+        top = sorted(range(len(texts)), key=lambda i: -expected[i])[:len(hits)]
+        assert np.allclose([s for _, s in hits], [expected[i] for i in top], rtol=1e-5)
+        assert all(s > 0 for _, s in hits)
+
+
+def test_incremental_updates_equal_a_fresh_build():
+    texts, _ = _corpus(200)
+    index = BM25Index.build(enumerate(texts), tokenizer=str.split)
+    index.update(3, "termo5 termo5 novo")
+    index.remove(10)
+    index.add("extra", "novo termo8")
+
+    final = {i: t for i, t in enumerate(texts) if i != 10}
+    final[3] = "termo5 termo5 novo"
+    final["extra"] = "novo termo8"
+    fresh = BM25Index.build(final.items(), tokenizer=str.split)
+
+    for query in ("novo", "termo5 termo8", "termo1"):
+        got = dict(index.search(query, 20))
+        want = dict(fresh.search(query, 20))
+        assert got.keys() == want.keys()
+        assert np.allclose([got[k] for k in want], list(want.values()))
+    assert 10 not in index and len(index) == 200
+
+
+async def test_ranking_adapter_reuses_index_and_keeps_zero_score_padding():
+    adapter = BM25RankingAdapter()
+    docs = [
+        Document(tenant_id="t", content="Python programming language", id="py"),
+        Document(tenant_id="t", content="Java programming language", id="java"),
+        Document(tenant_id="t", content="Unrelated content", id="other"),
+    ]
+
+    ranked = await adapter.rank_bm25("Python programming", docs, top_k=3)
+    assert [r.document.id for r in ranked] == ["py", "java", "other"]
+    assert ranked[2].score == 0.0
+
+    tokenized = []
+    adapter._index.tokenizer = lambda text: tokenized.append(text) or adapter._tokenize(text)
+    docs[2] = Document(tenant_id="t", content="Python snippets", id="other")
+    ranked = await adapter.rank_bm25("Python", docs[1:], top_k=2)
+
+    assert tokenized == ["Python snippets"]
+    assert [r.document.id for r in ranked] == ["other", "java"]
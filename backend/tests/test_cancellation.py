@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.app.core.agents.caculinha_bi_agent import CaculinhaBIAgent
+from backend.app.core.cancellation import (
+    CancellationToken,
+    RequestCancelled,
+    cancellation_scope,
+    current_cancellation_token,
+)
+from backend.app.core.parquet_cache import cache
+
+SLOW_SQL = "SELECT COUNT(*) AS n FROM range(100000000000) a"
+
+
+async def test_token_reaches_tool_threads_and_fires_callbacks_once():
+    token = CancellationToken()
+    fired = []
+
+    with cancellation_scope(token):
+        seen = await asyncio.to_thread(current_cancellation_token)
+    assert seen is token
+    assert current_cancellation_token() is None
+
+    token.add_callback(lambda: fired.append("a"))
+    remove = token.add_callback(lambda: fired.append("b"))
+    remove()
+    assert token.cancel("client_disconnected") is True
+    assert token.cancel("timeout") is False
+    token.add_callback(lambda: fired.append("late"))  # já cancelado: roda na hora
+
+    assert fired == ["a", "late"]
+    assert token.reason == "client_disconnected"
+    with pytest.raises(RequestCancelled):
+        token.raise_if_cancelled()
+
+
+async def test_cancel_interrupts_running_duckdb_query_without_breaking_shared_connection():
+    token = CancellationToken()
+
+    with cancellation_scope(token):
+        query = asyncio.ensure_future(asyncio.to_thread(cache.query, SLOW_SQL))
+    await asyncio.sleep(0.2)
+
+    start = time.perf_counter()
+    token.cancel("client_disconnected")
+    with pytest.raises(RequestCancelled):
+        await asyncio.wait_for(query, timeout=5)
+
+    assert time.perf_counter() - start < 2.0
+    assert cache.query("SELECT 42 AS x")["x"].tolist() == [42]
+    with cancellation_scope(CancellationToken()):
+        assert cache.query("SELECT 7 AS x")["x"].tolist() == [7]
+
+
+def test_cancelled_request_neither_starts_nor_retries_tools():
+    agent = CaculinhaBIAgent.__new__(CaculinhaBIAgent)
+    token = CancellationToken()
+    calls = []
+
+    def tool(**kwargs):
+        calls.append(kwargs)
+        token.cancel("client_disconnected")  # desconexão durante a execução
+        raise RuntimeError("interrupted")
+
+    with cancellation_scope(token):
+        with pytest.raises(RequestCancelled):
+            agent._execute_tool_with_recovery(tool, "consultar_dados_flexivel", {"limite": 5})
+        assert len(calls) == 1  # sem retry com argumentos coercidos
+
+        with pytest.raises(RequestCancelled):
+            agent._execute_tool_with_recovery(tool, "consultar_dados_flexivel", {"limite": 5})
+        assert len(calls) == 1  # nem inicia
@@ -0,0 +1,132 @@
+import hashlib
+import shutil
+from datetime import datetime
+
+import duckdb
+import numpy as np
+
+from backend.application.services.catalog_builder_service import CatalogBuilderService
+from backend.application.services.pt_br_normalizer import PTBRNormalizer
+from backend.infrastructure.adapters.repository.duckdb_catalog_repository import DuckDBCatalogRepository
+from backend.infrastructure.adapters.search import vector_index_adapter as v
+from backend.infrastructure.adapters.search.vector_index_adapter import VectorIndexAdapter
+
+
+class FakeSource:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def load_full_catalog(self):
+        return [dict(r) for r in self.rows]
+
+    async def load_incremental_catalog(self, since):
+        return []
+
+
+class CountingNormalizer(PTBRNormalizer):
+    def __init__(self):
+        self.rows = 0
+
+    def normalize_series(self, series):
+        self.rows += len(series)
+        return super().normalize_series(series)
+
+
+class FakeBackend:
+    max_batch_size = 1000
+    max_concurrency = 1
+    model_name = "fake"
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_batch(self, texts):
+        self.embedded.extend(texts)
+        return [
+            np.random.default_rng(int(hashlib.md5(t.encode()).hexdigest()[:8], 16)).normal(size=8).astype(np.float32)
+            for t in texts
+        ]
+
+
+def _row(pid, name, brand="ACME", updated_at=datetime(2026, 1, 1)):
+    return {
+        "product_id": pid, "name_raw": name, "brand": brand, "dept": "PAPELARIA",
+        "category": "ESCRITA", "subcategory": "CANETAS", "updated_at": updated_at,
+    }
+
+
+def _builder(tmp_path, rows):
+    db_path = str(tmp_path / "catalog.duckdb")
+    repo = DuckDBCatalogRepository(db_path)
+    backend = FakeBackend()
+    vec = VectorIndexAdapter(db_path, backend=backend)
+    normalizer = CountingNormalizer()
+    builder = CatalogBuilderService(FakeSource(rows), repo, repo, normalizer, vector_index=vec)
+    return builder, normalizer, backend, vec, db_path
+
+
+def _version_ids(db_path, table, version):
+    with duckdb.connect(db_path) as con:
+        rows = con.execute(f"SELECT product_id FROM {table} WHERE catalog_version = ?", [version]).fetchall()
+    return sorted(r[0] for r in rows)
+
+
+def _embedding_ids(vec, version):
+    ids, vectors = vec._load_embeddings(version, list(range(10)))
+    assert vectors.shape == (len(ids), 8)
+    return sorted(ids)
+
+
+async def test_second_rebuild_only_processes_changed_products(tmp_path):
+    rows = [_row(1, "CANETA AZUL"), _row(2, "LÁPIS Nº2"), _row(3, "COLA BRANCA")]
+    builder, normalizer, backend, vec, db_path = _builder(tmp_path, rows)
+    v1 = await builder.rebuild_catalog("v1")
+    assert _embedding_ids(vec, v1) == [1, 2, 3]
+
+    normalizer.rows, backend.embedded = 0, []
+    builder.source.rows = [
+        _row(1, "CANETA AZUL", updated_at=datetime(2026, 2, 1)),  # só updated_at mudou
+        _row(2, "LÁPIS Nº2 HB"),  # alterado
+        _row(4, "TESOURA"),  # novo; 3 saiu da fonte
+    ]
+    v2 = await builder.rebuild_catalog("v2")
+
+    assert v2 and v2 != v1
+    assert normalizer.rows == 2 * 3  # nome, marca e categoria de 2 produtos
+    assert sorted(backend.embedded) == ["lapis n 2 hb acme escrita", "tesoura acme escrita"]
+    assert _version_ids(db_path, "products_canonical", v2) == [1, 2, 4]
+    assert _embedding_ids(vec, v2) == [1, 2, 4]
+    assert _version_ids(db_path, "products_embeddings", v2) == [2, 4]  # só os vetores novos
+    assert _version_ids(db_path, "products_embedding_refs", v2) == [1]
+    assert sorted(vec._load_ann(v2).ids()) == [1, 2, 4]
+    assert (await builder.repository.get_product(1, v2)).name_canonical == "caneta azul"
+    assert _version_ids(db_path, "products_canonical", v1) == [1, 2, 3]  # versão antiga intacta
+
+    # Terceira versão sem mudanças: referências resolvidas até a versão com o vetor
+    v3 = await builder.rebuild_catalog("v3")
+    assert _version_ids(db_path, "products_embeddings", v3) == []
+    assert _embedding_ids(vec, v3) == [1, 2, 4]
+    shutil.rmtree(vec._ann_path(v3))
+    v._ANN_CACHE.clear()
+    hits = await vec.search("tesoura acme escrita", v3, top_k=3)  # fallback SQL
+    assert hits[0].product_id == 4 and len(hits) == 3
+
+
+async def test_full_rebuild_and_missing_base_embeddings_reprocess_everything(tmp_path):
+    rows = [_row(1, "CANETA AZUL"), _row(2, "LÁPIS")]
+    builder, normalizer, backend, vec, db_path = _builder(tmp_path, rows)
+    await builder.rebuild_catalog("v1")
+
+    normalizer.rows = 0
+    await builder.rebuild_catalog("v2", full=True)
+    assert normalizer.rows == 2 * 3
+
+    # Base sem embeddings: cópia incompleta -> índice vetorial da versão inteira
+    active = await builder.version_manager.get_active_version()
+    with duckdb.connect(db_path) as con:
+        con.execute("DELETE FROM products_embeddings WHERE catalog_version = ?", [active])
+    normalizer.rows = 0
+    v3 = await builder.rebuild_catalog("v3")
+    assert normalizer.rows == 0
+    assert _embedding_ids(vec, v3) == [1, 2]
+    assert sorted(vec._load_ann(v3).ids()) == [1, 2]
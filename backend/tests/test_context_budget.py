@@ -0,0 +1,81 @@
+import json
+
+from backend.app.core.utils.context_budget import (
+    ContextBudgeter,
+    digest_tool_result,
+    estimate_tokens,
+)
+
+
+def _rows(n):
+    return [{"PRODUTO": 1000 + i, "NOME": f"PRODUTO {i}", "VENDA_30DD": float(i)} for i in range(n)]
+
+
+def _tool_turn(n_rows, with_chart=False):
+    payload = {"total_resultados": n_rows, "resultados": _rows(n_rows)}
+    if with_chart:
+        payload["chart_data"] = json.dumps({"data": [{"y": list(range(2000))}]})
+    return [
+        {"role": "assistant", "content": None, "tool_calls": [
+            {"id": "call_1", "type": "function", "function": {"name": "consultar_dados_flexivel", "arguments": "{}"}}
+        ]},
+        {"role": "function", "name": "consultar_dados_flexivel", "content": json.dumps(payload)},
+    ]
+
+
+def test_digest_keeps_top_k_rows_and_aggregates():
+    digest = digest_tool_result(json.dumps({"resultados": _rows(500), "chart_data": "{...}"}), top_k=5)
+
+    assert digest["_digest"] == "tabela"
+    assert len(digest["resultados"]) == 5
+    assert digest["resultados_total"] == 500
+    assert digest["resultados_colunas"] == ["PRODUTO", "NOME", "VENDA_30DD"]
+    assert digest["resultados_agregados"]["VENDA_30DD"]["soma"] == sum(range(500))
+    assert "omitido" in digest["chart_data"]
+
+
+def test_fit_compacts_tool_results_without_touching_original():
+    messages = [{"role": "user", "content": "top 500 produtos"}] + _tool_turn(500, with_chart=True)
+    original = json.dumps(messages)
+    budgeter = ContextBudgeter(max_tokens=4000, tool_result_max_tokens=1000, top_k=10)
+
+    compacted, report = budgeter.fit(messages)
+
+    assert json.dumps(messages) == original
+    assert report.digested == 1 and report.evicted == 0
+    assert report.tokens_after <= 4000 < report.tokens_before
+    assert [m["role"] for m in compacted] == ["user", "assistant", "function"]
+    assert compacted[1]["tool_calls"] == messages[1]["tool_calls"]
+
+
+def test_fit_evicts_oldest_history_but_keeps_current_query():
+    history = [{"role": "user" if i % 2 == 0 else "assistant", "content": "x" * 2000} for i in range(10)]
+    query = {"role": "user", "content": "e as rupturas?"}
+    messages = history + [query]
+    budgeter = ContextBudgeter(max_tokens=2500, reserved_tokens=500)
+
+    compacted, report = budgeter.fit(messages, history_len=len(history))
+
+    assert report.evicted > 0
+    assert compacted[-1] == query
+    assert compacted[0] == history[report.evicted]
+    assert report.tokens_after <= 2500
+    assert report.tokens_saved["evict"] == report.tokens_before - report.tokens_after
+
+
+def test_estimate_tokens_handles_structures():
+    assert estimate_tokens(None) == 0
+    assert estimate_tokens("abcd" * 10) == 10
+    assert estimate_tokens({"a": 1}) > 0
+
+
+def test_fit_terminates_when_floor_exceeds_tiny_budget():
+    messages = [{"role": "user", "content": "a" * 400}, {"role": "user", "content": "b" * 400}]
+
+    compacted, report = ContextBudgeter(max_tokens=100).fit(messages)
+    assert len(compacted) == 2 and report.truncated == 2
+    assert report.tokens_after < report.tokens_before
+
+    # Prompt reservado maior que o orçamento inteiro (message_budget == 0)
+    compacted, report = ContextBudgeter(max_tokens=1000, reserved_tokens=4800).fit(messages)
+    assert compacted[0]["content"].startswith("a" * 256) and report.tokens_after > 1000
@@ -0,0 +1,59 @@
+import numpy as np
+
+from backend.app.core.rag.dense_index import DenseMatrixIndex, corpus_fingerprint
+from backend.app.core.rag.hybrid_retriever import HybridRetriever
+
+
+def _brute_force(vectors, query, top_k):
+    scored = []
+    for i, v in enumerate(vectors):
+        if v is None:
+            continue
+        v = np.asarray(v, dtype=np.float64)
+        scored.append((i, float(v @ query / (np.linalg.norm(v) * np.linalg.norm(query)))))
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return scored[:top_k]
+
+
+def test_matrix_search_matches_per_document_cosine_and_skips_missing_vectors():
+    rng = np.random.default_rng(7)
+    vectors = [list(rng.normal(size=32)) for _ in range(200)]
+    vectors[3] = None
+    vectors[10] = [1.0, 2.0]  # dimensão errada: ignorado
+    query = rng.normal(size=32)
+
+    index = DenseMatrixIndex.build(vectors)
+    expected = _brute_force([v if v is None or len(v) == 32 else None for v in vectors], query, 10)
+    got = index.search(query, top_k=10)
+
+    assert index.size == 198 and index.matrix.dtype == np.float32
+    assert [pos for pos, _ in got] == [pos for pos, _ in expected]
+    assert np.allclose([s for _, s in got], [s for _, s in expected], atol=1e-5)
+    assert len(index.search(query, top_k=500)) == 198
+    assert index.search(np.zeros(32), top_k=5) == []
+
+
+def test_saved_matrix_is_memory_mapped_and_invalidated_by_fingerprint(tmp_path):
+    path = tmp_path / "embeddings_matrix.npy"
+    fingerprint = corpus_fingerprint(["vendas une 1685", "estoque"], "models/text-embedding-004")
+    DenseMatrixIndex.build([[1.0, 0.0], [0.0, 1.0]], fingerprint).save(path)
+
+    loaded = DenseMatrixIndex.load(path, fingerprint)
+    assert isinstance(loaded.matrix, np.memmap)
+    assert loaded.search([0.1, 0.9], top_k=1)[0][0] == 1
+    assert DenseMatrixIndex.load(path, corpus_fingerprint(["outro corpus"], "models/text-embedding-004")) is None
+
+
+def test_hybrid_retriever_dense_search_uses_matrix_aligned_with_documents(tmp_path):
+    retriever = HybridRetriever(examples_path=str(tmp_path))
+    retriever.documents = [{"query": "vendas"}, {"query": "sem embedding"}, {"query": "estoque"}]
+    retriever.embedding_store.add_many({"vendas": [1.0, 0.0, 0.0], "estoque": [0.0, 1.0, 0.0]})
+    retriever._build_dense_index()
+    retriever._generate_embedding = lambda text: [0.2, 0.9, 0.0]
+
+    results = retriever._dense_search("quanto tenho em estoque", top_k=5)
+
+    assert [r["doc"]["query"] for r in results] == ["estoque", "vendas"]
+    assert results[0]["method"] == "dense" and results[0]["score"] > results[1]["score"]
+    assert (tmp_path / "embeddings_matrix.npy").exists()
+    assert retriever.get_stats()["dense_matrix_rows"] == 2
@@ -0,0 +1,75 @@
+from backend.app.core.agents.caculinha_bi_agent import CaculinhaBIAgent
+from backend.app.core.utils.deterministic_fast_path import plan_fast_path, render_fast_path_answer
+
+
+class _FakeTool:
+    def __init__(self, name, result):
+        self.name = name
+        self.result = result
+        self.calls = []
+
+    def invoke(self, args):
+        self.calls.append(args)
+        return self.result
+
+
+def _agent_stub(tools) -> CaculinhaBIAgent:
+    agent = CaculinhaBIAgent.__new__(CaculinhaBIAgent)
+    agent.bi_tools = tools
+    return agent
+
+
+def test_plans_kpi_templates_with_extracted_params():
+    une = plan_fast_path("vendas da une 1685")
+    assert une.template == "kpi_une"
+    assert une.tool_params == {"filtros": {"UNE": 1685}, "agregacao": "SUM", "coluna_agregacao": "VENDA_30DD"}
+
+    produto = plan_fast_path("qual o estoque do produto 369947 na une 2365")
+    assert produto.template == "kpi_produto"
+    assert produto.tool_params["filtros"] == {"PRODUTO": 369947, "UNE": 2365}
+
+    top = plan_fast_path("top 10 produtos mais vendidos na une 2365")
+    assert top.template == "top_produtos"
+    assert top.tool_params["limite"] == 10
+    assert top.tool_params["agrupar_por"] == ["PRODUTO", "NOME"]
+
+
+def test_open_ended_and_out_of_scope_queries_keep_the_llm():
+    assert plan_fast_path("por que as vendas da une 1685 caíram?") is None
+    assert plan_fast_path("gere um gráfico de vendas da une 1685") is None
+    assert plan_fast_path("preveja a demanda do produto 25") is None
+    # A ferramenta de ruptura não filtra por UNE: recorte fica com o LLM
+    assert plan_fast_path("rupturas críticas na une 1685") is None
+
+
+def test_render_falls_back_on_tool_error():
+    plan = plan_fast_path("vendas da une 1685")
+    assert render_fast_path_answer(plan, {"error": "Erro na consulta"}) is None
+
+    answer = render_fast_path_answer(plan, {"total_resultados": 1, "resultado_agregado": {"valor": 12345.5}})
+    assert "R$ 12.345,50" in answer["result"]["mensagem"]
+
+
+async def test_agent_answers_without_llm_loop():
+    tool = _FakeTool(
+        "consultar_dados_flexivel",
+        {
+            "total_resultados": 2,
+            "resultados": [
+                {"PRODUTO": 25, "NOME": "TNT AZUL", "UNE": 1685, "VENDA_30DD": 100.0, "ESTOQUE_UNE": 10},
+                {"PRODUTO": 25, "NOME": "TNT AZUL", "UNE": 2365, "VENDA_30DD": 50.0, "ESTOQUE_UNE": 5},
+            ],
+        },
+    )
+    agent = _agent_stub([tool])
+    events = []
+
+    async def on_progress(event):
+        events.append(event)
+
+    response = await agent._try_deterministic_fast_path("quanto vendeu o produto 25", None, on_progress)
+
+    msg = response["result"]["mensagem"]
+    assert "TNT AZUL" in msg and "R$ 150,00" in msg and "2 UNE(s)" in msg
+    assert tool.calls[0]["filtros"] == {"PRODUTO": 25}
+    assert events == [{"type": "tool_progress", "tool": "tool.data_query", "status": "executing"}]
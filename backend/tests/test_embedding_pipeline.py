@@ -0,0 +1,86 @@
+import threading
+import time
+
+import numpy as np
+
+from backend.app.core.rag.embedding_pipeline import EmbeddingPipeline, content_hash
+from backend.app.core.rag.embedding_store import EmbeddingStore
+
+MODEL = "fake-embedder"
+
+
+class FakeBackend:
+    max_batch_size = 1000
+    max_concurrency = 8
+
+    def __init__(self, fail_on=None, rate_limited_calls=0, delay=0.0):
+        self.calls = []
+        self.fail_on = fail_on
+        self.rate_limited_calls = rate_limited_calls
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def embed_batch(self, texts):
+        with self.lock:
+            self.calls.append(list(texts))
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            rate_limited = self.rate_limited_calls > 0
+            self.rate_limited_calls -= 1
+        try:
+            time.sleep(self.delay)
+            if rate_limited:
+                raise RuntimeError("429 RESOURCE_EXHAUSTED: quota exceeded")
+            if self.fail_on and self.fail_on in texts:
+                raise RuntimeError("backend indisponível")
+            return [[float(len(t)), 1.0] for t in texts]
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+def test_texts_are_deduped_batched_and_run_with_bounded_concurrency(tmp_path):
+    texts = [f"produto {i % 100}" for i in range(250)]  # 100 textos distintos
+    backend = FakeBackend(delay=0.02)
+    pipeline = EmbeddingPipeline(backend, EmbeddingStore(tmp_path, MODEL), batch_size=10, max_concurrency=3)
+
+    result = pipeline.run(texts)
+
+    assert (result.total, result.unique, result.embedded, result.batches) == (250, 100, 100, 10)
+    assert sum(len(c) for c in backend.calls) == 100
+    assert 1 < backend.peak <= 3
+    vectors = pipeline.vectors_for(["produto 7", "nunca visto"])
+    assert vectors.tolist() == [[9.0, 1.0], [0.0, 0.0]]
+    assert content_hash("produto 7") in EmbeddingStore(tmp_path, MODEL).load()
+
+
+def test_failed_batches_do_not_stop_others_and_rerun_resumes_only_missing(tmp_path):
+    texts = [f"item {i}" for i in range(40)]
+    broken = FakeBackend(fail_on="item 25")
+    first = EmbeddingPipeline(broken, EmbeddingStore(tmp_path, MODEL), batch_size=10, max_retries=1, sleep=lambda s: None)
+
+    result = first.run(texts)
+    assert (result.embedded, result.failed, result.complete) == (30, 10, False)
+
+    healthy = FakeBackend()
+    resumed = EmbeddingPipeline(healthy, EmbeddingStore(tmp_path, MODEL).load(), batch_size=10)
+    result = resumed.run(texts)
+
+    assert (result.cached, result.embedded, result.complete) == (30, 10, True)
+    assert healthy.calls == [[f"item {i}" for i in range(20, 30)]]
+
+
+def test_rate_limit_pauses_and_retries():
+    slept = []
+    backend = FakeBackend(rate_limited_calls=1)
+    pipeline = EmbeddingPipeline(
+        backend, EmbeddingStore(None, MODEL), batch_size=5, max_concurrency=1, backoff_seconds=0.05, sleep=slept.append
+    )
+
+    result = pipeline.run([f"t{i}" for i in range(5)])
+
+    assert result.complete and result.retries == 1 and len(backend.calls) == 2
+    assert slept and 0 < slept[0] <= 0.05
+    assert isinstance(pipeline.vectors_for(["t1"]), np.ndarray)
@@ -0,0 +1,82 @@
+import threading
+
+import numpy as np
+import pytest
+
+from backend.app.core.rag.embedding_pipeline import SentenceTransformerBackend
+from backend.app.core.rag.embedding_runtime import QueryEmbeddingRuntime, build_embedding_backend, mean_pool
+
+
+class RecordingBackend:
+    model_name = "fake"
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.release = threading.Event()
+
+    def embed_batch(self, texts):
+        self.release.wait(5)
+        self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("modelo indisponível")
+        return np.array([[len(t), 1.0] for t in texts])
+
+
+def test_concurrent_queries_share_one_forward_pass_and_the_lru():
+    backend = RecordingBackend()
+    runtime = QueryEmbeddingRuntime(backend, batch_window_ms=200, max_batch_size=8, cache_size=2)
+
+    futures = [runtime.submit(t) for t in ["caneta", "cola", "caneta", "tecido"]]
+    backend.release.set()
+    vectors = [f.result(5) for f in futures]
+
+    assert backend.batches == [["caneta", "cola", "tecido"]]
+    assert vectors[0] is vectors[2] and vectors[1].tolist() == [4.0, 1.0]
+    assert not vectors[0].flags.writeable
+
+    assert runtime.embed_query("tecido") is vectors[3]  # LRU
+    assert len(backend.batches) == 1
+    stats = runtime.get_stats()
+    assert stats["cache_hits"] == 1 and stats["avg_batch"] == 3 and stats["cached_queries"] == 2
+
+
+async def test_backend_errors_reach_every_waiting_query():
+    backend = RecordingBackend(fail=True)
+    backend.release.set()
+    runtime = QueryEmbeddingRuntime(backend, batch_window_ms=1)
+
+    with pytest.raises(RuntimeError, match="indisponível"):
+        await runtime.aembed_query("caneta")
+    backend.fail = False
+    assert (await runtime.aembed_query("caneta")).tolist() == [6.0, 1.0]
+
+
+async def test_short_backend_output_fails_the_batch_and_keeps_the_worker_alive():
+    class ShortBackend(RecordingBackend):
+        def embed_batch(self, texts):
+            vectors = super().embed_batch(texts)
+            return vectors[:-1] if self.short else vectors
+
+    backend = ShortBackend()
+    backend.short = True
+    runtime = QueryEmbeddingRuntime(backend, batch_window_ms=200, max_batch_size=8)
+
+    futures = [runtime.submit(t) for t in ["caneta", "cola"]]
+    backend.release.set()
+    for future in futures:
+        with pytest.raises(ValueError, match="1 vetores para 2 textos"):
+            future.result(5)
+
+    backend.short = False
+    assert (await runtime.aembed_query("tecido")).tolist() == [6.0, 1.0]
+
+
+def test_mean_pool_ignores_padding_and_missing_onnx_model_falls_back(tmp_path):
+    hidden = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]])
+    pooled = mean_pool(hidden, np.array([[1, 1, 0]]), normalize=False)
+    assert pooled.tolist() == [[2.0, 0.0]]
+    assert np.allclose(np.linalg.norm(mean_pool(hidden, np.array([[1, 1, 1]])), axis=1), 1.0)
+
+    backend = build_embedding_backend("all-MiniLM-L6-v2", onnx_model_dir=str(tmp_path / "sem-modelo"))
+    assert isinstance(backend, SentenceTransformerBackend) and backend.model_name == "all-MiniLM-L6-v2"
@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+
+from backend.app.core.rag.embedding_store import EmbeddingStore
+from backend.app.core.rag.hybrid_retriever import HybridRetriever
+
+MODEL = "models/text-embedding-004"
+
+
+def test_store_appends_rows_and_reopens_memory_mapped(tmp_path):
+    store = EmbeddingStore(tmp_path, MODEL, dtype="float16")
+    assert store.add_many({"vendas": [1.0, 0.0, 0.5], "estoque": [0.0, 1.0, 0.25]}) == 2
+    assert store.add_many({"vendas": [9.0, 9.0, 9.0], "ruptura": [0.5, 0.5, 0.0], "errado": [1.0]}) == 1
+
+    reopened = EmbeddingStore(tmp_path, MODEL, dtype="float16").load()
+
+    assert isinstance(reopened.vectors, np.memmap) and reopened.vectors.dtype == np.float16
+    assert reopened.ids == ["vendas", "estoque", "ruptura"]
+    assert reopened.get("vendas").tolist() == [1.0, 0.0, 0.5]
+    assert reopened.positions(["ruptura", "nao existe"]).tolist() == [2, -1]
+    assert (tmp_path / "embeddings.v1.bin").stat().st_size == 3 * 3 * 2
+
+
+def test_interrupted_append_is_discarded_and_other_model_is_rebuilt(tmp_path):
+    EmbeddingStore(tmp_path, MODEL).add_many({"a": [1.0, 2.0]})
+    with open(tmp_path / "embeddings.v1.bin", "ab") as f:
+        f.write(b"\x00" * 5)  # escrita interrompida: sem commit no cabeçalho
+    with open(tmp_path / "embeddings.v1.ids", "ab") as f:
+        f.write(b'"meio')
+
+    store = EmbeddingStore(tmp_path, MODEL).load()
+    assert store.ids == ["a"]
+    store.add_many({"b": [3.0, 4.0]})
+    assert EmbeddingStore(tmp_path, MODEL).load().get("b").tolist() == [3.0, 4.0]
+
+    other = EmbeddingStore(tmp_path, "all-MiniLM-L6-v2").load()
+    assert len(other) == 0
+    other.add_many({"x": [0.1, 0.2, 0.3]})
+    assert EmbeddingStore(tmp_path, "all-MiniLM-L6-v2").load().ids == ["x"]
+
+
+def test_retriever_migrates_legacy_json_once_and_only_embeds_new_documents(tmp_path):
+    (tmp_path / "embeddings_cache.json").write_text(json.dumps({"vendas": [1.0, 0.0], "estoque": [0.0, 1.0]}))
+    calls = []
+
+    class Backend:
+        def embed_batch(self, texts):
+            calls.extend(texts)
+            return [[0.5, 0.5] for _ in texts]
+
+    retriever = HybridRetriever(examples_path=str(tmp_path))
+    retriever.documents = [{"query": "vendas"}, {"query": "estoque"}, {"query": "ruptura"}]
+    retriever._embedding_backend = Backend
+    retriever._load_or_generate_embeddings()
+
+    assert calls == ["ruptura"]
+    assert retriever.get_stats()["embeddings_cached"] == 3
+
+    restarted = HybridRetriever(examples_path=str(tmp_path))
+    restarted.documents = retriever.documents
+    restarted._embedding_backend = Backend
+    restarted._load_or_generate_embeddings()
+    restarted._build_dense_index()
+
+    assert calls == ["ruptura"]
+    assert isinstance(restarted.embedding_store.vectors, np.memmap)
+    assert restarted.dense_index.size == 3
@@ -0,0 +1,128 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.app.services import insights_cache
+from backend.app.services.background_tasks import get_task_manager
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(insights_cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(insights_cache, "_inflight_regenerations", {})
+    return tmp_path
+
+
+def _write_cache(cache_dir, filters, age_hours):
+    key = insights_cache.get_cache_key(filters)
+    payload = {
+        "insights": [{"title": "Ruptura TNT", "description": "old"}],
+        "generated_at": (datetime.utcnow() - timedelta(hours=age_hours)).isoformat(),
+        "cache_key": key,
+        "filters": filters,
+    }
+    (cache_dir / f"{key}.json").write_text(json.dumps(payload), encoding="utf-8")
+    return key
+
+
+def test_expired_cache_is_served_as_stale(cache_dir):
+    key = _write_cache(cache_dir, {"segments": ["PAPELARIA"]}, age_hours=30)
+
+    cached = insights_cache.get_cached_insights(key)
+
+    assert cached["stale"] is True
+    assert cached["insights"][0]["title"] == "Ruptura TNT"
+    assert cached["filters"] == {"segments": ["PAPELARIA"]}
+
+
+def test_fresh_cache_is_not_stale(cache_dir):
+    key = _write_cache(cache_dir, {}, age_hours=1)
+
+    assert insights_cache.get_cached_insights(key)["stale"] is False
+
+
+async def test_regeneration_is_deduplicated_and_refreshes_cache(cache_dir, monkeypatch):
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def fake_generate(filters):
+        started.set()
+        await release.wait()
+        return [{"title": "Novo insight", "description": "fresh"}]
+
+    monkeypatch.setattr(insights_cache, "generate_insights", fake_generate)
+    filters = {"segments": ["TECIDOS"]}
+
+    first = await insights_cache.schedule_insights_regeneration(filters)
+    second = await insights_cache.schedule_insights_regeneration(filters)
+    assert first is not None
+    assert second is None
+
+    await started.wait()
+    release.set()
+    await get_task_manager().wait_for_task(first, timeout=1)
+
+    cached = insights_cache.get_cached_insights(insights_cache.get_cache_key(filters))
+    assert cached["stale"] is False
+    assert cached["insights"][0]["title"] == "Novo insight"
+    assert insights_cache._inflight_regenerations == {}
+
+
+async def test_dataset_refresh_schedules_every_known_scope(cache_dir, monkeypatch):
+    _write_cache(cache_dir, {"segments": ["PAPELARIA"]}, age_hours=2)
+    _write_cache(cache_dir, {"segments": ["ARMARINHO"]}, age_hours=2)
+    regenerated = []
+
+    async def fake_generate(filters):
+        regenerated.append(filters)
+        return []
+
+    monkeypatch.setattr(insights_cache, "generate_insights", fake_generate)
+
+    task_ids = await insights_cache.schedule_insights_refresh_for_all_scopes()
+    for task_id in task_ids:
+        await get_task_manager().wait_for_task(task_id, timeout=1)
+
+    assert len(task_ids) == 3  # global + 2 segment scopes
+    assert {} in regenerated
+    assert {"segments": ["PAPELARIA"]} in regenerated
+    assert {"segments": ["ARMARINHO"]} in regenerated
+
+
+@pytest.mark.parametrize("sync_result, refreshes", [
+    ({"status": "success", "rows": 10}, 1),
+    ({"status": "warning", "message": "Nenhum dado encontrado"}, 0),
+])
+async def test_parquet_sync_only_refreshes_insights_after_success(monkeypatch, sync_result, refreshes):
+    pytest.importorskip("pyodbc")  # sync_service (SQL Server) precisa do driver ODBC
+    from backend.app.api.v1.endpoints import admin
+
+    scheduled = []
+
+    async def fake_schedule():
+        scheduled.append(1)
+        return []
+
+    monkeypatch.setattr(admin.sync_service, "run_sync", lambda: sync_result)
+    monkeypatch.setattr(admin, "schedule_insights_refresh_for_all_scopes", fake_schedule)
+
+    await admin._sync_parquet_and_refresh_insights()
+    assert len(scheduled) == refreshes
+
+
+async def test_degraded_regeneration_keeps_previous_cache(cache_dir, monkeypatch):
+    key = _write_cache(cache_dir, {}, age_hours=30)
+
+    async def degraded_generate(filters):
+        return [{"title": "Sistema de insights em manutenção", "description": "quota"}]
+
+    monkeypatch.setattr(insights_cache, "generate_insights", degraded_generate)
+
+    result = await insights_cache.regenerate_insights({})
+
+    cached = insights_cache.get_cached_insights(key)
+    assert result == cached["insights"]
+    assert cached["insights"][0]["title"] == "Ruptura TNT"
+    assert cached["stale"] is True
@@ -0,0 +1,113 @@
+import pytest
+
+from backend.app.core import llm_cache
+from backend.app.core.llm_base import BaseLLMAdapter
+from backend.app.core.llm_cache import LLMCompletionCache, cached_completion, llm_call_site
+
+
+class _CountingAdapter(BaseLLMAdapter):
+    provider = "fake"
+    model_name = "fake-1"
+
+    def __init__(self, temperature=0.1):
+        self.temperature = temperature
+        self.system_instruction = None
+        self.calls = 0
+
+    def get_completion(self, messages, tools=None):
+        self.calls += 1
+        # Simula o Groq, que altera a lista de mensagens in-place
+        messages.insert(0, {"role": "system", "content": "injected"})
+        return {"content": f"resposta {self.calls}"}
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    cache = LLMCompletionCache(max_entries=2, ttl_seconds=60, max_temperature=0.1)
+    monkeypatch.setattr(llm_cache, "_llm_cache", cache)
+    return cache
+
+
+def test_identical_prompts_hit_cache_with_whitespace_normalization(fresh_cache):
+    adapter = _CountingAdapter()
+
+    with llm_call_site("intent_classification"):
+        first = cached_completion(adapter, [{"role": "user", "content": "vendas  da UNE 1685"}])
+        second = cached_completion(adapter, [{"role": "user", "content": "vendas da UNE 1685 "}])
+
+    assert adapter.calls == 1
+    assert first == second == {"content": "resposta 1"}
+    stats = fresh_cache.get_stats()["call_sites"]["intent_classification"]
+    assert stats["hit"] == 1 and stats["miss"] == 1
+
+
+def test_tools_and_model_are_part_of_the_key(fresh_cache):
+    adapter = _CountingAdapter()
+    messages = [{"role": "user", "content": "top produtos"}]
+
+    cached_completion(adapter, list(messages), {"function_declarations": [{"name": "a"}]})
+    cached_completion(adapter, list(messages), {"function_declarations": [{"name": "b"}]})
+    adapter.model_name = "fake-2"
+    cached_completion(adapter, list(messages), {"function_declarations": [{"name": "a"}]})
+
+    assert adapter.calls == 3
+
+
+def test_non_deterministic_adapters_and_errors_are_not_cached(fresh_cache):
+    hot = _CountingAdapter(temperature=0.9)
+    cached_completion(hot, [{"role": "user", "content": "oi"}])
+    cached_completion(hot, [{"role": "user", "content": "oi"}])
+    assert hot.calls == 2
+
+    failing = _CountingAdapter()
+    failing.get_completion = lambda messages, tools=None: {"error": "quota"}
+    cached_completion(failing, [{"role": "user", "content": "oi"}])
+    assert fresh_cache.get_stats()["entries"] == 0
+
+
+def test_bypass_flag_forces_provider_call(fresh_cache):
+    adapter = _CountingAdapter()
+    cached_completion(adapter, [{"role": "user", "content": "insights"}])
+
+    with llm_call_site("proactive_insights", bypass=True):
+        cached_completion(adapter, [{"role": "user", "content": "insights"}])
+
+    assert adapter.calls == 2
+    assert fresh_cache.get_stats()["call_sites"]["proactive_insights"]["bypass"] == 1
+
+
+def test_lru_and_ttl_eviction(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(llm_cache.time, "monotonic", lambda: clock[0])
+    cache = LLMCompletionCache(max_entries=2, ttl_seconds=10)
+
+    cache.set("a", {"content": "A"})
+    cache.set("b", {"content": "B"})
+    assert cache.get("a") is not None  # "a" passa a ser o mais recente
+    cache.set("c", {"content": "C"})
+
+    assert cache.get("b") is None
+    assert cache.get("c") == {"content": "C"}
+
+    clock[0] += 11
+    assert cache.get("a") is None
+    assert cache.get("c") is None
+
+
+def test_query_interpreter_caches_intent_classification_on_raw_adapters(fresh_cache):
+    from backend.app.services.query_interpreter import IntentType, QueryInterpreter
+
+    class _IntentAdapter(_CountingAdapter):
+        def get_completion(self, messages, tools=None):
+            self.calls += 1
+            return {"content": '{"intent_type": "vendas", "entities": {}, "confidence": 0.9, "visualization": "bar"}'}
+
+    adapter = _IntentAdapter()
+    interpreter = QueryInterpreter(llm_adapter=adapter)
+    first = interpreter._llm_classify("como foi o desempenho do tecido?")
+    second = interpreter._llm_classify("como foi o desempenho do tecido?")
+
+    assert adapter.calls == 1
+    assert first.intent_type == second.intent_type == IntentType.VENDAS
+    stats = fresh_cache.get_stats()["call_sites"]["intent_classification"]
+    assert stats["hit"] == 1 and stats["miss"] == 1
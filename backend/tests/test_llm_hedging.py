@@ -0,0 +1,133 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.app.config.settings import settings
+from backend.app.core import llm_hedging
+from backend.app.core.llm_factory import SmartLLM
+from backend.app.core.llm_hedging import COMPLETION, HedgeBudget, LatencyTracker, hedge_deadline
+from backend.app.core.llm_resilience import reset_provider_guards
+
+
+class _FakeProvider:
+    """Provedor falso com latência roteirizada (sem rede, sem cache)."""
+
+    temperature = 0.7
+
+    def __init__(self, name, delay, content=None, error=None):
+        self.provider = name
+        self.delay = delay
+        self.content = content or f"resposta {name}"
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+        self.closed = False
+
+    async def aget_completion(self, messages, tools=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return {"error": self.error} if self.error else {"content": self.content}
+
+    async def astream_completion(self, messages, tools=None):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+            for token in self.content.split():
+                yield {"content": token}
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def hedging(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGING_ENABLED", True)
+    monkeypatch.setattr(settings, "LLM_HEDGING_DEFAULT_DEADLINE_SECONDS", 0.05)
+    monkeypatch.setattr(llm_hedging, "_tracker", LatencyTracker(min_samples=20))
+    monkeypatch.setattr(llm_hedging, "_budget", HedgeBudget(max_ratio=1.0, initial_tokens=5))
+    reset_provider_guards()
+
+
+def _smart(primary, secondary):
+    smart = SmartLLM(primary="mock")
+    adapters = {"groq": primary, "google": secondary}
+    smart.provider_chain = ["groq", "google", "mock"]
+    smart._get_adapter = adapters.get
+    return smart
+
+
+async def test_slow_primary_is_hedged_and_loser_cancelled(hedging):
+    primary, secondary = _FakeProvider("groq", delay=5.0), _FakeProvider("google", delay=0.01)
+
+    start = time.perf_counter()
+    result = await _smart(primary, secondary).aget_completion([{"role": "user", "content": "vendas"}])
+
+    assert result["provider"] == "google"
+    assert time.perf_counter() - start < 1.0
+    assert primary.cancelled
+    assert llm_hedging._budget.get_stats()["inflight"] == 0
+
+
+async def test_fast_primary_never_fires_secondary_and_feeds_latency(hedging):
+    primary, secondary = _FakeProvider("groq", delay=0.0), _FakeProvider("google", delay=0.0)
+
+    result = await _smart(primary, secondary).aget_completion([{"role": "user", "content": "vendas"}])
+
+    assert result["provider"] == "groq"
+    assert secondary.calls == 0
+    assert llm_hedging._tracker.get_stats()["groq:completion"]["samples"] == 1
+
+
+async def test_exhausted_budget_waits_for_primary(hedging, monkeypatch):
+    monkeypatch.setattr(llm_hedging, "_budget", HedgeBudget(max_ratio=0.0, initial_tokens=0))
+    primary, secondary = _FakeProvider("groq", delay=0.15), _FakeProvider("google", delay=0.0)
+
+    result = await _smart(primary, secondary).aget_completion([{"role": "user", "content": "vendas"}])
+
+    assert result["provider"] == "groq"
+    assert secondary.calls == 0
+
+
+async def test_primary_error_fails_over_immediately(hedging, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGING_DEFAULT_DEADLINE_SECONDS", 5.0)
+    primary = _FakeProvider("groq", delay=0.0, error="503 unavailable")
+    secondary = _FakeProvider("google", delay=0.0)
+
+    start = time.perf_counter()
+    result = await _smart(primary, secondary).aget_completion([{"role": "user", "content": "vendas"}])
+
+    assert result["provider"] == "google"
+    assert time.perf_counter() - start < 1.0
+
+
+async def test_stream_races_on_first_token(hedging):
+    primary = _FakeProvider("groq", delay=5.0)
+    secondary = _FakeProvider("google", delay=0.01, content="UNE 1685 vendeu")
+
+    chunks = [c async for c in _smart(primary, secondary).astream_completion([{"role": "user", "content": "vendas"}])]
+
+    assert [c["content"] for c in chunks] == ["UNE", "1685", "vendeu"]
+    assert {c["provider"] for c in chunks} == {"google"}
+    assert primary.closed
+
+
+def test_deadline_follows_primary_p95_with_floor(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGING_MIN_DEADLINE_SECONDS", 0.5)
+    tracker = LatencyTracker(min_samples=5)
+    assert hedge_deadline("groq", COMPLETION, tracker) == settings.LLM_HEDGING_DEFAULT_DEADLINE_SECONDS
+
+    for seconds in [1.0] * 19 + [3.0]:
+        tracker.record("groq", COMPLETION, seconds)
+    assert hedge_deadline("groq", COMPLETION, tracker) == 3.0
+
+    fast = LatencyTracker(min_samples=5)
+    for _ in range(10):
+        fast.record("groq", COMPLETION, 0.05)
+    assert hedge_deadline("groq", COMPLETION, fast) == 0.5
@@ -0,0 +1,182 @@
+import httpx
+import pytest
+
+from backend.app.config.settings import settings
+from backend.app.core import llm_cache, llm_http
+from backend.app.core.llm_factory import SmartLLM
+from backend.app.core.llm_cache import LLMCompletionCache
+from backend.app.core.llm_groq_adapter import GroqLLMAdapter
+from backend.app.core.llm_resilience import (
+    AdaptiveConcurrencyLimit,
+    ProviderGuard,
+    get_provider_guard,
+    reset_provider_guards,
+)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def fresh_guards():
+    reset_provider_guards()
+    yield
+    reset_provider_guards()
+
+
+def test_aimd_limit_backs_off_once_per_generation_and_recovers():
+    limiter = AdaptiveConcurrencyLimit(initial=8, min_limit=1, max_limit=16, latency_target=1.0)
+
+    # Rajada de respostas lentas iniciadas antes da primeira queda: uma única redução
+    for _ in range(5):
+        limiter.on_sample(started_at=0.0, latency=3.0, overloaded=False, inflight=8)
+    assert limiter.limit == 6
+
+    limiter.on_sample(started_at=10.0, latency=0.1, overloaded=True, inflight=6)
+    assert limiter.limit == 4
+
+    for _ in range(40):
+        limiter.on_sample(started_at=20.0, latency=0.2, overloaded=False, inflight=limiter.limit)
+    assert limiter.limit >= 8
+
+
+def test_breaker_trips_on_latency_slo_and_reopens_longer_after_bad_probe(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_LATENCY_SLO_SECONDS", 2.0)
+    monkeypatch.setattr(settings, "LLM_BREAKER_MIN_CALLS", 4)
+    monkeypatch.setattr(settings, "LLM_BREAKER_OPEN_SECONDS", 30.0)
+    clock = _Clock()
+    guard = ProviderGuard("groq", clock=clock)
+
+    for _ in range(4):
+        permit, _ = guard.try_acquire()
+        permit.release("success", latency=5.0)  # respostas "ok", mas fora do SLO
+
+    assert guard.try_acquire() == (None, "circuit_open")
+    assert guard.get_status()["last_trip_reason"] == "latency_slo"
+
+    clock.now += 31
+    probe, _ = guard.try_acquire()
+    assert probe is not None
+    assert guard.try_acquire() == (None, "circuit_open")  # uma sonda por vez
+    probe.release("error", error="503 Service Unavailable")
+
+    clock.now += 31
+    assert guard.try_acquire() == (None, "circuit_open")  # tempo aberto dobrou
+    clock.now += 30
+    probe, _ = guard.try_acquire()
+    probe.release("success", latency=0.5)
+    assert guard.get_status()["state"] == "closed"
+
+
+def test_rate_limit_headers_and_retry_hints_block_the_provider():
+    clock = _Clock()
+    guard = ProviderGuard("groq", clock=clock)
+
+    guard.observe_headers({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2.5s"})
+    assert guard.try_acquire() == (None, "rate_limited")
+    clock.now += 3
+    permit, _ = guard.try_acquire()
+    assert permit is not None
+
+    permit.release("error", error="Error code: 429 - Rate limit reached. Please try again in 1m2.5s.")
+    clock.now += 60
+    assert guard.try_acquire() == (None, "rate_limited")
+    clock.now += 3
+    assert guard.try_acquire()[0] is not None
+
+
+async def test_smart_llm_reroutes_when_primary_is_shed():
+    class _Provider:
+        temperature = 0.7
+
+        def __init__(self, name):
+            self.provider = name
+            self.calls = 0
+
+        async def aget_completion(self, messages, tools=None):
+            self.calls += 1
+            return {"content": f"via {self.provider}"}
+
+    groq, google = _Provider("groq"), _Provider("google")
+    smart = SmartLLM(primary="mock")
+    smart.provider_chain = ["groq", "google"]
+    smart._get_adapter = {"groq": groq, "google": google}.get
+
+    get_provider_guard("groq").observe_headers({"retry-after": "30"})
+    result = await smart.aget_completion([{"role": "user", "content": "vendas"}])
+
+    assert result["provider"] == "google"
+    assert groq.calls == 0
+    assert smart.get_provider_status()["admission"]["groq"]["shed"] == {"rate_limited": 1}
+
+
+async def test_cache_hits_skip_admission_even_when_provider_is_blocked(monkeypatch):
+    class _Cached:
+        provider = "groq"
+        model_name = "fake"
+        temperature = 0.0
+        system_instruction = None
+
+        def __init__(self):
+            self.calls = 0
+
+        def get_completion(self, messages, tools=None):
+            self.calls += 1
+            return {"content": "top 10 produtos"}
+
+    monkeypatch.setattr(llm_cache, "_llm_cache", LLMCompletionCache(ttl_seconds=60, max_temperature=0.1))
+    adapter = _Cached()
+    smart = SmartLLM(primary="mock")
+    smart.provider_chain = ["groq"]
+    smart._get_adapter = {"groq": adapter}.get
+    messages = [{"role": "user", "content": "top 10"}]
+    guard = get_provider_guard("groq")
+    acquired = []
+    try_acquire = guard.try_acquire
+    monkeypatch.setattr(guard, "try_acquire", lambda *a: acquired.append(a) or try_acquire(*a))
+
+    assert smart.get_completion(list(messages))["content"] == "top 10 produtos"
+    guard.observe_headers({"retry-after": "30"})
+
+    assert smart.get_completion(list(messages))["content"] == "top 10 produtos"
+    assert (await smart.aget_completion(list(messages)))["content"] == "top 10 produtos"
+    assert adapter.calls == 1 and len(acquired) == 1  # hits não pedem vaga nem contam no AIMD
+    assert guard.get_status()["shed"] == {}
+
+    assert "error" in smart.get_completion([{"role": "user", "content": "outra pergunta"}])
+    assert adapter.calls == 1 and guard.get_status()["shed"] == {"rate_limited": 1}
+
+
+async def test_http_pool_feeds_rate_limit_headers_to_guard(monkeypatch):
+    def handler(request):
+        return httpx.Response(
+            200,
+            headers={"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "10s"},
+            json={
+                "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "fake-model",
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}],
+            },
+        )
+
+    monkeypatch.setattr(
+        llm_http,
+        "_build_client",
+        lambda: httpx.AsyncClient(
+            transport=httpx.MockTransport(handler),
+            event_hooks={"response": [llm_http._observe_rate_limit_headers]},
+        ),
+    )
+    await llm_http.close_async_http_clients()
+
+    adapter = GroqLLMAdapter(api_key="test-key", base_url="http://fake-provider")
+    assert (await adapter.aget_completion([{"role": "user", "content": "oi"}]))["content"] == "ok"
+
+    status = get_provider_guard("groq").get_status()
+    assert status["remaining_requests"] == 0
+    assert status["rate_limited_for"] > 0
+    await llm_http.close_async_http_clients()
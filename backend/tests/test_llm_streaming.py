@@ -0,0 +1,102 @@
+import time
+
+from backend.app.core import llm_cache
+from backend.app.core.agents.caculinha_bi_agent import CaculinhaBIAgent
+from backend.app.core.llm_cache import LLMCompletionCache
+from backend.app.core.llm_factory import SmartLLM
+from backend.app.core.llm_mock import MockStreamingLLMAdapter
+
+
+def _agent_stub(llm) -> CaculinhaBIAgent:
+    agent = CaculinhaBIAgent.__new__(CaculinhaBIAgent)
+    agent.llm = llm
+    return agent
+
+
+async def test_final_answer_tokens_reach_progress_before_completion():
+    llm = MockStreamingLLMAdapter(
+        responses=[{"content": "A UNE 1685 vendeu R$ 10.000 nos últimos 30 dias."}],
+        first_token_delay=0.05,
+        token_delay=0.02,
+    )
+    agent = _agent_stub(llm)
+    events = []
+
+    async def on_progress(event):
+        events.append((time.perf_counter(), event))
+
+    start = time.perf_counter()
+    response = await agent._get_completion_streaming([{"role": "user", "content": "vendas"}], None, on_progress)
+    total = time.perf_counter() - start
+
+    text_events = [(t, e) for t, e in events if e["type"] == "text"]
+    assert len(text_events) == 10
+    assert "".join(e["text"] for _, e in text_events) == response["content"]
+    time_to_first_token = text_events[0][0] - start
+    assert time_to_first_token < total / 2
+
+
+async def test_tool_call_turn_is_not_streamed_as_text():
+    tool_call = {"id": "call_1", "type": "function", "function": {"name": "consultar_dados_flexivel", "arguments": "{}"}}
+    agent = _agent_stub(MockStreamingLLMAdapter(responses=[{"content": "", "tool_calls": [tool_call]}]))
+    events = []
+
+    async def on_progress(event):
+        events.append(event)
+
+    response = await agent._get_completion_streaming([{"role": "user", "content": "vendas"}], None, on_progress)
+
+    assert response["tool_calls"] == [tool_call]
+    assert events == []
+
+
+class _FailingAdapter(MockStreamingLLMAdapter):
+    provider = "groq"
+
+    def stream_completion(self, messages, tools=None):
+        yield {"error": "429 rate limit"}
+
+
+def test_smart_llm_stream_falls_back_before_first_token():
+    smart = SmartLLM(primary="mock")
+    adapters = {
+        "groq": _FailingAdapter(),
+        "mock": MockStreamingLLMAdapter(responses=[{"content": "resposta via fallback"}]),
+    }
+    smart.provider_chain = ["groq", "mock"]
+    smart._get_adapter = adapters.get
+
+    chunks = list(smart.stream_completion([{"role": "user", "content": "oi"}]))
+
+    assert "".join(c["content"] for c in chunks) == "resposta via fallback"
+    assert {c["provider"] for c in chunks} == {"mock"}
+
+
+class _DeterministicStreamingAdapter(MockStreamingLLMAdapter):
+    temperature = 0.0
+
+
+async def test_streamed_turn_is_cached_and_hit_is_sent_as_one_text_event(monkeypatch):
+    monkeypatch.setattr(llm_cache, "_llm_cache", LLMCompletionCache(max_entries=8, ttl_seconds=60, max_temperature=0.1))
+    adapter = _DeterministicStreamingAdapter(
+        responses=[{"content": "A UNE 1685 vendeu R$ 10.000."}, {"content": "não deveria ser chamado"}]
+    )
+    smart = SmartLLM(primary="mock")
+    smart.provider_chain = ["mock"]
+    smart._get_adapter = {"mock": adapter}.get
+    agent = _agent_stub(smart)
+    messages = [{"role": "user", "content": "vendas da UNE 1685"}]
+
+    async def collect(events):
+        async def on_progress(event):
+            events.append(event)
+        return await agent._get_completion_streaming(messages, None, on_progress)
+
+    first_events, second_events = [], []
+    first = await collect(first_events)
+    second = await collect(second_events)
+
+    assert len(adapter.calls) == 1
+    assert len(first_events) > 1
+    assert second_events == [{"type": "text", "text": first["content"], "done": False}]
+    assert second["content"] == first["content"]
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import time
+
+from backend.app.core.agents.caculinha_bi_agent import CaculinhaBIAgent
+from backend.app.core.utils.multi_intent_planner import (
+    PlanNode,
+    QueryPlan,
+    execute_plan,
+    extract_une_list,
+    parse_llm_plan,
+    plan_compound_query,
+)
+
+COMPOUND = "compare vendas e rupturas da UNE 1685 com a 1700 e gere um gráfico"
+
+
+def test_compound_query_becomes_one_parallel_wave_per_facet_and_une():
+    plan = plan_compound_query(COMPOUND)
+
+    assert [n.node_id for n in plan.nodes] == ["vendas_1685", "vendas_1700", "rupturas_1685", "rupturas_1700", "grafico"]
+    assert plan.nodes[1].tool_params["filtros"] == {"UNE": 1700}
+    assert plan.nodes[-1].tool_name == "gerar_grafico_universal_v2"
+    assert len(plan.waves()) == 1
+    assert extract_une_list("estoque das lojas 520, 2365 e 135 nos últimos 30 dias") == ["520", "2365", "135"]
+
+
+def test_simple_or_specialized_questions_are_not_planned():
+    assert plan_compound_query("vendas da une 1685") is None
+    assert plan_compound_query("top 10 produtos mais vendidos na une 2365") is None
+    assert plan_compound_query("previsão de vendas do produto 25 e gere um gráfico") is None
+
+
+async def test_execute_plan_runs_branches_concurrently_and_skips_failed_dependents():
+    plan = QueryPlan(nodes=[
+        PlanNode("a", "t", {"delay": 0.1}),
+        PlanNode("b", "t", {"delay": 0.1}),
+        PlanNode("falha", "t", {"error": True}),
+        PlanNode("c", "t", {"delay": 0.1}, depends_on=("a", "b")),
+        PlanNode("d", "t", {}, depends_on=("falha",)),
+    ])
+    calls = []
+
+    async def runner(node):
+        calls.append(node.node_id)
+        if node.tool_params.get("error"):
+            raise RuntimeError("boom")
+        await asyncio.sleep(node.tool_params.get("delay", 0))
+        return {"status": "success", "node": node.node_id}
+
+    start = time.perf_counter()
+    results = await execute_plan(plan, runner)
+
+    assert time.perf_counter() - start < 0.35  # duas ondas de 0.1s, não quatro chamadas em série
+    assert results["c"] == {"status": "success", "node": "c"}
+    assert results["falha"] == {"error": "boom"}
+    assert "d" not in calls and "falha" in results["d"]["error"]
+
+
+def test_llm_plan_is_validated():
+    tools = ["consultar_dados_flexivel", "gerar_grafico_universal_v2"]
+    ok = parse_llm_plan(
+        'Plano: {"steps": [{"id": "v", "tool": "consultar_dados_flexivel", "params": {"limite": 5}},'
+        ' {"id": "g", "tool": "gerar_grafico_universal_v2", "params": {"descricao": "x"}, "depends_on": ["v"]}]}',
+        tools,
+    )
+    assert ok.source == "llm" and ok.nodes[1].depends_on == ("v",)
+
+    unknown_tool = '{"steps": [{"id": "a", "tool": "rm_rf", "params": {}}, {"id": "b", "tool": "consultar_dados_flexivel"}]}'
+    forward_dep = (
+        '{"steps": [{"id": "a", "tool": "consultar_dados_flexivel", "depends_on": ["b"]},'
+        ' {"id": "b", "tool": "consultar_dados_flexivel"}]}'
+    )
+    assert parse_llm_plan(unknown_tool, tools) is None
+    assert parse_llm_plan(forward_dep, tools) is None
+
+
+async def test_agent_turns_plan_results_into_a_completed_tool_round():
+    agent = CaculinhaBIAgent.__new__(CaculinhaBIAgent)
+    agent.bi_tools = [lambda **kw: None]
+    agent._tool_name = lambda t: "consultar_dados_flexivel"
+    agent._execute_tool_with_recovery = lambda tool, name, params: {"resultado_agregado": {"valor": params["filtros"]["UNE"]}}
+    events = []
+
+    async def on_progress(event):
+        events.append(event)
+
+    plan = plan_compound_query("vendas da une 1685 e da 1700")
+    messages = await agent._execute_multi_intent_plan(plan, None, on_progress)
+
+    assert [tc["id"] for tc in messages[0]["tool_calls"]] == ["plan_vendas_1685", "plan_vendas_1700"]
+    assert json.loads(messages[2]["content"]) == {"resultado_agregado": {"valor": 1700}}
+    assert messages[2]["tool_call_id"] == "plan_vendas_1700"
+    assert [e["status"] for e in events] == ["executing", "executing"]
@@ -0,0 +1,68 @@
+import pandas as pd
+
+from backend.app.core.rag import product_retrieval
+from backend.app.core.rag.product_autocomplete import ProductAutocompleteIndex
+from backend.app.core.rag.product_retrieval import ProductRetrievalService
+from backend.app.core.utils.deterministic_fast_path import plan_fast_path
+
+
+def _index():
+    return ProductAutocompleteIndex(
+        product_ids=[101, 202, 303, 404, 1015],
+        names=[
+            "CANETA ESFEROGRAFICA AZUL",
+            "CANETA GEL PRETA",
+            "CANETINHA HIDROGRAFICA 12 CORES",
+            "COLA BRANCA ESCOLAR 90G",
+            "LAPIS PRETO Nº2",
+        ],
+        sales=[50, 900, 10, 300, 5],
+        segments=["PAPELARIA", "PAPELARIA", "ARTES", "PAPELARIA", "PAPELARIA"],
+    )
+
+
+def test_prefix_typos_and_codes_are_ranked_by_match_then_sales():
+    index = _index()
+
+    hits = index.search("can", limit=5)
+    assert [h.product_id for h in hits] == [202, 101, 303]  # mesmo score (prefixo): mais vendido primeiro
+    assert {h.match for h in hits} == {"prefix"}
+
+    assert [h.product_id for h in index.search("caneta")] == [202, 101]  # "canetinha" não tem o prefixo
+    assert [h.match for h in index.search("canet")] == ["prefix"] * 3
+
+    typo = index.search("canta esferografca")
+    assert [h.product_id for h in typo] == [101] and typo[0].match == "fuzzy"
+
+    assert [h.product_id for h in index.search("101")] == [101, 1015]
+    assert [h.product_id for h in index.search("can", segments=["ARTES"])] == [303]
+    assert index.search("xyzw") == []
+
+
+def test_service_sums_sales_across_unes_and_resolves_names_for_the_fast_path(tmp_path, monkeypatch):
+    parquet = tmp_path / "admmat.parquet"
+    pd.DataFrame(
+        [
+            (101, "CANETA ESFEROGRAFICA AZUL", "PAPELARIA", 1, 40.0),
+            (101, "CANETA ESFEROGRAFICA AZUL", "PAPELARIA", 2, 30.0),
+            (202, "CANETA GEL PRETA", "PAPELARIA", 1, 60.0),
+            (505, "MATRIZ", "PAPELARIA", 1, 1.0),
+        ],
+        columns=["PRODUTO", "NOME", "NOMESEGMENTO", "UNE", "VENDA_30DD"],
+    ).to_parquet(parquet)
+    service = ProductRetrievalService(str(parquet))
+    monkeypatch.setattr(product_retrieval, "_product_retrieval", service)
+
+    # Fast path não dispara a leitura do parquet: sem serviço aquecido, fica com o LLM
+    assert plan_fast_path("quanto vendeu a caneta gel preta") is None
+
+    service.warm()
+    hits = service.autocomplete("caneta")
+    assert [(h.product_id, h.sales) for h in hits] == [(101, 70.0), (202, 60.0)]
+
+    plan = plan_fast_path("quanto vendeu a caneta gel preta")
+    assert plan.template == "kpi_produto" and plan.tool_params["filtros"] == {"PRODUTO": 202}
+    assert plan_fast_path("qual o estoque da caneta") is None  # ambíguo
+    # Palavra solta igual ao nome de um produto não tira a pergunta do KPI por UNE
+    une = plan_fast_path("quanto vendeu a une 1685 matriz")
+    assert une.template == "kpi_une" and une.tool_params["filtros"] == {"UNE": 1685}
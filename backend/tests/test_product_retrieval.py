@@ -0,0 +1,120 @@
+import hashlib
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend.app.core.rag.product_retrieval import ProductRetrievalService
+from backend.infrastructure.adapters.search.product_retrieval_index_adapter import ProductRetrievalIndexAdapter
+
+
+def _write_parquet(path, extra=()):
+    rows = [
+        (101, "COLA BRANCA ESCOLAR 90G", "PAPELARIA", "ADESIVOS", "TENAZ", 1),
+        (101, "COLA BRANCA ESCOLAR 90G", "PAPELARIA", "ADESIVOS", "TENAZ", 2),
+        (202, "CANETA ESFEROGRAFICA AZUL", "PAPELARIA", "ESCRITA", "BIC", 1),
+        (303, "TECIDO TRICOLINE ESTAMPADO", "TECIDOS", "ALGODAO", "FABRICANTE D'OESTE", 1),
+        *extra,
+    ]
+    df = pd.DataFrame(rows, columns=["PRODUTO", "NOME", "NOMESEGMENTO", "NOMEGRUPO", "NOMEFABRICANTE", "UNE"])
+    df.to_parquet(path)
+
+
+class FakeEmbeddings:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def _vec(self, text):
+        seed = int(hashlib.md5(text.split("|")[-1].strip().lower().encode()).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).normal(size=8).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vec(t) for t in texts]
+
+    def embed_query(self, text):
+        time.sleep(self.delay)
+        return self._vec(text)
+
+
+def test_index_is_built_once_per_version_and_queries_are_cached(tmp_path):
+    parquet = tmp_path / "admmat.parquet"
+    _write_parquet(parquet)
+    service = ProductRetrievalService(str(parquet), version_check_seconds=0)
+
+    hits = service.search("cola escolar", top_k=2)
+    assert hits[0].product_id == 101 and hits[0].source == "bm25"
+    assert service.search("Cola  escolar", top_k=2) == hits
+    assert service.get_stats()["cache_hits"] == 1 and service.get_stats()["builds"] == 1
+
+    _write_parquet(parquet, extra=[(404, "COLA QUENTE BASTAO", "PAPELARIA", "ADESIVOS", "TENAZ", 1)])
+    assert {h.product_id for h in service.search("cola", top_k=5)} == {101, 404}
+    assert service.get_stats()["builds"] == 2
+
+
+def test_dense_leg_is_fused_and_dropped_when_over_latency_budget(tmp_path):
+    parquet = tmp_path / "admmat.parquet"
+    _write_parquet(parquet)
+    service = ProductRetrievalService(str(parquet), embeddings=FakeEmbeddings(), cache_dir=str(tmp_path / "cache"))
+    service._build_dense(service.snapshot())
+
+    hits = service.search("tecido tricoline estampado", top_k=3)
+    assert hits[0].product_id == 303 and hits[0].source == "hybrid"
+    assert (tmp_path / "cache" / "product_ann").exists()
+
+    service.embeddings.delay = 0.3
+    service.latency_budget_s = 0.05
+    hits = service.search("caneta azul", top_k=3)
+    assert [h.source for h in hits] == ["bm25"] and hits[0].product_id == 202
+    assert service.get_stats()["dense_timeouts"] == 1 and service.get_stats()["cached_queries"] == 1
+
+
+async def test_attribute_filters_and_catalog_adapter_share_the_snapshot(tmp_path):
+    parquet = tmp_path / "admmat.parquet"
+    _write_parquet(parquet)
+    service = ProductRetrievalService(str(parquet))
+
+    assert service.match_attribute("NOMEFABRICANTE", "oeste") == ["FABRICANTE D'OESTE"]
+    assert service.match_attribute("NOMESEGMENTO", "pApEl") == ["PAPELARIA"]
+    assert service.match_attribute("NOMEGRUPO", "inexistente") == []
+
+    items = await ProductRetrievalIndexAdapter(service).search("caneta bic", version="v1", top_k=5)
+    assert [i.product_id for i in items] == [202] and items[0].source == "bm25"
+    assert service.get_stats()["builds"] == 1
+
+
+async def test_catalog_adapter_drops_hits_outside_the_catalog_version(tmp_path):
+    parquet = tmp_path / "admmat.parquet"
+    _write_parquet(parquet, extra=[(404, "CANETA GEL AZUL", "PAPELARIA", "ESCRITA", "PILOT", 1)])
+
+    class _Repo:
+        def __init__(self):
+            self.calls = 0
+
+        async def get_product_ids(self, version):
+            self.calls += 1
+            return {202} if version == "v1" else {202, 404}
+
+    repo = _Repo()
+    adapter = ProductRetrievalIndexAdapter(ProductRetrievalService(str(parquet)), repository=repo)
+
+    assert [i.product_id for i in await adapter.search("caneta azul", version="v1", top_k=5)] == [202]
+    assert [i.product_id for i in await adapter.search("caneta", version="v1", top_k=5)] == [202]
+    assert repo.calls == 1  # ids da versão são reaproveitados
+    assert {i.product_id for i in await adapter.search("caneta azul", version="v2", top_k=5)} == {202, 404}
+
+
+def test_semantic_search_tool_counts_distinct_products_not_une_rows(tmp_path, monkeypatch):
+    from backend.app.core.tools import semantic_search_tool
+
+    parquet = tmp_path / "admmat.parquet"
+    _write_parquet(parquet)
+    df = pd.read_parquet(parquet).assign(NOMECATEGORIA="", LIQUIDO_38=1.0, ESTOQUE_UNE=1, VENDA_30DD=0)
+    df.to_parquet(parquet)
+    service = ProductRetrievalService(str(parquet))
+    monkeypatch.setattr(semantic_search_tool, "get_product_retrieval_service", lambda: service)
+
+    result = semantic_search_tool.buscar_produtos_inteligente.invoke({"descricao": "cola branca escolar"})
+
+    assert result["status"] == "success"
+    assert len(result["produtos"]) == 2  # 101 nas UNEs 1 e 2
+    assert result["total_encontrados"] == 1
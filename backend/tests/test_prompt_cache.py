@@ -0,0 +1,72 @@
+from backend.app.core.llm_mock import MockPromptCachingLLMAdapter
+from backend.app.core.prompt_cache import PromptCacheRegistry, split_system_prefix
+
+SYSTEM_PROMPT = "Você é o Caculinha BI. " + "Colunas: PRODUTO, NOME, UNE, VENDA_30DD. " * 200
+ANALYST_TOOLS = {"function_declarations": [{"name": "consultar_dados_flexivel", "description": "x" * 2000}]}
+ADMIN_TOOLS = {"function_declarations": ANALYST_TOOLS["function_declarations"] + [{"name": "admin_tool"}]}
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _adapter(ttl=3600):
+    clock = _Clock()
+    registry = PromptCacheRegistry(ttl_seconds=ttl, refresh_margin_seconds=60, clock=clock)
+    return MockPromptCachingLLMAdapter(registry=registry, clock=clock), registry, clock
+
+
+def _turn(question):
+    return [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": question}]
+
+
+def test_cached_prefix_is_created_once_and_reused_across_turns():
+    adapter, registry, _ = _adapter()
+
+    for question in ["vendas da une 1685", "e o estoque?", "top 10 produtos"]:
+        assert "error" not in adapter.get_completion(_turn(question), ANALYST_TOOLS)
+
+    assert adapter.cache_creations == 1
+    assert adapter.calls_with_cache == 3
+    assert all(call["input_tokens"] < 50 for call in adapter.calls)
+    stats = registry.get_stats()
+    assert stats["created"] == 1 and stats["reused"] == 2
+
+
+def test_handle_is_refreshed_before_expiry():
+    adapter, registry, clock = _adapter(ttl=600)
+    adapter.get_completion(_turn("vendas"), ANALYST_TOOLS)
+    first_handle = adapter.calls[-1]["cached_content"]
+
+    clock.now += 600 - 30  # dentro da margem de renovação
+    adapter.get_completion(_turn("vendas"), ANALYST_TOOLS)
+
+    assert adapter.cache_creations == 2
+    assert adapter.calls[-1]["cached_content"] != first_handle
+    assert registry.get_stats()["refreshed"] == 1
+
+
+def test_tool_set_per_role_gets_its_own_handle_and_lost_cache_is_recreated():
+    adapter, registry, _ = _adapter()
+    adapter.get_completion(_turn("vendas"), ANALYST_TOOLS)
+    adapter.get_completion(_turn("vendas"), ADMIN_TOOLS)
+    assert adapter.cache_creations == 2
+
+    adapter.provider_caches.clear()  # provedor descartou os caches
+    result = adapter.get_completion(_turn("vendas"), ANALYST_TOOLS)
+
+    assert "error" not in result
+    assert adapter.cache_creations == 3
+    assert registry.get_stats()["invalidated"] == 1
+
+
+def test_split_system_prefix_only_takes_leading_system_messages():
+    system, rest = split_system_prefix(
+        [{"role": "system", "content": "A"}, {"role": "user", "content": "q"}, {"role": "system", "content": "B"}]
+    )
+    assert system == "A"
+    assert [m["content"] for m in rest] == ["q", "B"]
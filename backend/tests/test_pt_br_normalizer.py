@@ -0,0 +1,43 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from backend.application.services.pt_br_normalizer import PTBRNormalizer, _tokenize_cached
+
+
+def _reference(text):
+    # Implementação original (lower + NFD + regex), usada como oráculo
+    text = "".join(c for c in unicodedata.normalize("NFD", text.lower()) if unicodedata.category(c) != "Mn")
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9\s]", " ", text)).strip()
+
+
+def test_translation_table_matches_reference_normalization():
+    samples = [
+        "AÇÚCAR REFINADO 1KG", "Pão-de-Ló c/ 12", "LÁPIS Nº2", "CORAÇÃO \tAZUL", "İSTANBUL ß",
+        "água", "ΣΟΦΙΑ", "tecido 100% algodão — 1,5m", "   ", "😀 kit",
+    ]
+    rng = np.random.default_rng(0)
+    alphabet = [chr(c) for c in range(0x300)] + ["́", " ", "ẞ"]
+    samples += ["".join(rng.choice(alphabet, size=rng.integers(1, 12))) for _ in range(2000)]
+
+    for text in samples:
+        assert PTBRNormalizer.normalize_text(text) == _reference(text), repr(text)
+
+    series = pd.Series(samples + [None, float("nan"), 123], index=range(10, 10 + len(samples) + 3))
+    normalized = PTBRNormalizer.normalize_series(series)
+    assert list(normalized.index) == list(series.index)
+    assert normalized.tolist() == [_reference(t) for t in samples] + ["", "", ""]
+
+
+def test_tokenize_is_memoized_and_returns_independent_lists():
+    _tokenize_cached.cache_clear()
+    tokens = PTBRNormalizer.tokenize("Caneta de Gel AZUL")
+    assert tokens == ["caneta", "gel", "azul"]
+    tokens.append("mutado")
+
+    assert PTBRNormalizer.tokenize("Caneta de Gel AZUL") == ["caneta", "gel", "azul"]
+    assert PTBRNormalizer.tokenize("Caneta de Gel AZUL", remove_stopwords=False) == ["caneta", "de", "gel", "azul"]
+    assert _tokenize_cached.cache_info().hits == 1
+    assert PTBRNormalizer.tokenize(None) == []
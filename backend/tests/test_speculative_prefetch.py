@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+import pytest
+
+from backend.app.core.utils.speculative_prefetch import SpeculationBudget, SpeculativePrefetch
+
+
+def _normalize(tool_name, args):
+    args = dict(args)
+    if "limite" in args:
+        args["limite"] = int(args["limite"])
+    return args
+
+
+def _tool_call(name, args):
+    return {"id": "call_1", "function": {"name": name, "arguments": json.dumps(args)}}
+
+
+async def test_matching_llm_call_reuses_speculative_result():
+    budget = SpeculationBudget(max_inflight=2)
+    prefetch = SpeculativePrefetch(_normalize, budget)
+    runs = []
+
+    async def runner():
+        runs.append(1)
+        return {"total_resultados": 3}
+
+    assert prefetch.start("consultar_dados_flexivel", {"limite": "50"}, runner)
+
+    # LLM serializa o limite como inteiro: mesma chave após normalização
+    prefetch.settle([_tool_call("consultar_dados_flexivel", {"limite": 50})])
+    task = prefetch.take("consultar_dados_flexivel", {"limite": 50})
+
+    assert await task == {"total_resultados": 3}
+    assert runs == [1]
+    assert prefetch.take("consultar_dados_flexivel", {"limite": 50}) is None
+    assert budget.get_stats()["hit"] == 1
+
+
+async def test_unrequested_speculation_is_reported_as_wasted():
+    budget = SpeculationBudget(max_inflight=2)
+    prefetch = SpeculativePrefetch(_normalize, budget)
+
+    async def runner():
+        return {"total_criticos": 0}
+
+    prefetch.start("encontrar_rupturas_criticas", {"limite": 20}, runner)
+    prefetch.settle([_tool_call("consultar_dados_flexivel", {"limite": 10})])
+    await asyncio.sleep(0)
+
+    stats = budget.get_stats()
+    assert stats["wasted"] == 1 and stats["hit"] == 0
+    assert prefetch.take("encontrar_rupturas_criticas", {"limite": 20}) is None
+
+
+async def test_budget_and_unsafe_tools_limit_speculation():
+    budget = SpeculationBudget(max_inflight=1)
+    release = asyncio.Event()
+
+    async def slow_runner():
+        await release.wait()
+        return {}
+
+    first = SpeculativePrefetch(_normalize, budget)
+    second = SpeculativePrefetch(_normalize, budget)
+
+    assert not first.start("pesquisar_precos_concorrentes", {}, slow_runner)  # efeito externo
+    assert first.start("consultar_dados_flexivel", {}, slow_runner)
+    assert not second.start("consultar_dados_flexivel", {"limite": 5}, slow_runner)
+    assert budget.get_stats()["skipped_budget"] == 1
+
+    release.set()
+    first.settle([])
+    await asyncio.sleep(0.01)
+    assert budget.get_stats()["inflight"] == 0
+
+
+async def test_discard_reaps_unsettled_speculation_when_the_turn_fails():
+    from backend.app.core.agents.caculinha_bi_agent import CaculinhaBIAgent
+
+    budget = SpeculationBudget(max_inflight=2)
+    prefetch = SpeculativePrefetch(_normalize, budget)
+
+    async def failing_runner():
+        raise RuntimeError("parquet indisponível")
+
+    async def failing_turn(self, *args):
+        args[-1].append(prefetch)
+        prefetch.start("consultar_dados_flexivel", {"limite": 10}, failing_runner)
+        raise RuntimeError("LLM fora do ar")
+
+    agent = CaculinhaBIAgent.__new__(CaculinhaBIAgent)
+    agent._run_async = failing_turn.__get__(agent)
+    with pytest.raises(RuntimeError, match="LLM"):
+        await agent.run_async("top 10 produtos")
+    await asyncio.sleep(0.01)
+
+    assert budget.get_stats()["wasted"] == 1 and budget.get_stats()["inflight"] == 0
+    assert prefetch.take("consultar_dados_flexivel", {"limite": 10}) is None
+    assert not prefetch.start("consultar_dados_flexivel", {"limite": 20}, failing_runner)
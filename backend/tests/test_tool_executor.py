@@ -0,0 +1,81 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+
+import pytest
+
+from backend.app.core.tool_executor import ToolExecutionProfile, ToolExecutor
+from backend.app.core.tools.tool_registry import TOOL_EXECUTION_PROFILES
+
+PROFILES = {
+    "pesada": ToolExecutionProfile(pool="cpu", max_concurrency=1),
+    "getpid": ToolExecutionProfile(pool="cpu", process=True),
+}
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+
+async def test_heavy_tool_is_capped_and_does_not_starve_light_tools():
+    executor = ToolExecutor(PROFILES, cpu_workers=2, io_workers=2)
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def heavy():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.15)
+        with lock:
+            running[0] -= 1
+        return "ok"
+
+    heavy_calls = [asyncio.ensure_future(executor.run("pesada", heavy)) for _ in range(3)]
+    await asyncio.sleep(0.02)
+
+    start = time.perf_counter()
+    assert await executor.run("consultar_dados_flexivel", lambda: "leve") == "leve"
+    assert time.perf_counter() - start < 0.1  # pool "io" livre enquanto "pesada" enfileira
+
+    assert await asyncio.gather(*heavy_calls) == ["ok", "ok", "ok"]
+    assert peak[0] == 1
+    assert executor.get_stats()["queued"] == 2
+    executor.shutdown(wait=True)
+
+
+async def test_context_propagates_and_cancelled_queued_call_never_runs():
+    executor = ToolExecutor(PROFILES, cpu_workers=2, io_workers=2)
+    release = threading.Event()
+    ran = []
+
+    _request_id.set("req-1")
+    blocker = asyncio.ensure_future(executor.run("pesada", lambda: release.wait(2) and _request_id.get()))
+    await asyncio.sleep(0.02)
+    queued = asyncio.ensure_future(executor.run("pesada", lambda: ran.append("queued")))
+    await asyncio.sleep(0.02)
+    queued.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+    assert not executor._waiting["pesada"]  # saiu da fila antes de a vaga ser liberada
+    release.set()
+
+    assert await blocker == "req-1"
+    assert await executor.run("pesada", lambda: "depois") == "depois"  # a vaga foi liberada
+    assert ran == []
+    executor.shutdown(wait=True)
+
+
+def test_process_profile_runs_in_child_process_and_registry_declares_heavy_tools():
+    executor = ToolExecutor(PROFILES, cpu_workers=1, io_workers=1, process_pool_enabled=True, process_workers=1)
+    try:
+        assert executor.invoke(os.getpid, "getpid", {}) != os.getpid()
+        assert executor.get_stats()["process"] == 1
+    finally:
+        executor.shutdown(wait=True)
+
+    disabled = ToolExecutor(PROFILES, process_pool_enabled=False)
+    assert disabled.invoke(os.getpid, "getpid", {}) == os.getpid()
+
+    for name in ("sugerir_transferencias_automaticas", "gerar_dashboard_executivo", "analise_correlacao_produtos"):
+        profile = TOOL_EXECUTION_PROFILES[name]
+        assert profile.pool == "cpu" and profile.max_concurrency and profile.process
@@ -0,0 +1,69 @@
+from backend.app.config.settings import settings
+from backend.app.core.agents.caculinha_bi_agent import CaculinhaBIAgent
+from backend.app.core.utils import tool_memo
+from backend.app.core.utils.tool_memo import ToolMemo, ToolMemoStore
+
+SCOPE = ("analyst", ["ARMARINHO"])
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_requires_same_args_scope_and_dataset_version():
+    memo = ToolMemo()
+    key = memo.key("consultar_dados_flexivel", {"filtros": {"une": 1685}, "limite": 10}, SCOPE, "v1")
+    memo.put(key, {"total_vendas": 1200})
+
+    same = memo.key("consultar_dados_flexivel", {"limite": 10, "filtros": {"une": 1685}}, SCOPE, "v1")
+    assert memo.get(same) == {"total_vendas": 1200}
+
+    assert memo.get(memo.key("consultar_dados_flexivel", {"filtros": {"une": 1685}, "limite": 10}, SCOPE, "v2")) is None
+    assert memo.get(memo.key("consultar_dados_flexivel", {"filtros": {"une": 1685}, "limite": 10}, ("admin", []), "v1")) is None
+    assert memo.get_stats() == {"hits": 1, "lookups": 3, "hit_rate": 0.333, "entries": 1}
+
+
+def test_errors_and_non_readonly_tools_are_not_memoized():
+    memo = ToolMemo()
+
+    assert memo.put(memo.key("consultar_dados_flexivel", {}, SCOPE, "v1"), {"error": "timeout"}) is None
+    assert memo.put(memo.key("consultar_dados_flexivel", {"a": 1}, SCOPE, "v1"), {"status": "error"}) is None
+    assert memo.put(memo.key("calcular_preco_final_une", {}, SCOPE, "v1"), {"preco_final": 9.9}) is None
+    assert memo.get_stats()["entries"] == 0
+
+
+def test_cached_results_are_isolated_copies_and_expire():
+    clock = _Clock()
+    memo = ToolMemo(ttl_seconds=60, clock=clock)
+    key = memo.key("encontrar_rupturas_criticas", {"limite": 5}, SCOPE, "v1")
+    memo.put(key, {"rupturas": [{"produto": 1}]})
+
+    memo.get(key)["rupturas"].clear()  # pós-processamento do agente
+    assert memo.get(key) == {"rupturas": [{"produto": 1}]}
+
+    clock.now += 61
+    assert memo.get(key) is None
+
+
+def test_store_keeps_one_memo_per_session_and_agent_scopes_by_role(monkeypatch):
+    store = ToolMemoStore(max_sessions=2)
+    first = store.for_session("s1")
+    assert store.for_session("s1") is first
+    store.for_session("s2")
+    store.for_session("s3")
+    assert store.for_session("s1") is not first  # s1 foi a menos recente
+
+    monkeypatch.setattr(tool_memo, "_store", store)
+    monkeypatch.setattr(settings, "TOOL_MEMO_ENABLED", True)
+    agent = CaculinhaBIAgent.__new__(CaculinhaBIAgent)
+    agent.user_role = "viewer"
+
+    assert agent._open_tool_memo(None) is None
+    memo, scope, version = agent._open_tool_memo("s2")
+    assert memo is store.for_session("s2")
+    assert scope[0] == "viewer"
+    assert isinstance(version, str)
@@ -0,0 +1,97 @@
+from typing import Optional, Union
+
+import pytest
+from langchain_core.tools import tool
+
+from backend.app.core.agents import caculinha_bi_agent
+from backend.app.core.agents.caculinha_bi_agent import CaculinhaBIAgent
+from backend.app.core.tools import tool_registry
+from backend.app.core.tools.tool_registry import ToolRegistry, clean_tool_schema, get_tool_registry
+
+
+@tool
+def consultar_dados_flexivel(filtros: Optional[dict] = None, limite: int = 10) -> str:
+    """Consulta genérica."""
+    return "ok"
+
+
+@tool
+def gerar_grafico_universal_v2(descricao: str) -> str:
+    """Gera gráfico."""
+    return "ok"
+
+
+@tool
+def calcular_preco_final_une(produto: int) -> str:
+    """Preço final (somente admin)."""
+    return "ok"
+
+
+TOOLS = [consultar_dados_flexivel, gerar_grafico_universal_v2, calcular_preco_final_une]
+
+
+@pytest.fixture
+def fake_registry(monkeypatch):
+    builds = []
+
+    def builder():
+        builds.append(1)
+        return TOOLS
+
+    tool_registry.reset_tool_registry()
+    monkeypatch.setattr(caculinha_bi_agent, "get_tool_registry", lambda: get_tool_registry(builder))
+    monkeypatch.setattr(caculinha_bi_agent, "_system_prompt_cache", "PROMPT")
+    yield builds
+    tool_registry.reset_tool_registry()
+
+
+def test_role_views_are_cached_index_subsets_of_precomputed_declarations():
+    registry = ToolRegistry(TOOLS)
+
+    admin, analyst, viewer = registry.view("admin"), registry.view("analyst"), registry.view("viewer")
+
+    assert admin.indices == (0, 1, 2)
+    assert analyst.indices == (0, 1)
+    assert viewer.indices == (1,)
+    assert registry.view("ANALYST") is analyst
+    # Mesma declaration (objeto) compartilhada entre as visões: nada é reconvertido
+    assert analyst.declarations["function_declarations"][1] is registry.declarations[1]
+    assert admin.declarations["function_declarations"][2]["name"] == "calcular_preco_final_une"
+
+
+def test_agents_for_new_roles_reuse_the_process_registry(fake_registry):
+    agents = {
+        role: CaculinhaBIAgent(llm=None, code_gen_agent=None, field_mapper=None, user_role=role, enable_rag=False)
+        for role in ["analyst", "viewer", "admin"]
+    }
+
+    assert len(fake_registry) == 1
+    assert [t.name for t in agents["viewer"].bi_tools] == ["gerar_grafico_universal_v2"]
+    assert len(agents["admin"].gemini_tools["function_declarations"]) == 3
+    assert agents["analyst"].system_prompt == "PROMPT"
+
+
+def test_clean_tool_schema_flattens_optional_and_does_not_mutate_input():
+    schema = consultar_dados_flexivel.get_input_schema().model_json_schema()
+    before = repr(schema)
+
+    cleaned = clean_tool_schema(schema)
+
+    assert repr(schema) == before
+    assert "anyOf" not in cleaned["properties"]["filtros"]
+    assert cleaned["properties"]["filtros"]["type"] == "object"
+    assert "title" not in cleaned["properties"]["limite"]
+
+    mixed = clean_tool_schema({"anyOf": [{"type": "boolean"}, {"type": "string"}, {"type": "null"}]})
+    assert mixed == {"type": "string"}
+
+
+def test_union_annotations_are_declared_as_string():
+    @tool
+    def ferramenta(valor: Union[int, str]) -> str:
+        """Aceita número ou texto."""
+        return str(valor)
+
+    declaration = ToolRegistry([ferramenta]).declarations[0]
+    assert declaration["parameters"]["properties"]["valor"]["type"] == "string"
+    assert declaration["parameters"]["required"] == ["valor"]
@@ -295,6 +295,12 @@ export default function Chat() {
               msg.id === currentMessageId ? { ...msg, text: msg.text + data.text, isThinking: false } : msg
             ));
           }
+          else if (data.type === 'text_replace') {
+            // Versão final do texto já transmitido token a token
+            setMessages(prev => prev.map(msg =>
+              msg.id === currentMessageId ? { ...msg, text: data.text || '', isThinking: false } : msg
+            ));
+          }
           else if (data.type === 'chart' && data.chart_spec) {
             // Switch to chart type or add new message if needed
             setMessages(prev => prev.map(msg =>